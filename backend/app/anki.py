@@ -0,0 +1,239 @@
+"""
+Import von Anki-Decks (.apkg) als Vokabelliste.
+
+Ein .apkg ist ein ZIP mit der Anki-Sammlung als SQLite-Datei
+(collection.anki21 bzw. collection.anki2) und Mediendateien, die wir
+ignorieren. Neuere Anki-Versionen legen die Sammlung zstd-komprimiert als
+collection.anki21b ab; die lesen wir nur mit dem optionalen Paket
+zstandard, sonst hilft in Anki der Export "Unterstützung älterer Versionen".
+
+Speicher: Der Upload liegt als SpooledTemporaryFile vor, vom ZIP wird nur
+das Inhaltsverzeichnis gelesen und die Sammlung blockweise in eine
+temporäre Datei entpackt (sqlite3 braucht einen Pfad). Die Notizen kommen
+per Cursor in Blöcken und werden in Transaktionen zu je
+ANKI_IMPORT_BATCH_SIZE geschrieben – Einträge per INSERT ... RETURNING,
+Feldwerte per executemany.
+
+Zuordnung: Felder des häufigsten Notiztyps -> ListColumns (das erste ist
+primär), Notizen -> VocabEntries in Anki-Reihenfolge. Notizen anderer
+Typen werden über die Feldposition zugeordnet. HTML und [sound:...]
+werden entfernt.
+"""
+import html
+import json
+import re
+import sqlite3
+import tempfile
+import zipfile
+from contextlib import contextmanager
+from pathlib import Path
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+from app import config, models, stats
+from app.metrics import registry
+from app.normalize import normalize_term
+
+try:
+    import zstandard
+except ImportError:  # optional, nur für collection.anki21b
+    zstandard = None
+
+registry.describe("anki_imported_notes_total", "counter", "Aus Anki-Decks importierte Notizen")
+
+FIELD_SEPARATOR = "\x1f"
+CHUNK_SIZE = 1024 * 1024
+
+_TAG_RE = re.compile(r"<[^>]+>")
+_BREAK_RE = re.compile(r"<br\s*/?>|</div>|</p>", re.IGNORECASE)
+_SOUND_RE = re.compile(r"\[sound:[^\]]*\]")
+
+
+class AnkiImportError(ValueError):
+    """Upload ist kein (lesbares) Anki-Deck."""
+
+
+def clean_field(value: str) -> str:
+    """Anki-Feld (HTML) -> Text; Zeilenumbrüche bleiben erhalten."""
+    value = _BREAK_RE.sub("\n", _SOUND_RE.sub("", value))
+    value = html.unescape(_TAG_RE.sub("", value)).replace("\xa0", " ")
+    return "\n".join(line.strip() for line in value.splitlines() if line.strip())
+
+
+# ============== Sammlung lesen ==============
+def _copy_limited(src, dst):
+    written = 0
+    while chunk := src.read(CHUNK_SIZE):
+        written += len(chunk)
+        if written > config.ANKI_MAX_COLLECTION_BYTES:
+            raise AnkiImportError("Anki-Sammlung ist zu groß")
+        dst.write(chunk)
+
+
+@contextmanager
+def open_collection(fileobj):
+    """Entpackt die Sammlung aus dem .apkg in eine temporäre Datei und öffnet sie nur lesend."""
+    try:
+        archive = zipfile.ZipFile(fileobj)
+    except zipfile.BadZipFile:
+        raise AnkiImportError("Keine .apkg-Datei (kein ZIP-Archiv)")
+    with archive, tempfile.TemporaryDirectory(prefix="anki-") as tmp:
+        names = set(archive.namelist())
+        # Neue Exporte enthalten neben anki21b ein collection.anki2, das nur einen Hinweis enthält
+        if "collection.anki21b" in names and (zstandard is not None or "collection.anki21" not in names):
+            if zstandard is None:
+                raise AnkiImportError(
+                    "Neues Anki-Format: in Anki mit \"Unterstützung älterer Versionen\" exportieren"
+                )
+            member, decompress = "collection.anki21b", True
+        elif "collection.anki21" in names:
+            member, decompress = "collection.anki21", False
+        elif "collection.anki2" in names:
+            member, decompress = "collection.anki2", False
+        else:
+            raise AnkiImportError("Keine Anki-Sammlung im Archiv gefunden")
+
+        path = Path(tmp) / "collection.sqlite"
+        with archive.open(member) as src, path.open("wb") as dst:
+            if decompress:
+                src = zstandard.ZstdDecompressor().stream_reader(src)
+            _copy_limited(src, dst)
+        conn = sqlite3.connect(f"{path.as_uri()}?mode=ro", uri=True)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+
+def note_types(conn) -> dict:
+    """{notiztyp_id: [feldnamen]} – Schema 18 (Tabelle fields) oder älter (JSON in col.models)."""
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    types = {}
+    if "fields" in tables:
+        for ntid, name in conn.execute("SELECT ntid, name FROM fields ORDER BY ntid, ord"):
+            types.setdefault(ntid, []).append(name)
+    if not types:
+        row = conn.execute("SELECT models FROM col").fetchone()
+        for mid, model in json.loads(row[0] if row and row[0] else "{}").items():
+            fields = sorted(model.get("flds", []), key=lambda field: field.get("ord", 0))
+            types[int(mid)] = [field["name"] for field in fields]
+    return types
+
+
+def deck_name(conn) -> str:
+    """Name des Decks mit den meisten Karten (letzter Teil von "Eltern::Kind")."""
+    row = conn.execute("SELECT did FROM cards GROUP BY did ORDER BY COUNT(*) DESC LIMIT 1").fetchone()
+    if row is None:
+        return None
+    tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    if "decks" in tables:
+        found = conn.execute("SELECT name FROM decks WHERE id = ?", (row[0],)).fetchone()
+        name = found[0].replace(FIELD_SEPARATOR, "::") if found else None
+    else:
+        decks = json.loads(conn.execute("SELECT decks FROM col").fetchone()[0] or "{}")
+        name = decks.get(str(row[0]), {}).get("name")
+    return name.split("::")[-1].strip() if name else None
+
+
+# ============== Import ==============
+def import_deck(db: Session, fileobj, user_id: int, name: str = None, progress=None) -> dict:
+    """
+    Legt aus einem .apkg eine neue Liste für user_id an; bei einem Fehler
+    wird sie wieder entfernt. progress(importiert, gesamt) nach jedem Block –
+    eine Exception daraus (Job abgebrochen) bricht den Import ebenfalls ab.
+    """
+    with open_collection(fileobj) as conn:
+        try:
+            types = note_types(conn)
+            counts = dict(conn.execute("SELECT mid, COUNT(*) FROM notes GROUP BY mid").fetchall())
+            name = name or deck_name(conn) or "Anki-Import"
+        except (sqlite3.DatabaseError, ValueError, KeyError):
+            raise AnkiImportError("Anki-Sammlung ist beschädigt")
+        total = sum(counts.values())
+        if not total:
+            raise AnkiImportError("Das Deck enthält keine Notizen")
+        if total > config.ANKI_MAX_NOTES:
+            raise AnkiImportError(f"Zu viele Notizen ({total}, max. {config.ANKI_MAX_NOTES})")
+
+        main_type = max(counts, key=counts.get)
+        field_names = types.get(main_type)
+        if not field_names:
+            first = conn.execute("SELECT flds FROM notes WHERE mid = ? LIMIT 1", (main_type,)).fetchone()[0]
+            field_names = [f"Feld {i + 1}" for i in range(len(first.split(FIELD_SEPARATOR)))]
+
+        vocab_list = models.VocabList(name=name, description="Aus Anki importiert", user_id=user_id)
+        db.add(vocab_list)
+        db.flush()
+        # Die Einträge kommen gesammelt ohne crud: Ablenker erst beim ersten Quiz bzw. per Job
+        columns = [
+            models.ListColumn(vocab_list_id=vocab_list.id, name=field, position=i, is_primary=(i == 0),
+                              distractors_ready=None)
+            for i, field in enumerate(field_names)
+        ]
+        db.add_all(columns)
+        stats.list_added(db, vocab_list.id)
+        db.commit()
+        list_id, column_ids = vocab_list.id, [column.id for column in columns]
+
+        imported = 0
+        try:
+            cursor = conn.execute("SELECT flds FROM notes ORDER BY id")
+            while rows := cursor.fetchmany(config.ANKI_IMPORT_BATCH_SIZE):
+                _insert_notes(db, list_id, column_ids, [row[0] for row in rows], imported)
+                db.commit()
+                imported += len(rows)
+                registry.inc("anki_imported_notes_total", amount=len(rows))
+                if progress:
+                    progress(imported, total)
+        except BaseException as exc:
+            db.rollback()
+            _discard_list(db, list_id)
+            for obj in (vocab_list, *columns):
+                db.expunge(obj)
+            # Fehler der eigenen DB kommen als sqlalchemy.exc.DatabaseError, sqlite3 nur von der Sammlung
+            if isinstance(exc, sqlite3.DatabaseError):
+                raise AnkiImportError("Anki-Sammlung ist beschädigt") from exc
+            raise
+
+    return {"vocab_list_id": list_id, "name": name, "columns": columns, "notes": imported}
+
+
+def _insert_notes(db: Session, list_id: int, column_ids, notes, position: int):
+    documents = [
+        {column_id: clean_field(value) for column_id, value in zip(column_ids, note.split(FIELD_SEPARATOR))}
+        for note in notes
+    ]
+    entries = models.VocabEntry.__table__
+    entry_ids = db.execute(
+        insert(entries).returning(entries.c.id, sort_by_parameter_order=True),
+        [
+            {
+                "vocab_list_id": list_id,
+                "position": position + offset,
+                "data": {str(k): v for k, v in document.items()} if config.ENTRY_STORAGE != "eav" else None,
+                "normalized_term": normalize_term(document.get(column_ids[0])) or None,
+            }
+            for offset, document in enumerate(documents)
+        ]
+    ).scalars().all()
+    stats.add_entries(db, list_id, len(entry_ids))
+    stats.add_filled(db, stats.filled_columns(pair for document in documents for pair in document.items()))
+    if config.ENTRY_STORAGE != "json":
+        db.execute(insert(models.EntryFieldValue.__table__), [
+            {"entry_id": entry_id, "column_id": column_id, "value": value}
+            for entry_id, document in zip(entry_ids, documents)
+            for column_id, value in document.items()
+        ])
+
+
+def _discard_list(db: Session, list_id: int):
+    """Halb importierte Liste entfernen – mengenbasiert, ohne 20k Einträge ins ORM zu laden."""
+    stats.list_removed(db, list_id)
+    entries = models.VocabEntry.__table__
+    entry_ids = select(entries.c.id).where(entries.c.vocab_list_id == list_id)
+    db.execute(delete(models.EntryFieldValue.__table__).where(models.EntryFieldValue.entry_id.in_(entry_ids)))
+    db.execute(delete(entries).where(entries.c.vocab_list_id == list_id))
+    db.execute(delete(models.ListColumn.__table__).where(models.ListColumn.vocab_list_id == list_id))
+    db.execute(delete(models.VocabList.__table__).where(models.VocabList.id == list_id))
+    db.commit()
@@ -1,90 +1,235 @@
 ﻿from datetime import datetime, timedelta
-from jose import JWTError, jwt
-from passlib.context import CryptContext
+from functools import lru_cache
+import hashlib
+import secrets
+import time
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import delete, select, update
 from sqlalchemy.orm import Session
-from app.database import SessionLocal
-from app import models, database
-import os
-from dotenv import load_dotenv
+from app import models, database, crud_async, config, revocation
 
 
 # ============== Config ==============
-load_dotenv()
-
-pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
-
-SECRET_KEY = os.getenv("SECRET_KEY")
-ALGORITHM = os.getenv("ALGORITHM")
-ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES"))
+SECRET_KEY = config.SECRET_KEY
+ALGORITHM = config.ALGORITHM
+ACCESS_TOKEN_EXPIRE_MINUTES = config.ACCESS_TOKEN_EXPIRE_MINUTES
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/login/")
 
-def get_db():
-    db = database.SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+get_db = database.get_db
 
 # ============== Passwort ==============
+@lru_cache(maxsize=None)
+def pwd_context():
+    # passlib (und jose unten) erst bei Bedarf laden: der Import kostet bei jedem Start und in jedem Test-Lauf
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
+
+
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    return pwd_context().hash(password)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return pwd_context().verify(plain_password, hashed_password)
 
 
 # ============== JWT ==============
 def create_access_token(data: dict):
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    # iat mit Nachkommastellen: ein direkt nach einer Sperre ausgestelltes Token bleibt gültig
+    to_encode.update({"exp": expire, "iat": time.time(), "type": "access"})
+    from jose import jwt
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
-def verify_access_token(token: str):
+def access_claims(user) -> dict:
+    """Alles, was die Auth pro Request braucht – danach ist kein DB-Zugriff mehr nötig."""
+    claims = {"sub": user.username, "uid": user.id, "role": user.role}
+    if config.TENANT_SHARDING and user.tenant:
+        claims["tenant"] = user.tenant
+    return claims
+
+
+def decode_token(token: str):
+    """Claims nach Prüfung von Signatur und Ablauf, None bei ungültigem Token."""
+    from jose import JWTError, jwt
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        return username
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
     except JWTError:
         return None
 
 
+def decode_access_token(token: str):
+    payload = decode_token(token)
+    if not payload:
+        return None
+    if payload.get("type", "access") != "access":
+        return None
+    return payload
+
+
+def verify_access_token(token: str):
+    payload = decode_access_token(token)
+    return payload.get("sub") if payload else None
+
+
+def is_revoked(payload: dict, user_id: int) -> bool:
+    subject = revocation.subject(user_id, payload.get("tenant"))
+    return revocation.revocations.is_revoked(subject, payload.get("iat"))
+
+
+# ============== User aus Token (ohne DB) ==============
+class TokenUser:
+    """Benutzer aus den Claims eines Access-Tokens; reicht überall, wo nur id/Rolle gebraucht werden."""
+    is_active = True
+
+    def __init__(self, claims: dict):
+        self.id = claims["uid"]
+        self.username = claims["sub"]
+        self.role = claims.get("role")
+        self.tenant = claims.get("tenant")
+
+
+def get_token_user(token: str = Depends(oauth2_scheme)) -> TokenUser:
+    """Signatur, Ablauf und Sperrliste – reine CPU-Arbeit, keine Datenbank."""
+    payload = decode_access_token(token)
+    if not payload or "uid" not in payload:
+        raise HTTPException(status_code=401, detail="Ungültiger oder abgelaufener Token")
+    if is_revoked(payload, payload["uid"]):
+        raise HTTPException(status_code=401, detail="Token wurde widerrufen")
+    return TokenUser(payload)
+
+
 # ============== User aus Token holen ==============
 def get_current_user_from_token(
     token: str = Depends(oauth2_scheme),
     db: Session = Depends(get_db)
 ):
-    username = verify_access_token(token)
-    if not username:
+    payload = decode_access_token(token)
+    if not payload or not payload.get("sub"):
         raise HTTPException(status_code=401, detail="UngÃ¼ltiger oder abgelaufener Token")
 
-    user = db.query(models.User).filter(models.User.username == username).first()
+    user = db.query(models.User).filter(models.User.username == payload["sub"]).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="Benutzer nicht gefunden")
+
+    _check_loaded_user(payload, user)
+    return user
+
+
+def _check_loaded_user(payload: dict, user):
+    if not user.is_active:
+        raise HTTPException(status_code=403, detail="Benutzerkonto ist deaktiviert")
+    if is_revoked(payload, user.id):
+        raise HTTPException(status_code=401, detail="Token wurde widerrufen")
+
+
+# ============== User aus Token holen (async) ==============
+async def get_current_user_async(
+    token: str = Depends(oauth2_scheme),
+    db=Depends(database.get_async_db)
+):
+    payload = decode_access_token(token)
+    if not payload or not payload.get("sub"):
+        raise HTTPException(status_code=401, detail="Ungültiger oder abgelaufener Token")
+
+    user = await crud_async.get_user_by_username(db, payload["sub"])
     if not user:
         raise HTTPException(status_code=404, detail="Benutzer nicht gefunden")
 
+    _check_loaded_user(payload, user)
     return user
 
 
 # ============== Admin-Check ==============
 def admin_required(token: str = Depends(oauth2_scheme)):
-    db = SessionLocal()
-    try:
-        username = verify_access_token(token)
-        if not username:
-            raise HTTPException(status_code=401, detail="UngÃ¼ltiger oder abgelaufener Token")
-
-        user = db.query(models.User).filter(models.User.username == username).first()
-        if not user:
-            raise HTTPException(status_code=404, detail="Benutzer nicht gefunden")
+    user = get_token_user(token)
+    if user.role != "Admin":
+        raise HTTPException(status_code=403, detail="Nur Admins dÃ¼rfen diese Aktion durchfÃ¼hren")
+    return user
 
-        if user.role != "Admin":
-            raise HTTPException(status_code=403, detail="Nur Admins dÃ¼rfen diese Aktion durchfÃ¼hren")
 
-        return user
+# ============== Refresh-Tokens ==============
+def _token_hash(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def create_token_pair(user) -> dict:
+    """Access-Token plus neues Refresh-Token (in der Haupt-DB steht nur dessen Hash)."""
+    refresh_token = secrets.token_urlsafe(32)
+    now = time.time()
+    tokens = models.RefreshToken
+    with database.SessionLocal() as directory:
+        directory.execute(delete(tokens).where(tokens.expires_at < now))
+        directory.add(tokens(
+            token_hash=_token_hash(refresh_token),
+            user_id=user.id,
+            tenant=user.tenant if config.TENANT_SHARDING else None,
+            expires_at=now + config.REFRESH_TOKEN_EXPIRE_DAYS * 86400,
+        ))
+        directory.commit()
+    return {
+        "access_token": create_access_token(data=access_claims(user)),
+        "refresh_token": refresh_token,
+        "token_type": "bearer",
+        "expires_in": ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    }
+
+
+def refresh_token_pair(refresh_token: str) -> dict:
+    """
+    Löst ein Refresh-Token ein und gibt ein neues Paar zurück (Rotation:
+    jedes Refresh-Token gilt genau einmal).
+
+    Taucht ein eingelöstes Token nach REFRESH_REUSE_GRACE_SECONDS noch
+    einmal auf, hat es vermutlich jemand kopiert – dann werden alle
+    Sitzungen des Benutzers beendet.
+    """
+    from app import tenancy
+
+    now = time.time()
+    tokens = models.RefreshToken
+    with database.SessionLocal() as directory:
+        row = directory.execute(
+            select(tokens).where(tokens.token_hash == _token_hash(refresh_token))
+        ).scalar_one_or_none()
+        if row is None or row.expires_at < now:
+            raise HTTPException(status_code=401, detail="Refresh-Token ungültig oder abgelaufen")
+        user_id, tenant, revoked_at = row.user_id, row.tenant, row.revoked_at
+        if revoked_at is None:
+            # Von zwei gleichzeitigen Refreshes mit demselben Token gewinnt genau einer
+            claimed = directory.execute(
+                update(tokens).where(tokens.id == row.id, tokens.revoked_at.is_(None)).values(revoked_at=now)
+            ).rowcount
+            directory.commit()
+            if not claimed:
+                revoked_at = now
+
+    if revoked_at is not None:
+        if now - revoked_at > config.REFRESH_REUSE_GRACE_SECONDS:
+            revocation.revoke_users([user_id], tenant)
+        raise HTTPException(status_code=401, detail="Refresh-Token wurde bereits verwendet")
+
+    db = tenancy.session_for_tenant(tenant)
+    try:
+        user = db.get(models.User, user_id)
+        if user is None or not user.is_active:
+            raise HTTPException(status_code=401, detail="Benutzerkonto ist deaktiviert oder gelöscht")
+        return create_token_pair(user)
     finally:
         db.close()
+
+
+def revoke_refresh_token(refresh_token: str):
+    """Logout: dieses Refresh-Token ist danach wertlos (das Access-Token läuft von selbst ab)."""
+    tokens = models.RefreshToken
+    with database.SessionLocal() as directory:
+        directory.execute(
+            update(tokens)
+            .where(tokens.token_hash == _token_hash(refresh_token), tokens.revoked_at.is_(None))
+            .values(revoked_at=time.time())
+        )
+        directory.commit()
@@ -0,0 +1,82 @@
+"""
+Avatarbilder: Upload, Thumbnails und URLs.
+
+In users steht nur noch der sha256 des hochgeladenen Bildes (avatar_hash).
+Original und Thumbnails (quadratisch, AVATAR_SIZES, WebP) liegen im
+BlobStore unter AVATAR_DIR und werden beim Upload einmalig erzeugt –
+dasselbe Bild ein zweites Mal hochzuladen kostet nur den Hash.
+
+`users.avatar` bleibt für die kurzen Farb-Presets des Frontends ("color:emerald").
+"""
+import base64
+import binascii
+import io
+
+from app import config
+from app.blobstore import BlobStore, digest
+
+
+class AvatarError(ValueError):
+    """Upload ist kein (zulässiges) Bild."""
+
+
+def store() -> BlobStore:
+    return BlobStore(config.AVATAR_DIR)
+
+
+def thumbnail_suffix(size: int) -> str:
+    return f"-{size}.webp"
+
+
+def avatar_url(key: str, size: int = None) -> str:
+    return f"/api/avatars/{key}-{size or max(config.AVATAR_SIZES)}.webp"
+
+
+def _open(data: bytes):
+    # Pillow erst beim ersten Upload laden (schemas importiert dieses Modul für avatar_url)
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    try:
+        image = Image.open(io.BytesIO(data))
+        if image.width * image.height > config.AVATAR_MAX_PIXELS:
+            raise AvatarError(f"Bild zu groß (max. {config.AVATAR_MAX_PIXELS} Pixel)")
+        image.load()
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError):
+        raise AvatarError("Keine gültige Bilddatei")
+    image = ImageOps.exif_transpose(image)
+    if "A" in image.getbands() or "transparency" in image.info:
+        return image.convert("RGBA")
+    return image.convert("RGB")
+
+
+def save_avatar(data: bytes) -> str:
+    """Legt Original und fehlende Thumbnails ab und gibt den Hash zurück."""
+    if len(data) > config.AVATAR_MAX_BYTES:
+        raise AvatarError(f"Bild zu groß (max. {config.AVATAR_MAX_BYTES // 1024} KB)")
+    key = digest(data)
+    blobs = store()
+    missing = [size for size in config.AVATAR_SIZES if not blobs.exists(key, thumbnail_suffix(size))]
+    if not missing:
+        return key
+
+    from PIL import Image, ImageOps
+
+    image = _open(data)
+    for size in missing:
+        thumbnail = ImageOps.fit(image, (size, size), Image.LANCZOS)
+        buffer = io.BytesIO()
+        thumbnail.save(buffer, "WEBP", quality=85, method=4)
+        blobs.write(key, buffer.getvalue(), thumbnail_suffix(size))
+    blobs.write(key, data)
+    return key
+
+
+def from_data_url(value: str) -> bytes:
+    """Bytes aus "data:image/...;base64,..." (so hat das Frontend Bilder bisher gespeichert)."""
+    header, _, payload = value.partition(",")
+    if not header.startswith("data:image/") or not header.endswith(";base64"):
+        raise AvatarError("Nur base64-kodierte data:image/...-URLs werden unterstützt")
+    try:
+        return base64.b64decode(payload, validate=True)
+    except binascii.Error:
+        raise AvatarError("Ungültige base64-Daten")
@@ -0,0 +1,293 @@
+"""
+Online-Backups der SQLite-Datenbank(en) über die SQLite-Backup-API.
+
+Kopiert wird seitenweise (BACKUP_PAGES_PER_STEP Seiten pro Schritt,
+dazwischen BACKUP_STEP_SLEEP Sekunden Pause), die Lesesperre auf der
+Quelle besteht also immer nur für einen Schritt und Schreiber warten nie
+lange. Schreibt eine andere Verbindung während der Kopie, fängt SQLite
+von vorn an; dann wird mit doppelt so großen Schritten neu gestartet und
+nach BACKUP_MAX_RESTARTS Versuchen in einem Zug kopiert.
+
+Jede Kopie wird mit PRAGMA integrity_check geprüft und erst danach unter
+ihrem endgültigen Namen abgelegt (<datenbank>-JJJJMMTT-HHMMSS.db); pro
+Datenbank bleiben die neuesten BACKUP_KEEP Stück.
+
+Bei TENANT_SHARDING werden auch alle SQLite-Shards gesichert.
+"""
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy.engine import make_url
+
+from app import config, database, models
+from app.metrics import registry
+
+try:
+    import fcntl
+except ImportError:  # Windows: keine Sperre zwischen mehreren Workern
+    fcntl = None
+
+logger = logging.getLogger("vocademy.backup")
+
+registry.describe("backup_last_success_timestamp_seconds", "gauge", "Zeitpunkt des letzten erfolgreichen Backups")
+registry.describe("backup_duration_seconds", "gauge", "Dauer des letzten Backups inkl. Prüfung")
+registry.describe("backup_size_bytes", "gauge", "Größe des letzten Backups")
+registry.describe("backup_restarts_total", "counter", "Neustarts der Backup-Kopie durch parallele Schreiber")
+registry.describe("backup_failures_total", "counter", "Fehlgeschlagene Backups")
+
+
+class BackupError(Exception):
+    """Backup oder Restore fehlgeschlagen (z.B. integrity_check nicht ok)."""
+
+
+class _Restarted(Exception):
+    pass
+
+
+class BackupResult:
+    __slots__ = ("path", "size", "seconds", "restarts")
+
+    def __init__(self, path, size, seconds, restarts):
+        self.path = path
+        self.size = size
+        self.seconds = seconds
+        self.restarts = restarts
+
+
+def _connect_readonly(path) -> sqlite3.Connection:
+    return sqlite3.connect(Path(path).resolve().as_uri() + "?mode=ro", uri=True)
+
+
+def _copy(source, target, pages, sleep, progress=None):
+    """Eine Kopie über die Backup-API; _Restarted, wenn SQLite wegen eines Schreibers neu beginnt."""
+    src = _connect_readonly(source)
+    dst = sqlite3.connect(target)
+    last_remaining = None
+
+    def on_step(status, remaining, total):
+        nonlocal last_remaining
+        if last_remaining is not None and remaining >= last_remaining:  # kein Fortschritt = Neustart
+            raise _Restarted()
+        last_remaining = remaining
+        if progress:
+            progress(total - remaining, total)
+
+    try:
+        src.backup(dst, pages=pages, progress=on_step, sleep=sleep)
+    finally:
+        dst.close()
+        src.close()
+
+
+def verify(path) -> str:
+    """PRAGMA integrity_check einer Datei; "ok" oder die gemeldeten Fehler."""
+    conn = _connect_readonly(path)
+    try:
+        rows = conn.execute("PRAGMA integrity_check").fetchall()
+    except sqlite3.DatabaseError as exc:
+        return str(exc)
+    finally:
+        conn.close()
+    return "\n".join(row[0] for row in rows)
+
+
+def _pattern(name):
+    return re.compile(rf"^{re.escape(name)}-\d{{8}}-\d{{6}}\.db$")
+
+
+def list_backups(directory, name) -> list:
+    """Backups einer Datenbank, älteste zuerst."""
+    directory = Path(directory)
+    if not directory.is_dir():
+        return []
+    pattern = _pattern(name)
+    return sorted(p for p in directory.iterdir() if pattern.match(p.name))
+
+
+def rotate(directory, name, keep) -> list:
+    """Löscht alle bis auf die neuesten `keep` Backups und gibt die gelöschten Pfade zurück."""
+    old = list_backups(directory, name)[:-keep] if keep > 0 else []
+    for path in old:
+        path.unlink(missing_ok=True)
+    return old
+
+
+def backup_file(source, directory, name, pages=None, sleep=None, keep=None, progress=None) -> BackupResult:
+    """Sichert die SQLite-Datei `source` nach `directory` und rotiert alte Backups."""
+    source = Path(source)
+    if not source.exists():
+        raise BackupError(f"{source} existiert nicht")
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    pages = pages or config.BACKUP_PAGES_PER_STEP
+    sleep = config.BACKUP_STEP_SLEEP if sleep is None else sleep
+    keep = config.BACKUP_KEEP if keep is None else keep
+
+    started = time.perf_counter()
+    target = directory / f"{name}-{datetime.now():%Y%m%d-%H%M%S}.db"
+    partial = target.with_name(target.name + ".part")
+    restarts = 0
+    while True:
+        partial.unlink(missing_ok=True)
+        try:
+            _copy(source, partial, pages, sleep, progress)
+            break
+        except _Restarted:
+            restarts += 1
+            registry.inc("backup_restarts_total", (("database", name),))
+            pages = -1 if restarts >= config.BACKUP_MAX_RESTARTS else pages * 2
+            logger.info("Backup %s neu gestartet (Schreiber aktiv), jetzt %s Seiten pro Schritt", name, pages)
+
+    result = verify(partial)
+    if result != "ok":
+        partial.unlink(missing_ok=True)
+        raise BackupError(f"integrity_check für {name} fehlgeschlagen: {result}")
+    os.replace(partial, target)
+    rotate(directory, name, keep)
+    return BackupResult(target, target.stat().st_size, time.perf_counter() - started, restarts)
+
+
+# ============== Datenbanken ==============
+def _sqlite_path(url):
+    parsed = make_url(url)
+    if parsed.get_backend_name() != "sqlite" or not parsed.database or parsed.database == ":memory:":
+        return None
+    return Path(parsed.database)
+
+
+def sqlite_databases() -> dict:
+    """{name: pfad} aller zu sichernden SQLite-Dateien ("main" + Shards bei TENANT_SHARDING)."""
+    databases = {}
+    main = _sqlite_path(database.SQLALCHEMY_DATABASE_URL)
+    if main is not None:
+        databases["main"] = main
+    if config.TENANT_SHARDING:
+        from app import tenancy
+
+        with database.SessionLocal() as directory:
+            shards = {shard for (shard,) in directory.query(models.Tenant.shard).distinct()}
+        for shard in sorted(shards - {tenancy.MAIN_SHARD}):
+            path = _sqlite_path(tenancy.shard_url(shard))
+            if path is not None and path.exists():
+                databases[shard] = path
+    return databases
+
+
+def run_backups(directory=None, progress=None) -> dict:
+    """Sichert alle SQLite-Datenbanken; {name: BackupResult oder Exception}."""
+    directory = Path(directory or config.BACKUP_DIR)
+    results = {}
+    for name, path in sqlite_databases().items():
+        labels = (("database", name),)
+        try:
+            result = backup_file(path, directory, name, progress=progress)
+        except (BackupError, sqlite3.Error) as exc:
+            registry.inc("backup_failures_total", labels)
+            logger.error("Backup von %s fehlgeschlagen: %s", name, exc)
+            results[name] = exc
+            continue
+        registry.set_gauge("backup_last_success_timestamp_seconds", time.time(), labels)
+        registry.set_gauge("backup_duration_seconds", result.seconds, labels)
+        registry.set_gauge("backup_size_bytes", result.size, labels)
+        results[name] = result
+    return results
+
+
+def restore(backup, name="main", directory=None) -> Path:
+    """
+    Spielt ein Backup zurück (Server vorher stoppen).
+
+    Das Backup wird zuerst geprüft, der aktuelle Stand vorher selbst
+    gesichert (<name>-vor-restore-*.db), dann per Backup-API
+    überschrieben und erneut geprüft.
+    """
+    backup = Path(backup)
+    result = verify(backup)
+    if result != "ok":
+        raise BackupError(f"{backup} ist beschädigt: {result}")
+    target = sqlite_databases().get(name)
+    if target is None:
+        raise BackupError(f"Unbekannte SQLite-Datenbank '{name}'")
+    if target.exists():
+        backup_file(target, Path(directory or config.BACKUP_DIR), f"{name}-vor-restore", pages=-1, keep=3)
+
+    src = _connect_readonly(backup)
+    dst = sqlite3.connect(target)
+    try:
+        src.backup(dst)
+    finally:
+        dst.close()
+        src.close()
+    result = verify(target)
+    if result != "ok":
+        raise BackupError(f"Datenbank nach Restore beschädigt: {result}")
+    return target
+
+
+# ============== Hintergrund-Job ==============
+class BackupJob:
+    """Thread, der alle `interval` Sekunden run_backups() ausführt (nur ein Worker gleichzeitig)."""
+
+    def __init__(self, interval: float, directory=None):
+        self.interval = interval
+        self.directory = Path(directory or config.BACKUP_DIR)
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="backup-job", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.run_once()
+
+    def run_once(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self.directory / ".lock", "w") as lock:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    return None  # anderer Worker sichert gerade
+            latest = list_backups(self.directory, "main")
+            if latest and time.time() - latest[-1].stat().st_mtime < self.interval / 2:
+                return None  # ein anderer Worker war in diesem Intervall schon dran
+            try:
+                return run_backups(self.directory)
+            except Exception:
+                logger.exception("Backup-Job fehlgeschlagen")
+                return None
+
+
+_job = None
+
+
+def start_background(interval_minutes: float = None) -> BackupJob:
+    global _job
+    if _job is None or not _job.running:
+        _job = BackupJob((interval_minutes or config.BACKUP_INTERVAL_MINUTES) * 60)
+        _job.start()
+    return _job
+
+
+def stop_background():
+    if _job is not None:
+        _job.stop()
+    return _job
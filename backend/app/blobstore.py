@@ -0,0 +1,55 @@
+"""
+Content-addressed Dateiablage: Dateiname = sha256 des Inhalts.
+
+Gleiche Inhalte werden nur einmal gespeichert, Dateien ändern sich nie
+(und dürfen deshalb mit "immutable" ausgeliefert werden). Geschrieben wird
+über eine temporäre Datei + os.replace, Leser sehen also nie halbe Dateien.
+
+Layout: <root>/<hash[:2]>/<hash><suffix>
+"""
+import hashlib
+import os
+import re
+import tempfile
+from pathlib import Path
+
+DIGEST_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+def digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class BlobStore:
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def path(self, key: str, suffix: str = "") -> Path:
+        if not DIGEST_RE.match(key):
+            raise ValueError(f"Ungültiger Hash '{key}'")
+        return self.root / key[:2] / f"{key}{suffix}"
+
+    def exists(self, key: str, suffix: str = "") -> bool:
+        return self.path(key, suffix).exists()
+
+    def write(self, key: str, data: bytes, suffix: str = "") -> Path:
+        """Legt `data` unter `key` ab (no-op, wenn die Datei schon existiert)."""
+        path = self.path(key, suffix)
+        if path.exists():
+            return path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+        return path
+
+    def put(self, data: bytes, suffix: str = "") -> str:
+        """Speichert `data` unter seinem sha256 und gibt den Hash zurück."""
+        key = digest(data)
+        self.write(key, data, suffix)
+        return key
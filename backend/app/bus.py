@@ -0,0 +1,218 @@
+"""
+Invalidierungs-Bus zwischen Worker-Prozessen.
+
+Mit mehreren Workern (python -m app.serve) hat jeder Prozess eigenen
+Speicher. Was dort gehalten wird – die Abos der Live-Änderungen
+(events.py), die Sperrliste der Tokens (revocation.py), die Zuordnung
+Mandant -> Shard (tenancy.py) – muss von Schreibzugriffen in den anderen
+Workern erfahren, sonst bedient ein Worker veraltete Daten.
+
+- publish(topic, **payload) schreibt nach dem eigentlichen Commit eine Zeile
+  in bus_messages (Haupt-DB). Die crud-Funktionen tun das über
+  events.publish(), Sperrliste und Mandanten-Verzeichnis direkt.
+- Ein Thread pro Prozess liest alle BUS_POLL_SECONDS die neuen Zeilen der
+  anderen Prozesse und ruft die mit @listener(topic) registrierten
+  Funktionen auf. Auf SQLite fragt er zuerst PRAGMA data_version seiner
+  eigenen Verbindung ab: der Wert ändert sich nur, wenn eine andere
+  Verbindung committet hat. Ohne Schreibzugriffe kostet ein Durchlauf so
+  keinen Zugriff auf die Tabelle.
+- IDs werden nicht in Commit-Reihenfolge sichtbar: PostgreSQL vergibt sie
+  vor dem Commit, ein Worker kann N+1 committen, während N noch offen ist.
+  Fehlende IDs unterhalb der höchsten gelesenen merkt sich poll() als
+  Lücken und liest ab der ältesten erneut (schon Ausgeliefertes wird
+  übersprungen), bis sie auftauchen oder nach BUS_GAP_SECONDS als
+  zurückgerollt gelten.
+- Ohne BUS_ENABLED (ein Worker, Standard) ist publish() ein No-op, und es
+  läuft kein Thread. Gelesene Nachrichten werden nach
+  BUS_RETENTION_SECONDS gelöscht.
+"""
+import logging
+import os
+import threading
+import time
+import uuid
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.exc import SQLAlchemyError
+
+from app import config, database, models
+from app.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+registry.describe("bus_published_total", "counter", "An andere Worker gesendete Nachrichten nach Thema")
+registry.describe("bus_received_total", "counter", "Von anderen Workern empfangene Nachrichten nach Thema")
+
+messages = models.BusMessage.__table__
+
+_listeners = {}  # topic -> [Funktion(**payload)]
+
+
+def listener(topic: str):
+    """Registriert eine Funktion für Nachrichten anderer Worker zu topic."""
+    def register(func):
+        _listeners.setdefault(topic, []).append(func)
+        return func
+    return register
+
+
+def _origin() -> str:
+    return f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+
+class Bus:
+    def __init__(self, engine=None, poll_seconds: float = None):
+        self._engine = engine
+        self.poll_seconds = config.BUS_POLL_SECONDS if poll_seconds is None else poll_seconds
+        self.origin = _origin()
+        self.last_id = None  # alle IDs <= last_id sind erledigt
+        self._max_id = None  # höchste gelesene ID
+        self._gaps = {}  # fehlende ID -> seit (monotonic)
+        self._delivered = set()  # schon verarbeitete IDs > last_id
+        self._connection = None
+        self._data_version = None
+        self._pruned_at = 0.0
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def engine(self):
+        return self._engine or database.engine
+
+    def publish(self, topic: str, **payload):
+        """Nach dem Commit der eigentlichen Änderung aufrufen; Fehler kosten nur die Benachrichtigung."""
+        if not config.BUS_ENABLED:
+            return
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(insert(messages).values(
+                    origin=self.origin, topic=topic, payload=payload, created_at=time.time()
+                ))
+        except SQLAlchemyError:
+            logger.warning("Nachricht '%s' an andere Worker fehlgeschlagen", topic, exc_info=True)
+            return
+        registry.inc("bus_published_total", (("topic", topic),))
+
+    # ============== Empfangen ==============
+    def open(self):
+        """Eigene Verbindung zum Abfragen; ab jetzt gelten nur neue Nachrichten."""
+        with self._lock:
+            self._connection = self.engine.connect()
+            self.last_id = self._max_id = self._connection.scalar(select(func.max(messages.c.id))) or 0
+            self._gaps.clear()
+            self._delivered.clear()
+            self._data_version = self._version()
+            self._connection.commit()
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def _version(self):
+        if self.engine.dialect.name != "sqlite":
+            return None
+        return self._connection.exec_driver_sql("PRAGMA data_version").scalar()
+
+    def poll(self) -> int:
+        """Neue Nachrichten anderer Worker ausliefern; gibt ihre Anzahl zurück."""
+        with self._lock:
+            if self._connection is None:
+                return 0
+            try:
+                version = self._version()
+                if version is not None and version == self._data_version:
+                    self._advance([])  # Lücken können nur ablaufen
+                    return 0
+                rows = self._connection.execute(
+                    select(messages.c.id, messages.c.origin, messages.c.topic, messages.c.payload)
+                    .where(messages.c.id > self.last_id).order_by(messages.c.id)
+                ).all()
+                self._data_version = version
+            finally:
+                # Keine Lesetransaktion offen halten (SQLite: Snapshot, WAL-Checkpoints)
+                self._connection.commit()
+            rows = self._advance(rows)
+        received = 0
+        for row in rows:
+            if row.origin == self.origin:
+                continue
+            received += 1
+            registry.inc("bus_received_total", (("topic", row.topic),))
+            for func in _listeners.get(row.topic, ()):
+                try:
+                    func(**row.payload)
+                except Exception:
+                    logger.exception("Nachricht '%s' eines anderen Workers nicht verarbeitet", row.topic)
+        return received
+
+    def _advance(self, rows):
+        """Neue Zeilen (ohne schon ausgelieferte) und Cursor weiter bis zur ältesten offenen Lücke."""
+        now = time.monotonic()
+        fresh = []
+        for row in rows:
+            if row.id in self._delivered:
+                continue
+            self._gaps.pop(row.id, None)
+            self._delivered.add(row.id)
+            for missing in range(self._max_id + 1, row.id):
+                self._gaps[missing] = now
+            self._max_id = max(self._max_id, row.id)
+            fresh.append(row)
+        for missing, since in list(self._gaps.items()):
+            if now - since >= config.BUS_GAP_SECONDS:
+                del self._gaps[missing]
+        self.last_id = min(self._gaps) - 1 if self._gaps else self._max_id
+        self._delivered = {id_ for id_ in self._delivered if id_ > self.last_id}
+        return fresh
+
+    def prune(self) -> int:
+        with self.engine.begin() as conn:
+            return conn.execute(
+                delete(messages).where(messages.c.created_at < time.time() - config.BUS_RETENTION_SECONDS)
+            ).rowcount
+
+    # ============== Hintergrund-Thread ==============
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running():
+            return
+        # Nach fork() eindeutig pro Prozess, sonst überspringen sich die Worker gegenseitig
+        self.origin = _origin()
+        self.open()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="worker-bus", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout=5)
+        self.close()
+
+    def _run(self):
+        while not self._stop.wait(self.poll_seconds):
+            try:
+                self.poll()
+                if time.monotonic() - self._pruned_at > config.BUS_RETENTION_SECONDS / 2:
+                    self._pruned_at = time.monotonic()
+                    self.prune()
+            except SQLAlchemyError:
+                logger.warning("Abfrage des Worker-Bus fehlgeschlagen", exc_info=True)
+
+
+bus = Bus()
+
+
+def start_background() -> Bus:
+    bus.start()
+    return bus
+
+
+def stop_background():
+    bus.stop()
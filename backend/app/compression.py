@@ -0,0 +1,170 @@
+"""
+Komprimierung von API-Antworten (gzip, optional brotli).
+
+Vokabel-JSON besteht zu großen Teilen aus wiederholten Schlüsseln
+("column_id", "value", "entry_id") und schrumpft mit gzip etwa auf ein Fünftel.
+Level/Quality sind für die CPU des Pi gewählt: gzip 5 bzw. brotli 4 liegen
+nahe am Optimum aus gesparten Bytes pro CPU-Millisekunde
+(siehe benchmarks/bench_compression.py).
+
+Gestreamte Antworten werden Chunk für Chunk komprimiert und jeweils geflusht,
+damit der Client sofort Daten bekommt.
+"""
+import time
+import zlib
+
+from app import config
+from app.metrics import registry
+from app.static import accepted_encodings
+
+try:
+    import brotli
+except ImportError:  # optional
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "application/xml", "image/svg+xml")
+# SSE: kleine Events, und jede offene Verbindung hielte sonst einen eigenen Kompressor (zlib ~256 KB)
+UNCOMPRESSED_TYPES = ("text/event-stream",)
+
+registry.describe("http_compression_bytes_in_total", "counter", "Unkomprimierte Bytes vor der Komprimierung")
+registry.describe("http_compression_bytes_out_total", "counter", "Übertragene Bytes nach der Komprimierung")
+registry.describe("http_compression_cpu_seconds_total", "counter", "CPU-Zeit für die Komprimierung")
+
+
+class _Gzip:
+    name = "gzip"
+
+    def __init__(self):
+        # wbits 16+15 = gzip-Header
+        self._obj = zlib.compressobj(config.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._obj.compress(data) + self._obj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._obj.compress(data) + self._obj.flush(zlib.Z_FINISH)
+
+
+class _Brotli:
+    name = "br"
+
+    def __init__(self):
+        self._obj = brotli.Compressor(quality=config.COMPRESSION_BROTLI_QUALITY)
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._obj.process(data) + self._obj.flush()
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._obj.process(data) + self._obj.finish()
+
+
+def choose_encoder(accept_encoding: str):
+    accepted = accepted_encodings(accept_encoding)
+    if brotli is not None and "br" in accepted:
+        return _Brotli
+    if "gzip" in accepted:
+        return _Gzip
+    return None
+
+
+class CompressionMiddleware:
+    """ASGI-Middleware für /api-Antworten ab COMPRESSION_MIN_SIZE Bytes."""
+
+    def __init__(self, app, prefix: str = "/api"):
+        self.app = app
+        self.prefix = prefix
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.prefix):
+            await self.app(scope, receive, send)
+            return
+        accept = ""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept = value.decode("latin-1")
+                break
+        encoder_cls = choose_encoder(accept)
+        if encoder_cls is None:
+            await self.app(scope, receive, send)
+            return
+        await _CompressedResponse(encoder_cls, send)(self.app, scope, receive)
+
+
+class _CompressedResponse:
+    def __init__(self, encoder_cls, send):
+        self.encoder_cls = encoder_cls
+        self.send = send
+        self.start = None
+        self.encoder = None
+        self.passthrough = False
+
+    async def __call__(self, app, scope, receive):
+        await app(scope, receive, self.on_message)
+
+    async def on_message(self, message):
+        if message["type"] == "http.response.start":
+            self.start = message
+            headers = {k.lower(): v for k, v in message.get("headers", [])}
+            content_type = headers.get(b"content-type", b"").decode("latin-1")
+            self.passthrough = (
+                b"content-encoding" in headers
+                or not content_type.startswith(COMPRESSIBLE_TYPES)
+                or content_type.startswith(UNCOMPRESSED_TYPES)
+                or message["status"] in (204, 304)
+            )
+            return
+
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.passthrough:
+            await self._send_start()
+            await self.send(message)
+            return
+
+        if self.encoder is None:
+            if not more_body and len(body) < config.COMPRESSION_MIN_SIZE:
+                # Kleine Antwort: unverändert senden
+                self.passthrough = True
+                await self._send_start(vary=True)
+                await self.send(message)
+                return
+            self.encoder = self.encoder_cls()
+            if not more_body:
+                out = self._compress(body, final=True)
+                await self._send_start(vary=True, length=len(out))
+                await self.send({"type": "http.response.body", "body": out})
+                return
+            await self._send_start(vary=True)
+
+        out = self._compress(body, final=not more_body)
+        await self.send({"type": "http.response.body", "body": out, "more_body": more_body})
+
+    def _compress(self, data: bytes, final: bool) -> bytes:
+        cpu = time.thread_time()
+        out = self.encoder.finish(data) if final else self.encoder.chunk(data)
+        cpu = time.thread_time() - cpu
+        labels = (("encoding", self.encoder.name),)
+        registry.inc("http_compression_bytes_in_total", labels, len(data))
+        registry.inc("http_compression_bytes_out_total", labels, len(out))
+        registry.inc("http_compression_cpu_seconds_total", labels, cpu)
+        return out
+
+    async def _send_start(self, vary: bool = False, length: int = None):
+        if self.start is None:
+            return
+        message, self.start = dict(self.start), None
+        headers = list(message.get("headers", []))
+        if self.encoder is not None:
+            headers = [(k, v) for k, v in headers if k.lower() != b"content-length"]
+            headers.append((b"content-encoding", self.encoder.name.encode()))
+            if length is not None:
+                headers.append((b"content-length", str(length).encode()))
+        if vary:
+            headers.append((b"vary", b"Accept-Encoding"))
+        message["headers"] = headers
+        await self.send(message)
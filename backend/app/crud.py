@@ -1,8 +1,15 @@
+import secrets
+from sqlalchemy import Integer, bindparam, func, insert, literal, select, update
 from sqlalchemy.orm import Session
-from app import models, schemas, auth
+from app import models, schemas, auth, avatars, config, distractors, events, revocation, stats
+from app.normalize import normalize_term
 from fastapi import HTTPException, status
 from app.auth import hash_password
 
+# Farb-Presets wie "color:emerald"; alles Längere gehört in den BlobStore
+AVATAR_PRESET_MAX_LENGTH = 64
+
+
 # ============== USER ==============
 def create_user(db: Session, user: schemas.UserCreate):
     # Check if email already exists
@@ -18,7 +25,8 @@ def create_user(db: Session, user: schemas.UserCreate):
         firstname=(user.firstname.strip() if getattr(user, 'firstname', None) else None),
         password=hashed_pw,
         role="User",
-        is_active=True
+        is_active=True,
+        tenant=user.tenant
     )
 
     db.add(new_user)
@@ -47,6 +55,9 @@ def update_user(db: Session, user_id: int, updated_data: schemas.UserUpdate, cur
     if current_user.role != "Admin" and current_user.id != user_id:
         raise HTTPException(status_code=403, detail="Kein Zugriff!")
 
+    # Access-Tokens tragen Name und Rolle: bei Änderung sperren, der Client holt per Refresh neue
+    claims_before = (user.username, user.role, user.is_active)
+
     if updated_data.username and updated_data.username.strip():
         user.username = updated_data.username.strip()
     
@@ -66,7 +77,16 @@ def update_user(db: Session, user_id: int, updated_data: schemas.UserUpdate, cur
         user.firstname = fn
 
     if getattr(updated_data, 'avatar', None) is not None:
-        user.avatar = updated_data.avatar
+        if updated_data.avatar.startswith("data:"):
+            # Bilder nicht mehr in der users-Zeile speichern, sondern im BlobStore
+            try:
+                user.avatar_hash = avatars.save_avatar(avatars.from_data_url(updated_data.avatar))
+            except avatars.AvatarError as exc:
+                raise HTTPException(status_code=400, detail=str(exc))
+        elif len(updated_data.avatar) > AVATAR_PRESET_MAX_LENGTH:
+            raise HTTPException(status_code=400, detail="Avatar zu lang – Bilder über /api/user/me/avatar hochladen")
+        else:
+            user.avatar = updated_data.avatar
 
     if updated_data.role and updated_data.role.strip():
         if current_user.role != "Admin":
@@ -80,6 +100,8 @@ def update_user(db: Session, user_id: int, updated_data: schemas.UserUpdate, cur
 
     db.commit()
     db.refresh(user)
+    if claims_before != (user.username, user.role, user.is_active):
+        revocation.revoke(user, refresh_tokens=not user.is_active)
     return user
 
 
@@ -97,6 +119,7 @@ def deactivate_user(db: Session, user_id: int, current_user: models.User):
     user.is_active = False
     db.commit()
     db.refresh(user)
+    revocation.revoke(user)
     return {"message": f"Benutzer '{user.username}' wurde deaktiviert."}
 
 
@@ -111,9 +134,11 @@ def delete_user(db: Session, user_id: int, current_user: models.User):
     if current_user.id == user.id:
         raise HTTPException(status_code=400, detail="Admins können sich nicht selbst löschen")
 
+    user_id, tenant, username = user.id, user.tenant if config.TENANT_SHARDING else None, user.username
     db.delete(user)
     db.commit()
-    return {"message": f"Benutzer '{user.username}' wurde gelöscht."}
+    revocation.revoke_users([user_id], tenant)
+    return {"message": f"Benutzer '{username}' wurde gelöscht."}
 
 
 # ============== VOCAB LISTS ==============
@@ -140,6 +165,7 @@ def create_vocab_list(db: Session, vocablist_data: schemas.VocabListCreate, user
             is_primary=col_data.is_primary
         )
         db.add(column)
+    stats.list_added(db, new_vocab_list.id)
     
     db.commit()
     db.refresh(new_vocab_list)
@@ -167,6 +193,13 @@ def get_vocab_list(db: Session, vocablist_id: int):
     ).filter(models.VocabList.id == vocablist_id).first()
 
 
+def get_vocab_list_owner(db: Session, vocablist_id: int):
+    """
+    Nur user_id einer Liste (für den Berechtigungscheck), None wenn sie nicht existiert.
+    """
+    return db.query(models.VocabList.user_id).filter(models.VocabList.id == vocablist_id).scalar()
+
+
 def update_vocab_list(db: Session, vocablist_id: int, data: schemas.VocabListUpdate):
     """
     Aktualisiert Name/Beschreibung einer Liste.
@@ -182,6 +215,7 @@ def update_vocab_list(db: Session, vocablist_id: int, data: schemas.VocabListUpd
     
     db.commit()
     db.refresh(vocab_list)
+    events.publish(db, vocablist_id, "list_updated", name=vocab_list.name, description=vocab_list.description)
     return vocab_list
 
 
@@ -192,11 +226,130 @@ def delete_vocab_list(db: Session, vocablist_id: int):
     vocab_list = get_vocab_list(db, vocablist_id)
     if not vocab_list:
         return False
+    stats.list_removed(db, vocablist_id)
+    distractors.list_removed(db, vocablist_id)
     db.delete(vocab_list)
     db.commit()
+    events.publish(db, vocablist_id, "list_deleted")
     return True
 
 
+# ============== KOPIEREN & TEILEN ==============
+def _id_map(table, source_list_id: int, clone_list_id: int):
+    """
+    (old_id, new_id) für die Zeilen einer Tabelle zweier Listen, zugeordnet
+    über die Reihenfolge: Die Kopie wurde in id-Reihenfolge eingefügt und
+    war vorher leer, also entspricht die n-te neue Zeile der n-ten alten.
+    """
+    def ranked(list_id, label):
+        return select(
+            table.c.id.label(label),
+            func.row_number().over(order_by=table.c.id).label("rank")
+        ).where(table.c.vocab_list_id == list_id).subquery()
+
+    old, new = ranked(source_list_id, "old_id"), ranked(clone_list_id, "new_id")
+    return select(old.c.old_id, new.c.new_id).join(new, old.c.rank == new.c.rank).subquery()
+
+
+def clone_vocab_list(db: Session, vocablist_id: int, user_id: int, name: str = None):
+    """
+    Kopiert eine Liste mit Spalten, Einträgen und Feldwerten für user_id.
+
+    Mengenbasiert in einer Transaktion: pro Tabelle ein INSERT ... SELECT,
+    egal wie viele Einträge die Liste hat. Nur die JSON-Dokumente
+    (ENTRY_STORAGE != "eav") werden in Python umgeschrieben, weil ihre
+    Schlüssel Spalten-IDs sind – gesammelt als ein executemany.
+    """
+    source = db.get(models.VocabList, vocablist_id)
+    if not source:
+        return None
+    clone = models.VocabList(
+        name=name or source.name, description=source.description, user_id=user_id, entry_count=source.entry_count
+    )
+    db.add(clone)
+    db.flush()
+
+    columns = models.ListColumn.__table__
+    entries = models.VocabEntry.__table__
+    values = models.EntryFieldValue.__table__
+    new_list_id = literal(clone.id, Integer)
+
+    column_fields = ["name", "column_type", "position", "language_code", "is_primary", "filled_count"]
+    db.execute(insert(columns).from_select(
+        ["vocab_list_id", *column_fields],
+        select(new_list_id, *(columns.c[f] for f in column_fields))
+        .where(columns.c.vocab_list_id == source.id).order_by(columns.c.id)
+    ))
+    db.execute(insert(entries).from_select(
+        ["vocab_list_id", "position", "data", "normalized_term"],
+        select(new_list_id, entries.c.position, entries.c.data, entries.c.normalized_term)
+        .where(entries.c.vocab_list_id == source.id).order_by(entries.c.id)
+    ))
+
+    column_map = _id_map(columns, source.id, clone.id)
+    if config.ENTRY_STORAGE != "json":
+        entry_map = _id_map(entries, source.id, clone.id)
+        db.execute(insert(values).from_select(
+            ["entry_id", "column_id", "value"],
+            select(entry_map.c.new_id, column_map.c.new_id, values.c.value)
+            .select_from(values)
+            .join(entry_map, values.c.entry_id == entry_map.c.old_id)
+            .join(column_map, values.c.column_id == column_map.c.old_id)
+            .order_by(values.c.id)
+        ))
+    if config.ENTRY_STORAGE != "eav":
+        keys = {str(old): str(new) for old, new in db.execute(select(column_map.c.old_id, column_map.c.new_id))}
+        documents = [
+            {"entry_id": entry_id, "document": {keys.get(k, k): v for k, v in data.items()}}
+            for entry_id, data in db.execute(
+                select(entries.c.id, entries.c.data)
+                .where(entries.c.vocab_list_id == clone.id, entries.c.data.isnot(None))
+            )
+        ]
+        if documents:
+            db.execute(
+                update(entries).where(entries.c.id == bindparam("entry_id")).values(data=bindparam("document")),
+                documents
+            )
+
+    # Ablenker-Kandidaten nicht mitkopieren, beim ersten Quiz neu berechnen
+    db.execute(update(columns).where(columns.c.vocab_list_id == clone.id).values(distractors_ready=None))
+    stats.list_added(db, clone.id)
+    db.commit()
+    return get_vocab_list(db, clone.id)
+
+
+def share_vocab_list(db: Session, vocablist_id: int, enabled: bool = True):
+    """Vergibt einen Freigabe-Code (bleibt beim erneuten Teilen gleich) oder entzieht ihn."""
+    vocab_list = get_vocab_list(db, vocablist_id)
+    if not vocab_list:
+        return None
+    if not enabled:
+        vocab_list.share_code = None
+    elif not vocab_list.share_code:
+        vocab_list.share_code = secrets.token_urlsafe(9)
+    db.commit()
+    db.refresh(vocab_list)
+    return vocab_list
+
+
+def get_shared_vocab_list(db: Session, share_code: str):
+    from sqlalchemy.orm import selectinload
+    entries = selectinload(models.VocabList.entries)
+    if config.ENTRY_STORAGE == "eav":
+        # Sonst lädt die Serialisierung die Feldwerte einzeln pro Eintrag
+        entries = entries.selectinload(models.VocabEntry.field_values)
+    return db.query(models.VocabList).options(
+        selectinload(models.VocabList.columns),
+        entries
+    ).filter(models.VocabList.share_code == share_code).first()
+
+
+def get_shared_vocab_list_id(db: Session, share_code: str):
+    """Nur die ID einer freigegebenen Liste, None wenn der Code nicht (mehr) gilt."""
+    return db.query(models.VocabList.id).filter(models.VocabList.share_code == share_code).scalar()
+
+
 # ============== LIST COLUMNS ==============
 def add_column_to_list(db: Session, list_id: int, column_data: schemas.ListColumnCreate):
     """
@@ -220,8 +373,12 @@ def add_column_to_list(db: Session, list_id: int, column_data: schemas.ListColum
         is_primary=column_data.is_primary
     )
     db.add(column)
+    db.flush()
+    if term_column_id(db, list_id) == column.id:
+        refresh_entry_terms(db, list_id)
     db.commit()
     db.refresh(column)
+    events.publish(db, list_id, "column_added", column=events.column_payload(column))
     return column
 
 
@@ -232,16 +389,146 @@ def delete_column(db: Session, column_id: int):
     column = db.query(models.ListColumn).filter(models.ListColumn.id == column_id).first()
     if not column:
         return False
+    if config.ENTRY_STORAGE != "eav":
+        key = str(column_id)
+        entries = db.query(models.VocabEntry).filter(
+            models.VocabEntry.vocab_list_id == column.vocab_list_id,
+            models.VocabEntry.data.isnot(None)
+        ).all()
+        for entry in entries:
+            if key in entry.data:
+                entry.data = {k: v for k, v in entry.data.items() if k != key}
+    list_id = column.vocab_list_id
+    was_term_column = term_column_id(db, list_id) == column_id
+    distractors.columns_removed(db, [column_id])
     db.delete(column)
+    db.flush()
+    if was_term_column:
+        refresh_entry_terms(db, list_id)
     db.commit()
+    events.publish(db, list_id, "column_deleted", column_id=column_id)
     return True
 
 
+# ============== NORMALISIERTE BEGRIFFE ==============
+def term_column_id(db: Session, list_id: int):
+    """Spalte, deren Wert als Begriff eines Eintrags gilt: die Hauptspalte, sonst die erste."""
+    return db.query(models.ListColumn.id).filter(
+        models.ListColumn.vocab_list_id == list_id
+    ).order_by(
+        models.ListColumn.is_primary.desc(), models.ListColumn.position, models.ListColumn.id
+    ).limit(1).scalar()
+
+
+def entry_term(field_values, column_id):
+    for field in field_values:
+        if field.column_id == column_id:
+            return normalize_term(field.value) or None
+    return None
+
+
+def refresh_entry_terms(db: Session, list_id: int):
+    """
+    Berechnet normalized_term aller Einträge einer Liste neu (Hauptspalte
+    hinzugefügt/gelöscht, Backfill). Ein executemany, ohne Commit.
+    """
+    column_id = term_column_id(db, list_id)
+    entries = models.VocabEntry.__table__
+    if config.ENTRY_STORAGE == "eav":
+        values = dict(db.execute(
+            select(models.EntryFieldValue.entry_id, models.EntryFieldValue.value)
+            .join(models.VocabEntry)
+            .where(models.VocabEntry.vocab_list_id == list_id, models.EntryFieldValue.column_id == column_id)
+        ).all())
+    else:
+        values = {
+            entry_id: (data or {}).get(str(column_id))
+            for entry_id, data in db.execute(select(entries.c.id, entries.c.data).where(entries.c.vocab_list_id == list_id))
+        }
+    terms = [
+        {"entry_id": entry_id, "term": normalize_term(values.get(entry_id)) or None}
+        for entry_id in db.execute(select(entries.c.id).where(entries.c.vocab_list_id == list_id)).scalars()
+    ]
+    if terms:
+        db.execute(
+            update(entries).where(entries.c.id == bindparam("entry_id")).values(normalized_term=bindparam("term")),
+            terms
+        )
+
+
+def find_entry_ids_by_term(db: Session, list_id: int, term: str):
+    """IDs der Einträge mit diesem (bereits normalisierten) Begriff – ein Index-Lookup."""
+    return [row[0] for row in db.query(models.VocabEntry.id).filter(
+        models.VocabEntry.vocab_list_id == list_id,
+        models.VocabEntry.normalized_term == term
+    ).order_by(models.VocabEntry.position, models.VocabEntry.id)]
+
+
+def find_entries_by_term(db: Session, list_id: int, value: str):
+    """Exakte Suche nach einem Wort in der Hauptspalte (normalisiert wie im Vokabeltest)."""
+    term = normalize_term(value)
+    if not term:
+        return []
+    from sqlalchemy.orm import joinedload
+    query = db.query(models.VocabEntry)
+    if config.ENTRY_STORAGE == "eav":
+        query = query.options(
+            joinedload(models.VocabEntry.field_values).joinedload(models.EntryFieldValue.column)
+        )
+    return query.filter(
+        models.VocabEntry.vocab_list_id == list_id,
+        models.VocabEntry.normalized_term == term
+    ).order_by(models.VocabEntry.position, models.VocabEntry.id).all()
+
+
+def find_duplicate_entries(db: Session, list_id: int):
+    """Begriffe, die mehrfach in der Liste stehen: [{"normalized_term", "entry_ids"}]."""
+    entries = models.VocabEntry
+    duplicated = select(entries.normalized_term).where(
+        entries.vocab_list_id == list_id,
+        entries.normalized_term.isnot(None)
+    ).group_by(entries.normalized_term).having(func.count() > 1)
+    rows = db.query(entries.id, entries.normalized_term).filter(
+        entries.vocab_list_id == list_id,
+        entries.normalized_term.in_(duplicated)
+    ).order_by(entries.normalized_term, entries.position, entries.id)
+    groups = {}
+    for entry_id, term in rows:
+        groups.setdefault(term, []).append(entry_id)
+    return [{"normalized_term": term, "entry_ids": ids} for term, ids in groups.items()]
+
+
 # ============== VOCAB ENTRIES ==============
-def create_vocab_entry(db: Session, data: schemas.VocabEntryCreate):
+def _write_field_values(db: Session, entry: models.VocabEntry, field_values):
+    """
+    Schreibt die Feldwerte eines Eintrags je nach ENTRY_STORAGE
+    als EntryFieldValue-Zeilen, als JSON-Dokument oder beides.
+    Läuft in der Transaktion des Aufrufers.
+    """
+    if config.ENTRY_STORAGE != "json":
+        for field_data in field_values:
+            field_value = models.EntryFieldValue(
+                entry_id=entry.id,
+                column_id=field_data.column_id,
+                value=field_data.value
+            )
+            db.add(field_value)
+    if config.ENTRY_STORAGE != "eav":
+        entry.data = {str(f.column_id): f.value for f in field_values}
+
+
+def create_vocab_entry(db: Session, data: schemas.VocabEntryCreate, reject_duplicates: bool = False):
     """
     Erstellt einen Vokabeleintrag mit Feldwerten.
+
+    reject_duplicates: 409, wenn die Liste den Begriff (normalisiert) schon enthält.
     """
+    term = entry_term(data.field_values, term_column_id(db, data.vocab_list_id))
+    if reject_duplicates and term:
+        existing = find_entry_ids_by_term(db, data.vocab_list_id, term)
+        if existing:
+            raise HTTPException(status_code=409, detail=f"Eintrag existiert bereits (ID {existing[0]})")
+
     # Get next position
     max_pos = db.query(models.VocabEntry).filter(
         models.VocabEntry.vocab_list_id == data.vocab_list_id
@@ -249,22 +536,21 @@ def create_vocab_entry(db: Session, data: schemas.VocabEntryCreate):
     
     entry = models.VocabEntry(
         vocab_list_id=data.vocab_list_id,
-        position=max_pos
+        position=max_pos,
+        normalized_term=term
     )
     db.add(entry)
     db.flush()
     
     # Add field values
-    for field_data in data.field_values:
-        field_value = models.EntryFieldValue(
-            entry_id=entry.id,
-            column_id=field_data.column_id,
-            value=field_data.value
-        )
-        db.add(field_value)
+    _write_field_values(db, entry, data.field_values)
+    stats.add_entries(db, data.vocab_list_id, 1)
+    stats.add_filled(db, stats.filled_columns((f.column_id, f.value) for f in data.field_values))
+    distractors.entry_changed(db, data.vocab_list_id, entry.id, [(f.column_id, f.value) for f in data.field_values])
     
     db.commit()
     db.refresh(entry)
+    events.publish(db, data.vocab_list_id, "entry_created", entry=events.entry_payload(entry, data.field_values))
     return entry
 
 
@@ -284,9 +570,13 @@ def get_vocab_list_entries(db: Session, list_id: int):
     Holt alle Einträge einer Liste.
     """
     from sqlalchemy.orm import joinedload
-    return db.query(models.VocabEntry).options(
-        joinedload(models.VocabEntry.field_values).joinedload(models.EntryFieldValue.column)
-    ).filter(models.VocabEntry.vocab_list_id == list_id).all()
+    query = db.query(models.VocabEntry)
+    if config.ENTRY_STORAGE == "eav":
+        # Im JSON-Modus kommen die Werte aus vocab_entries.data (kein Join nötig)
+        query = query.options(
+            joinedload(models.VocabEntry.field_values).joinedload(models.EntryFieldValue.column)
+        )
+    return query.filter(models.VocabEntry.vocab_list_id == list_id).all()
 
 
 def update_vocab_entry(db: Session, entry_id: int, data: schemas.VocabEntryUpdate):
@@ -298,22 +588,24 @@ def update_vocab_entry(db: Session, entry_id: int, data: schemas.VocabEntryUpdat
         return None
     
     if data.field_values:
+        old_values = stats.entry_values(db, [entry_id])
+        new_values = [(f.column_id, f.value) for f in data.field_values]
+        stats.change_filled(db, old_values, new_values)
+        # Spalten ohne neuen Wert gelten als geleert
+        distractors.entry_changed(db, entry.vocab_list_id, entry_id, [(c, None) for c, _ in old_values] + new_values)
         # Delete old values
         db.query(models.EntryFieldValue).filter(
             models.EntryFieldValue.entry_id == entry_id
         ).delete()
         
         # Add new values
-        for field_data in data.field_values:
-            field_value = models.EntryFieldValue(
-                entry_id=entry.id,
-                column_id=field_data.column_id,
-                value=field_data.value
-            )
-            db.add(field_value)
+        _write_field_values(db, entry, data.field_values)
+        entry.normalized_term = entry_term(data.field_values, term_column_id(db, entry.vocab_list_id))
     
     db.commit()
     db.refresh(entry)
+    if data.field_values:
+        events.publish(db, entry.vocab_list_id, "entry_updated", entry=events.entry_payload(entry, data.field_values))
     return entry
 
 
@@ -324,8 +616,12 @@ def delete_vocab_entry(db: Session, entry_id: int):
     entry = get_vocab_entry(db, entry_id)
     if not entry:
         return False
+    list_id = entry.vocab_list_id
+    stats.entries_removed(db, list_id, [entry_id])
+    distractors.entries_removed(db, list_id, [entry_id])
     db.delete(entry)
     db.commit()
+    events.publish(db, list_id, "entry_deleted", entry_id=entry_id)
     return True
 
 
@@ -340,7 +636,18 @@ def update_field_value(db: Session, field_value_id: int, new_value: str):
     if not field:
         return None
     
+    stats.change_filled(db, [(field.column_id, field.value)], [(field.column_id, new_value)])
     field.value = new_value
+    entry = field.entry
+    if field.column_id == term_column_id(db, entry.vocab_list_id):
+        entry.normalized_term = normalize_term(new_value) or None
+    if config.ENTRY_STORAGE != "eav" and entry.data is not None:
+        document = dict(entry.data)
+        document[str(field.column_id)] = new_value
+        entry.data = document
+    list_id = entry.vocab_list_id
+    distractors.entry_changed(db, list_id, field.entry_id, [(field.column_id, new_value)])
     db.commit()
     db.refresh(field)
+    events.publish(db, list_id, "field_updated", entry_id=field.entry_id, column_id=field.column_id, value=new_value)
     return field
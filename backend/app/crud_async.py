@@ -0,0 +1,74 @@
+"""
+Async-Varianten der häufigsten Lesezugriffe aus crud.py.
+
+Im Async-Pfad gibt es kein Lazy Loading: alles, was die Schemas beim
+Serialisieren anfassen, wird hier per selectinload/joinedload mitgeladen.
+"""
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
+from app import models
+
+
+def _list_options(base=None):
+    """Lade-Optionen für VocabList inkl. Spalten, Einträgen und Feldwerten (optional unter `base`)."""
+    load = base.selectinload if base is not None else selectinload
+    return [
+        load(models.VocabList.columns),
+        load(models.VocabList.entries).selectinload(models.VocabEntry.field_values),
+    ]
+
+
+# ============== USER ==============
+async def get_user_by_username(db: AsyncSession, username: str, with_lists: bool = False):
+    query = select(models.User).filter(models.User.username == username)
+    if with_lists:
+        query = query.options(*_list_options(selectinload(models.User.lists)))
+    return (await db.execute(query)).scalars().first()
+
+
+# ============== VOCAB LISTS ==============
+async def get_vocab_list_by_user(db: AsyncSession, user_id: int):
+    """
+    Gibt alle Vokabellisten eines bestimmten Users aus.
+    """
+    query = select(models.VocabList).options(*_list_options()).filter(models.VocabList.user_id == user_id)
+    return (await db.execute(query)).scalars().all()
+
+
+async def get_vocab_list(db: AsyncSession, vocablist_id: int):
+    """
+    Gibt Vokabelliste einer bestimmten ID aus.
+    """
+    query = select(models.VocabList).options(*_list_options()).filter(models.VocabList.id == vocablist_id)
+    return (await db.execute(query)).scalars().first()
+
+
+async def get_vocab_list_owner(db: AsyncSession, vocablist_id: int):
+    """
+    Nur user_id einer Liste (für den Berechtigungscheck), None wenn sie nicht existiert.
+    """
+    query = select(models.VocabList.user_id).filter(models.VocabList.id == vocablist_id)
+    return (await db.execute(query)).scalars().first()
+
+
+# ============== VOCAB ENTRIES ==============
+async def get_vocab_entry(db: AsyncSession, entry_id: int):
+    """
+    Holt einen Eintrag mit allen Feldwerten.
+    """
+    query = select(models.VocabEntry).options(
+        selectinload(models.VocabEntry.field_values),
+        joinedload(models.VocabEntry.vocab_list)
+    ).filter(models.VocabEntry.id == entry_id)
+    return (await db.execute(query)).scalars().first()
+
+
+async def get_vocab_list_entries(db: AsyncSession, list_id: int):
+    """
+    Holt alle Einträge einer Liste.
+    """
+    query = select(models.VocabEntry).options(
+        selectinload(models.VocabEntry.field_values)
+    ).filter(models.VocabEntry.vocab_list_id == list_id)
+    return (await db.execute(query)).scalars().all()
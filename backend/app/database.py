@@ -1,19 +1,91 @@
-from sqlalchemy import create_engine
+from fastapi import Request
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.orm import sessionmaker
+from app import config, metrics
+
+SQLALCHEMY_DATABASE_URL = config.DATABASE_URL
+
+
+def engine_options(url: str) -> dict:
+    """create_engine-Argumente je nach Dialekt (SQLite-Datei vs. Server-Datenbank)."""
+    options = {"pool_size": config.DB_POOL_SIZE, "max_overflow": config.DB_MAX_OVERFLOW,
+               "pool_timeout": config.DB_POOL_TIMEOUT}
+    if make_url(url).get_backend_name() == "sqlite":
+        options["connect_args"] = {"check_same_thread": False}
+    else:
+        options["pool_recycle"] = config.DB_POOL_RECYCLE
+        options["pool_pre_ping"] = config.DB_POOL_PRE_PING
+    return options
+
+
+def use_wal(engine):
+    """SQLite: WAL-Modus für jede neue Verbindung (mehrere Worker lesen, während einer schreibt)."""
+    if config.SQLITE_WAL and engine.dialect.name == "sqlite" and engine.url.database not in (None, "", ":memory:"):
+        event.listen(engine, "connect", lambda dbapi_connection, record: dbapi_connection.execute("PRAGMA journal_mode=WAL"))
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./vokabeln.db"
 
 engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+    SQLALCHEMY_DATABASE_URL, poolclass=metrics.TimedQueuePool, **engine_options(SQLALCHEMY_DATABASE_URL)
 )
+metrics.instrument_engine(engine)
+use_wal(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-def get_db():
-    db = SessionLocal()
+def get_db(request: Request):
+    if config.TENANT_SHARDING:
+        from app import tenancy
+        db = tenancy.session_for_request(request)
+    else:
+        db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
 
-Base = declarative_base()
\ No newline at end of file
+Base = declarative_base()
+
+
+# ============== Async (optional: aiosqlite / asyncpg) ==============
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+_async_engine = None
+AsyncSessionLocal = None
+
+
+def async_database_url(url: str) -> str:
+    """sqlite:///x.db -> sqlite+aiosqlite:///x.db, postgresql://... -> postgresql+asyncpg://..."""
+    scheme, sep, rest = url.partition("://")
+    return ASYNC_DRIVERS.get(scheme.split("+")[0], scheme) + sep + rest
+
+
+def get_async_engine():
+    """Legt die Async-Engine beim ersten Aufruf an (Treiber werden erst dann importiert)."""
+    global _async_engine, AsyncSessionLocal
+    if _async_engine is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        url = config.ASYNC_DATABASE_URL or async_database_url(SQLALCHEMY_DATABASE_URL)
+        options = engine_options(url)
+        options.pop("connect_args", None)
+        _async_engine = create_async_engine(url, poolclass=metrics.TimedAsyncQueuePool, **options)
+        metrics.instrument_engine(_async_engine.sync_engine)
+        AsyncSessionLocal = async_sessionmaker(_async_engine, autoflush=False, expire_on_commit=False)
+    return _async_engine
+
+
+def after_fork():
+    """
+    Im geforkten Worker (app.serve): geerbte Pools verwerfen, ohne die
+    Verbindungen des Hauptprozesses zu schließen – jeder Worker öffnet eigene.
+    """
+    engine.dispose(close=False)
+    if _async_engine is not None:
+        _async_engine.sync_engine.dispose(close=False)
+
+
+async def get_async_db():
+    get_async_engine()
+    async with AsyncSessionLocal() as db:
+        yield db
\ No newline at end of file
@@ -0,0 +1,371 @@
+"""
+Ablenker für Multiple-Choice-Abfragen.
+
+distractor_candidates hält zu jedem Wert einer Spalte die
+DISTRACTOR_CANDIDATES ähnlichsten anderen Werte derselben Spalte (gleiche
+Spalte = gleiche Sprache): kleine normalisierte Levenshtein-Distanz und
+ähnliche Länge, siehe score(). Verglichen werden nur Werte im
+Längenfenster, und die Distanz bricht ab, sobald sie schlechter als der
+bisher k-te Kandidat ist.
+
+- Ein Quiz liest die Werte von Quell- und Zielspalten und die Kandidaten
+  der gezogenen Einträge (ein indizierter Lookup), statt bei jedem Request
+  alle Paare zu vergleichen.
+- crud hält die Tabelle bei jedem Schreibzugriff aktuell: der geänderte
+  Eintrag bekommt neue Kandidaten und verdrängt bei anderen Einträgen den
+  schwächsten, wenn er besser passt – O(n) pro Spalte statt O(n²).
+- Spalten mit distractors_ready NULL (Anki-Import, Kopie, Migration) werden
+  komplett berechnet: beim ersten Quiz bis DISTRACTOR_INLINE_LIMIT Einträge
+  direkt, sonst per Job "rebuild_distractors". Bis dahin füllt das Quiz
+  mit zufälligen Werten der Spalte auf.
+"""
+import heapq
+import random
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+
+from sqlalchemy import bindparam, delete, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from app import config, models
+from app.normalize import normalize_term
+
+candidates = models.DistractorCandidate.__table__
+columns = models.ListColumn.__table__
+entries = models.VocabEntry.__table__
+values = models.EntryFieldValue.__table__
+
+EDIT_WEIGHT = 0.7
+LENGTH_WEIGHT = 0.3
+# Nur Werte vergleichen, deren Länge höchstens um diesen Anteil von der längeren abweicht
+MAX_LENGTH_RATIO = 0.5
+# Mehr betroffene Einträge (Massenlöschung): Spalte später komplett neu berechnen
+REFILL_LIMIT = 50
+
+
+# ============== Ähnlichkeit ==============
+def distance(a: str, b: str, limit: int) -> int:
+    """Levenshtein-Distanz; limit + 1, sobald sie limit sicher übersteigt."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def score(a: str, b: str, worst: float = 1.0):
+    """
+    Zwei normalisierte Werte: 0 = fast gleich, 1 = völlig verschieden.
+    None bei gleichen Werten (kein Ablenker) oder wenn schlechter als worst.
+    """
+    if a == b:
+        return None
+    longest = max(len(a), len(b))
+    length = abs(len(a) - len(b)) / longest
+    limit = int((worst - LENGTH_WEIGHT * length) / EDIT_WEIGHT * longest)
+    if limit < 0:
+        return None
+    edit = distance(a, b, limit)
+    if edit > limit:
+        return None
+    result = EDIT_WEIGHT * edit / longest + LENGTH_WEIGHT * length
+    return result if result <= worst else None
+
+
+class _Column:
+    """Normalisierte Werte einer Spalte, nach Länge sortiert."""
+
+    def __init__(self, pairs):
+        normalized = ((entry_id, normalize_term(value)) for entry_id, value in pairs)
+        self.items = sorted((len(term), term, entry_id) for entry_id, term in normalized if term)
+        self.lengths = [item[0] for item in self.items]
+
+    def window(self, length: int):
+        """Werte, deren Länge höchstens MAX_LENGTH_RATIO von length abweicht."""
+        low = bisect_left(self.lengths, length * (1 - MAX_LENGTH_RATIO))
+        high = bisect_right(self.lengths, length / (1 - MAX_LENGTH_RATIO))
+        return self.items[low:high]
+
+
+def nearest(entry_id: int, term: str, column: _Column, k: int) -> list:
+    """Die k ähnlichsten (score, entry_id) der Spalte, ohne entry_id selbst."""
+    heap = []  # (-score, entry_id): der schwächste Kandidat liegt oben
+    for _, other, other_id in column.window(len(term)):
+        if other_id == entry_id:
+            continue
+        result = score(term, other, -heap[0][0] if len(heap) >= k else 1.0)
+        if result is None:
+            continue
+        if len(heap) < k:
+            heapq.heappush(heap, (-result, other_id))
+        else:
+            heapq.heapreplace(heap, (-result, other_id))
+    return sorted((-negative, other_id) for negative, other_id in heap)
+
+
+# ============== Werte lesen ==============
+def values_by_column(db: Session, list_id: int, column_ids) -> dict:
+    """{column_id: {entry_id: wert}} der Einträge mit nicht-leerem Wert – ein Query."""
+    result = {column_id: {} for column_id in column_ids}
+    if not result:
+        return result
+    if config.ENTRY_STORAGE == "json":
+        keys = {str(column_id): column_id for column_id in result}
+        for entry_id, data in db.execute(select(entries.c.id, entries.c.data).where(entries.c.vocab_list_id == list_id)):
+            for key, column_id in keys.items():
+                value = (data or {}).get(key)
+                if value and value.strip():
+                    result[column_id][entry_id] = value
+        return result
+    for entry_id, column_id, value in db.execute(
+        select(values.c.entry_id, values.c.column_id, values.c.value).where(values.c.column_id.in_(result))
+    ):
+        if value and value.strip():
+            result[column_id][entry_id] = value
+    return result
+
+
+def _rows(column_id, pairs):
+    return [
+        {"column_id": column_id, "entry_id": entry_id, "candidate_entry_id": candidate_id, "score": result}
+        for entry_id, candidate_id, result in pairs
+    ]
+
+
+# ============== Neu berechnen ==============
+def pending_columns(db: Session, column_ids) -> list:
+    """Spalten, deren Kandidaten noch nicht berechnet sind."""
+    return db.scalars(
+        select(columns.c.id).where(columns.c.id.in_(column_ids), columns.c.distractors_ready.isnot(True))
+    ).all()
+
+
+def rebuild_columns(db: Session, list_id: int, column_ids, progress=None):
+    """Berechnet die Kandidaten der Spalten komplett neu, eine Transaktion pro Spalte."""
+    k = config.DISTRACTOR_CANDIDATES
+    current = values_by_column(db, list_id, column_ids)
+    for done, column_id in enumerate(column_ids, start=1):
+        db.execute(delete(candidates).where(candidates.c.column_id == column_id))
+        column = _Column(current[column_id].items())
+        rows = _rows(column_id, (
+            (entry_id, candidate_id, result)
+            for _, term, entry_id in column.items
+            for result, candidate_id in nearest(entry_id, term, column, k)
+        ))
+        if rows:
+            db.execute(insert(candidates), rows)
+        db.execute(update(columns).where(columns.c.id == column_id).values(distractors_ready=True))
+        db.commit()
+        if progress:
+            progress(done, len(column_ids))
+
+
+def ensure_ready(db: Session, list_id: int, column_ids) -> bool:
+    """
+    Berechnet fehlende Kandidaten direkt, wenn die Liste klein genug ist.
+    False: zu groß, der Aufrufer plant den Job "rebuild_distractors" ein.
+    """
+    pending = pending_columns(db, column_ids)
+    if not pending:
+        return True
+    size = db.scalar(select(func.count()).select_from(entries).where(entries.c.vocab_list_id == list_id))
+    if size > config.DISTRACTOR_INLINE_LIMIT:
+        return False
+    rebuild_columns(db, list_id, pending)
+    return True
+
+
+# ============== Fortschreiben (Transaktion des Aufrufers) ==============
+def _ready_columns(db: Session, list_id: int) -> list:
+    return db.scalars(
+        select(columns.c.id).where(columns.c.vocab_list_id == list_id, columns.c.distractors_ready.is_(True))
+    ).all()
+
+
+def _lost(db: Session, column_ids, entry_ids) -> dict:
+    """{column_id: Einträge, die einen der entry_ids als Kandidaten haben}."""
+    lost = defaultdict(set)
+    for column_id, entry_id in db.execute(
+        select(candidates.c.column_id, candidates.c.entry_id)
+        .where(candidates.c.column_id.in_(column_ids), candidates.c.candidate_entry_id.in_(entry_ids))
+    ):
+        if entry_id not in entry_ids:
+            lost[column_id].add(entry_id)
+    return lost
+
+
+def _refill(db: Session, column_id: int, entry_ids, column: _Column) -> list:
+    """Einträge, die einen Kandidaten verloren haben, bekommen ihre Liste neu berechnet."""
+    db.execute(delete(candidates).where(candidates.c.column_id == column_id, candidates.c.entry_id.in_(entry_ids)))
+    k = config.DISTRACTOR_CANDIDATES
+    return _rows(column_id, (
+        (entry_id, candidate_id, result)
+        for _, term, entry_id in column.items if entry_id in entry_ids
+        for result, candidate_id in nearest(entry_id, term, column, k)
+    ))
+
+
+def _too_many(db: Session, column_id: int, affected) -> bool:
+    """Bei Massenänderungen lieber die ganze Spalte später neu berechnen als Eintrag für Eintrag."""
+    if len(affected) <= REFILL_LIMIT:
+        return False
+    db.execute(delete(candidates).where(candidates.c.column_id == column_id))
+    db.execute(update(columns).where(columns.c.id == column_id).values(distractors_ready=None))
+    return True
+
+
+def entry_changed(db: Session, list_id: int, entry_id: int, pairs):
+    """
+    Nach Anlegen/Ändern eines Eintrags. pairs: die geänderten (column_id, wert),
+    leerer Wert = entfernt. Nur für Spalten, deren Kandidaten schon berechnet sind.
+    """
+    changed = {column_id: normalize_term(value or "") for column_id, value in pairs}
+    ready = [column_id for column_id in _ready_columns(db, list_id) if column_id in changed]
+    if not ready:
+        return
+    lost = _lost(db, ready, {entry_id})
+    db.execute(delete(candidates).where(
+        candidates.c.column_id.in_(ready),
+        (candidates.c.entry_id == entry_id) | (candidates.c.candidate_entry_id == entry_id)
+    ))
+    k = config.DISTRACTOR_CANDIDATES
+    current = values_by_column(db, list_id, ready)
+    for column_id in ready:
+        term = changed[column_id]
+        others = current[column_id]
+        others.pop(entry_id, None)
+        column = _Column([*others.items(), *([(entry_id, term)] if term else [])])
+        affected = lost[column_id]
+        if _too_many(db, column_id, affected):
+            continue
+        rows = _refill(db, column_id, affected, column) if affected else []
+        if not term:
+            if rows:
+                db.execute(insert(candidates), rows)
+            continue
+        rows += _rows(column_id, ((entry_id, candidate_id, result) for result, candidate_id in nearest(entry_id, term, column, k)))
+
+        # Umgekehrt: verdrängt der Eintrag bei anderen den schwächsten Kandidaten?
+        held = {
+            row.entry_id: (row.count, row.worst)
+            for row in db.execute(
+                select(candidates.c.entry_id, func.count().label("count"), func.max(candidates.c.score).label("worst"))
+                .where(candidates.c.column_id == column_id).group_by(candidates.c.entry_id)
+            )
+        }
+        trim = []
+        for _, other, other_id in column.window(len(term)):
+            if other_id == entry_id or other_id in affected:
+                continue
+            count, worst = held.get(other_id, (0, 1.0))
+            result = score(other, term, worst if count >= k else 1.0)
+            if result is None:
+                continue
+            rows += _rows(column_id, [(other_id, entry_id, result)])
+            if count >= k:
+                trim.append({"other_id": other_id})
+        if rows:
+            db.execute(insert(candidates), rows)
+        if trim:
+            weakest = (
+                select(candidates.c.id)
+                .where(candidates.c.column_id == column_id, candidates.c.entry_id == bindparam("other_id"))
+                .order_by(candidates.c.score.desc(), candidates.c.id.desc()).limit(1).scalar_subquery()
+            )
+            db.execute(delete(candidates).where(candidates.c.id == weakest), trim)
+
+
+def entries_removed(db: Session, list_id: int, entry_ids):
+    """Vor dem Löschen von Einträgen: ihre Zeilen weg, betroffene Einträge neu auffüllen."""
+    if not entry_ids:
+        return
+    removed = set(entry_ids)
+    lost = _lost(db, _ready_columns(db, list_id), removed)
+    db.execute(delete(candidates).where(
+        candidates.c.entry_id.in_(removed) | candidates.c.candidate_entry_id.in_(removed)
+    ))
+    lost = {column_id: affected for column_id, affected in lost.items() if not _too_many(db, column_id, affected)}
+    if not lost:
+        return
+    rows = []
+    for column_id, column_values in values_by_column(db, list_id, lost).items():
+        column = _Column((e, v) for e, v in column_values.items() if e not in removed)
+        rows += _refill(db, column_id, lost[column_id], column)
+    if rows:
+        db.execute(insert(candidates), rows)
+
+
+def columns_removed(db: Session, column_ids):
+    if column_ids:
+        db.execute(delete(candidates).where(candidates.c.column_id.in_(column_ids)))
+
+
+def list_removed(db: Session, list_id: int):
+    db.execute(delete(candidates).where(
+        candidates.c.column_id.in_(select(columns.c.id).where(columns.c.vocab_list_id == list_id))
+    ))
+
+
+# ============== Quiz ==============
+def quiz(db: Session, list_id: int, source_id: int, target_ids, count: int, choices: int = 4, rng=None) -> list:
+    """
+    Bis zu count Fragen "Wert der Quellspalte -> Wert einer Zielspalte" mit je
+    choices Antworten: die richtige und zufällig gewählte Kandidaten, bei
+    Bedarf aufgefüllt mit zufälligen anderen Werten der Zielspalte.
+    """
+    rng = rng or random
+    current = values_by_column(db, list_id, [source_id, *target_ids])
+    source = current[source_id]
+    pairs = [(entry_id, target_id) for target_id in target_ids for entry_id in current[target_id] if entry_id in source]
+    picked = rng.sample(pairs, min(count, len(pairs)))
+
+    near = defaultdict(list)
+    if picked:
+        for column_id, entry_id, candidate_id in db.execute(
+            select(candidates.c.column_id, candidates.c.entry_id, candidates.c.candidate_entry_id)
+            .where(candidates.c.column_id.in_(target_ids), candidates.c.entry_id.in_({e for e, _ in picked}))
+            .order_by(candidates.c.score)
+        ):
+            near[(entry_id, column_id)].append(candidate_id)
+
+    pools = {}
+    questions = []
+    for entry_id, target_id in picked:
+        column = current[target_id]
+        answer = column[entry_id]
+        seen = {normalize_term(answer)}
+
+        def unique(candidate_values):
+            for value in candidate_values:
+                term = normalize_term(value)
+                if term not in seen:
+                    seen.add(term)
+                    yield value
+
+        close = list(unique(column[c] for c in near[(entry_id, target_id)] if c in column))
+        wrong = rng.sample(close, min(len(close), choices - 1))
+        if len(wrong) < choices - 1:
+            if target_id not in pools:
+                pools[target_id] = list(column.values())
+            pool = pools[target_id]
+            filler = rng.sample(pool, min(len(pool), 3 * choices))
+            wrong += list(unique(filler))[:choices - 1 - len(wrong)]
+        options = [answer, *wrong]
+        rng.shuffle(options)
+        questions.append({
+            "entry_id": entry_id,
+            "source_column_id": source_id,
+            "target_column_id": target_id,
+            "prompt": source[entry_id],
+            "answer": answer,
+            "options": options,
+        })
+    return questions
@@ -0,0 +1,254 @@
+"""
+Live-Änderungen an Vokabellisten (Server-Sent Events).
+
+Die crud-Funktionen melden nach dem Commit kompakte Events an den Hub
+("entry_created", "entry_updated", "entry_deleted", "field_updated",
+"column_added", "column_deleted", "list_updated", "list_deleted"). Jede
+offene Listenseite hält GET /api/vocablist/{id}/events offen und wendet die
+Events auf ihren Stand an, statt die ganze Liste neu zu laden.
+
+- Ein Abo ist eine asyncio.Queue mit EVENTS_QUEUE_SIZE Plätzen. Liest ein
+  Client nicht schnell genug, wird seine Queue geleert und er bekommt ein
+  einziges "resync" (Liste neu laden). Ein langsamer Client hält so weder
+  den schreibenden Request noch andere Abos auf, der Speicher bleibt begrenzt.
+- publish() läuft im Threadpool der sync-Routen, serialisiert das Event
+  einmal und übergibt es per call_soon_threadsafe an den Event-Loop. Ohne
+  Abonnenten kostet ein Event nur einen Platz in der Historie; wartende
+  Abos kosten nur eine Queue und alle EVENTS_PING_SECONDS einen Ping.
+- Event-IDs sind "<epoch>.<seq>". Mit Last-Event-ID holt eine
+  Wiederverbindung die verpassten Events aus der Historie der Liste (die
+  letzten EVENTS_HISTORY); ist die Lücke nicht zu schließen (Neustart,
+  zu alt), kommt "resync".
+- Der Hub ist pro Prozess. Mit mehreren Workern gehen die Events zusätzlich
+  über den Bus (bus.py) an die anderen, die sie in ihren Hub einspeisen.
+  Event-IDs bleiben pro Worker: landet eine Wiederverbindung bei einem
+  anderen Worker, kommt "resync".
+"""
+import asyncio
+import itertools
+import json
+import secrets
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+
+from fastapi import HTTPException
+
+from app import bus, config, database
+from app.metrics import registry
+
+registry.describe("events_published_total", "counter", "Gemeldete Änderungen an Listen")
+registry.describe("events_resyncs_total", "counter", "Abos, die wegen voller Queue oder Lücke neu laden mussten")
+registry.describe("events_streams_open", "gauge", "Offene SSE-Verbindungen")
+
+RETRY_MS = 3000
+RESYNC = (None, "resync", '{"type":"resync"}')
+
+
+def channel(db, list_id: int):
+    """Schlüssel einer Liste: Datenbank (Shard) und ID, Listen-IDs sind nur pro Shard eindeutig."""
+    return db.get_bind().url.render_as_string(hide_password=True), list_id
+
+
+def main_channel(list_id: int):
+    """Wie channel() für die Async-Routen: sie lesen die Haupt-DB, nur über einen anderen Treiber."""
+    return database.engine.url.render_as_string(hide_password=True), list_id
+
+
+def entry_payload(entry, field_values) -> dict:
+    return {"id": entry.id, "position": entry.position, "values": {str(f.column_id): f.value for f in field_values}}
+
+
+def column_payload(column) -> dict:
+    return {
+        "id": column.id, "name": column.name, "column_type": column.column_type,
+        "language_code": column.language_code, "position": column.position, "is_primary": column.is_primary,
+    }
+
+
+class Subscription:
+    def __init__(self, key, owner, loop):
+        self.key = key
+        self.owner = owner
+        self.loop = loop
+        self.queue = asyncio.Queue(config.EVENTS_QUEUE_SIZE)
+        self.overflowed = False
+
+    def offer(self, message):
+        """Läuft im Event-Loop. Volle Queue: verwerfen und nur noch "resync" zustellen."""
+        if self.overflowed:
+            return
+        if self.queue.full():
+            self.overflowed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+            registry.inc("events_resyncs_total")
+            return
+        self.queue.put_nowait(message)
+
+    async def next(self, timeout: float):
+        """Nächstes Event, None nach timeout Sekunden."""
+        try:
+            message = await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        if message is RESYNC:
+            self.overflowed = False
+        return message
+
+
+class _History:
+    """Letzte Events einer Liste; vollständig für alle seq > since."""
+
+    def __init__(self, since: int):
+        self.since = since
+        self.events = deque(maxlen=config.EVENTS_HISTORY)
+
+    def append(self, seq, message):
+        if len(self.events) == self.events.maxlen:
+            self.since = self.events[0][0]
+        self.events.append((seq, message))
+
+
+class EventHub:
+    def __init__(self):
+        self.epoch = secrets.token_hex(4)
+        self._seq = itertools.count(1)
+        self._lock = threading.Lock()
+        self._subscribers = {}  # key -> {Subscription}
+        self._history = OrderedDict()  # key -> _History, zuletzt geänderte Liste hinten
+        self._floor = 0  # höchste seq aus verdrängten Historien
+        self._streams = Counter()  # owner -> offene Abos
+
+    def publish(self, key, event_type: str, **payload):
+        data = json.dumps({"type": event_type, **payload}, separators=(",", ":"), ensure_ascii=False)
+        with self._lock:
+            seq = next(self._seq)
+            message = (f"{self.epoch}.{seq}", event_type, data)
+            history = self._history.get(key)
+            if history is None:
+                history = self._history[key] = _History(self._floor)
+                if len(self._history) > config.EVENTS_HISTORY_LISTS:
+                    _, evicted = self._history.popitem(last=False)
+                    self._floor = max(self._floor, evicted.events[-1][0] if evicted.events else evicted.since)
+            else:
+                self._history.move_to_end(key)
+            history.append(seq, message)
+            # Unter dem Lock übergeben, damit jedes Abo die Events in seq-Reihenfolge bekommt
+            for subscription in self._subscribers.get(key, ()):
+                try:
+                    subscription.loop.call_soon_threadsafe(subscription.offer, message)
+                except RuntimeError:
+                    pass  # Event-Loop schon beendet, das Abo räumt sich selbst ab
+        registry.inc("events_published_total")
+
+    def subscribe(self, key, owner, last_event_id: str = None):
+        """
+        Im Event-Loop aufrufen. Gibt (Subscription, verpasste Events) zurück;
+        die verpassten sind [RESYNC], wenn last_event_id nicht mehr nachzuholen ist.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._streams[owner] >= config.EVENTS_MAX_STREAMS_PER_USER:
+                raise HTTPException(status_code=429, detail="Zu viele offene Live-Verbindungen")
+            subscription = Subscription(key, owner, loop)
+            self._subscribers.setdefault(key, set()).add(subscription)
+            self._streams[owner] += 1
+            missed = self._missed(key, last_event_id) if last_event_id else []
+        registry.add_gauge("events_streams_open", 1)
+        if missed is None:
+            registry.inc("events_resyncs_total")
+            missed = [RESYNC]
+        return subscription, missed
+
+    def _missed(self, key, last_event_id: str):
+        """Events nach last_event_id, None wenn die Lücke nicht zu schließen ist."""
+        epoch, _, seq = last_event_id.partition(".")
+        if epoch != self.epoch or not seq.isdigit():
+            return None
+        seq = int(seq)
+        history = self._history.get(key)
+        since = history.since if history is not None else self._floor
+        if seq < since:
+            return None
+        return [message for event_seq, message in (history.events if history else ()) if event_seq > seq]
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.key)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.key]
+            self._streams[subscription.owner] -= 1
+            if self._streams[subscription.owner] <= 0:
+                del self._streams[subscription.owner]
+        registry.add_gauge("events_streams_open", -1)
+
+    def version(self, key) -> int:
+        """
+        Stand einer Liste: wächst mit jedem Event zu ihr (auch von anderen
+        Workern). Ohne Historie die höchste verdrängte seq – nie kleiner als vorher.
+        """
+        with self._lock:
+            history = self._history.get(key)
+            if history is None:
+                return self._floor
+            return history.events[-1][0] if history.events else history.since
+
+    def subscriber_count(self, key) -> int:
+        with self._lock:
+            return len(self._subscribers.get(key, ()))
+
+
+hub = EventHub()
+
+
+def publish(db, list_id: int, event_type: str, **payload):
+    """Für crud: nach dem Commit aufrufen, damit niemand ein zurückgerolltes Event sieht."""
+    key = channel(db, list_id)
+    hub.publish(key, event_type, **payload)
+    bus.bus.publish("event", key=list(key), type=event_type, payload=payload)
+
+
+def version(key) -> int:
+    return hub.version(key)
+
+
+@bus.listener("event")
+def _from_other_worker(key, type, payload):
+    hub.publish(tuple(key), type, **payload)
+
+
+def format_message(message) -> str:
+    event_id, _, data = message
+    return f"id: {event_id}\ndata: {data}\n\n" if event_id else f"data: {data}\n\n"
+
+
+async def stream(subscription: Subscription, missed, expires_at: float, active_hub: EventHub = None, authorized=None):
+    """
+    SSE-Body: verpasste Events, dann live bis zum Ablauf; Pings halten die Verbindung offen.
+    authorized() wird vor jedem Event und Ping erneut geprüft (z.B. Sperrliste); ist
+    es False, endet der Stream, und die Wiederverbindung scheitert an der Anmeldung.
+    """
+    active_hub = active_hub or hub
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        for message in missed:
+            yield format_message(message)
+        while True:
+            remaining = expires_at - time.time()
+            if remaining <= 0:
+                return
+            message = await subscription.next(min(config.EVENTS_PING_SECONDS, remaining))
+            if authorized is not None and not authorized():
+                return
+            if message is None:
+                yield ": ping\n\n"
+                continue
+            yield format_message(message)
+            if message[1] == "list_deleted":
+                return
+    finally:
+        active_hub.unsubscribe(subscription)
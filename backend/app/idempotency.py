@@ -0,0 +1,275 @@
+"""
+Idempotency-Keys für schreibende Requests.
+
+Über wackelige Mobilverbindungen (Cloudflare-Tunnel) schickt der Client
+POSTs erneut, deren Antwort verloren ging – ohne Schutz entstehen doppelte
+Listen und Einträge. Schickt der Client einen Header "Idempotency-Key"
+(eine UUID pro Vorgang, bei Wiederholungen dieselbe), führt die Middleware
+den Request pro Benutzer nur einmal aus und spielt danach die gespeicherte
+Antwort ab ("Idempotent-Replayed: true"), ohne die Route aufzurufen.
+
+- Gilt für POST/PUT/PATCH/DELETE unter /api mit gültigem Bearer-Token; der
+  Key ist pro Benutzer (Subject wie in der Sperrliste). Login, Refresh und
+  Registrierung haben kein Token und laufen normal.
+- Derselbe Key mit anderem Request (Methode, Pfad, Query, Body) -> 422,
+  während der erste noch läuft -> 409, der Client wiederholt später.
+- Gespeichert wird nur, was kein Serverfehler ist (5xx darf erneut
+  versucht werden) und in IDEMPOTENCY_MAX_BODY_BYTES passt; größere
+  Requests (Uploads) laufen ohne Schutz durch.
+- Die Tabelle idempotency_keys liegt in der Haupt-DB, damit alle Worker
+  dieselben Keys sehen. Abgelaufene Einträge (IDEMPOTENCY_TTL_SECONDS)
+  löscht ein DELETE über den Index auf expires_at, höchstens alle
+  IDEMPOTENCY_PRUNE_SECONDS.
+"""
+import hashlib
+import time
+from collections import namedtuple
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse
+
+from app import auth, config, database, models, revocation
+from app.metrics import registry
+
+registry.describe("idempotency_replays_total", "counter", "Wiederholte Requests, deren Antwort aus idempotency_keys kam")
+registry.describe("idempotency_conflicts_total", "counter", "Idempotency-Keys, die noch liefen oder für einen anderen Request benutzt wurden")
+
+METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+MAX_KEY_LENGTH = 255
+# Diese Header gehören zur Verbindung bzw. werden beim Abspielen neu gesetzt
+SKIPPED_HEADERS = {"content-length", "content-encoding", "date", "server", "set-cookie", "vary"}
+
+# CORS-Header hängen vom Origin des jeweiligen Requests ab (CORS gehört außerhalb dieser Middleware)
+SKIPPED_PREFIXES = ("access-control-",)
+
+EXECUTE, REPLAY, BUSY, MISMATCH = "execute", "replay", "busy", "mismatch"
+
+Stored = namedtuple("Stored", "status_code headers body")
+
+
+def fingerprint(method: str, path: str, query: bytes, body: bytes) -> str:
+    digest = hashlib.sha256()
+    for part in (method.encode(), path.encode(), query, body):
+        digest.update(len(part).to_bytes(8, "big"))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+def subject_of(authorization: str) -> str:
+    """Subject aus einem gültigen, nicht gesperrten Bearer-Token, sonst None (nur CPU, keine DB)."""
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    payload = auth.decode_access_token(token.strip())
+    if not payload:
+        return None
+    if "uid" in payload and auth.is_revoked(payload, payload["uid"]):
+        return None
+    return revocation.subject(payload.get("uid", payload.get("sub")), payload.get("tenant"))
+
+
+class IdempotencyStore:
+    def __init__(self, session_factory=None):
+        self._session_factory = session_factory
+        self._last_prune = 0
+
+    def session(self):
+        return (self._session_factory or database.SessionLocal)()
+
+    def begin(self, subject: str, key: str, request_hash: str):
+        """
+        Reserviert den Key für diesen Request. Gibt (EXECUTE, None),
+        (REPLAY, Stored), (BUSY, None) oder (MISMATCH, None) zurück.
+        """
+        table = models.IdempotencyKey
+        now = time.time()
+        with self.session() as db:
+            try:
+                db.add(table(subject=subject, key=key, fingerprint=request_hash,
+                             created_at=now, expires_at=now + config.IDEMPOTENCY_TTL_SECONDS))
+                db.commit()
+                return EXECUTE, None
+            except IntegrityError:
+                db.rollback()
+            row = db.scalars(select(table).where(table.subject == subject, table.key == key)).first()
+            if row is None:
+                return BUSY, None  # gerade abgelaufen und gelöscht – der Client versucht es erneut
+            abandoned = row.status_code is None and row.created_at < now - config.IDEMPOTENCY_LOCK_SECONDS
+            if row.expires_at < now or abandoned:
+                # Neu belegen; das bedingte UPDATE gewinnt nur ein Worker
+                taken = db.execute(
+                    update(table).where(table.id == row.id, table.created_at == row.created_at)
+                    .values(fingerprint=request_hash, status_code=None, headers=None, body=None,
+                            created_at=now, expires_at=now + config.IDEMPOTENCY_TTL_SECONDS)
+                ).rowcount
+                db.commit()
+                return (EXECUTE, None) if taken else (BUSY, None)
+            if row.fingerprint != request_hash:
+                return MISMATCH, None
+            if row.status_code is None:
+                return BUSY, None
+            return REPLAY, Stored(row.status_code, row.headers or [], row.body or b"")
+
+    def complete(self, subject: str, key: str, stored: Stored):
+        table = models.IdempotencyKey
+        with self.session() as db:
+            db.execute(
+                update(table).where(table.subject == subject, table.key == key)
+                .values(status_code=stored.status_code, headers=stored.headers, body=stored.body)
+            )
+            db.commit()
+
+    def release(self, subject: str, key: str):
+        """Key wieder freigeben (Serverfehler, Antwort zu groß): die Wiederholung wird ausgeführt."""
+        table = models.IdempotencyKey
+        with self.session() as db:
+            db.execute(delete(table).where(table.subject == subject, table.key == key, table.status_code.is_(None)))
+            db.commit()
+
+    def prune(self, force: bool = False) -> int:
+        """Abgelaufene Keys in einem DELETE entfernen, höchstens alle IDEMPOTENCY_PRUNE_SECONDS."""
+        now = time.time()
+        if not force and now - self._last_prune < config.IDEMPOTENCY_PRUNE_SECONDS:
+            return 0
+        self._last_prune = now
+        table = models.IdempotencyKey
+        with self.session() as db:
+            pruned = db.execute(delete(table).where(table.expires_at < now)).rowcount
+            db.commit()
+        return pruned
+
+
+store = IdempotencyStore()
+
+
+async def _read_body(receive, limit: int):
+    """Liest den Request-Body bis limit Bytes. Gibt (Nachrichten, vollständig) zurück."""
+    messages, size = [], 0
+    while True:
+        message = await receive()
+        messages.append(message)
+        if message["type"] != "http.request":
+            return messages, False
+        size += len(message.get("body", b""))
+        if size > limit:
+            return messages, False
+        if not message.get("more_body", False):
+            return messages, True
+
+
+def _replaying(messages, receive):
+    """receive, das erst die gepufferten Nachrichten liefert und dann an den Server weiterreicht."""
+    pending = list(messages)
+
+    async def replay():
+        if pending:
+            return pending.pop(0)
+        return await receive()
+    return replay
+
+
+class IdempotencyMiddleware:
+    """ASGI-Middleware; siehe Modul-Docstring."""
+
+    def __init__(self, app, prefix: str = "/api", store: IdempotencyStore = None):
+        self.app = app
+        self.prefix = prefix
+        self.store = store
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in METHODS or not scope["path"].startswith(self.prefix):
+            await self.app(scope, receive, send)
+            return
+        headers = {name: value.decode("latin-1") for name, value in scope["headers"]}
+        key = headers.get(b"idempotency-key", "").strip()
+        subject = subject_of(headers.get(b"authorization", "")) if key else None
+        if subject is None:
+            await self.app(scope, receive, send)
+            return
+        if len(key) > MAX_KEY_LENGTH:
+            await JSONResponse({"detail": "Idempotency-Key ist zu lang"}, status_code=400)(scope, receive, send)
+            return
+
+        messages, complete = await _read_body(receive, config.IDEMPOTENCY_MAX_BODY_BYTES)
+        receive = _replaying(messages, receive)
+        if not complete:
+            await self.app(scope, receive, send)
+            return
+
+        active_store = self.store or store
+        body = b"".join(m.get("body", b"") for m in messages)
+        request_hash = fingerprint(scope["method"], scope["path"], scope.get("query_string", b""), body)
+        decision, stored = await run_in_threadpool(active_store.begin, subject, key, request_hash)
+        if decision == REPLAY:
+            registry.inc("idempotency_replays_total")
+            await self._replay(stored, send)
+            return
+        if decision in (BUSY, MISMATCH):
+            registry.inc("idempotency_conflicts_total")
+            response = JSONResponse(
+                {"detail": "Request mit diesem Idempotency-Key läuft noch"}, status_code=409
+            ) if decision == BUSY else JSONResponse(
+                {"detail": "Idempotency-Key wurde bereits für einen anderen Request verwendet"}, status_code=422
+            )
+            await response(scope, receive, send)
+            return
+
+        capture = _Capture(send, config.IDEMPOTENCY_MAX_BODY_BYTES)
+        try:
+            await self.app(scope, receive, capture.send)
+        except BaseException:
+            await run_in_threadpool(active_store.release, subject, key)
+            raise
+        result = capture.result()
+        if result is None:
+            await run_in_threadpool(active_store.release, subject, key)
+        else:
+            await run_in_threadpool(active_store.complete, subject, key, result)
+        await run_in_threadpool(active_store.prune)
+
+    async def _replay(self, stored: Stored, send):
+        headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in stored.headers]
+        headers.append((b"content-length", str(len(stored.body)).encode()))
+        headers.append((b"idempotent-replayed", b"true"))
+        await send({"type": "http.response.start", "status": stored.status_code, "headers": headers})
+        await send({"type": "http.response.body", "body": stored.body})
+
+
+def _skipped(name: str) -> bool:
+    return name in SKIPPED_HEADERS or name.startswith(SKIPPED_PREFIXES)
+
+
+class _Capture:
+    """Reicht die Antwort durch und merkt sie sich (bis limit Bytes)."""
+
+    def __init__(self, send, limit: int):
+        self._send = send
+        self.limit = limit
+        self.status_code = None
+        self.headers = []
+        self.chunks = []
+        self.size = 0
+        self.complete = False
+
+    async def send(self, message):
+        if message["type"] == "http.response.start":
+            self.status_code = message["status"]
+            self.headers = [
+                [name.decode("latin-1"), value.decode("latin-1")]
+                for name, value in message.get("headers", [])
+                if not _skipped(name.decode("latin-1").lower())
+            ]
+        elif message["type"] == "http.response.body" and self.size <= self.limit:
+            body = message.get("body", b"")
+            self.size += len(body)
+            self.chunks.append(body)
+            self.complete = not message.get("more_body", False)
+        await self._send(message)
+
+    def result(self) -> Stored:
+        """Die Antwort zum Speichern, oder None (Serverfehler, zu groß, abgebrochen)."""
+        if self.status_code is None or self.status_code >= 500 or self.size > self.limit or not self.complete:
+            return None
+        return Stored(self.status_code, self.headers, b"".join(self.chunks))
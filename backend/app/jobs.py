@@ -0,0 +1,453 @@
+"""
+Hintergrund-Jobs für lange Listen-Operationen.
+
+Große Importe, das Löschen großer Listen oder das Neuberechnen der Begriffe
+dauern zu lange für einen Request (Proxy-Timeouts im Cloudflare-Tunnel).
+Die Route reiht stattdessen einen Job ein und antwortet sofort mit 202, der
+Client fragt GET /api/jobs/{id} ab.
+
+Die Warteschlange ist die Tabelle jobs in der Haupt-DB: Jobs überleben einen
+Neustart, und mehrere Worker-Prozesse teilen sie sich. Jeder Prozess startet
+JOB_WORKERS Threads; ein Job wird per bedingtem UPDATE (status = 'queued')
+genau einem Thread zugeteilt. Laufende Jobs ohne Lebenszeichen seit
+JOB_STALE_SECONDS (Prozess abgestürzt) werden neu eingeplant.
+
+Drosselung: wenige Worker (Standard 1), Arbeit in Blöcken mit eigener
+Transaktion und JOB_THROTTLE_SECONDS Pause nach jedem Block – dazwischen
+kommen interaktive Requests an GIL und SQLite-Schreibsperre.
+
+Handler registrieren sich mit @handler("art") und bekommen einen
+JobContext: ctx.db (Session im Shard des Auftraggebers), ctx.params und
+ctx.progress(done, total) für Fortschritt, Lebenszeichen und Abbruch.
+Vorübergehende DB-Fehler (OperationalError, z.B. "database is locked")
+werden bis JOB_MAX_ATTEMPTS mit wachsender Pause wiederholt; andere Fehler
+beenden den Job, erneut starten geht mit POST /api/jobs/{id}/retry.
+"""
+import logging
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from fastapi import HTTPException
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.exc import OperationalError, SQLAlchemyError
+
+from app import anki, config, crud, database, distractors, migrations, models, stats
+from app.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+registry.describe("jobs_finished_total", "counter", "Beendete Hintergrund-Jobs nach Art und Status")
+registry.describe("jobs_queued", "gauge", "Wartende Hintergrund-Jobs")
+
+ACTIVE = ("queued", "running")
+CHUNK_SIZE = 1024 * 1024
+MAINTENANCE_SECONDS = 60
+
+
+class JobCancelled(Exception):
+    """Löst ctx.progress() aus, wenn der Job abgebrochen wurde."""
+
+
+class JobError(Exception):
+    """Erwarteter Fehler; die Meldung landet beim Benutzer, ohne Traceback im Log."""
+
+
+_handlers = {}
+
+
+def handler(kind: str, cancellable: bool = True):
+    """
+    Registriert einen Handler. cancellable=False für Jobs, die mittendrin
+    abgebrochen einen halben Zustand hinterlassen würden – die lassen sich
+    nur abbrechen, solange sie noch warten.
+    """
+    def register(func):
+        _handlers[kind] = (func, cancellable)
+        return func
+    return register
+
+
+def cancellable(kind: str) -> bool:
+    return kind in _handlers and _handlers[kind][1]
+
+
+class JobContext:
+    def __init__(self, queue: "JobQueue", job: models.Job):
+        self.queue = queue
+        self.id = job.id
+        self.kind = job.kind
+        self.user_id = job.user_id
+        self.tenant = job.tenant
+        self.params = dict(job.params or {})
+        self.db = queue.data_session(job.tenant)
+
+    def progress(self, done: int, total: int = None):
+        """Nach jedem Block: Fortschritt und Lebenszeichen speichern, Abbruch prüfen, kurz pausieren."""
+        if self.queue.heartbeat(self.id, done, total) and cancellable(self.kind):
+            raise JobCancelled()
+        if config.JOB_THROTTLE_SECONDS > 0:
+            time.sleep(config.JOB_THROTTLE_SECONDS)
+
+
+class JobQueue:
+    def __init__(self, session_factory=None, workers: int = None):
+        self._session_factory = session_factory
+        self.workers = config.JOB_WORKERS if workers is None else workers
+        self._threads = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+
+    def session(self):
+        """Session der Haupt-DB (Tabelle jobs)."""
+        return (self._session_factory or database.SessionLocal)()
+
+    def data_session(self, tenant: str = None):
+        """Session, in der der Handler arbeitet – ohne Sharding ist das die Haupt-DB."""
+        if tenant and config.TENANT_SHARDING:
+            from app import tenancy
+            return tenancy.session_for_tenant(tenant)
+        return self.session()
+
+    # ============== Einreihen & Verwalten ==============
+    def enqueue(self, kind: str, params: dict = None, user_id: int = None, tenant: str = None) -> models.Job:
+        if kind not in _handlers:
+            raise ValueError(f"Unbekannte Job-Art '{kind}'")
+        now = time.time()
+        with self.session() as db:
+            if user_id is not None and config.JOB_MAX_ACTIVE_PER_USER:
+                active = db.scalar(select(func.count()).select_from(models.Job).where(
+                    models.Job.user_id == user_id, _tenant_is(tenant), models.Job.status.in_(ACTIVE)
+                ))
+                if active >= config.JOB_MAX_ACTIVE_PER_USER:
+                    raise HTTPException(status_code=429, detail="Zu viele laufende Hintergrund-Jobs, bitte warten")
+            job = models.Job(
+                kind=kind, status="queued", params=params or {}, user_id=user_id, tenant=tenant,
+                progress=0, attempts=0, max_attempts=config.JOB_MAX_ATTEMPTS, cancel_requested=False,
+                created_at=now, run_after=now
+            )
+            db.add(job)
+            db.commit()
+            db.refresh(job)
+            db.expunge(job)
+        self._wake.set()
+        return job
+
+    def get(self, job_id: int) -> models.Job:
+        with self.session() as db:
+            job = db.get(models.Job, job_id)
+            if job is not None:
+                db.expunge(job)
+            return job
+
+    def list_jobs(self, user_id: int, tenant: str = None, limit: int = 50) -> list:
+        with self.session() as db:
+            jobs = db.scalars(
+                select(models.Job).where(models.Job.user_id == user_id, _tenant_is(tenant))
+                .order_by(models.Job.id.desc()).limit(limit)
+            ).all()
+            db.expunge_all()
+            return jobs
+
+    def cancel(self, job_id: int) -> models.Job:
+        """Wartende Jobs sofort, laufende beim nächsten ctx.progress()."""
+        now = time.time()
+        job = models.Job
+        with self.session() as db:
+            db.execute(
+                update(job).where(job.id == job_id, job.status == "queued")
+                .values(status="cancelled", cancel_requested=True, finished_at=now)
+            )
+            db.execute(update(job).where(job.id == job_id, job.status == "running").values(cancel_requested=True))
+            db.commit()
+        return self.get(job_id)
+
+    def retry(self, job_id: int) -> bool:
+        """Fehlgeschlagenen oder abgebrochenen Job neu einreihen (alle Versuche wieder frei)."""
+        now = time.time()
+        job = models.Job
+        with self.session() as db:
+            retried = db.execute(
+                update(job).where(job.id == job_id, job.status.in_(("failed", "cancelled")))
+                .values(status="queued", attempts=0, cancel_requested=False, error=None, result=None,
+                        progress=0, total=None, run_after=now, started_at=None, finished_at=None)
+            ).rowcount
+            db.commit()
+        if retried:
+            self._wake.set()
+        return bool(retried)
+
+    # ============== Ausführen ==============
+    def claim(self) -> models.Job:
+        """Nächsten fälligen Job übernehmen; andere Worker verlieren das bedingte UPDATE."""
+        now = time.time()
+        job = models.Job
+        with self.session() as db:
+            candidates = db.scalars(
+                select(job.id).where(job.status == "queued", job.run_after <= now)
+                .order_by(job.run_after, job.id).limit(5)
+            ).all()
+            for job_id in candidates:
+                claimed = db.execute(
+                    update(job).where(job.id == job_id, job.status == "queued")
+                    .values(status="running", attempts=job.attempts + 1, started_at=now, heartbeat_at=now)
+                ).rowcount
+                db.commit()
+                if claimed:
+                    row = db.get(job, job_id)
+                    db.expunge(row)
+                    return row
+        return None
+
+    def run_next(self) -> models.Job:
+        """Einen Job ausführen (None, wenn nichts ansteht). Gibt den Job im Endzustand zurück."""
+        job = self.claim()
+        if job is None:
+            return None
+        self.execute(job)
+        return self.get(job.id)
+
+    def execute(self, job: models.Job):
+        func = _handlers.get(job.kind, (None,))[0]
+        ctx = JobContext(self, job)
+        try:
+            if func is None:
+                raise JobError(f"Unbekannte Job-Art '{job.kind}'")
+            result = func(ctx)
+        except JobCancelled:
+            ctx.db.rollback()
+            self._finish(job, "cancelled")
+        except OperationalError as exc:
+            ctx.db.rollback()
+            if job.attempts < job.max_attempts:
+                delay = config.JOB_RETRY_DELAY_SECONDS * 2 ** (job.attempts - 1)
+                logger.warning("Job %s (%s) wird in %.0f s wiederholt: %s", job.id, job.kind, delay, exc.orig)
+                self._requeue(job, delay, str(exc.orig))
+            else:
+                self._finish(job, "failed", error=f"Datenbankfehler: {exc.orig}")
+        except JobError as exc:
+            ctx.db.rollback()
+            self._finish(job, "failed", error=str(exc))
+        except Exception as exc:
+            ctx.db.rollback()
+            logger.exception("Job %s (%s) fehlgeschlagen", job.id, job.kind)
+            self._finish(job, "failed", error=f"Interner Fehler ({type(exc).__name__})")
+        else:
+            self._finish(job, "succeeded", result=result)
+        finally:
+            ctx.db.close()
+
+    def heartbeat(self, job_id: int, done: int, total: int = None) -> bool:
+        """Speichert den Fortschritt; True, wenn der Job abgebrochen werden soll."""
+        values = {"progress": done, "heartbeat_at": time.time()}
+        if total is not None:
+            values["total"] = total
+        with self.session() as db:
+            db.execute(update(models.Job).where(models.Job.id == job_id).values(**values))
+            db.commit()
+            return bool(db.scalar(select(models.Job.cancel_requested).where(models.Job.id == job_id)))
+
+    def _requeue(self, job: models.Job, delay: float, error: str):
+        with self.session() as db:
+            db.execute(
+                update(models.Job).where(models.Job.id == job.id, models.Job.status == "running")
+                .values(status="queued", run_after=time.time() + delay, error=error)
+            )
+            db.commit()
+
+    def _finish(self, job: models.Job, status: str, result=None, error: str = None):
+        now = time.time()
+        with self.session() as db:
+            db.execute(
+                update(models.Job).where(models.Job.id == job.id, models.Job.status == "running")
+                .values(status=status, result=result, error=error, finished_at=now, heartbeat_at=now)
+            )
+            db.commit()
+        registry.inc("jobs_finished_total", (("kind", job.kind), ("status", status)))
+
+    # ============== Wartung ==============
+    def recover_stale(self) -> int:
+        """Jobs abgestürzter Worker neu einplanen (bzw. aufgeben, wenn keine Versuche mehr übrig sind)."""
+        now = time.time()
+        job = models.Job
+        stale = (job.status == "running", job.heartbeat_at < now - config.JOB_STALE_SECONDS)
+        with self.session() as db:
+            requeued = db.execute(
+                update(job).where(*stale, job.attempts < job.max_attempts).values(status="queued", run_after=now)
+            ).rowcount
+            failed = db.execute(
+                update(job).where(*stale).values(status="failed", error="Worker wurde beendet", finished_at=now)
+            ).rowcount
+            db.commit()
+        return requeued + failed
+
+    def prune(self) -> int:
+        """Abgeschlossene Jobs nach JOB_KEEP_DAYS löschen, samt hochgeladener Dateien."""
+        cutoff = time.time() - config.JOB_KEEP_DAYS * 86400
+        job = models.Job
+        finished = (job.status.notin_(ACTIVE), job.finished_at < cutoff)
+        with self.session() as db:
+            for params in db.scalars(select(job.params).where(*finished)):
+                if params and params.get("upload"):
+                    upload_path(params["upload"]).unlink(missing_ok=True)
+            pruned = db.execute(delete(job).where(*finished)).rowcount
+            queued = db.scalar(select(func.count()).select_from(job).where(job.status == "queued"))
+            db.commit()
+        registry.set_gauge("jobs_queued", queued)
+        return pruned
+
+    # ============== Worker-Threads ==============
+    @property
+    def running(self):
+        return any(thread.is_alive() for thread in self._threads)
+
+    def start(self):
+        with self._lock:
+            if self.running or self.workers <= 0:
+                return
+            self._stop.clear()
+            self._threads = [
+                threading.Thread(target=self._run, args=(i == 0,), name=f"job-worker-{i}", daemon=True)
+                for i in range(self.workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        threads, self._threads = self._threads, []
+        for thread in threads:
+            thread.join(timeout=5)
+
+    def _run(self, maintenance: bool):
+        last_maintenance = 0
+        while not self._stop.is_set():
+            job = None
+            try:
+                if maintenance and time.time() - last_maintenance > MAINTENANCE_SECONDS:
+                    self.recover_stale()
+                    self.prune()
+                    last_maintenance = time.time()
+                job = self.run_next()
+            except SQLAlchemyError:
+                logger.warning("Job-Warteschlange nicht erreichbar", exc_info=True)
+            if job is None:
+                self._wake.wait(config.JOB_POLL_SECONDS)
+                self._wake.clear()
+
+
+def _tenant_is(tenant: str):
+    return models.Job.tenant.is_(None) if tenant is None else models.Job.tenant == tenant
+
+
+# ============== Uploads ==============
+def upload_path(name: str) -> Path:
+    return Path(config.JOB_DIR) / Path(name).name
+
+
+def save_upload(fileobj, max_bytes: int, suffix: str = "") -> str:
+    """
+    Kopiert einen Upload blockweise nach JOB_DIR – die temporäre Datei des
+    Requests ist weg, bevor der Job läuft. Gibt den Dateinamen für die
+    Job-Parameter ("upload") zurück.
+    """
+    directory = Path(config.JOB_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    name = f"{uuid.uuid4().hex}{suffix}"
+    written = 0
+    with open(directory / name, "wb") as dst:
+        while chunk := fileobj.read(CHUNK_SIZE):
+            written += len(chunk)
+            if written > max_bytes:
+                break
+            dst.write(chunk)
+    if written > max_bytes:
+        upload_path(name).unlink()
+        raise HTTPException(status_code=413, detail=f"Datei zu groß (max. {max_bytes // (1024 * 1024)} MB)")
+    return name
+
+
+# ============== Handler ==============
+@handler("delete_vocab_list", cancellable=False)
+def delete_vocab_list(ctx: JobContext) -> dict:
+    """Löscht Einträge blockweise (mengenbasiert, ohne ORM-Kaskade über alle Einträge), dann die Liste."""
+    list_id = ctx.params["vocab_list_id"]
+    db = ctx.db
+    entries = models.VocabEntry.__table__
+    values = models.EntryFieldValue.__table__
+    total = db.scalar(select(func.count()).select_from(entries).where(entries.c.vocab_list_id == list_id))
+    distractors.list_removed(db, list_id)
+    done = 0
+    while ids := db.scalars(
+        select(entries.c.id).where(entries.c.vocab_list_id == list_id).limit(config.JOB_BATCH_SIZE)
+    ).all():
+        stats.entries_removed(db, list_id, ids)
+        db.execute(delete(values).where(values.c.entry_id.in_(ids)))
+        db.execute(delete(entries).where(entries.c.id.in_(ids)))
+        db.commit()
+        done += len(ids)
+        ctx.progress(done, total)
+    deleted = crud.delete_vocab_list(db, list_id)
+    return {"vocab_list_id": list_id, "deleted": deleted, "entries": done}
+
+
+@handler("import_anki")
+def import_anki(ctx: JobContext) -> dict:
+    """Anki-Import aus der hochgeladenen Datei; bei Abbruch räumt import_deck die halbe Liste weg."""
+    path = upload_path(ctx.params["upload"])
+    if not path.exists():
+        raise JobError("Hochgeladene Datei ist nicht mehr vorhanden, bitte erneut hochladen")
+    with open(path, "rb") as fileobj:
+        try:
+            result = anki.import_deck(ctx.db, fileobj, ctx.user_id, ctx.params.get("name"), progress=ctx.progress)
+        except anki.AnkiImportError as exc:
+            raise JobError(str(exc))
+    path.unlink(missing_ok=True)
+    return {
+        "vocab_list_id": result["vocab_list_id"],
+        "name": result["name"],
+        "notes": result["notes"],
+        "columns": [column.name for column in result["columns"]],
+    }
+
+
+@handler("rebuild_distractors")
+def rebuild_distractors(ctx: JobContext) -> dict:
+    """Ablenker-Kandidaten aller noch nicht berechneten Spalten einer Liste."""
+    list_id = ctx.params["vocab_list_id"]
+    column_ids = distractors.pending_columns(ctx.db, select(models.ListColumn.id).where(
+        models.ListColumn.vocab_list_id == list_id
+    ))
+    distractors.rebuild_columns(ctx.db, list_id, column_ids, progress=ctx.progress)
+    return {"vocab_list_id": list_id, "columns": len(column_ids)}
+
+
+@handler("reconcile_stats")
+def reconcile_stats(ctx: JobContext) -> dict:
+    return {"corrected": stats.reconcile(ctx.db, progress=ctx.progress)}
+
+
+@handler("backfill_entry_terms")
+def backfill_entry_terms(ctx: JobContext) -> dict:
+    lists = migrations.backfill_entry_terms(
+        ctx.db, only_missing=not ctx.params.get("all"), progress=ctx.progress
+    )
+    return {"lists": lists}
+
+
+queue = JobQueue()
+
+
+def start_background(workers: int = None) -> JobQueue:
+    if workers is not None:
+        queue.workers = workers
+    queue.start()
+    return queue
+
+
+def stop_background():
+    queue.stop()
+    return queue
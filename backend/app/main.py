@@ -1,14 +1,46 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import PlainTextResponse
 from pathlib import Path
-from app.database import engine, Base
-from app.routes import vocab, vocablist, user
+from app.database import engine
+from app import backup, bus, compression, config, idempotency, jobs, metrics, migrations, profiling, querylog, serve, static
+from app.routes import vocab, vocablist, user, admin, async_reads, avatars, stats, events, quiz, jobs as job_routes
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Start: Schema nur prüfen (gespeicherter Fingerabdruck, siehe migrations.ensure_schema)
+    und Hintergrund-Threads starten; beim Beenden stoppen. Der Import von app.main
+    bleibt so frei von Datenbankzugriffen.
+    """
+    migrations.ensure_schema(engine)
+    # Mehrere Worker (app.serve): Änderungen der anderen übernehmen, siehe bus.py
+    if config.BUS_ENABLED:
+        bus.start_background()
+    # Online-Backups der SQLite-Datenbank im Hintergrund (nur einmal pro Installation)
+    if config.BACKUP_INTERVAL_MINUTES > 0 and serve.primary():
+        backup.start_background()
+    # Worker für Hintergrund-Jobs (Löschen/Import großer Listen), siehe jobs.py
+    if config.JOB_WORKERS > 0:
+        jobs.start_background()
+    if config.PROFILER_ALWAYS_ON:
+        profiling.start_background()
+    yield
+    profiling.stop_background()
+    jobs.stop_background()
+    backup.stop_background()
+    bus.stop_background()
 
-# CORS for dev and production domain
+
+app = FastAPI(lifespan=lifespan)
+
+# Idempotency-Key: Wiederholungen schreibender Requests spielen die gespeicherte Antwort ab
+# (innerhalb von Metrics/Komprimierung, gespeichert wird die unkomprimierte Antwort)
+if config.IDEMPOTENCY_ENABLED:
+    app.add_middleware(idempotency.IdempotencyMiddleware)
+
+# CORS for dev and production domain (outside idempotency: replays get the headers for their own Origin)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -21,27 +53,67 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-Base.metadata.create_all(bind=engine)
+app.add_middleware(metrics.MetricsMiddleware)
+
+# gzip/brotli for larger API responses (outside metrics, so sizes there stay uncompressed)
+if config.COMPRESSION_ENABLED:
+    app.add_middleware(compression.CompressionMiddleware)
+
+# Opt-in SQL instrumentation (N+1 detection, slow query log)
+if config.SQL_INSTRUMENTATION:
+    querylog.install(engine)
+    app.add_middleware(querylog.QueryLogMiddleware)
+
+# Admin-only request profiling (X-Profile header / ?profile=)
+app.add_middleware(profiling.ProfilingMiddleware)
 
 # API routes under /api
+if config.ASYNC_DB and not config.TENANT_SHARDING:
+    # async read routes first, so they take precedence over the sync ones
+    app.include_router(async_reads.router, prefix="/api")
 app.include_router(vocab.router, prefix="/api")
 app.include_router(vocablist.router, prefix="/api")
+app.include_router(avatars.router, prefix="/api")
 app.include_router(user.router, prefix="/api")
+app.include_router(admin.router, prefix="/api")
+app.include_router(job_routes.router, prefix="/api")
+app.include_router(stats.router, prefix="/api")
+app.include_router(events.router, prefix="/api")
+app.include_router(quiz.router, prefix="/api")
+
+# Simple health/info endpoints under /api
+# (registered before the SPA fallback, otherwise the catch-all route shadows them)
+@app.get("/api/health")
+def health():
+    return {"status": "ok"}
+
+@app.get("/api")
+def api_root():
+    return {"status": "ok", "routes": ["/api/login/", "/api/register/", "/api/vocablist/", "/api/health", "/api/metrics"]}
+
+# Prometheus scrape endpoint
+@app.get("/api/metrics", include_in_schema=False)
+async def metrics_endpoint(request: Request):
+    if config.METRICS_TOKEN and request.headers.get("authorization") != f"Bearer {config.METRICS_TOKEN}":
+        raise HTTPException(status_code=401, detail="Ungültiger Metrics-Token")
+    metrics.collect_threadpool()
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
 
 # Frontend build paths
 frontend_dist = (Path(__file__).resolve().parents[2] / "frontend" / "dist").resolve()
 index_file = frontend_dist / "index.html"
 assets_dir = frontend_dist / "assets"
+spa_index = static.SpaIndex(index_file)
 
-# Serve Vite assets under /assets if they exist
+# Serve Vite assets under /assets if they exist (precompressed, immutable caching)
 if assets_dir.exists():
-    app.mount("/assets", StaticFiles(directory=str(assets_dir)), name="assets")
+    app.mount("/assets", static.PrecompressedStaticFiles(directory=str(assets_dir)), name="assets")
 
 # Root serves index.html if present (SPA), else backend info
 @app.get("/", include_in_schema=False)
-def root_html():
-    if index_file.exists():
-        return FileResponse(str(index_file))
+def root_html(request: Request):
+    if spa_index.available:
+        return spa_index.response(request)
     return {"msg": "Backend läuft mit Datenbank!"}
 
 # SPA fallback for client-side routes (non-API)
@@ -51,16 +123,6 @@ def spa_fallback(full_path: str, request: Request):
     if full_path.startswith("api"):
         raise HTTPException(status_code=404, detail="Not Found")
     # Serve index.html for any other path if build exists
-    if index_file.exists():
-        return FileResponse(str(index_file))
+    if spa_index.available:
+        return spa_index.response(request)
     raise HTTPException(status_code=404, detail="Not Found")
-
-# Simple health/info endpoints under /api
-@app.get("/api/health")
-def health():
-    return {"status": "ok"}
-
-@app.get("/api")
-def api_root():
-    return {"status": "ok", "routes": ["/api/login/", "/api/register/", "/api/vocablist/", "/api/health"]}
-
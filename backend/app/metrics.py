@@ -0,0 +1,237 @@
+"""
+Request-Metriken im Prometheus-Textformat.
+
+Alles liegt im Prozess-Speicher (pro uvicorn-Worker). Erfasst werden:
+- Latenz- und Antwortgrößen-Histogramme pro Route
+- laufende Requests (in-flight)
+- Auslastung des Starlette-Threadpools
+- Wartezeit beim Auschecken einer DB-Verbindung aus dem Pool
+- SQL-Statements pro Request
+"""
+import threading
+import time
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+STATEMENT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 250, 1000)
+WAIT_BUCKETS = (0.0001, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # letzter Eintrag = +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        i = 0
+        while i < len(self.buckets) and value > self.buckets[i]:
+            i += 1
+        self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Registry:
+    """Thread-sichere Sammlung aller Zähler, Gauges und Histogramme."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}    # (name, labels) -> float
+        self.gauges = {}      # (name, labels) -> float
+        self.histograms = {}  # (name, labels) -> Histogram
+        self.help = {}        # name -> (type, help)
+
+    def describe(self, name, kind, text):
+        self.help[name] = (kind, text)
+
+    def inc(self, name, labels=(), amount=1):
+        with self._lock:
+            key = (name, labels)
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def add_gauge(self, name, amount, labels=()):
+        with self._lock:
+            key = (name, labels)
+            self.gauges[key] = self.gauges.get(key, 0) + amount
+
+    def set_gauge(self, name, value, labels=()):
+        with self._lock:
+            self.gauges[(name, labels)] = value
+
+    def observe(self, name, value, buckets, labels=()):
+        with self._lock:
+            key = (name, labels)
+            hist = self.histograms.get(key)
+            if hist is None:
+                hist = self.histograms[key] = Histogram(buckets)
+            hist.observe(value)
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.gauges.clear()
+            self.histograms.clear()
+
+    def render(self) -> str:
+        """Gibt alle Werte im Prometheus-Textformat (Version 0.0.4) aus."""
+        with self._lock:
+            samples = {}
+            for (name, labels), value in self.counters.items():
+                samples.setdefault(name, []).append(f"{name}{_labels(labels)} {_num(value)}")
+            for (name, labels), value in self.gauges.items():
+                samples.setdefault(name, []).append(f"{name}{_labels(labels)} {_num(value)}")
+            for (name, labels), hist in self.histograms.items():
+                lines = samples.setdefault(name, [])
+                cumulative = 0
+                for bound, count in zip(hist.buckets + ("+Inf",), hist.counts):
+                    cumulative += count
+                    le = bound if bound == "+Inf" else _num(bound)
+                    lines.append(f"{name}_bucket{_labels(labels + (('le', le),))} {cumulative}")
+                lines.append(f"{name}_sum{_labels(labels)} {_num(hist.sum)}")
+                lines.append(f"{name}_count{_labels(labels)} {hist.count}")
+
+        out = []
+        for name in sorted(samples):
+            if name in self.help:
+                kind, text = self.help[name]
+                out.append(f"# HELP {name} {text}")
+                out.append(f"# TYPE {name} {kind}")
+            out.extend(samples[name])
+        return "\n".join(out) + "\n"
+
+
+def _num(value) -> str:
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+registry = Registry()
+registry.describe("http_requests_total", "counter", "Anzahl abgeschlossener HTTP-Requests")
+registry.describe("http_request_duration_seconds", "histogram", "Latenz pro Route")
+registry.describe("http_response_size_bytes", "histogram", "Größe des Antwort-Bodys pro Route")
+registry.describe("http_requests_in_flight", "gauge", "Aktuell laufende HTTP-Requests")
+registry.describe("http_request_sql_statements", "histogram", "SQL-Statements pro Request")
+registry.describe("threadpool_tokens_borrowed", "gauge", "Belegte Threads im Starlette-Threadpool")
+registry.describe("threadpool_tokens_total", "gauge", "Größe des Starlette-Threadpools")
+registry.describe("db_pool_checkout_wait_seconds", "histogram", "Wartezeit auf eine DB-Verbindung aus dem Pool")
+registry.describe("db_pool_checked_out", "gauge", "Ausgecheckte DB-Verbindungen")
+
+
+# ============== Per-Request State ==============
+class RequestStats:
+    __slots__ = ("statements",)
+
+    def __init__(self):
+        self.statements = 0
+
+
+# Das Objekt wird beim Threadpool-Aufruf mitkopiert (copy_context),
+# sync-Handler zählen also in dasselbe RequestStats-Objekt.
+current_request: ContextVar = ContextVar("current_request", default=None)
+
+
+# ============== SQLAlchemy ==============
+class _TimedCheckout:
+    """Misst die Wartezeit beim Auschecken einer Verbindung aus dem Pool."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            registry.observe("db_pool_checkout_wait_seconds", time.perf_counter() - start, WAIT_BUCKETS)
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    pass
+
+
+def instrument_engine(engine):
+    """Zählt SQL-Statements pro Request und ausgecheckte Verbindungen."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _count_statement(conn, cursor, statement, parameters, context, executemany):
+        stats = current_request.get()
+        if stats is not None:
+            stats.statements += 1
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_conn, record, proxy):
+        registry.add_gauge("db_pool_checked_out", 1)
+
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_conn, record):
+        registry.add_gauge("db_pool_checked_out", -1)
+
+
+# ============== Middleware ==============
+class MetricsMiddleware:
+    """Reine ASGI-Middleware (kein BaseHTTPMiddleware), damit Streaming-Antworten nicht gepuffert werden."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        status_code = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status_code, size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        registry.add_gauge("http_requests_in_flight", 1)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            registry.add_gauge("http_requests_in_flight", -1)
+            current_request.reset(token)
+
+            route = scope.get("route")
+            path = route.path if route is not None else "other"
+            labels = (("method", scope["method"]), ("route", path))
+            registry.inc("http_requests_total", labels + (("status", str(status_code)),))
+            registry.observe("http_request_duration_seconds", elapsed, LATENCY_BUCKETS, labels)
+            registry.observe("http_response_size_bytes", size, SIZE_BUCKETS, labels)
+            registry.observe("http_request_sql_statements", stats.statements, STATEMENT_BUCKETS, labels)
+
+
+def collect_threadpool():
+    """Liest die Auslastung des anyio-Threadpools (muss im Event-Loop laufen)."""
+    from anyio import to_thread
+
+    limiter = to_thread.current_default_thread_limiter()
+    registry.set_gauge("threadpool_tokens_borrowed", limiter.borrowed_tokens)
+    registry.set_gauge("threadpool_tokens_total", limiter.total_tokens)
@@ -0,0 +1,222 @@
+"""
+Leichtgewichtige Schema-Migrationen.
+
+create_all() legt nur fehlende Tabellen an, aber keine neuen Spalten in
+bestehenden Tabellen. Additive Spalten (und ihre Indizes) werden hier nachgezogen.
+
+Beim Start ruft die App ensure_schema() auf: create_all() und upgrade()
+reflektieren jede Tabelle, das kostet bei jedem Neustart (und für jeden
+Shard) spürbar Zeit. Stattdessen wird ein Fingerabdruck des Schemas in
+schema_version gespeichert; stimmt er, reicht ein einziges SELECT.
+"""
+import hashlib
+import time
+
+from sqlalchemy import delete, func, inspect, insert, select, text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from sqlalchemy.orm import Session
+from app import models
+
+# (Tabelle, Spalte, SQL-Typ) – nur nullable Spalten ohne Default
+ADDED_COLUMNS = [
+    ("vocab_entries", "data", "JSON"),
+    ("users", "tenant", "VARCHAR"),
+    ("users", "avatar_hash", "VARCHAR(64)"),
+    ("vocab_lists", "share_code", "VARCHAR"),
+    ("vocab_entries", "normalized_term", "VARCHAR"),
+    # Zähler: NULL wird beim ersten Lesen bzw. von stats.reconcile() berechnet
+    ("users", "list_count", "INTEGER"),
+    ("users", "entry_count", "INTEGER"),
+    ("vocab_lists", "entry_count", "INTEGER"),
+    ("list_columns", "filled_count", "INTEGER"),
+    # NULL: Ablenker werden beim ersten Quiz bzw. per Job berechnet
+    ("list_columns", "distractors_ready", "BOOLEAN"),
+]
+
+# Indizes auf nachgezogenen Spalten (Namen wie von SQLAlchemy vergeben)
+ADDED_INDEXES = [
+    "ix_vocab_lists_share_code",
+    "ix_vocab_entries_list_term",
+]
+
+
+def upgrade(engine):
+    """Fügt fehlende Spalten aus ADDED_COLUMNS und Indizes aus ADDED_INDEXES hinzu."""
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table, column, sql_type in ADDED_COLUMNS:
+            existing = {c["name"] for c in inspector.get_columns(table)}
+            if column not in existing:
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {sql_type}"))
+        indexes = {index.name: index for table in models.Base.metadata.tables.values() for index in table.indexes}
+        for name in ADDED_INDEXES:
+            indexes[name].create(conn, checkfirst=True)
+
+
+# ============== Schema-Version ==============
+def schema_fingerprint() -> str:
+    """Hash über Tabellen, Spalten, Indizes und die Nachzieh-Listen; ändert sich mit jedem Modell-Update."""
+    parts = []
+    for table in sorted(models.Base.metadata.tables.values(), key=lambda t: t.name):
+        parts.append(table.name)
+        parts += [f"{c.name} {c.type!r} {c.nullable}" for c in table.columns]
+        parts += sorted(f"{i.name} {[c.name for c in i.columns]} {i.unique}" for i in table.indexes)
+    parts += [repr(ADDED_COLUMNS), repr(ADDED_INDEXES)]
+    return hashlib.sha256("\n".join(parts).encode()).hexdigest()
+
+
+def stored_fingerprint(engine):
+    """Gespeicherter Fingerabdruck, None bei neuer oder älterer Datenbank (ohne schema_version)."""
+    table = models.SchemaVersion.__table__
+    try:
+        with engine.connect() as conn:
+            return conn.execute(select(table.c.fingerprint).where(table.c.id == 1)).scalar()
+    except (OperationalError, ProgrammingError):
+        return None
+
+
+def ensure_schema(engine) -> bool:
+    """
+    Legt fehlende Tabellen an und zieht Spalten/Indizes nach – aber nur, wenn
+    die Datenbank nicht schon mit dem aktuellen Schema-Fingerabdruck
+    markiert ist. Gibt True zurück, wenn migriert wurde.
+    """
+    fingerprint = schema_fingerprint()
+    if stored_fingerprint(engine) == fingerprint:
+        return False
+    models.Base.metadata.create_all(bind=engine)
+    upgrade(engine)
+    table = models.SchemaVersion.__table__
+    with engine.begin() as conn:
+        conn.execute(delete(table))
+        conn.execute(insert(table).values(id=1, fingerprint=fingerprint, applied_at=time.time()))
+    return True
+
+
+# ============== ENTRY DATA BACKFILL ==============
+def backfill_entry_data(db: Session, batch_size: int = 1000, progress=None) -> int:
+    """
+    Füllt vocab_entries.data aus entry_field_values für alle Einträge ohne Dokument.
+
+    Arbeitet in kleinen Transaktionen (eine pro Batch), damit der Server
+    während der Migration weiter schreiben kann. Gibt die Anzahl der
+    befüllten Einträge zurück.
+    """
+    done = 0
+    last_id = 0
+    while True:
+        ids = [row[0] for row in db.query(models.VocabEntry.id).filter(
+            models.VocabEntry.id > last_id,
+            models.VocabEntry.data.is_(None)
+        ).order_by(models.VocabEntry.id).limit(batch_size).all()]
+        if not ids:
+            break
+
+        documents = {entry_id: {} for entry_id in ids}
+        rows = db.query(
+            models.EntryFieldValue.entry_id,
+            models.EntryFieldValue.column_id,
+            models.EntryFieldValue.value
+        ).filter(models.EntryFieldValue.entry_id.in_(ids)).order_by(models.EntryFieldValue.id)
+        for entry_id, column_id, value in rows:
+            documents[entry_id][str(column_id)] = value
+
+        # data IS NULL erneut prüfen: parallel geschriebene Einträge nicht überschreiben
+        for entry_id, document in documents.items():
+            db.query(models.VocabEntry).filter(
+                models.VocabEntry.id == entry_id,
+                models.VocabEntry.data.is_(None)
+            ).update({models.VocabEntry.data: document}, synchronize_session=False)
+        db.commit()
+
+        done += len(ids)
+        last_id = ids[-1]
+        if progress:
+            progress(done)
+    return done
+
+
+# ============== BEGRIFFE BACKFILL ==============
+def backfill_entry_terms(db: Session, only_missing: bool = True, progress=None) -> int:
+    """
+    Berechnet vocab_entries.normalized_term listenweise (eine Transaktion pro
+    Liste). only_missing=False rechnet alles neu, z.B. nach einer Änderung
+    an normalize_term(). Gibt die Anzahl der Listen zurück.
+    """
+    from app import crud
+
+    query = db.query(models.VocabEntry.vocab_list_id).distinct()
+    if only_missing:
+        query = query.filter(models.VocabEntry.normalized_term.is_(None))
+    list_ids = [row[0] for row in query]
+    for done, list_id in enumerate(list_ids, start=1):
+        crud.refresh_entry_terms(db, list_id)
+        db.commit()
+        if progress:
+            progress(done)
+    return len(list_ids)
+
+
+# ============== SQLITE -> POSTGRES ==============
+def copy_database(source, target, batch_size: int = 5000, progress=None) -> dict:
+    """
+    Kopiert alle Tabellen von `source` nach `target` (z.B. SQLite -> PostgreSQL).
+
+    Die Tabellen werden in Abhängigkeitsreihenfolge gelesen und in Batches
+    per executemany eingefügt, alles in einer Transaktion auf dem Ziel.
+    SQLite prüft Fremdschlüssel standardmäßig nicht; Zeilen, deren
+    Elternzeile fehlt, werden übersprungen statt die Migration abzubrechen.
+    Auf PostgreSQL werden danach die id-Sequenzen hochgesetzt.
+    schema_version wird nicht kopiert, das Ziel markiert sich selbst;
+    bus_messages (flüchtige Nachrichten zwischen Workern) auch nicht.
+
+    Gibt {tabelle: (kopiert, übersprungen)} zurück.
+    """
+    from app.database import Base
+
+    ensure_schema(target)
+    skip = {models.SchemaVersion.__tablename__, models.BusMessage.__tablename__}
+    tables = [table for table in Base.metadata.sorted_tables if table.name not in skip]
+    result = {}
+    copied_ids = {}
+
+    with source.connect() as src, target.begin() as dst:
+        for table in tables:
+            if dst.execute(select(func.count()).select_from(table)).scalar():
+                raise ValueError(f"Zieltabelle '{table.name}' ist nicht leer")
+
+        for table in tables:
+            foreign_keys = [
+                (fk.parent.name, fk.column.table.name) for fk in table.foreign_keys
+                if fk.column.table.name in copied_ids
+            ]
+            ids = copied_ids[table.name] = set()
+            copied = skipped = 0
+            rows = src.execution_options(yield_per=batch_size).execute(
+                select(table).order_by(*table.primary_key.columns)
+            )
+            for partition in rows.partitions():
+                batch = []
+                for row in partition:
+                    values = dict(row._mapping)
+                    if any(values[column] is not None and values[column] not in copied_ids[parent]
+                           for column, parent in foreign_keys):
+                        skipped += 1
+                        continue
+                    batch.append(values)
+                    ids.add(values.get("id"))
+                if batch:
+                    dst.execute(table.insert(), batch)
+                    copied += len(batch)
+                    if progress:
+                        progress(table.name, copied)
+            result[table.name] = (copied, skipped)
+
+        if dst.dialect.name == "postgresql":
+            for table in tables:
+                if "id" in table.columns:
+                    dst.execute(text(
+                        f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+                        f"COALESCE(MAX(id), 1), MAX(id) IS NOT NULL) FROM {table.name}"
+                    ))
+    return result
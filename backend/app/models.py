@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Boolean, JSON, Text
+from sqlalchemy import Column, Integer, String, ForeignKey, Boolean, JSON, Text, Float, Index, LargeBinary
 from sqlalchemy.orm import relationship
 from app.database import Base
 
@@ -12,11 +12,134 @@ class User(Base):
     password = Column(String)
     role = Column(String, default='User')
     is_active = Column(Boolean, default=True)
+    # Farb-Preset des Frontends ("color:emerald"), Bilder über avatar_hash
     avatar = Column(String, nullable=True)
+    # sha256 des hochgeladenen Bildes, Dateien im BlobStore (siehe avatars.py)
+    avatar_hash = Column(String(64), nullable=True)
+    # Mandant (Schule/Organisation), nur bei TENANT_SHARDING
+    tenant = Column(String, nullable=True)
+    # Zähler für Dashboard/Admin (siehe stats.py), NULL = noch nicht berechnet
+    list_count = Column(Integer, nullable=True, default=0)
+    entry_count = Column(Integer, nullable=True, default=0)
 
     lists = relationship("VocabList", back_populates="owner")
 
 
+class Tenant(Base):
+    """Mandant und der Shard, in dem seine Daten liegen (nur in der Haupt-DB genutzt)."""
+    __tablename__ = "tenants"
+
+    name = Column(String, primary_key=True)
+    shard = Column(String, nullable=False, default="main")
+
+
+class TenantMember(Base):
+    """Verzeichnis Benutzername -> Mandant, damit der Login den richtigen Shard findet."""
+    __tablename__ = "tenant_members"
+
+    username = Column(String, primary_key=True)
+    tenant = Column(String, ForeignKey("tenants.name"), nullable=False, index=True)
+
+
+class RefreshToken(Base):
+    """Refresh-Token (nur der sha256 wird gespeichert), immer in der Haupt-DB."""
+    __tablename__ = "refresh_tokens"
+
+    id = Column(Integer, primary_key=True)
+    token_hash = Column(String(64), unique=True, nullable=False)
+    # Benutzer-ID im Shard des Mandanten (kein Fremdschlüssel, der Benutzer liegt evtl. woanders)
+    user_id = Column(Integer, nullable=False)
+    tenant = Column(String, nullable=True)
+    expires_at = Column(Float, nullable=False, index=True)
+    # Zeitpunkt des Einlösens/Widerrufs; ein Token gilt genau einmal
+    revoked_at = Column(Float, nullable=True)
+
+    __table_args__ = (Index("ix_refresh_tokens_user", "user_id", "tenant"),)
+
+
+class TokenRevocation(Base):
+    """Access-Tokens eines Benutzers, die vor revoked_before ausgestellt wurden, sind ungültig."""
+    __tablename__ = "token_revocations"
+
+    subject = Column(String, primary_key=True)  # "<mandant>:<user_id>"
+    revoked_before = Column(Float, nullable=False)
+
+
+class BusMessage(Base):
+    """Nachricht zwischen Worker-Prozessen (siehe bus.py); origin = sendender Prozess."""
+    __tablename__ = "bus_messages"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    origin = Column(String(32), nullable=False)
+    topic = Column(String(32), nullable=False)
+    payload = Column(JSON, nullable=False)
+    created_at = Column(Float, nullable=False, index=True)
+
+    # IDs nie wiederverwenden, auch wenn das Aufräumen alle Zeilen gelöscht hat
+    __table_args__ = {"sqlite_autoincrement": True}
+
+
+class SchemaVersion(Base):
+    """Fingerabdruck des Schemas, mit dem diese Datenbank zuletzt angelegt/migriert wurde (siehe migrations.ensure_schema)."""
+    __tablename__ = "schema_version"
+
+    id = Column(Integer, primary_key=True)
+    fingerprint = Column(String(64), nullable=False)
+    applied_at = Column(Float, nullable=False)
+
+
+class IdempotencyKey(Base):
+    """Antwort auf einen Request mit Idempotency-Key (siehe idempotency.py), immer in der Haupt-DB."""
+    __tablename__ = "idempotency_keys"
+
+    id = Column(Integer, primary_key=True)
+    subject = Column(String, nullable=False)  # "<mandant>:<user_id>" wie in token_revocations
+    key = Column(String(255), nullable=False)
+    # sha256 über Methode, Pfad, Query und Body: derselbe Key für einen anderen Request ist ein Fehler
+    fingerprint = Column(String(64), nullable=False)
+    # NULL, solange der erste Request noch läuft
+    status_code = Column(Integer, nullable=True)
+    headers = Column(JSON, nullable=True)
+    body = Column(LargeBinary, nullable=True)
+    created_at = Column(Float, nullable=False)
+    expires_at = Column(Float, nullable=False, index=True)
+
+    __table_args__ = (Index("ix_idempotency_keys_subject_key", "subject", "key", unique=True),)
+
+
+class Job(Base):
+    """Hintergrund-Job (siehe jobs.py), immer in der Haupt-DB."""
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String, nullable=False)
+    # queued -> running -> succeeded | failed | cancelled
+    status = Column(String, nullable=False, default="queued")
+    # Auftraggeber im Shard des Mandanten (kein Fremdschlüssel, wie bei RefreshToken)
+    user_id = Column(Integer, nullable=True)
+    tenant = Column(String, nullable=True)
+    params = Column(JSON, nullable=True)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    progress = Column(Integer, nullable=False, default=0)
+    total = Column(Integer, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=1)
+    cancel_requested = Column(Boolean, nullable=False, default=False)
+    created_at = Column(Float, nullable=False)
+    # Frühester Start (Wiederholung nach vorübergehendem Fehler)
+    run_after = Column(Float, nullable=False)
+    started_at = Column(Float, nullable=True)
+    finished_at = Column(Float, nullable=True)
+    # Lebenszeichen des ausführenden Workers; veraltet -> Job wird neu eingeplant
+    heartbeat_at = Column(Float, nullable=True)
+
+    __table_args__ = (
+        Index("ix_jobs_status_run_after", "status", "run_after"),
+        Index("ix_jobs_user", "user_id", "tenant"),
+    )
+
+
 class VocabList(Base):
     __tablename__ = "vocab_lists"
 
@@ -24,6 +147,10 @@ class VocabList(Base):
     name = Column(String)
     description = Column(Text, nullable=True)
     user_id = Column(Integer, ForeignKey("users.id"))
+    # Freigabe-Code: wer ihn kennt, darf die Liste lesen und sich eine Kopie ziehen
+    share_code = Column(String, unique=True, index=True, nullable=True)
+    # Zähler (siehe stats.py), NULL = noch nicht berechnet
+    entry_count = Column(Integer, nullable=True, default=0)
 
     owner = relationship("User", back_populates="lists")
     columns = relationship("ListColumn", back_populates="vocab_list", cascade="all, delete-orphan", order_by="ListColumn.position")
@@ -62,6 +189,12 @@ class ListColumn(Base):
     # Ist diese Spalte die Hauptspalte? (für Suche/Sortierung)
     is_primary = Column(Boolean, default=False)
 
+    # Einträge mit nicht-leerem Wert in dieser Spalte (siehe stats.py), NULL = noch nicht berechnet
+    filled_count = Column(Integer, nullable=True, default=0)
+
+    # Ablenker-Kandidaten (siehe distractors.py) sind aktuell; NULL = noch zu berechnen
+    distractors_ready = Column(Boolean, nullable=True, default=True)
+
     vocab_list = relationship("VocabList", back_populates="columns")
     field_values = relationship("EntryFieldValue", back_populates="column", cascade="all, delete-orphan")
 
@@ -79,9 +212,39 @@ class VocabEntry(Base):
     # Optional: Position für manuelle Sortierung
     position = Column(Integer, default=0)
 
+    # Denormalisierte Kopie der Feldwerte: {"<column_id>": "<value>"}
+    # Wird nur bei ENTRY_STORAGE="dual"/"json" gepflegt (siehe crud.py)
+    data = Column(JSON(none_as_null=True), nullable=True)
+
+    # normalize_term() des Werts in der Hauptspalte (is_primary, sonst erste Spalte);
+    # Index (Liste, Begriff) für Duplikatprüfung und exakte Suche
+    normalized_term = Column(String, nullable=True)
+
     vocab_list = relationship("VocabList", back_populates="entries")
     field_values = relationship("EntryFieldValue", back_populates="entry", cascade="all, delete-orphan")
 
+    __table_args__ = (Index("ix_vocab_entries_list_term", "vocab_list_id", "normalized_term"),)
+
+
+class DistractorCandidate(Base):
+    """
+    Vorberechneter Ablenker für Multiple Choice: ein ähnlicher Wert derselben
+    Spalte (candidate_entry_id) zum Wert von entry_id, kleiner score = ähnlicher.
+    Reiner Cache ohne Fremdschlüssel, wird mit Einträgen/Spalten gelöscht.
+    """
+    __tablename__ = "distractor_candidates"
+
+    id = Column(Integer, primary_key=True)
+    column_id = Column(Integer, nullable=False)
+    entry_id = Column(Integer, nullable=False)
+    candidate_entry_id = Column(Integer, nullable=False)
+    score = Column(Float, nullable=False)
+
+    __table_args__ = (
+        Index("ix_distractor_candidates_column_entry", "column_id", "entry_id"),
+        Index("ix_distractor_candidates_candidate", "candidate_entry_id"),
+    )
+
 
 class EntryFieldValue(Base):
     """
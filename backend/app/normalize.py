@@ -0,0 +1,27 @@
+"""
+Normalisierte Form von Vokabeln für Duplikaterkennung und exakte Suche.
+
+Entspricht normalizeAnswer() in frontend/src/pages/VocabTest.tsx: was dort
+im Test als gleiche Antwort gilt, ist hier dasselbe Wort ("Straße",
+"strasse", " STRASSE! " -> "strasse"). Änderungen immer in beiden Dateien
+machen und danach `python -m app.manage backfill-entry-terms` laufen lassen.
+"""
+import re
+import unicodedata
+
+_COMBINING_RE = re.compile("[\u0300-\u036f]")
+_SINGLE_QUOTES_RE = re.compile("[\u2018\u2019\u201A\u201B\u2032\u2035\u00B4]")
+_DOUBLE_QUOTES_RE = re.compile("[\u201C\u201D\u201E\u201F\u2033\u2036]")
+_PUNCTUATION_RE = re.compile(r"""[.,;:!?/\\()\[\]{}"'«»„“”‚’`´~^|]""")
+_DASHES_RE = re.compile("[-–—_]")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_term(value: str) -> str:
+    if not value:
+        return ""
+    value = unicodedata.normalize("NFKD", value.casefold())
+    value = _COMBINING_RE.sub("", value).replace("ß", "ss")
+    value = _DOUBLE_QUOTES_RE.sub('"', _SINGLE_QUOTES_RE.sub("'", value))
+    value = _DASHES_RE.sub(" ", _PUNCTUATION_RE.sub(" ", value))
+    return _SPACE_RE.sub(" ", value).strip()
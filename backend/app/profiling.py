@@ -0,0 +1,265 @@
+"""
+Sampling-Profiler für den laufenden Server.
+
+- Einzelner Request: Admins setzen "X-Profile: store|return" (oder ?profile=store|return).
+  "store" legt das Profil in PROFILE_DIR ab (ID im Header X-Profile-Id),
+  "return" liefert statt der Antwort direkt das Profil (ohne es abzulegen).
+  Gesampelt werden nur der Event-Loop und der Threadpool-Thread des Endpoints,
+  nicht Jobs, Bus oder der Dauer-Sampler.
+- Dauerbetrieb: ein Sampler mit niedriger Frequenz, zur Laufzeit über
+  /api/admin/profiler/start|stop schaltbar (siehe routes/admin.py).
+
+Ausgabe ist das "folded stacks"-Format (eine Zeile pro Stack: "a;b;c 42"),
+das flamegraph.pl, speedscope und inferno direkt lesen.
+"""
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+from urllib.parse import parse_qs
+
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+
+from app import auth, config
+
+PROFILE_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+# Blatt-Frames in diesen Modulen bedeuten: Thread wartet nur
+_IDLE_FILES = ("threading.py", "selectors.py", "queue.py", os.path.join("concurrent", "futures", "thread.py"))
+
+
+# ============== Sampler ==============
+class Sampler:
+    """
+    Liest in festem Intervall die Stacks aller beschäftigten Threads;
+    mit keep(thread_id, frame) nur die, für die keep True liefert.
+    """
+
+    def __init__(self, interval: float, keep=None):
+        self.interval = interval
+        self.keep = keep
+        self.stacks = Counter()
+        self.samples = 0
+        self.started_at = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        self._stop.clear()
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=self._run, name="vocademy-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            with self._lock:
+                self.samples += 1
+                for thread_id, frame in frames.items():
+                    if thread_id == own or _is_idle(frame):
+                        continue
+                    if self.keep is not None and not self.keep(thread_id, frame):
+                        continue
+                    self.stacks[_fold(frame)] += 1
+
+    def folded(self) -> str:
+        with self._lock:
+            return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def reset(self):
+        with self._lock:
+            self.stacks.clear()
+            self.samples = 0
+            self.started_at = time.time()
+
+
+def _is_idle(frame) -> bool:
+    return frame.f_code.co_filename.endswith(_IDLE_FILES)
+
+
+def _runs(frame, code) -> bool:
+    while frame is not None:
+        if frame.f_code is code:
+            return True
+        frame = frame.f_back
+    return False
+
+
+def _fold(frame) -> str:
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+# ============== Dauerbetrieb ==============
+_background = None
+_background_lock = threading.Lock()
+
+
+def start_background(interval: float = None) -> Sampler:
+    global _background
+    with _background_lock:
+        if _background is None or not _background.running:
+            _background = Sampler(interval or config.PROFILER_BACKGROUND_INTERVAL)
+            _background.start()
+        return _background
+
+
+def stop_background():
+    with _background_lock:
+        if _background is not None:
+            _background.stop()
+        return _background
+
+
+def background():
+    return _background
+
+
+# ============== Gespeicherte Profile ==============
+def _profile_dir() -> Path:
+    path = Path(config.PROFILE_DIR)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def store_profile(profile_id: str, header: str, folded: str):
+    directory = _profile_dir()
+    (directory / f"{profile_id}.folded").write_text(f"# {header}\n{folded}", encoding="utf-8")
+    # Nur die neuesten PROFILE_KEEP Profile behalten
+    files = sorted(directory.glob("*.folded"), key=lambda p: p.stat().st_mtime, reverse=True)
+    for old in files[config.PROFILE_KEEP:]:
+        old.unlink(missing_ok=True)
+
+
+def list_profiles():
+    directory = _profile_dir()
+    files = sorted(directory.glob("*.folded"), key=lambda p: p.stat().st_mtime, reverse=True)
+    result = []
+    for path in files:
+        with path.open(encoding="utf-8") as f:
+            header = f.readline()[2:].strip()
+        result.append({"id": path.stem, "request": header, "created": path.stat().st_mtime})
+    return result
+
+
+def load_profile(profile_id: str):
+    if not PROFILE_ID_RE.match(profile_id):
+        return None
+    path = _profile_dir() / f"{profile_id}.folded"
+    return path.read_text(encoding="utf-8") if path.exists() else None
+
+
+# ============== Middleware ==============
+def _requested_mode(scope):
+    for name, value in scope["headers"]:
+        if name == b"x-profile":
+            return value.decode("latin-1").strip().lower() or None
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    return query.get("profile", [None])[0]
+
+
+def _bearer_token(scope):
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer":
+                return token
+    return None
+
+
+class ProfilingMiddleware:
+    """Profiliert einzelne Requests von Admins; alle anderen laufen unverändert durch."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        mode = _requested_mode(scope) if scope["type"] == "http" else None
+        if mode not in ("1", "store", "return") or not await self._is_admin(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = uuid.uuid4().hex
+        description = f"{scope['method']} {scope['path']}"
+        sampler = Sampler(config.PROFILER_REQUEST_INTERVAL, keep=self._request_threads(scope))
+        status = {"code": 500}
+
+        if mode == "return":
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    status["code"] = message["status"]
+        else:
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    status["code"] = message["status"]
+                    message = dict(message)
+                    message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile_id.encode())]
+                await send(message)
+
+        sampler.start()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # join() wartet bis zu einem Intervall – nicht im Event-Loop
+            await run_in_threadpool(sampler.stop)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            header = f"{description} -> {status['code']} in {elapsed_ms:.1f} ms, {sampler.samples} samples"
+            folded = sampler.folded()
+            if mode != "return":
+                await run_in_threadpool(store_profile, profile_id, header, folded)
+
+        if mode == "return":
+            body = f"# {header}\n{folded}".encode("utf-8")
+            await send({"type": "http.response.start", "status": 200, "headers": [
+                (b"content-type", b"text/plain; charset=utf-8"),
+                (b"content-length", str(len(body)).encode()),
+            ]})
+            await send({"type": "http.response.body", "body": body})
+
+    @staticmethod
+    def _request_threads(scope):
+        """
+        Nur Threads dieses Requests: der Event-Loop (async-Endpoints, Middleware)
+        und Threadpool-Threads, deren Stack den Endpoint enthält (sync-Endpoints).
+        Den Endpoint trägt der Router erst nach dem Routing in scope ein.
+        """
+        loop_thread = threading.get_ident()
+
+        def keep(thread_id, frame):
+            if thread_id == loop_thread:
+                return True
+            code = getattr(scope.get("endpoint"), "__code__", None)
+            return code is not None and _runs(frame, code)
+        return keep
+
+    @staticmethod
+    async def _is_admin(scope) -> bool:
+        token = _bearer_token(scope)
+        if not token:
+            return False
+        try:
+            auth.admin_required(token)  # nur Token + Sperrliste, kein DB-Zugriff
+        except HTTPException:
+            return False
+        return True
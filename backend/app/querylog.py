@@ -0,0 +1,163 @@
+"""
+Opt-in SQL-Instrumentierung (SQL_INSTRUMENTATION=1).
+
+Hängt sich an die SQLAlchemy-Engine-Events und
+- sammelt alle Statements eines Requests,
+- meldet identische Statements, die mehrfach pro Request laufen (wahrscheinlich N+1),
+- loggt langsame Statements zusammen mit dem Query-Plan (SQLite/PostgreSQL),
+- prüft optional ein Query-Budget pro Route.
+
+In Tests kann budget() direkt genutzt werden, auch ohne SQL_INSTRUMENTATION.
+"""
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+from app import config
+
+logger = logging.getLogger("vocademy.sql")
+
+_installed = set()           # id(engine) der instrumentierten Engines
+_collectors_lock = threading.Lock()
+_global_collectors = []      # aktive budget()-Blöcke, sehen Statements aller Threads
+_request_log: ContextVar = ContextVar("sql_request_log", default=None)
+
+EXPLAIN_PREFIX = {"sqlite": "EXPLAIN QUERY PLAN ", "postgresql": "EXPLAIN "}
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Eine Route oder ein budget()-Block hat mehr Statements ausgeführt als erlaubt."""
+
+
+class StatementLog:
+    def __init__(self):
+        self.statements = []
+
+    def add(self, statement):
+        self.statements.append(statement)
+
+    def __len__(self):
+        return len(self.statements)
+
+    def repeated(self, threshold):
+        """Statements, die mindestens `threshold`-mal identisch liefen."""
+        return [(s, n) for s, n in Counter(self.statements).most_common() if n >= threshold]
+
+    def summary(self, limit=10):
+        lines = [f"{n}x {s}" for s, n in Counter(self.statements).most_common(limit)]
+        return "\n".join(lines)
+
+
+# ============== Engine Hooks ==============
+def install(engine):
+    """Registriert die Event-Listener einmalig pro Engine."""
+    if id(engine) in _installed:
+        return
+    _installed.add(id(engine))
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+        log = _request_log.get()
+        if log is not None:
+            log.add(statement)
+        if _global_collectors:
+            with _collectors_lock:
+                for collector in _global_collectors:
+                    collector.add(statement)
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed_ms = (time.perf_counter() - conn.info["query_start"].pop()) * 1000
+        if elapsed_ms >= config.SQL_SLOW_QUERY_MS:
+            plan = "" if executemany else _explain(conn, statement, parameters)
+            logger.warning("Langsames SQL (%.1f ms): %s%s", elapsed_ms, statement, plan)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        starts = context.connection.info.get("query_start") if context.connection is not None else None
+        if starts:
+            starts.pop()
+
+
+def _explain(conn, statement, parameters):
+    """EXPLAIN (QUERY PLAN) über den rohen DBAPI-Cursor (löst keine Events erneut aus)."""
+    prefix = EXPLAIN_PREFIX.get(conn.dialect.name)
+    if prefix is None or not statement.lstrip().upper().startswith("SELECT"):
+        return ""
+    try:
+        cursor = conn.connection.dbapi_connection.cursor()
+        try:
+            cursor.execute(prefix + statement, parameters or ())
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+    except Exception as exc:  # Plan ist nur Zusatzinfo
+        return f"\n  (EXPLAIN fehlgeschlagen: {exc})"
+    return "".join(f"\n  {row[-1]}" for row in rows)
+
+
+# ============== Budget (Tests) ==============
+@contextmanager
+def budget(max_statements: int, engine=None):
+    """
+    Schlägt fehl, wenn im Block mehr als `max_statements` SQL-Statements laufen.
+
+        with querylog.budget(3):
+            client.get("/api/vocablist/1", headers=...)
+    """
+    if engine is None:
+        from app.database import engine
+    install(engine)
+    log = StatementLog()
+    with _collectors_lock:
+        _global_collectors.append(log)
+    try:
+        yield log
+    finally:
+        with _collectors_lock:
+            _global_collectors.remove(log)
+    if len(log) > max_statements:
+        raise QueryBudgetExceeded(
+            f"{len(log)} SQL-Statements ausgeführt, erlaubt sind {max_statements}:\n{log.summary()}"
+        )
+
+
+# ============== Middleware ==============
+class QueryLogMiddleware:
+    """Sammelt Statements pro Request und meldet N+1-Muster mit der auslösenden Route."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        log = StatementLog()
+        token = _request_log.set(log)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_log.reset(token)
+        self.report(scope, log)
+
+    @staticmethod
+    def report(scope, log):
+        route = scope.get("route")
+        where = f"{scope['method']} {route.path if route is not None else scope['path']}"
+
+        for statement, count in log.repeated(config.SQL_N_PLUS_ONE_THRESHOLD):
+            logger.warning("Wahrscheinliches N+1 in %s: %dx %s", where, count, statement)
+
+        if config.SQL_QUERY_BUDGET and len(log) > config.SQL_QUERY_BUDGET:
+            message = f"{where} hat {len(log)} SQL-Statements ausgeführt (Budget {config.SQL_QUERY_BUDGET})"
+            if config.SQL_QUERY_BUDGET_STRICT:
+                raise QueryBudgetExceeded(f"{message}:\n{log.summary()}")
+            logger.warning(message)
@@ -0,0 +1,162 @@
+"""
+Token-Bucket-Rate-Limiting (Login und andere teure Endpoints).
+
+Jede Regel hat einen Bucket pro Schlüssel (IP, Benutzername, "global"):
+`capacity` Versuche am Stück, danach kommt alle `per / capacity` Sekunden
+ein Token dazu. Ist der Bucket leer, wird mit 429 + Retry-After
+abgelehnt, bevor irgendeine teure Arbeit (pbkdf2) passiert.
+
+Backends:
+- MemoryBackend: pro Prozess, Standard.
+- SqliteBackend: gemeinsame SQLite-Datei, damit mehrere uvicorn-Worker
+  dieselben Buckets sehen.
+Eigene Backends (z.B. Redis) brauchen nur take(key, capacity, rate).
+
+Hinter cloudflared liefert uvicorn (--proxy-headers, Standard) die echte
+Client-IP in request.client.host.
+"""
+import math
+import sqlite3
+import threading
+import time
+
+from fastapi import HTTPException
+
+from app import config
+from app.metrics import registry
+
+registry.describe("rate_limit_rejected_total", "counter", "Wegen Rate-Limit abgelehnte Requests")
+
+
+def parse_rate(value: str):
+    """"10/60" -> (capacity=10, rate=10/60 Tokens pro Sekunde); leer -> None."""
+    if not value:
+        return None
+    count, _, seconds = value.partition("/")
+    capacity = float(count)
+    return capacity, capacity / float(seconds or 1)
+
+
+def _refill(tokens, updated, now, capacity, rate):
+    return min(capacity, tokens + (now - updated) * rate)
+
+
+def _take(tokens, capacity, rate):
+    """(neuer Stand, Wartezeit); Wartezeit 0 = erlaubt."""
+    if tokens >= 1:
+        return tokens - 1, 0.0
+    return tokens, (1 - tokens) / rate
+
+
+# ============== Backends ==============
+class MemoryBackend:
+    def __init__(self, max_keys: int = 100_000, clock=time.monotonic):
+        self.max_keys = max_keys
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._buckets = {}  # key -> [tokens, updated, capacity, rate]
+
+    def take(self, key, capacity, rate) -> float:
+        now = self.clock()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            tokens = capacity if bucket is None else _refill(bucket[0], bucket[1], now, capacity, rate)
+            tokens, wait = _take(tokens, capacity, rate)
+            self._buckets[key] = [tokens, now, capacity, rate]
+            if len(self._buckets) > self.max_keys:
+                self._prune(now)
+            return wait
+
+    def _prune(self, now):
+        """Volle Buckets verhalten sich wie nicht vorhandene und können weg."""
+        full = [key for key, (tokens, updated, capacity, rate) in self._buckets.items()
+                if _refill(tokens, updated, now, capacity, rate) >= capacity]
+        for key in full:
+            del self._buckets[key]
+
+    def reset(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class SqliteBackend:
+    """Buckets in einer SQLite-Datei; BEGIN IMMEDIATE macht take() atomar über Prozesse hinweg."""
+
+    def __init__(self, path: str, clock=time.time):
+        self.path = path
+        self.clock = clock
+        self._local = threading.local()
+        self._calls = 0
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+            )
+            self._local.conn = conn
+        return conn
+
+    def take(self, key, capacity, rate) -> float:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = self.clock()
+            row = conn.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+            tokens = capacity if row is None else _refill(row[0], row[1], now, capacity, rate)
+            tokens, wait = _take(tokens, capacity, rate)
+            conn.execute(
+                "INSERT INTO buckets (key, tokens, updated) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated",
+                (key, tokens, now)
+            )
+            self._calls += 1
+            if self._calls % 1000 == 0:
+                # Seit einer Stunde unbenutzte Buckets sind längst wieder voll
+                conn.execute("DELETE FROM buckets WHERE updated < ?", (now - 3600,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return wait
+
+    def reset(self):
+        self._conn().execute("DELETE FROM buckets")
+
+
+def make_backend(name: str = None):
+    name = name or config.RATE_LIMIT_BACKEND
+    if name == "memory":
+        return MemoryBackend()
+    if name == "sqlite":
+        return SqliteBackend(config.RATE_LIMIT_SQLITE_PATH)
+    raise ValueError(f"Unbekanntes RATE_LIMIT_BACKEND '{name}' (memory|sqlite)")
+
+
+backend = make_backend()
+
+
+# ============== Prüfung ==============
+def check(rule: str, key: str, rate: str):
+    """Nimmt ein Token aus dem Bucket `rule:key` oder wirft 429 mit Retry-After."""
+    parsed = parse_rate(rate)
+    if not config.RATE_LIMIT_ENABLED or parsed is None:
+        return
+    capacity, per_second = parsed
+    wait = backend.take(f"{rule}:{key}", capacity, per_second)
+    if wait > 0:
+        registry.inc("rate_limit_rejected_total", (("rule", rule),))
+        raise HTTPException(
+            status_code=429,
+            detail="Zu viele Anmeldeversuche, bitte später erneut versuchen",
+            headers={"Retry-After": str(math.ceil(wait))}
+        )
+
+
+def check_login(client_ip: str, username: str):
+    """Reihenfolge: IP, Benutzername, global – billig abgelehnte Versuche verbrauchen kein globales Token."""
+    check("login_ip", client_ip or "unknown", config.LOGIN_RATE_PER_IP)
+    check("login_username", (username or "").strip().lower(), config.LOGIN_RATE_PER_USERNAME)
+    check("login_global", "all", config.LOGIN_RATE_GLOBAL)
@@ -0,0 +1,142 @@
+"""
+Sperrliste für Access-Tokens.
+
+Access-Tokens werden pro Request nur noch kryptographisch geprüft (Signatur,
+Ablauf, Claims) – ohne Datenbankzugriff. Damit Deaktivieren, Rollenwechsel,
+Passwortänderung oder Löschen trotzdem greifen, steht pro Benutzer ein
+Zeitpunkt in token_revocations (Haupt-DB): alle vorher ausgestellten Tokens
+dieses Benutzers sind ungültig.
+
+Jeder Prozess hält die Tabelle als dict im Speicher (die Prüfung ist ein
+Lookup) und gleicht sie alle REVOCATION_SYNC_SECONDS in einem
+Hintergrund-Thread ab. Der eigene Prozess sieht eine Sperre sofort, andere
+Worker über den Bus (bus.py) nach BUS_POLL_SECONDS, spätestens beim
+nächsten Abgleich. Einträge, die älter als ein Access-Token
+werden können, braucht niemand mehr; sie fliegen beim Abgleich raus.
+"""
+import logging
+import threading
+import time
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import SQLAlchemyError
+
+from app import bus, config, database, metrics, models
+
+logger = logging.getLogger(__name__)
+
+metrics.registry.describe("token_revocations", "gauge", "Gesperrte Benutzer in der Sperrliste dieses Prozesses")
+
+
+def subject(user_id: int, tenant: str = None) -> str:
+    """Schlüssel eines Benutzers – IDs sind nur pro Shard eindeutig, daher mit Mandant."""
+    return f"{tenant or ''}:{user_id}"
+
+
+class RevocationList:
+    def __init__(self, max_age: float = None, sync_seconds: float = None):
+        self.max_age = config.ACCESS_TOKEN_EXPIRE_MINUTES * 60 if max_age is None else max_age
+        self.sync_seconds = config.REVOCATION_SYNC_SECONDS if sync_seconds is None else sync_seconds
+        self._lock = threading.Lock()
+        self._revoked = {}  # subject -> revoked_before (Unix-Zeit)
+        self._thread = None
+        self._stop = threading.Event()
+
+    def is_revoked(self, subject: str, issued_at: float) -> bool:
+        """Pro Request: nur ein dict-Lookup. Tokens ohne iat gelten als uralt."""
+        if self._thread is None:
+            self.start()
+        revoked_before = self._revoked.get(subject)
+        return revoked_before is not None and (issued_at or 0) <= revoked_before
+
+    def revoke(self, subjects, when: float = None):
+        when = time.time() if when is None else when
+        with database.SessionLocal() as db:
+            for key in subjects:
+                db.merge(models.TokenRevocation(subject=key, revoked_before=when))
+            db.commit()
+        self._remember((key, when) for key in subjects)
+        # Andere Worker sofort, nicht erst beim nächsten Abgleich
+        bus.bus.publish("revocation", rows=[[key, when] for key in subjects])
+
+    def _remember(self, rows):
+        with self._lock:
+            for key, revoked_before in rows:
+                if revoked_before > self._revoked.get(key, 0):
+                    self._revoked[key] = revoked_before
+
+    def sync(self):
+        """Übernimmt Sperren anderer Prozesse und vergisst abgelaufene."""
+        cutoff = time.time() - self.max_age
+        table = models.TokenRevocation
+        with database.SessionLocal() as db:
+            rows = db.execute(select(table.subject, table.revoked_before)).all()
+            if any(revoked_before < cutoff for _, revoked_before in rows):
+                db.execute(delete(table).where(table.revoked_before < cutoff))
+                db.commit()
+        self._remember(row for row in rows if row[1] >= cutoff)
+        with self._lock:
+            for key in [key for key, revoked_before in self._revoked.items() if revoked_before < cutoff]:
+                del self._revoked[key]
+            metrics.registry.set_gauge("token_revocations", len(self._revoked))
+
+    # ============== Hintergrund-Abgleich ==============
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="token-revocations", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout=5)
+
+    def _run(self):
+        while True:
+            try:
+                self.sync()
+            except SQLAlchemyError:
+                # Mit dem bisherigen Stand weiterprüfen, beim nächsten Durchlauf erneut versuchen
+                logger.warning("Abgleich der Token-Sperrliste fehlgeschlagen", exc_info=True)
+            if self._stop.wait(self.sync_seconds):
+                return
+
+
+revocations = RevocationList()
+
+
+@bus.listener("revocation")
+def _from_other_worker(rows):
+    revocations._remember(rows)
+
+
+def revoke_users(user_ids, tenant: str = None, refresh_tokens: bool = True):
+    """
+    Sperrt alle bisher ausgestellten Access-Tokens der Benutzer.
+
+    refresh_tokens=False (Rollen-/Namenswechsel): der Client holt sich per
+    Refresh sofort ein Token mit den neuen Claims. Sonst (Deaktivieren,
+    Löschen, Passwortwechsel, Mandant verschoben) sind auch alle
+    Refresh-Tokens weg und es muss neu eingeloggt werden.
+    """
+    user_ids = list(user_ids)
+    now = time.time()
+    if refresh_tokens and user_ids:
+        tokens = models.RefreshToken
+        owner = tokens.tenant.is_(None) if tenant is None else tokens.tenant == tenant
+        with database.SessionLocal() as db:
+            db.execute(
+                update(tokens)
+                .where(tokens.user_id.in_(user_ids), owner, tokens.revoked_at.is_(None))
+                .values(revoked_at=now)
+            )
+            db.commit()
+    revocations.revoke([subject(user_id, tenant) for user_id in user_ids], now)
+
+
+def revoke(user: models.User, refresh_tokens: bool = True):
+    revoke_users([user.id], user.tenant if config.TENANT_SHARDING else None, refresh_tokens)
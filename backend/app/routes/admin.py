@@ -0,0 +1,82 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from app import jobs, models, profiling
+from app.auth import admin_required
+from app.routes.jobs import accepted, job_tenant
+
+router = APIRouter()
+
+
+# ============== Profiling ==============
+@router.get("/admin/profiles")
+def list_profiles(current_user: models.User = Depends(admin_required)):
+    """Gespeicherte Request-Profile (neueste zuerst)."""
+    return profiling.list_profiles()
+
+
+@router.get("/admin/profiles/{profile_id}", response_class=PlainTextResponse)
+def get_profile(profile_id: str, current_user: models.User = Depends(admin_required)):
+    """Ein Profil im folded-stacks-Format (für flamegraph.pl / speedscope)."""
+    folded = profiling.load_profile(profile_id)
+    if folded is None:
+        raise HTTPException(status_code=404, detail="Profil nicht gefunden")
+    return folded
+
+
+@router.get("/admin/profiler")
+def profiler_status(current_user: models.User = Depends(admin_required)):
+    sampler = profiling.background()
+    if sampler is None:
+        return {"running": False}
+    return {
+        "running": sampler.running,
+        "interval": sampler.interval,
+        "samples": sampler.samples,
+        "started_at": sampler.started_at,
+    }
+
+
+@router.get("/admin/profiler/folded", response_class=PlainTextResponse)
+def profiler_folded(current_user: models.User = Depends(admin_required)):
+    """Bisher gesammelte Stacks des Dauer-Samplers."""
+    sampler = profiling.background()
+    return sampler.folded() if sampler else ""
+
+
+@router.post("/admin/profiler/start")
+def profiler_start(interval: float = None, current_user: models.User = Depends(admin_required)):
+    if interval is not None and not 0.001 <= interval <= 10:
+        raise HTTPException(status_code=400, detail="Intervall muss zwischen 0.001 und 10 Sekunden liegen")
+    sampler = profiling.start_background(interval)
+    return {"running": sampler.running, "interval": sampler.interval}
+
+
+@router.post("/admin/profiler/stop")
+def profiler_stop(current_user: models.User = Depends(admin_required)):
+    sampler = profiling.stop_background()
+    return {"running": False, "samples": sampler.samples if sampler else 0}
+
+
+@router.delete("/admin/profiler")
+def profiler_reset(current_user: models.User = Depends(admin_required)):
+    sampler = profiling.background()
+    if sampler:
+        sampler.reset()
+    return {"message": "Profiler zurückgesetzt"}
+
+
+# ============== Jobs ==============
+@router.post("/admin/jobs/backfill-entry-terms", status_code=202)
+def backfill_entry_terms(
+    recompute: bool = Query(False, alias="all"), current_user: models.User = Depends(admin_required)
+):
+    """Normalisierte Begriffe im Hintergrund neu berechnen (wie manage backfill-entry-terms)."""
+    return accepted(jobs.queue.enqueue(
+        "backfill_entry_terms", {"all": recompute}, current_user.id, job_tenant(current_user)
+    ))
+
+
+@router.post("/admin/jobs/reconcile-stats", status_code=202)
+def reconcile_stats(current_user: models.User = Depends(admin_required)):
+    """Alle Zähler (stats.py) nachzählen und Abweichungen korrigieren."""
+    return accepted(jobs.queue.enqueue("reconcile_stats", {}, current_user.id, job_tenant(current_user)))
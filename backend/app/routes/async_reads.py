@@ -0,0 +1,99 @@
+from fastapi import APIRouter, Depends, HTTPException, Response
+from app import schemas, crud_async, database, events, models, singleflight
+from app.auth import get_current_user_async
+
+# Async-Varianten der heißen Lese-Routen (ASYNC_DB=1).
+# Werden in main.py vor den sync-Routern eingebunden und haben daher Vorrang.
+router = APIRouter()
+
+list_reads = singleflight.SingleFlight("vocablist")
+entry_reads = singleflight.SingleFlight("entries")
+
+
+async def _check_list_owner(db, list_id: int, user: models.User):
+    owner_id = await crud_async.get_vocab_list_owner(db, list_id)
+    if owner_id is None:
+        raise HTTPException(status_code=404, detail="Vokabelliste nicht gefunden")
+    if owner_id != user.id:
+        raise HTTPException(status_code=403, detail="Keine Berechtigung für diese Liste")
+
+
+def _json_or_404(body) -> Response:
+    """Antwort eines gemeinsamen Ladevorgangs; None heißt: Liste inzwischen gelöscht."""
+    if body is None:
+        raise HTTPException(status_code=404, detail="Vokabelliste nicht gefunden")
+    return Response(body, media_type="application/json")
+
+
+@router.get("/me/", response_model=schemas.User)
+async def get_me(
+    db=Depends(database.get_async_db),
+    current_user: models.User = Depends(get_current_user_async)
+):
+    return await crud_async.get_user_by_username(db, current_user.username, with_lists=True)
+
+
+@router.get("/vocablist/", response_model=list[schemas.VocabList])
+async def get_all_vocablists(
+    db=Depends(database.get_async_db),
+    user: models.User = Depends(get_current_user_async)
+):
+    """Gibt alle Vokabellisten des aktuellen Users zurück"""
+    return await crud_async.get_vocab_list_by_user(db, user.id)
+
+
+@router.get("/vocablist/{vocab_id}", response_model=schemas.VocabList)
+async def get_vocablist(
+    vocab_id: int,
+    db=Depends(database.get_async_db),
+    user: models.User = Depends(get_current_user_async)
+):
+    """Gibt eine spezifische Vokabelliste zurück"""
+    await _check_list_owner(db, vocab_id, user)
+
+    async def load():
+        # Eigene Session: der Task lädt weiter, auch wenn dieser Request vorher endet
+        async with database.AsyncSessionLocal() as session:
+            vocab_list = await crud_async.get_vocab_list(session, vocab_id)
+            # None: nach dem Berechtigungscheck gelöscht
+            return None if vocab_list is None else singleflight.dump_json(schemas.VocabList, vocab_list)
+
+    key = events.main_channel(vocab_id)
+    return _json_or_404(await list_reads.do_async((*key, events.version(key)), load))
+
+
+@router.get("/vocab/entries/list/{list_id}", response_model=list[schemas.VocabEntry])
+async def get_entries_by_list(
+    list_id: int,
+    db=Depends(database.get_async_db),
+    user: models.User = Depends(get_current_user_async)
+):
+    """Gibt alle Einträge einer Liste zurück"""
+    await _check_list_owner(db, list_id, user)
+
+    async def load():
+        async with database.AsyncSessionLocal() as session:
+            entries = await crud_async.get_vocab_list_entries(session, list_id)
+            if not entries and await crud_async.get_vocab_list_owner(session, list_id) is None:
+                return None
+            return singleflight.dump_json(list[schemas.VocabEntry], entries)
+
+    key = events.main_channel(list_id)
+    return _json_or_404(await entry_reads.do_async((*key, events.version(key)), load))
+
+
+@router.get("/vocab/entries/{entry_id}", response_model=schemas.VocabEntry)
+async def get_entry(
+    entry_id: int,
+    db=Depends(database.get_async_db),
+    user: models.User = Depends(get_current_user_async)
+):
+    """Gibt einen spezifischen Eintrag zurück"""
+    entry = await crud_async.get_vocab_entry(db, entry_id)
+    if not entry:
+        raise HTTPException(status_code=404, detail="Eintrag nicht gefunden")
+
+    if entry.vocab_list.user_id != user.id:
+        raise HTTPException(status_code=403, detail="Keine Berechtigung für diesen Eintrag")
+
+    return entry
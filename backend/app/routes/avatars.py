@@ -0,0 +1,59 @@
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
+from fastapi.responses import FileResponse
+from sqlalchemy.orm import Session
+from app import avatars, config, database, models, schemas
+from app.auth import get_current_user_from_token
+
+router = APIRouter()
+
+get_db = database.get_db
+
+# Dateinamen enthalten den Inhalts-Hash, ändern sich also nie
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+# ============== Upload ==============
+@router.post("/user/me/avatar", response_model=schemas.User)
+def upload_avatar(
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user_from_token)
+):
+    """Lädt ein Profilbild hoch (PNG/JPEG/WebP/GIF, max. AVATAR_MAX_BYTES)."""
+    data = file.file.read(config.AVATAR_MAX_BYTES + 1)
+    if len(data) > config.AVATAR_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"Bild zu groß (max. {config.AVATAR_MAX_BYTES // 1024} KB)")
+    try:
+        current_user.avatar_hash = avatars.save_avatar(data)
+    except avatars.AvatarError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    db.commit()
+    db.refresh(current_user)
+    return current_user
+
+
+@router.delete("/user/me/avatar", response_model=schemas.User)
+def delete_avatar(
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user_from_token)
+):
+    """Entfernt das Profilbild (die Datei bleibt, andere Benutzer können dasselbe Bild nutzen)."""
+    current_user.avatar_hash = None
+    db.commit()
+    db.refresh(current_user)
+    return current_user
+
+
+# ============== Auslieferung ==============
+@router.get("/avatars/{key}-{size}.webp")
+def get_avatar(key: str, size: int):
+    """Thumbnail ohne Auth (für <img>), per Hash adressiert und unbegrenzt cachebar."""
+    if size not in config.AVATAR_SIZES:
+        raise HTTPException(status_code=404, detail="Unbekannte Größe")
+    try:
+        path = avatars.store().path(key, avatars.thumbnail_suffix(size))
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Avatar nicht gefunden")
+    if not path.exists():
+        raise HTTPException(status_code=404, detail="Avatar nicht gefunden")
+    return FileResponse(path, media_type="image/webp", headers={"Cache-Control": IMMUTABLE})
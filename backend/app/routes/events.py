@@ -0,0 +1,55 @@
+import time
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app import config, database, events, models, revocation
+from app.auth import TokenUser, decode_access_token, get_token_user, is_revoked, oauth2_scheme
+
+router = APIRouter()
+
+get_db = database.get_db
+
+
+def _list_owner(db: Session, vocab_id: int):
+    try:
+        return db.query(models.VocabList.user_id).filter(models.VocabList.id == vocab_id).scalar()
+    finally:
+        # Die Verbindung nicht für die ganze Dauer des Streams belegen
+        db.close()
+
+
+# ============== Live-Änderungen ==============
+@router.get("/vocablist/{vocab_id}/events")
+async def list_events(
+    vocab_id: int,
+    db: Session = Depends(get_db),
+    user: TokenUser = Depends(get_token_user),
+    token: str = Depends(oauth2_scheme),
+    last_event_id: str = Header(None),
+):
+    """
+    Server-Sent Events mit den Änderungen einer Liste (siehe events.py).
+    Der Stream endet mit dem Token (Ablauf oder Sperre) bzw. nach EVENTS_MAX_STREAM_SECONDS;
+    der Client verbindet sich mit Last-Event-ID neu.
+    """
+    key = events.channel(db, vocab_id)
+    owner = await run_in_threadpool(_list_owner, db, vocab_id)
+    if owner is None:
+        raise HTTPException(status_code=404, detail="Vokabelliste nicht gefunden")
+    if owner != user.id and user.role != "Admin":
+        raise HTTPException(status_code=403, detail="Keine Berechtigung für diese Liste")
+
+    claims = decode_access_token(token)
+    expires_at = min(claims.get("exp", float("inf")), time.time() + config.EVENTS_MAX_STREAM_SECONDS)
+    subscription, missed = events.hub.subscribe(
+        key, revocation.subject(user.id, claims.get("tenant")), last_event_id
+    )
+    return StreamingResponse(
+        # Gesperrte Tokens (Abmelden, Deaktivieren) beenden auch offene Streams
+        events.stream(subscription, missed, expires_at, authorized=lambda: not is_revoked(claims, user.id)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,62 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import JSONResponse
+from app import config, jobs, models, schemas
+from app.auth import TokenUser, get_token_user
+
+router = APIRouter()
+
+
+def job_tenant(user: TokenUser) -> str:
+    """Mandant des Auftraggebers – nur mit Sharding, sonst liegt alles in der Haupt-DB."""
+    return user.tenant if config.TENANT_SHARDING else None
+
+
+def accepted(job: models.Job) -> JSONResponse:
+    """202 mit dem eingereihten Job, Location zeigt auf die Status-Route."""
+    return JSONResponse(
+        status_code=202,
+        content=schemas.Job.model_validate(job).model_dump(),
+        headers={"Location": f"/api/jobs/{job.id}"}
+    )
+
+
+def _own_job(job_id: int, user: TokenUser) -> models.Job:
+    job = jobs.queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job nicht gefunden")
+    if user.role != "Admin" and (job.user_id, job.tenant) != (user.id, job_tenant(user)):
+        raise HTTPException(status_code=403, detail="Keine Berechtigung für diesen Job")
+    return job
+
+
+# ============== Jobs ==============
+@router.get("/jobs/", response_model=list[schemas.Job])
+def list_jobs(user: TokenUser = Depends(get_token_user)):
+    """Die letzten Jobs des Benutzers (neueste zuerst)."""
+    return jobs.queue.list_jobs(user.id, job_tenant(user))
+
+
+@router.get("/jobs/{job_id}", response_model=schemas.Job)
+def get_job(job_id: int, user: TokenUser = Depends(get_token_user)):
+    """Status und Fortschritt (progress/total); result ist gesetzt, sobald status "succeeded" ist."""
+    return _own_job(job_id, user)
+
+
+@router.post("/jobs/{job_id}/cancel", response_model=schemas.Job)
+def cancel_job(job_id: int, user: TokenUser = Depends(get_token_user)):
+    """Bricht einen wartenden Job sofort ab, einen laufenden nach dem aktuellen Block."""
+    job = _own_job(job_id, user)
+    if job.status == "running" and not jobs.cancellable(job.kind):
+        raise HTTPException(status_code=409, detail="Dieser Job kann nicht mehr abgebrochen werden")
+    if job.status not in jobs.ACTIVE:
+        raise HTTPException(status_code=409, detail="Job ist bereits beendet")
+    return jobs.queue.cancel(job_id)
+
+
+@router.post("/jobs/{job_id}/retry", response_model=schemas.Job, status_code=202)
+def retry_job(job_id: int, user: TokenUser = Depends(get_token_user)):
+    """Startet einen fehlgeschlagenen oder abgebrochenen Job erneut."""
+    _own_job(job_id, user)
+    if not jobs.queue.retry(job_id):
+        raise HTTPException(status_code=409, detail="Nur fehlgeschlagene oder abgebrochene Jobs können wiederholt werden")
+    return jobs.queue.get(job_id)
@@ -0,0 +1,63 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app import config, database, distractors, jobs, models, schemas
+from app.auth import TokenUser, get_token_user
+from app.routes.jobs import job_tenant
+
+router = APIRouter()
+
+get_db = database.get_db
+
+
+def _schedule_rebuild(list_id: int, user: TokenUser):
+    """Job "rebuild_distractors" einreihen, falls für die Liste nicht schon einer wartet oder läuft."""
+    tenant = job_tenant(user)
+    for job in jobs.queue.list_jobs(user.id, tenant):
+        if job.kind == "rebuild_distractors" and job.status in ("queued", "running") \
+                and job.params.get("vocab_list_id") == list_id:
+            return
+    try:
+        jobs.queue.enqueue("rebuild_distractors", {"vocab_list_id": list_id}, user_id=user.id, tenant=tenant)
+    except HTTPException:
+        pass  # Job-Limit erreicht: das Quiz geht trotzdem, mit zufälligen Ablenkern
+
+
+# ============== Multiple Choice ==============
+@router.get("/vocablist/{vocab_id}/quiz", response_model=schemas.Quiz)
+def get_quiz(
+    vocab_id: int,
+    source_column_id: int,
+    target_column_id: Optional[List[int]] = Query(None),
+    count: int = Query(50, ge=1),
+    choices: int = Query(4, ge=2, le=8),
+    db: Session = Depends(get_db),
+    user: TokenUser = Depends(get_token_user)
+):
+    """
+    Multiple-Choice-Fragen: Wert der Quellspalte, dazu der richtige Wert einer
+    Zielspalte und ähnliche Werte derselben Spalte als Ablenker. Ohne
+    target_column_id werden alle anderen Spalten abgefragt.
+    """
+    owner = db.query(models.VocabList.user_id).filter(models.VocabList.id == vocab_id).scalar()
+    if owner is None:
+        raise HTTPException(status_code=404, detail="Vokabelliste nicht gefunden")
+    if owner != user.id and user.role != "Admin":
+        raise HTTPException(status_code=403, detail="Keine Berechtigung für diese Liste")
+
+    column_ids = set(db.scalars(select(models.ListColumn.id).where(models.ListColumn.vocab_list_id == vocab_id)))
+    targets = target_column_id or sorted(column_ids - {source_column_id})
+    if source_column_id not in column_ids or not set(targets) <= column_ids:
+        raise HTTPException(status_code=400, detail="Spalte gehört nicht zu dieser Liste")
+    if source_column_id in targets:
+        raise HTTPException(status_code=400, detail="Quell- und Zielspalte müssen verschieden sein")
+
+    precomputed = distractors.ensure_ready(db, vocab_id, targets)
+    if not precomputed:
+        _schedule_rebuild(vocab_id, user)
+    questions = distractors.quiz(
+        db, vocab_id, source_column_id, targets, min(count, config.QUIZ_MAX_QUESTIONS), choices
+    )
+    return {"vocab_list_id": vocab_id, "precomputed": precomputed, "questions": questions}
@@ -0,0 +1,35 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from app import database, models, schemas, stats
+from app.auth import TokenUser, admin_required, get_token_user
+
+router = APIRouter()
+
+get_db = database.get_db
+
+
+# ============== Statistik ==============
+@router.get("/stats/me", response_model=schemas.UserStats)
+def my_stats(db: Session = Depends(get_db), user: TokenUser = Depends(get_token_user)):
+    """Listen und Einträge des Benutzers fürs Dashboard (nur die Zähler in users)."""
+    result = stats.user_stats(db, user.id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Benutzer nicht gefunden")
+    return result
+
+
+@router.get("/vocablist/{vocab_id}/stats", response_model=schemas.ListStats)
+def list_stats(vocab_id: int, db: Session = Depends(get_db), user: TokenUser = Depends(get_token_user)):
+    """Einträge und Füllstand pro Spalte, ohne die Einträge zu laden."""
+    owner = db.query(models.VocabList.user_id).filter(models.VocabList.id == vocab_id).scalar()
+    if owner is None:
+        raise HTTPException(status_code=404, detail="Vokabelliste nicht gefunden")
+    if owner != user.id and user.role != "Admin":
+        raise HTTPException(status_code=403, detail="Keine Berechtigung für diese Liste")
+    return stats.list_stats(db, vocab_id)
+
+
+@router.get("/admin/stats/users", response_model=list[schemas.UserOverview])
+def user_overview(db: Session = Depends(get_db), current_user: models.User = Depends(admin_required)):
+    """Listen/Einträge pro Benutzer für die Admin-Seite (eine Zeile pro Benutzer)."""
+    return stats.user_overview(db)
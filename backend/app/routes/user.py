@@ -1,40 +1,58 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
-from app import schemas, crud, database, models
+from app import schemas, crud, database, models, config, ratelimit, revocation, tenancy
 from app.auth import (
-    verify_password, create_access_token,
+    verify_password, create_token_pair, refresh_token_pair, revoke_refresh_token,
     get_current_user_from_token, admin_required
 )
 from pydantic import BaseModel
 
 router = APIRouter()
 
-def get_db():
-    db = database.SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+get_db = database.get_db
 
 
 # ============== Register & Login ==============
 @router.post("/register/", response_model=schemas.User)
 def register_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
+    if user.tenant:
+        return tenancy.register_user(db, user)
+    if config.TENANT_SHARDING and tenancy.username_taken(db, user.username.strip()):
+        raise HTTPException(status_code=400, detail="Benutzername bereits vergeben")
     return crud.create_user(db, user)
 
 
 @router.post("/login/")
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = crud.get_user_by_username(db, form_data.username)
-    if not user or not verify_password(form_data.password, user.password):
-        raise HTTPException(status_code=401, detail="Ungültiger Benutzername oder Passwort")
+def login(request: Request, form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+    # vor jeder pbkdf2-Prüfung, sonst kann ein Login-Burst alle Kerne belegen
+    ratelimit.check_login(request.client.host if request.client else None, form_data.username)
 
-    if not user.is_active:
-        raise HTTPException(status_code=403, detail="Benutzerkonto ist deaktiviert")
+    with tenancy.user_session(db, form_data.username) as user_db:
+        user = crud.get_user_by_username(user_db, form_data.username)
+        if not user or not verify_password(form_data.password, user.password):
+            raise HTTPException(status_code=401, detail="Ungültiger Benutzername oder Passwort")
 
-    access_token = create_access_token(data={"sub": user.username})
-    return {"access_token": access_token, "token_type": "bearer"}
+        if not user.is_active:
+            raise HTTPException(status_code=403, detail="Benutzerkonto ist deaktiviert")
+
+        return create_token_pair(user)
+
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+
+@router.post("/refresh/")
+def refresh(body: RefreshRequest):
+    """Neues Access-/Refresh-Token-Paar; das alte Refresh-Token ist danach verbraucht."""
+    return refresh_token_pair(body.refresh_token)
+
+
+@router.post("/logout/")
+def logout(body: RefreshRequest):
+    revoke_refresh_token(body.refresh_token)
+    return {"message": "Abgemeldet"}
 
 
 # ============== User Management ==============
@@ -64,7 +82,12 @@ def update_user_route(
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user_from_token)
 ):
-    return crud.update_user(db, user_id, updated_data, current_user)
+    old = crud.get_user(db, user_id)
+    old_username = old.username if old else None
+    user = crud.update_user(db, user_id, updated_data, current_user)
+    if config.TENANT_SHARDING and user.tenant:
+        tenancy.rename_member(old_username, user.username)
+    return user
 
 
 # ============== Admin Only ==============
@@ -88,7 +111,12 @@ def delete_user(
     db: Session = Depends(get_db),
     current_user: models.User = Depends(admin_required)
 ):
-    return crud.delete_user(db, user_id, current_user)
+    user = crud.get_user(db, user_id)
+    username = user.username if user else None
+    result = crud.delete_user(db, user_id, current_user)
+    if config.TENANT_SHARDING:
+        tenancy.remove_member(username)
+    return result
 
 
 # ============== Password Change (self only) ==============
@@ -115,4 +143,6 @@ def change_password_me(
     from app.auth import hash_password
     user.password = hash_password(body.new_password)
     db.commit()
-    return {"message": "Password changed"}
+    # Alle anderen Sitzungen beenden, diese mit einem frischen Token-Paar weiterführen
+    revocation.revoke(user)
+    return {"message": "Password changed", **create_token_pair(user)}
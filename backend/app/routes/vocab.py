@@ -1,38 +1,40 @@
-﻿from fastapi import APIRouter, Depends, HTTPException
-from fastapi.security import OAuth2PasswordBearer
+﻿from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
-from app import schemas, crud, database, models
-from app.auth import verify_access_token
+from app import schemas, crud, database, events, models, singleflight
+from app.auth import TokenUser, get_token_user, oauth2_scheme
 
 router = APIRouter()
 
-def get_db():
-    db = database.SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+get_db = database.get_db
 
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/login/")
+entry_reads = singleflight.SingleFlight("entries")
 
 
-def get_current_user(token: str, db: Session) -> models.User:
-    """Helper function to get current user from token"""
-    username = verify_access_token(token)
-    if not username:
-        raise HTTPException(status_code=401, detail="UngÃ¼ltiger Token")
-    
-    user = db.query(models.User).filter(models.User.username == username).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User nicht gefunden")
-    
-    return user
+def get_current_user(token: str, db: Session) -> TokenUser:
+    """Helper function to get current user from token (nur Claims, kein DB-Zugriff)"""
+    return get_token_user(token)
+
+
+def read_entries(db: Session, list_id: int):
+    """
+    Einträge einer Liste als JSON, None wenn sie nach dem Berechtigungscheck
+    gelöscht wurde. Gleichzeitige Aufrufe laden und serialisieren nur einmal.
+    """
+    def load():
+        entries = crud.get_vocab_list_entries(db, list_id)
+        if not entries and crud.get_vocab_list_owner(db, list_id) is None:
+            return None
+        return singleflight.dump_json(list[schemas.VocabEntry], entries)
+
+    key = events.channel(db, list_id)
+    return entry_reads.do((*key, events.version(key)), load)
 
 
 # ============== VOCAB ENTRIES ==============
 @router.post("/vocab/entries", response_model=schemas.VocabEntry)
 def create_entry(
     item: schemas.VocabEntryCreate,
+    reject_duplicates: bool = False,
     db: Session = Depends(get_db),
     token: str = Depends(oauth2_scheme)
 ):
@@ -49,6 +51,9 @@ def create_entry(
             {"column_id": 4, "value": "Wird bei Kopfschmerzen eingesetzt"}
         ]
     }
+
+    Mit ?reject_duplicates=true gibt es 409, wenn der Begriff (Hauptspalte,
+    normalisiert wie im Vokabeltest) schon in der Liste steht.
     """
     user = get_current_user(token, db)
     
@@ -61,7 +66,7 @@ def create_entry(
     if vocab_list.user_id != user.id:
         raise HTTPException(status_code=403, detail="Keine Berechtigung fÃ¼r diese Liste")
 
-    return crud.create_vocab_entry(db, item)
+    return crud.create_vocab_entry(db, item, reject_duplicates=reject_duplicates)
 
 
 @router.get("/vocab/entries/list/{list_id}", response_model=list[schemas.VocabEntry])
@@ -73,15 +78,51 @@ def get_entries_by_list(
     """Gibt alle EintrÃ¤ge einer Liste zurÃ¼ck"""
     user = get_current_user(token, db)
 
-    vocab_list = db.query(models.VocabList).filter(models.VocabList.id == list_id).first()
-    if not vocab_list:
+    owner_id = crud.get_vocab_list_owner(db, list_id)
+    if owner_id is None:
         raise HTTPException(status_code=404, detail="Vokabelliste nicht gefunden")
     
-    if vocab_list.user_id != user.id:
+    if owner_id != user.id:
         raise HTTPException(status_code=403, detail="Keine Berechtigung fÃ¼r diese Liste")
 
-    entries = crud.get_vocab_list_entries(db, list_id)
-    return entries
+    body = read_entries(db, list_id)
+    if body is None:
+        raise HTTPException(status_code=404, detail="Vokabelliste nicht gefunden")
+    return Response(body, media_type="application/json")
+
+
+def _own_list(db: Session, list_id: int, user) -> models.VocabList:
+    vocab_list = db.get(models.VocabList, list_id)
+    if not vocab_list:
+        raise HTTPException(status_code=404, detail="Vokabelliste nicht gefunden")
+    if vocab_list.user_id != user.id:
+        raise HTTPException(status_code=403, detail="Keine Berechtigung für diese Liste")
+    return vocab_list
+
+
+@router.get("/vocab/entries/list/{list_id}/duplicates", response_model=list[schemas.DuplicateGroup])
+def get_duplicate_entries(
+    list_id: int,
+    db: Session = Depends(get_db),
+    token: str = Depends(oauth2_scheme)
+):
+    """Mehrfach vorhandene Begriffe der Liste (über den Index, ohne alle Feldwerte zu lesen)."""
+    user = get_current_user(token, db)
+    _own_list(db, list_id, user)
+    return crud.find_duplicate_entries(db, list_id)
+
+
+@router.get("/vocab/entries/list/{list_id}/lookup", response_model=list[schemas.VocabEntry])
+def lookup_entries(
+    list_id: int,
+    term: str,
+    db: Session = Depends(get_db),
+    token: str = Depends(oauth2_scheme)
+):
+    """Exakte Suche in der Hauptspalte, z.B. ?term=Straße findet auch "strasse"."""
+    user = get_current_user(token, db)
+    _own_list(db, list_id, user)
+    return crud.find_entries_by_term(db, list_id, term)
 
 
 @router.get("/vocab/entries/{entry_id}", response_model=schemas.VocabEntry)
@@ -1,32 +1,21 @@
-﻿from fastapi import APIRouter, Depends, HTTPException
+﻿from typing import Optional
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Response, UploadFile
 from sqlalchemy.orm import Session
-from fastapi.security import OAuth2PasswordBearer
-from app import schemas, crud, database, models
-from app.auth import verify_access_token
+from app import anki, config, schemas, crud, database, events, jobs, models, singleflight
+from app.auth import TokenUser, get_token_user, oauth2_scheme
+from app.routes.jobs import accepted, job_tenant
+from app.routes.vocab import read_entries
 
 router = APIRouter()
 
-def get_db():
-    db = database.SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+get_db = database.get_db
 
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/login/")
+list_reads = singleflight.SingleFlight("vocablist")
 
 
-def get_current_user(token: str, db: Session) -> models.User:
-    """Helper function to get current user from token"""
-    username = verify_access_token(token)
-    if not username:
-        raise HTTPException(status_code=401, detail="UngÃ¼ltiger Token")
-    
-    user = db.query(models.User).filter(models.User.username == username).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User nicht gefunden")
-    
-    return user
+def get_current_user(token: str, db: Session) -> TokenUser:
+    """Helper function to get current user from token (nur Claims, kein DB-Zugriff)"""
+    return get_token_user(token)
 
 
 # ============== VOCAB LISTS ==============
@@ -65,6 +54,19 @@ def get_all_vocablists(
     return crud.get_vocab_list_by_user(db, user.id)
 
 
+def _read_list(db: Session, vocab_id: int):
+    """
+    Liste als JSON, None wenn sie nach dem Berechtigungscheck gelöscht wurde.
+    Gleichzeitige Aufrufe laden und serialisieren nur einmal.
+    """
+    def load():
+        vocab_list = crud.get_vocab_list(db, vocab_id)
+        return None if vocab_list is None else singleflight.dump_json(schemas.VocabList, vocab_list)
+
+    key = events.channel(db, vocab_id)
+    return list_reads.do((*key, events.version(key)), load)
+
+
 @router.get("/vocablist/{vocab_id}", response_model=schemas.VocabList)
 def get_vocablist(
     vocab_id: int,
@@ -74,14 +76,17 @@ def get_vocablist(
     """Gibt eine spezifische Vokabelliste zurÃ¼ck"""
     user = get_current_user(token, db)
     
-    vocab_list = crud.get_vocab_list(db, vocab_id)
-    if not vocab_list:
+    owner_id = crud.get_vocab_list_owner(db, vocab_id)
+    if owner_id is None:
         raise HTTPException(status_code=404, detail="Vokabelliste nicht gefunden")
     
-    if vocab_list.user_id != user.id:
+    if owner_id != user.id:
         raise HTTPException(status_code=403, detail="Keine Berechtigung fÃ¼r diese Liste")
     
-    return vocab_list
+    body = _read_list(db, vocab_id)
+    if body is None:
+        raise HTTPException(status_code=404, detail="Vokabelliste nicht gefunden")
+    return Response(body, media_type="application/json")
 
 
 @router.put("/vocablist/{vocab_id}", response_model=schemas.VocabList)
@@ -108,10 +113,16 @@ def update_vocablist(
 @router.delete("/vocablist/{vocab_id}")
 def delete_vocablist(
     vocab_id: int,
+    background: bool = False,
     db: Session = Depends(get_db),
     token: str = Depends(oauth2_scheme)
 ):
-    """LÃ¶scht eine Vokabelliste"""
+    """
+    LÃ¶scht eine Vokabelliste.
+
+    Mit ?background=true (große Listen) sofort 202 mit einem Job, gelöscht
+    wird blockweise im Hintergrund – Status unter /api/jobs/{id}.
+    """
     user = get_current_user(token, db)
     
     vocab_list = crud.get_vocab_list(db, vocab_id)
@@ -121,6 +132,10 @@ def delete_vocablist(
     if vocab_list.user_id != user.id:
         raise HTTPException(status_code=403, detail="Keine Berechtigung fÃ¼r diese Liste")
     
+    if background:
+        return accepted(jobs.queue.enqueue(
+            "delete_vocab_list", {"vocab_list_id": vocab_id}, user.id, job_tenant(user)
+        ))
     crud.delete_vocab_list(db, vocab_id)
     return {"message": "Vokabelliste wurde gelÃ¶scht"}
 
@@ -171,3 +186,137 @@ def delete_column(
     
     crud.delete_column(db, column_id)
     return {"message": "Spalte wurde gelÃ¶scht"}
+
+
+# ============== KOPIEREN & TEILEN ==============
+def _own_list(db: Session, vocab_id: int, user) -> models.VocabList:
+    vocab_list = db.get(models.VocabList, vocab_id)
+    if not vocab_list:
+        raise HTTPException(status_code=404, detail="Vokabelliste nicht gefunden")
+    if vocab_list.user_id != user.id:
+        raise HTTPException(status_code=403, detail="Keine Berechtigung für diese Liste")
+    return vocab_list
+
+
+def _shared_list(db: Session, share_code: str) -> models.VocabList:
+    vocab_list = crud.get_shared_vocab_list(db, share_code)
+    if not vocab_list:
+        raise HTTPException(status_code=404, detail="Freigegebene Liste nicht gefunden")
+    return vocab_list
+
+
+def _shared_list_id(db: Session, share_code: str) -> int:
+    list_id = crud.get_shared_vocab_list_id(db, share_code)
+    if list_id is None:
+        raise HTTPException(status_code=404, detail="Freigegebene Liste nicht gefunden")
+    return list_id
+
+
+@router.post("/vocablist/{vocab_id}/clone", response_model=schemas.VocabList)
+def clone_vocablist(
+    vocab_id: int,
+    item: Optional[schemas.VocabListClone] = None,
+    db: Session = Depends(get_db),
+    token: str = Depends(oauth2_scheme)
+):
+    """Kopiert eine eigene Liste samt Spalten und Einträgen (serverseitig, in einer Transaktion)."""
+    user = get_current_user(token, db)
+    _own_list(db, vocab_id, user)
+    return crud.clone_vocab_list(db, vocab_id, user.id, item.name if item else None)
+
+
+@router.post("/vocablist/{vocab_id}/share", response_model=schemas.VocabList)
+def share_vocablist(
+    vocab_id: int,
+    db: Session = Depends(get_db),
+    token: str = Depends(oauth2_scheme)
+):
+    """
+    Gibt eine Liste zum Lesen frei. Alle mit dem share_code lesen dieselbe
+    Liste (GET /shared/{code}) – kopiert wird erst, wer sie bearbeiten will.
+    """
+    user = get_current_user(token, db)
+    _own_list(db, vocab_id, user)
+    return crud.share_vocab_list(db, vocab_id)
+
+
+@router.delete("/vocablist/{vocab_id}/share", response_model=schemas.VocabList)
+def unshare_vocablist(
+    vocab_id: int,
+    db: Session = Depends(get_db),
+    token: str = Depends(oauth2_scheme)
+):
+    """Zieht die Freigabe zurück; bereits gezogene Kopien bleiben."""
+    user = get_current_user(token, db)
+    _own_list(db, vocab_id, user)
+    return crud.share_vocab_list(db, vocab_id, enabled=False)
+
+
+@router.get("/shared/{share_code}", response_model=schemas.VocabList)
+def get_shared_vocablist(
+    share_code: str,
+    db: Session = Depends(get_db),
+    token: str = Depends(oauth2_scheme)
+):
+    """Freigegebene Liste, nur lesend (Änderungen prüfen weiterhin den Besitzer)."""
+    get_current_user(token, db)
+    # Gleicher Ladevorgang wie GET /vocablist/{id} (Besitzer und andere Leser teilen ihn)
+    body = _read_list(db, _shared_list_id(db, share_code))
+    if body is None:
+        raise HTTPException(status_code=404, detail="Freigegebene Liste nicht gefunden")
+    return Response(body, media_type="application/json")
+
+
+@router.get("/shared/{share_code}/entries", response_model=list[schemas.VocabEntry])
+def get_shared_entries(
+    share_code: str,
+    db: Session = Depends(get_db),
+    token: str = Depends(oauth2_scheme)
+):
+    get_current_user(token, db)
+    body = read_entries(db, _shared_list_id(db, share_code))
+    if body is None:
+        raise HTTPException(status_code=404, detail="Freigegebene Liste nicht gefunden")
+    return Response(body, media_type="application/json")
+
+
+@router.post("/shared/{share_code}/clone", response_model=schemas.VocabList)
+def clone_shared_vocablist(
+    share_code: str,
+    item: Optional[schemas.VocabListClone] = None,
+    db: Session = Depends(get_db),
+    token: str = Depends(oauth2_scheme)
+):
+    """Eigene, bearbeitbare Kopie einer freigegebenen Liste."""
+    user = get_current_user(token, db)
+    vocab_list = _shared_list(db, share_code)
+    return crud.clone_vocab_list(db, vocab_list.id, user.id, item.name if item else None)
+
+
+# ============== IMPORT ==============
+@router.post("/vocablist/import/anki", response_model=schemas.AnkiImportResult)
+def import_anki_deck(
+    file: UploadFile = File(...),
+    name: Optional[str] = Form(None),
+    background: bool = False,
+    db: Session = Depends(get_db),
+    token: str = Depends(oauth2_scheme)
+):
+    """
+    Legt aus einem Anki-Deck (.apkg) eine neue Liste an (Name: Formularfeld oder Deckname).
+
+    Mit ?background=true sofort 202 mit einem Job (import_anki), das
+    Ergebnis steht dann in dessen result.
+    """
+    user = get_current_user(token, db)
+    if file.size is not None and file.size > config.ANKI_MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail=f"Datei zu groß (max. {config.ANKI_MAX_UPLOAD_BYTES // (1024 * 1024)} MB)")
+    if background:
+        upload = jobs.save_upload(file.file, config.ANKI_MAX_UPLOAD_BYTES, ".apkg")
+        return accepted(jobs.queue.enqueue(
+            "import_anki", {"upload": upload, "name": name}, user.id, job_tenant(user)
+        ))
+    try:
+        return anki.import_deck(db, file.file, user.id, name)
+    except anki.AnkiImportError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
@@ -1,5 +1,6 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field, computed_field, model_validator
 from typing import List, Optional, Dict
+from app import avatars, config
 
 # ============== LIST COLUMNS ==============
 class ListColumnBase(BaseModel):
@@ -15,6 +16,7 @@ class ListColumn(ListColumnBase):
     id: int
     vocab_list_id: int
     position: int
+    filled_count: Optional[int] = None
 
     model_config = {"from_attributes": True}
 
@@ -29,7 +31,7 @@ class EntryFieldValueCreate(EntryFieldValueBase):
     pass
 
 class EntryFieldValue(EntryFieldValueBase):
-    id: int
+    id: Optional[int] = None  # None, wenn aus dem JSON-Dokument gelesen
     entry_id: int
 
     model_config = {"from_attributes": True}
@@ -44,6 +46,10 @@ class VocabEntryCreate(VocabEntryBase):
     vocab_list_id: int
     field_values: List[EntryFieldValueCreate]
 
+class DuplicateGroup(BaseModel):
+    normalized_term: str
+    entry_ids: List[int]
+
 class VocabEntryUpdate(BaseModel):
     field_values: Optional[List[EntryFieldValueCreate]] = None
 
@@ -55,6 +61,23 @@ class VocabEntry(VocabEntryBase):
 
     model_config = {"from_attributes": True}
 
+    @model_validator(mode="before")
+    @classmethod
+    def from_document(cls, obj):
+        """Liest die Feldwerte aus vocab_entries.data statt aus der Relationship (ENTRY_STORAGE != "eav")."""
+        document = getattr(obj, "data", None)
+        if config.ENTRY_STORAGE == "eav" or not isinstance(document, dict):
+            return obj
+        return {
+            "id": obj.id,
+            "vocab_list_id": obj.vocab_list_id,
+            "position": obj.position,
+            "field_values": [
+                {"entry_id": obj.id, "column_id": int(column_id), "value": value}
+                for column_id, value in document.items()
+            ],
+        }
+
 
 
 # ============== VOCAB LISTS ==============
@@ -69,9 +92,22 @@ class VocabListUpdate(BaseModel):
     name: Optional[str] = None
     description: Optional[str] = None
 
+class AnkiImportResult(BaseModel):
+    vocab_list_id: int
+    name: str
+    columns: List[ListColumn]
+    notes: int
+
+    model_config = {"from_attributes": True}
+
+class VocabListClone(BaseModel):
+    name: Optional[str] = None  # Standard: Name der Vorlage
+
 class VocabList(VocabListBase):
     id: int
     user_id: int
+    share_code: Optional[str] = None
+    entry_count: Optional[int] = None
     columns: List[ListColumn] = []
     entries: List[VocabEntry] = []
 
@@ -88,6 +124,7 @@ class UserBase(BaseModel):
 
 class UserCreate(UserBase):
     password: str
+    tenant: Optional[str] = None
 
 class UserUpdate(BaseModel):
     username: Optional[str] = None
@@ -101,8 +138,18 @@ class User(UserBase):
     id: int
     role: str
     is_active: bool
+    tenant: Optional[str] = None
+    list_count: Optional[int] = None
+    entry_count: Optional[int] = None
+    avatar_hash: Optional[str] = Field(default=None, exclude=True)
     lists: List[VocabList] = []
 
+    @computed_field
+    @property
+    def avatar_url(self) -> Optional[str]:
+        """URL des größten Thumbnails, kleinere: gleiche URL mit -<größe>.webp."""
+        return avatars.avatar_url(self.avatar_hash) if self.avatar_hash else None
+
     model_config = {"from_attributes": True}
 
 
@@ -115,3 +162,56 @@ class VocabEntryTableRow(BaseModel):
     values: Dict[str, str]  # column_name -> value
     
     model_config = {"from_attributes": True}
+
+
+# ============== STATISTIK ==============
+class UserStats(BaseModel):
+    lists: int
+    entries: int
+
+class ColumnStats(BaseModel):
+    id: int
+    name: str
+    filled: int
+
+class ListStats(BaseModel):
+    vocab_list_id: int
+    entries: int
+    columns: List[ColumnStats]
+    filled_ratio: float  # gefüllte Zellen / (Einträge * Spalten)
+
+class UserOverview(UserStats):
+    id: int
+    username: str
+
+
+# ============== MULTIPLE CHOICE ==============
+class QuizQuestion(BaseModel):
+    entry_id: int
+    source_column_id: int
+    target_column_id: int
+    prompt: str
+    answer: str
+    options: List[str]  # gemischt, enthält answer
+
+class Quiz(BaseModel):
+    vocab_list_id: int
+    precomputed: bool  # False: Ablenker werden noch berechnet, bis dahin zufällig
+    questions: List[QuizQuestion]
+
+
+# ============== JOBS ==============
+class Job(BaseModel):
+    id: int
+    kind: str
+    status: str  # queued | running | succeeded | failed | cancelled
+    progress: int
+    total: Optional[int] = None
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    attempts: int
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    model_config = {"from_attributes": True}
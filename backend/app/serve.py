@@ -0,0 +1,159 @@
+"""
+Mehrere Worker-Prozesse auf einem Port.
+
+uvicorn --workers startet jeden Worker als frischen Interpreter, der die App
+selbst importiert. Hier wird app.main einmal im Hauptprozess geladen und
+danach pro Worker geforkt: der Import kostet einmal statt N-mal, und die
+geladenen Module bleiben per Copy-on-Write geteilt (RAM auf dem Pi).
+
+- Der Hauptprozess öffnet den Socket und forkt WEB_CONCURRENCY Worker, die
+  alle auf demselben Socket Verbindungen annehmen. Stirbt einer, wird er
+  neu gestartet; SIGTERM/SIGINT gehen an alle Worker.
+- Das Schema prüft der Hauptprozess einmal vor dem Forken. Jeder Worker
+  verwirft die geerbten Pools (database.after_fork()) und startet im
+  Lifespan seine eigenen Threads. Was genau einmal laufen soll
+  (Backups), läuft nur in Worker 0, siehe primary().
+- Zustand im Speicher der Worker gleicht der Bus ab (bus.py); mit
+  WEB_CONCURRENCY > 1 ist er automatisch an, ebenso SQLite im WAL-Modus und
+  das Rate-Limit in der gemeinsamen SQLite-Datei.
+
+Nur mit fork() (Linux, macOS). Aufruf aus dem backend-Verzeichnis:
+    python -m app.serve --host 0.0.0.0 --port 8000 --workers 4
+"""
+import argparse
+import logging
+import os
+import signal
+import socket
+import time
+
+logger = logging.getLogger(__name__)
+
+# Index dieses Workers, None ohne app.serve (uvicorn direkt, Tests)
+worker_index = None
+
+# Nach einem Absturz nicht schneller neu starten
+RESTART_DELAY_SECONDS = 1.0
+
+
+def primary() -> bool:
+    """Läuft hier, was pro Installation nur einmal laufen darf? (einziger Prozess oder Worker 0)"""
+    return worker_index in (None, 0)
+
+
+def _bind(host: str, port: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _uvicorn_config(app, args):
+    import uvicorn
+
+    return uvicorn.Config(
+        app, host=args.host, port=args.port, log_level=args.log_level,
+        forwarded_allow_ips=args.forwarded_allow_ips, timeout_graceful_shutdown=args.graceful_timeout,
+    )
+
+
+def _run_worker(index: int, sock: socket.socket, app, args):
+    global worker_index
+    worker_index = index
+    import uvicorn
+    from app import database
+
+    database.after_fork()
+    # uvicorn setzt eigene Handler, bis dahin die des Hauptprozesses zurücksetzen
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    uvicorn.Server(_uvicorn_config(app, args)).run(sockets=[sock])
+
+
+def serve(args):
+    # Vor dem Import von app.*: config liest daraus BUS_ENABLED, SQLITE_WAL, RATE_LIMIT_BACKEND
+    os.environ["WEB_CONCURRENCY"] = str(args.workers)
+    from app.main import app
+
+    if args.workers <= 1:
+        import uvicorn
+
+        uvicorn.Server(_uvicorn_config(app, args)).run()
+        return
+
+    # Schema einmal hier prüfen/migrieren statt gleichzeitig in allen Workern
+    from app import database, migrations
+
+    migrations.ensure_schema(database.engine)
+    database.engine.dispose()
+
+    sock = _bind(args.host, args.port)
+    children = {}  # pid -> Worker-Index
+    stopping = False
+
+    def spawn(index: int):
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                _run_worker(index, sock, app, args)
+            except BaseException:
+                logger.exception("Worker %s abgebrochen", index)
+                code = 1
+            finally:
+                os._exit(code)
+        children[pid] = index
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for index in range(args.workers):
+        spawn(index)
+    logger.info("%s Worker auf %s:%s gestartet", args.workers, args.host, args.port)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        index = children.pop(pid, None)
+        if index is None or stopping:
+            continue
+        logger.warning("Worker %s (pid %s) beendet mit Status %s, starte neu", index, pid, status)
+        time.sleep(RESTART_DELAY_SECONDS)
+        if not stopping:
+            spawn(index)
+    sock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "1")))
+    parser.add_argument("--log-level", default="info")
+    # Hinter cloudflared: X-Forwarded-For nur vom lokalen Tunnel übernehmen (wie uvicorn)
+    parser.add_argument("--forwarded-allow-ips", default=os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1"))
+    parser.add_argument("--graceful-timeout", type=float, default=10,
+                        help="Sekunden, die offene Requests/SSE beim Beenden noch bekommen")
+    args = parser.parse_args()
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    serve(args)
+
+
+if __name__ == "__main__":
+    # Über das importierte Modul starten: app.main fragt app.serve.worker_index ab, nicht __main__
+    from app.serve import main as run
+
+    run()
@@ -0,0 +1,109 @@
+"""
+Gleichzeitige gleiche Lesezugriffe teilen sich einen Ladevorgang.
+
+Der Vokabeltest lädt für jede gewählte Liste getVocabList und
+getEntriesByList, Listenseiten laden nach jeder Änderung in mehreren Tabs
+und Geräten neu – dieselben GETs laufen also oft gleichzeitig und
+wiederholen dieselben Queries und dieselbe Serialisierung.
+
+- Jede Route prüft zuerst selbst die Berechtigung. Danach lädt der erste
+  Request (Leader) Daten und JSON, gleichzeitige Requests mit demselben
+  Schlüssel warten auf ihn und bekommen dieselben Bytes (Follower). Nach
+  dem Ende des Ladens ist der Schlüssel wieder frei – es ist kein Cache.
+- Der Schlüssel enthält den Stand der Liste (events.version): nach einem
+  Schreibzugriff in diesem Worker startet der nächste Request einen neuen
+  Ladevorgang, statt einen zu übernehmen, der vor dem Commit begonnen hat.
+  Schreibzugriffe anderer Worker erhöhen den Stand erst, wenn der Bus sie
+  liefert (BUS_POLL_SECONDS); so lange kann ein Request noch einen älteren
+  Ladevorgang übernehmen – wie ohne Zusammenfassen ein Request, der kurz
+  vor dem Commit gelesen hat.
+- Schlägt das Laden fehl, bekommt nur der Leader den Fehler; die Follower
+  laden danach selbst (eigene Session, eigener Fehler).
+- do() für sync-Routen im Threadpool (Follower warten auf ein Event),
+  do_async() für die Async-Routen (ein Task, auf den alle per shield
+  warten – bricht ein Wartender ab, lädt der Task für die anderen weiter;
+  load() braucht dafür eine eigene Session statt der des Requests).
+"""
+import asyncio
+import threading
+
+from pydantic import TypeAdapter
+
+from app.metrics import registry
+
+registry.describe("singleflight_loads_total", "counter", "Ladevorgänge gemeinsamer Lesezugriffe nach Route")
+registry.describe("singleflight_coalesced_total", "counter", "Requests, die einen laufenden Ladevorgang übernommen haben")
+
+
+class _Call:
+    __slots__ = ("done", "result", "failed")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.failed = False
+
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self._labels = (("read", name),)
+        self._lock = threading.Lock()
+        self._calls = {}  # key -> _Call
+        self._tasks = {}  # key -> asyncio.Task
+
+    def do(self, key, load):
+        """Ergebnis von load() – oder das eines gleichzeitig laufenden Aufrufs mit demselben key."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            registry.inc("singleflight_coalesced_total", self._labels)
+            call.done.wait()
+            if call.failed:
+                # Nicht die Exception des Leaders weiterreichen (geteilter Traceback, fremder Kontext)
+                return load()
+            return call.result
+        registry.inc("singleflight_loads_total", self._labels)
+        try:
+            call.result = load()
+        except BaseException:
+            call.failed = True
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    async def do_async(self, key, load):
+        """Wie do(), load ist eine Coroutine-Funktion."""
+        loop = asyncio.get_running_loop()
+        task = self._tasks.get(key)
+        if task is not None and task.get_loop() is loop:
+            registry.inc("singleflight_coalesced_total", self._labels)
+            try:
+                return await asyncio.shield(task)
+            except Exception:
+                return await load()
+        registry.inc("singleflight_loads_total", self._labels)
+        task = self._tasks[key] = loop.create_task(load())
+        task.add_done_callback(lambda done: self._tasks.pop(key, None) if self._tasks.get(key) is done else None)
+        return await asyncio.shield(task)
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls) + len(self._tasks)
+
+
+_adapters = {}
+
+
+def dump_json(response_type, value) -> bytes:
+    """Wie FastAPI mit response_model: ORM-Objekte validieren, dann JSON (für alle Wartenden einmal)."""
+    adapter = _adapters.get(response_type)
+    if adapter is None:
+        adapter = _adapters[response_type] = TypeAdapter(response_type)
+    return adapter.dump_json(adapter.validate_python(value, from_attributes=True), by_alias=True)
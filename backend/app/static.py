@@ -0,0 +1,165 @@
+"""
+Auslieferung des Frontend-Builds (frontend/dist).
+
+- /assets/*: vorkomprimierte .br/.gz-Varianten je nach Accept-Encoding,
+  Dateinamen mit Vite-Hash bekommen "Cache-Control: immutable".
+- index.html: liegt im Speicher (roh + gzip/brotli) mit ETag, damit
+  SPA-Routen ohne Dateizugriff beantwortet werden.
+
+Varianten werden beim Build erzeugt: python -m app.manage precompress-static
+(brotli nur, wenn das optionale Paket "brotli" installiert ist).
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+import time
+from pathlib import Path
+
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+
+try:
+    import brotli
+except ImportError:  # optional
+    brotli = None
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+# Vite hängt einen 8-stelligen Hash an: index-Bnzvo9fu.js
+HASHED_NAME = re.compile(r"-[A-Za-z0-9_-]{8,}\.[A-Za-z0-9]+$")
+# Diese Typen sind bereits komprimiert
+SKIP_SUFFIXES = {".png", ".jpg", ".jpeg", ".gif", ".webp", ".avif", ".woff", ".woff2", ".br", ".gz", ".zip"}
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+def accepted_encodings(accept_encoding: str) -> set:
+    """Liest Accept-Encoding aus und ignoriert Einträge mit q=0."""
+    result = set()
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        params = params.replace(" ", "")
+        if name and params not in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            result.add(name.lower())
+    return result
+
+
+# ============== Assets ==============
+class PrecompressedStaticFiles(StaticFiles):
+    """StaticFiles, der vorhandene .br/.gz-Geschwister ausliefert."""
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        request_headers = Headers(scope=scope)
+        accepted = accepted_encodings(request_headers.get("accept-encoding", ""))
+        media_type = mimetypes.guess_type(str(full_path))[0] or "application/octet-stream"
+
+        response = None
+        for encoding, suffix in ENCODINGS:
+            if encoding not in accepted:
+                continue
+            variant = f"{full_path}{suffix}"
+            try:
+                variant_stat = os.stat(variant)
+            except OSError:
+                continue
+            response = FileResponse(variant, status_code=status_code, stat_result=variant_stat, media_type=media_type)
+            response.headers["content-encoding"] = encoding
+            break
+        if response is None:
+            response = FileResponse(full_path, status_code=status_code, stat_result=stat_result)
+
+        response.headers["vary"] = "Accept-Encoding"
+        if HASHED_NAME.search(os.path.basename(str(full_path))):
+            response.headers["cache-control"] = IMMUTABLE
+        if self.is_not_modified(response.headers, request_headers):
+            return Response(status_code=304, headers={
+                k: v for k, v in response.headers.items()
+                if k in ("etag", "cache-control", "vary", "content-location", "expires")
+            })
+        return response
+
+
+# ============== index.html ==============
+class SpaIndex:
+    """Hält index.html samt komprimierter Varianten im Speicher."""
+
+    CHECK_INTERVAL = 2.0  # Sekunden zwischen mtime-Prüfungen (neuer Build ohne Neustart)
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._checked = 0.0
+        self.bodies = {}
+        self.etag = None
+        self._load()
+
+    def _load(self):
+        try:
+            mtime = self.path.stat().st_mtime
+        except OSError:
+            self.bodies, self.etag, self._mtime = {}, None, None
+            return
+        if mtime == self._mtime:
+            return
+        raw = self.path.read_bytes()
+        bodies = {"identity": raw, "gzip": gzip.compress(raw, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            bodies["br"] = brotli.compress(raw, quality=11)
+        self.bodies = bodies
+        self.etag = '"' + hashlib.sha1(raw).hexdigest()[:20] + '"'
+        self._mtime = mtime
+
+    def _refresh(self):
+        now = time.monotonic()
+        if now - self._checked >= self.CHECK_INTERVAL:
+            with self._lock:
+                if now - self._checked >= self.CHECK_INTERVAL:
+                    self._checked = now
+                    self._load()
+
+    @property
+    def available(self) -> bool:
+        self._refresh()
+        return bool(self.bodies)
+
+    def response(self, request) -> Response:
+        self._refresh()
+        bodies, etag = self.bodies, self.etag
+        # index.html immer revalidieren, damit neue Asset-Hashes sofort greifen
+        headers = {"etag": etag, "cache-control": "no-cache", "vary": "Accept-Encoding"}
+
+        if_none_match = request.headers.get("if-none-match", "")
+        if etag in [tag.strip(" W/") for tag in if_none_match.split(",")]:
+            return Response(status_code=304, headers=headers)
+
+        accepted = accepted_encodings(request.headers.get("accept-encoding", ""))
+        for encoding, _ in ENCODINGS:
+            if encoding in accepted and encoding in bodies:
+                headers["content-encoding"] = encoding
+                return Response(bodies[encoding], media_type="text/html", headers=headers)
+        return Response(bodies["identity"], media_type="text/html", headers=headers)
+
+
+# ============== Build-Schritt ==============
+def precompress(directory: Path, min_size: int = 1024):
+    """Erzeugt .gz (und .br) neben allen komprimierbaren Dateien; gibt (Datei, roh, gz, br) zurück."""
+    results = []
+    for path in sorted(directory.rglob("*")):
+        if not path.is_file() or path.suffix.lower() in SKIP_SUFFIXES:
+            continue
+        raw = path.read_bytes()
+        if len(raw) < min_size:
+            continue
+        gz = gzip.compress(raw, compresslevel=9, mtime=0)
+        br = brotli.compress(raw, quality=11) if brotli is not None else None
+        for data, suffix in ((gz, ".gz"), (br, ".br")):
+            target = path.with_name(path.name + suffix)
+            if data is not None and len(data) < len(raw):
+                target.write_bytes(data)
+            elif target.exists():
+                target.unlink()
+        results.append((path, len(raw), len(gz), len(br) if br is not None else None))
+    return results
@@ -0,0 +1,204 @@
+"""
+Zähler für Dashboard und Admin-Seite.
+
+users.list_count/entry_count, vocab_lists.entry_count und
+list_columns.filled_count (Einträge mit nicht-leerem Wert) schreiben die
+crud-Funktionen in derselben Transaktion wie die Änderung fort – als
+UPDATE ... SET x = x + n, also atomar auch mit mehreren Workern. Die
+Stats-Routen lesen nur diese Spalten, egal wie viele Einträge es gibt.
+
+NULL heißt "nicht berechnet" (frisch migrierte Spalte). SQL rechnet
+NULL + n = NULL, ein unbekannter Zähler bleibt also unbekannt, bis er beim
+ersten Lesen nachgezählt wird. reconcile() zählt alles nach und repariert
+Abweichungen (Job reconcile_stats, python -m app.manage reconcile-stats).
+"""
+from collections import Counter
+
+from sqlalchemy import bindparam, func, select, update
+from sqlalchemy.orm import Session
+
+from app import config, models
+from app.metrics import registry
+
+registry.describe("stats_drift_total", "counter", "Von reconcile() korrigierte Zähler")
+
+users = models.User.__table__
+lists = models.VocabList.__table__
+columns = models.ListColumn.__table__
+entries = models.VocabEntry.__table__
+values = models.EntryFieldValue.__table__
+
+
+def is_filled(value) -> bool:
+    return bool(value and value.strip())
+
+
+def filled_columns(pairs) -> Counter:
+    """(column_id, wert)-Paare -> {column_id: Anzahl nicht-leerer Werte}."""
+    return Counter(column_id for column_id, value in pairs if is_filled(value))
+
+
+def entry_values(db: Session, entry_ids) -> list:
+    """(column_id, wert) aller Felder der Einträge – aus dem JSON-Dokument nur im Modus "json"."""
+    if not entry_ids:
+        return []
+    if config.ENTRY_STORAGE == "json":
+        documents = db.scalars(select(entries.c.data).where(entries.c.id.in_(entry_ids)))
+        return [(int(key), value) for data in documents for key, value in (data or {}).items()]
+    return db.execute(select(values.c.column_id, values.c.value).where(values.c.entry_id.in_(entry_ids))).all()
+
+
+# ============== Fortschreiben (Transaktion des Aufrufers) ==============
+def list_added(db: Session, list_id: int):
+    """Nach dem Anlegen (bzw. Kopieren) einer Liste: Besitzer zählt sie und ihre Einträge mit."""
+    entry_count = select(lists.c.entry_count).where(lists.c.id == list_id).scalar_subquery()
+    owner = select(lists.c.user_id).where(lists.c.id == list_id).scalar_subquery()
+    db.execute(update(users).where(users.c.id == owner).values(
+        list_count=users.c.list_count + 1,
+        entry_count=users.c.entry_count + entry_count
+    ))
+
+
+def add_entries(db: Session, list_id: int, amount: int):
+    if not amount:
+        return
+    db.execute(update(lists).where(lists.c.id == list_id).values(entry_count=lists.c.entry_count + amount))
+    owner = select(lists.c.user_id).where(lists.c.id == list_id).scalar_subquery()
+    db.execute(update(users).where(users.c.id == owner).values(entry_count=users.c.entry_count + amount))
+
+
+def add_filled(db: Session, deltas):
+    """deltas: {column_id: +n/-n}, ein executemany für alle Spalten."""
+    rows = [{"column_id": column_id, "delta": delta} for column_id, delta in deltas.items() if delta]
+    if rows:
+        db.execute(
+            update(columns).where(columns.c.id == bindparam("column_id"))
+            .values(filled_count=columns.c.filled_count + bindparam("delta")),
+            rows
+        )
+
+
+def change_filled(db: Session, before, after):
+    """Feldwerte eines Eintrags vorher/nachher als (column_id, wert)-Paare."""
+    delta = filled_columns(after)
+    delta.subtract(filled_columns(before))
+    add_filled(db, delta)
+
+
+def entries_removed(db: Session, list_id: int, entry_ids):
+    """Vor dem Löschen von Einträgen aufrufen – ihre Werte werden dafür noch gelesen."""
+    add_filled(db, {column_id: -n for column_id, n in filled_columns(entry_values(db, entry_ids)).items()})
+    add_entries(db, list_id, -len(entry_ids))
+
+
+def list_removed(db: Session, list_id: int):
+    """Vor dem Löschen einer Liste: Zähler des Besitzers um die Liste und ihre Einträge verringern."""
+    row = db.execute(select(lists.c.user_id, lists.c.entry_count).where(lists.c.id == list_id)).first()
+    if row is None:
+        return
+    user_id, entry_count = row
+    db.execute(update(users).where(users.c.id == user_id).values(
+        list_count=users.c.list_count - 1,
+        entry_count=users.c.entry_count - entry_count if entry_count is not None else None
+    ))
+
+
+# ============== Nachzählen ==============
+def reconcile_list(db: Session, list_id: int) -> int:
+    """Zählt Einträge und gefüllte Spalten einer Liste nach; gibt die Zahl korrigierter Zähler zurück."""
+    entry_ids = db.scalars(select(entries.c.id).where(entries.c.vocab_list_id == list_id)).all()
+    filled = filled_columns(entry_values(db, entry_ids))
+    fixes = 0
+    if db.scalar(select(lists.c.entry_count).where(lists.c.id == list_id)) != len(entry_ids):
+        db.execute(update(lists).where(lists.c.id == list_id).values(entry_count=len(entry_ids)))
+        fixes += 1
+    for column_id, filled_count in db.execute(
+        select(columns.c.id, columns.c.filled_count).where(columns.c.vocab_list_id == list_id)
+    ):
+        if filled_count != filled.get(column_id, 0):
+            db.execute(update(columns).where(columns.c.id == column_id).values(filled_count=filled.get(column_id, 0)))
+            fixes += 1
+    return fixes
+
+
+def reconcile_user(db: Session, user_id: int) -> int:
+    list_count = db.scalar(select(func.count()).select_from(lists).where(lists.c.user_id == user_id))
+    entry_count = db.scalar(
+        select(func.count()).select_from(entries).join(lists, entries.c.vocab_list_id == lists.c.id)
+        .where(lists.c.user_id == user_id)
+    )
+    stored = db.execute(select(users.c.list_count, users.c.entry_count).where(users.c.id == user_id)).first()
+    if stored is None or tuple(stored) == (list_count, entry_count):
+        return 0
+    db.execute(update(users).where(users.c.id == user_id).values(list_count=list_count, entry_count=entry_count))
+    return (stored[0] != list_count) + (stored[1] != entry_count)
+
+
+def reconcile(db: Session, progress=None) -> int:
+    """
+    Zählt alle Listen und Benutzer nach, eine Transaktion pro Liste bzw.
+    Benutzer. Gibt die Zahl korrigierter Zähler zurück (Drift).
+    """
+    list_ids = db.scalars(select(lists.c.id).order_by(lists.c.id)).all()
+    user_ids = db.scalars(select(users.c.id).order_by(users.c.id)).all()
+    total = len(list_ids) + len(user_ids)
+    fixes = 0
+    done = 0
+    for reconcile_one, ids in ((reconcile_list, list_ids), (reconcile_user, user_ids)):
+        for key in ids:
+            fixes += reconcile_one(db, key)
+            db.commit()
+            done += 1
+            if progress:
+                progress(done, total)
+    registry.inc("stats_drift_total", amount=fixes)
+    return fixes
+
+
+# ============== Lesen ==============
+def user_stats(db: Session, user_id: int) -> dict:
+    row = db.execute(select(users.c.list_count, users.c.entry_count).where(users.c.id == user_id)).first()
+    if row is None:
+        return None
+    if None in row:
+        reconcile_user(db, user_id)
+        db.commit()
+        row = db.execute(select(users.c.list_count, users.c.entry_count).where(users.c.id == user_id)).first()
+    return {"lists": row[0], "entries": row[1]}
+
+
+def list_stats(db: Session, list_id: int) -> dict:
+    """Einträge und Füllstand pro Spalte – liest nur Liste und Spalten, nie die Einträge."""
+    def load():
+        entry_count = db.scalar(select(lists.c.entry_count).where(lists.c.id == list_id))
+        rows = db.execute(
+            select(columns.c.id, columns.c.name, columns.c.filled_count)
+            .where(columns.c.vocab_list_id == list_id).order_by(columns.c.position, columns.c.id)
+        ).all()
+        return entry_count, rows
+
+    entry_count, rows = load()
+    if entry_count is None or any(row.filled_count is None for row in rows):
+        reconcile_list(db, list_id)
+        db.commit()
+        entry_count, rows = load()
+    cells = entry_count * len(rows)
+    return {
+        "vocab_list_id": list_id,
+        "entries": entry_count,
+        "columns": [{"id": row.id, "name": row.name, "filled": row.filled_count} for row in rows],
+        "filled_ratio": sum(row.filled_count for row in rows) / cells if cells else 0.0,
+    }
+
+
+def user_overview(db: Session) -> list:
+    """Zähler aller Benutzer für die Admin-Seite (eine Zeile pro Benutzer, keine Listen/Einträge)."""
+    unknown = db.scalars(select(users.c.id).where((users.c.list_count.is_(None)) | (users.c.entry_count.is_(None)))).all()
+    for user_id in unknown:
+        reconcile_user(db, user_id)
+    if unknown:
+        db.commit()
+    return [
+        {"id": row.id, "username": row.username, "lists": row.list_count, "entries": row.entry_count}
+        for row in db.execute(select(users.c.id, users.c.username, users.c.list_count, users.c.entry_count).order_by(users.c.id))
+    ]
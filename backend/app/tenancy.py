@@ -0,0 +1,375 @@
+"""
+Optionales Sharding pro Mandant (TENANT_SHARDING=1).
+
+Ein Mandant (Schule/Organisation) gruppiert Benutzer. Jeder Mandant liegt
+komplett (Benutzer, Listen, Einträge) in einem Shard, standardmäßig einer
+eigenen SQLite-Datei – Schreibzugriffe verschiedener Schulen blockieren sich
+dann nicht mehr gegenseitig.
+
+- Die Haupt-Datenbank (DATABASE_URL) ist das Verzeichnis: tenants
+  (Mandant -> Shard) und tenant_members (Benutzername -> Mandant, für den
+  Login). Benutzer ohne Mandant bleiben wie bisher dort (Shard "main").
+- Das Token trägt den Mandanten ("tenant"-Claim); get_db() wählt daraus
+  die Session, ohne pro Request das Verzeichnis zu fragen.
+- Shard-Engines werden in einer Registry gehalten und nach
+  TENANT_ENGINE_IDLE_SECONDS ohne Nutzung wieder geschlossen.
+
+Mandanten anlegen und verschieben: python -m app.manage create-tenant / move-tenant
+"""
+import re
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from fastapi import HTTPException
+from sqlalchemy import create_engine, delete, insert, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session, sessionmaker
+
+from app import auth, bus, config, crud, database, metrics, migrations, models, querylog, revocation, schemas
+
+MAIN_SHARD = "main"
+_NAME_RE = re.compile(r"^[a-z0-9][a-z0-9_-]{0,62}$")
+
+metrics.registry.describe("tenant_engines_open", "gauge", "Offene Shard-Engines (ohne Haupt-DB)")
+
+
+def validate_name(name: str) -> str:
+    """Mandanten- und Shard-Namen landen in Dateinamen/URLs: nur a-z, 0-9, '_' und '-'."""
+    if not _NAME_RE.match(name or ""):
+        raise ValueError(f"Ungültiger Name '{name}' (erlaubt: a-z, 0-9, '_', '-')")
+    return name
+
+
+def shard_url(shard: str) -> str:
+    return config.TENANT_DATABASE_URL.format(shard=validate_name(shard))
+
+
+# ============== Engine Registry ==============
+class ShardRegistry:
+    """Eine Engine pro Shard, bei Bedarf angelegt und nach Leerlauf wieder geschlossen."""
+
+    def __init__(self, idle_seconds: float = None, max_engines: int = None):
+        self.idle_seconds = config.TENANT_ENGINE_IDLE_SECONDS if idle_seconds is None else idle_seconds
+        self.max_engines = config.TENANT_MAX_ENGINES if max_engines is None else max_engines
+        self._lock = threading.Lock()
+        self._shards = {}   # shard -> [engine, sessionmaker, zuletzt benutzt]
+        self._tenants = {}  # mandant -> (shard, gültig bis)
+
+    def engine(self, shard: str):
+        return self._slot(shard)[0]
+
+    def session(self, shard: str) -> Session:
+        return self._slot(shard)[1]()
+
+    def _slot(self, shard):
+        if shard == MAIN_SHARD:
+            return database.engine, database.SessionLocal
+        now = time.monotonic()
+        with self._lock:
+            slot = self._shards.get(shard)
+            if slot is None:
+                slot = self._shards[shard] = [*self._create(shard), now]
+            slot[2] = now
+            self._evict(now, keep=shard)
+            metrics.registry.set_gauge("tenant_engines_open", len(self._shards))
+        return slot[0], slot[1]
+
+    def _create(self, shard):
+        url = shard_url(shard)
+        parsed = make_url(url)
+        if parsed.get_backend_name() == "sqlite" and parsed.database:
+            Path(parsed.database).parent.mkdir(parents=True, exist_ok=True)
+        engine = create_engine(url, poolclass=metrics.TimedQueuePool, **database.engine_options(url))
+        metrics.instrument_engine(engine)
+        database.use_wal(engine)
+        if config.SQL_INSTRUMENTATION:
+            querylog.install(engine)
+        migrations.ensure_schema(engine)
+        return engine, sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def _evict(self, now, keep=None):
+        """Schließt Engines ohne ausgecheckte Verbindungen: zu lange unbenutzt oder über dem Limit (LRU)."""
+        idle = sorted((slot[2], shard) for shard, slot in self._shards.items() if shard != keep)
+        over = len(self._shards) - self.max_engines
+        for last_used, shard in idle:
+            if over <= 0 and now - last_used < self.idle_seconds:
+                break
+            engine = self._shards[shard][0]
+            if engine.pool.checkedout():
+                continue
+            engine.dispose()
+            del self._shards[shard]
+            over -= 1
+
+    def evict_idle(self):
+        with self._lock:
+            self._evict(time.monotonic())
+            metrics.registry.set_gauge("tenant_engines_open", len(self._shards))
+
+    def open_shards(self) -> list:
+        with self._lock:
+            return sorted(self._shards)
+
+    def shard_of(self, tenant: str) -> str:
+        """Shard eines Mandanten aus dem Verzeichnis, TENANT_DIRECTORY_TTL Sekunden gecacht."""
+        now = time.monotonic()
+        cached = self._tenants.get(tenant)
+        if cached is not None and cached[1] > now:
+            return cached[0]
+        with database.SessionLocal() as directory:
+            row = directory.get(models.Tenant, tenant)
+        if row is None:
+            raise LookupError(f"Mandant '{tenant}' nicht gefunden")
+        self._tenants[tenant] = (row.shard, now + config.TENANT_DIRECTORY_TTL)
+        return row.shard
+
+    def forget(self, tenant: str = None):
+        if tenant is None:
+            self._tenants.clear()
+        else:
+            self._tenants.pop(tenant, None)
+
+    def dispose(self):
+        with self._lock:
+            for engine, _, _ in self._shards.values():
+                engine.dispose()
+            self._shards.clear()
+            self._tenants.clear()
+            metrics.registry.set_gauge("tenant_engines_open", 0)
+
+
+registry = ShardRegistry()
+
+
+@bus.listener("tenant")
+def _from_other_worker(name):
+    registry.forget(name)
+
+
+# ============== Session-Routing ==============
+def tenant_from_request(request) -> str:
+    """Mandant aus dem Bearer-Token; None ohne (gültiges) Token – die Auth prüft das danach selbst."""
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    claims = auth.decode_token(token)
+    return claims.get("tenant") if claims else None
+
+
+def session_for_tenant(tenant: str) -> Session:
+    if not tenant:
+        return database.SessionLocal()
+    try:
+        return registry.session(registry.shard_of(tenant))
+    except LookupError:
+        raise HTTPException(status_code=401, detail="Mandant existiert nicht mehr")
+
+
+def session_for_request(request) -> Session:
+    return session_for_tenant(tenant_from_request(request))
+
+
+# ============== Verzeichnis ==============
+def tenant_of_user(directory: Session, username: str) -> str:
+    member = directory.get(models.TenantMember, username)
+    return member.tenant if member else None
+
+
+@contextmanager
+def user_session(directory: Session, username: str):
+    """Session auf dem Shard des Benutzers (für Login, bevor es ein Token gibt)."""
+    tenant = tenant_of_user(directory, username) if config.TENANT_SHARDING else None
+    if tenant is None:
+        yield directory
+        return
+    db = session_for_tenant(tenant)
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def username_taken(directory: Session, username: str) -> bool:
+    return (
+        directory.get(models.TenantMember, username) is not None
+        or crud.get_user_by_username(directory, username) is not None
+    )
+
+
+def register_user(directory: Session, user: schemas.UserCreate) -> schemas.User:
+    """Legt einen Benutzer im Shard seines Mandanten an und trägt ihn ins Verzeichnis ein."""
+    if not config.TENANT_SHARDING:
+        raise HTTPException(status_code=400, detail="Mandanten sind nicht aktiviert")
+    tenant = directory.get(models.Tenant, user.tenant)
+    if tenant is None:
+        raise HTTPException(status_code=404, detail="Mandant nicht gefunden")
+    if username_taken(directory, user.username.strip()):
+        raise HTTPException(status_code=400, detail="Benutzername bereits vergeben")
+
+    if tenant.shard == MAIN_SHARD:
+        new_user = schemas.User.model_validate(crud.create_user(directory, user))
+    else:
+        db = registry.session(tenant.shard)
+        try:
+            new_user = schemas.User.model_validate(crud.create_user(db, user))
+        finally:
+            db.close()
+    directory.add(models.TenantMember(username=new_user.username, tenant=tenant.name))
+    directory.commit()
+    return new_user
+
+
+def rename_member(old_username: str, new_username: str):
+    if old_username == new_username:
+        return
+    with database.SessionLocal() as directory:
+        member = directory.get(models.TenantMember, old_username)
+        if member is not None:
+            directory.delete(member)
+            directory.flush()
+            directory.add(models.TenantMember(username=new_username, tenant=member.tenant))
+            directory.commit()
+
+
+def remove_member(username: str):
+    with database.SessionLocal() as directory:
+        directory.execute(delete(models.TenantMember).where(models.TenantMember.username == username))
+        directory.commit()
+
+
+# ============== Verwaltung ==============
+def create_tenant(name: str, shard: str = None) -> models.Tenant:
+    validate_name(name)
+    shard = validate_name(shard or name)
+    with database.SessionLocal() as directory:
+        if directory.get(models.Tenant, name) is not None:
+            raise ValueError(f"Mandant '{name}' existiert bereits")
+        tenant = models.Tenant(name=name, shard=shard)
+        directory.add(tenant)
+        directory.commit()
+    registry.engine(shard)  # Shard-Datenbank samt Schema anlegen
+    return tenant
+
+
+def add_members(name: str, usernames) -> int:
+    """Ordnet bestehende Benutzer der Haupt-DB einem Mandanten zu, der (noch) auf "main" liegt."""
+    with database.SessionLocal() as directory:
+        tenant = directory.get(models.Tenant, name)
+        if tenant is None:
+            raise LookupError(f"Mandant '{name}' nicht gefunden")
+        if tenant.shard != MAIN_SHARD:
+            raise ValueError("Nur für Mandanten im Shard 'main' – danach mit move-tenant verschieben")
+        count = 0
+        for username in usernames:
+            user = crud.get_user_by_username(directory, username)
+            if user is None:
+                raise LookupError(f"Benutzer '{username}' nicht gefunden")
+            user.tenant = name
+            directory.merge(models.TenantMember(username=username, tenant=name))
+            count += 1
+        directory.commit()
+    return count
+
+
+# Tabellen eines Mandanten in Abhängigkeitsreihenfolge: (Model, {Fremdschlüssel: Eltern-Model})
+TENANT_TABLES = [
+    (models.User, {}),
+    (models.VocabList, {"user_id": models.User}),
+    (models.ListColumn, {"vocab_list_id": models.VocabList}),
+    (models.VocabEntry, {"vocab_list_id": models.VocabList}),
+    (models.EntryFieldValue, {"entry_id": models.VocabEntry, "column_id": models.ListColumn}),
+]
+
+
+def move_tenant(name: str, target_shard: str, batch_size: int = 1000, progress=None) -> dict:
+    """
+    Verschiebt alle Daten eines Mandanten in einen anderen Shard.
+
+    IDs werden im Ziel neu vergeben (der Ziel-Shard kann bereits andere
+    Mandanten enthalten), Fremdschlüssel und die Spalten-IDs in
+    vocab_entries.data werden umgeschrieben. Ablauf: kopieren (eine
+    Transaktion im Ziel), Verzeichnis umstellen, im Quell-Shard löschen.
+
+    Schreibzugriffe während des Kopierens gehen verloren – in einem
+    Wartungsfenster ausführen; laufende Server folgen dem Verzeichnis
+    nach spätestens TENANT_DIRECTORY_TTL Sekunden (mit BUS_ENABLED
+    sofort). Die Benutzer müssen sich danach neu anmelden (ihre Tokens
+    enthalten die alten IDs).
+
+    Gibt {tabelle: anzahl} zurück.
+    """
+    validate_name(target_shard)
+    # Verzeichnis nicht während des Kopierens offen halten (SQLite: Leser blockieren Schreiber)
+    with database.SessionLocal() as directory:
+        tenant = directory.get(models.Tenant, name)
+        if tenant is None:
+            raise LookupError(f"Mandant '{name}' nicht gefunden")
+        source_shard = tenant.shard
+    if source_shard == target_shard:
+        return {}
+
+    source, target = registry.engine(source_shard), registry.engine(target_shard)
+    id_maps, counts = {}, {}
+    with source.connect() as src, target.begin() as dst:
+        for model, parents in TENANT_TABLES:
+            table = model.__table__
+            id_map = id_maps[model] = {}
+            for rows in _tenant_rows(src, table, name, parents, id_maps, batch_size):
+                old_ids = [row.pop("id") for row in rows]
+                for row in rows:
+                    for column, parent in parents.items():
+                        if row[column] is not None:
+                            row[column] = id_maps[parent].get(row[column])
+                    if model is models.ListColumn:
+                        # Ablenker-Kandidaten werden nicht mitkopiert, im Ziel neu berechnen
+                        row["distractors_ready"] = None
+                    if model is models.VocabEntry and row.get("data"):
+                        columns = id_maps[models.ListColumn]
+                        row["data"] = {str(columns.get(int(k), k)): v for k, v in row["data"].items()}
+                new_ids = dst.execute(
+                    insert(table).returning(table.c.id, sort_by_parameter_order=True), rows
+                ).scalars().all()
+                id_map.update(zip(old_ids, new_ids))
+            counts[table.name] = len(id_map)
+            if progress:
+                progress(table.name, len(id_map))
+
+    with database.SessionLocal() as directory:
+        directory.get(models.Tenant, name).shard = target_shard
+        directory.commit()
+    registry.forget(name)
+    bus.bus.publish("tenant", name=name)
+    # Tokens und Refresh-Tokens enthalten die alten IDs
+    revocation.revoke_users(id_maps[models.User], name)
+
+    with source.begin() as src:
+        column_ids = sorted(id_maps[models.ListColumn])
+        for start in range(0, len(column_ids), batch_size):
+            src.execute(delete(models.DistractorCandidate.__table__).where(
+                models.DistractorCandidate.column_id.in_(column_ids[start:start + batch_size])
+            ))
+        for model, _ in reversed(TENANT_TABLES):
+            ids = sorted(id_maps[model])
+            for start in range(0, len(ids), batch_size):
+                src.execute(delete(model.__table__).where(model.__table__.c.id.in_(ids[start:start + batch_size])))
+    return counts
+
+
+def _tenant_rows(conn, table, tenant, parents, id_maps, batch_size):
+    """Zeilen eines Mandanten in Batches: Benutzer über users.tenant, alles andere über den ersten Elternschlüssel."""
+    if not parents:
+        result = conn.execution_options(yield_per=batch_size).execute(
+            select(table).where(table.c.tenant == tenant).order_by(table.c.id)
+        )
+        for partition in result.partitions():
+            yield [dict(row._mapping) for row in partition]
+        return
+    column, parent = next(iter(parents.items()))
+    parent_ids = sorted(id_maps[parent])
+    for start in range(0, len(parent_ids), batch_size):
+        chunk = parent_ids[start:start + batch_size]
+        rows = conn.execute(select(table).where(table.c[column].in_(chunk)).order_by(table.c.id)).all()
+        if rows:
+            yield [dict(row._mapping) for row in rows]
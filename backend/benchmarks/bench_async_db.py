@@ -0,0 +1,67 @@
+"""
+Benchmark: sync-Routen (Threadpool) vs. Async-DB-Pfad (ASYNC_DB=1) unter steigender Parallelität.
+
+Startet uvicorn zweimal auf derselben Wegwerf-Datenbank und fährt das
+Szenario "list_open" mit wachsender Zahl gleichzeitiger Clients. Der
+sync-Pfad ist durch den Starlette-Threadpool (40 Threads) begrenzt,
+darüber stauen sich Requests; der Async-Pfad hält keinen Thread pro
+wartendem Request.
+
+Aufruf aus dem backend-Verzeichnis:
+    python -m benchmarks.bench_async_db --levels 25,100,250,500 --duration 10
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+
+from sqlalchemy import create_engine
+
+from app import migrations
+from app.database import Base
+from benchmarks import dataset, loadtest
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--lists", type=int, default=3)
+    parser.add_argument("--entries", type=int, default=100)
+    parser.add_argument("--levels", default="25,100,250")
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args()
+    levels = [int(x) for x in args.levels.split(",")]
+
+    rows = []
+    with tempfile.TemporaryDirectory() as workdir:
+        engine = create_engine(f"sqlite:///{os.path.join(workdir, 'vokabeln.db')}")
+        Base.metadata.create_all(bind=engine)
+        migrations.upgrade(engine)
+        seeded = dataset.seed(engine, users=args.users, lists=args.lists, columns=3, entries=args.entries)
+        engine.dispose()
+
+        for label, env in (("sync", {"ASYNC_DB": "0"}), ("async", {"ASYNC_DB": "1"})):
+            port = loadtest.free_port()
+            base_url = f"http://127.0.0.1:{port}"
+            server = loadtest.start_server(workdir, port, 1, extra_env=env)
+            try:
+                users = asyncio.run(loadtest.login_all(base_url, args.users, seeded))
+                for level in levels:
+                    print(f"[{label}] {level} Clients ...", flush=True)
+                    rec = loadtest.Recorder()
+                    elapsed = asyncio.run(loadtest.run_scenario("list_open", base_url, users, level, args.duration, rec, 1))
+                    samples = sorted(s for values in rec.samples.values() for s in values)
+                    errors = sum(rec.errors.values())
+                    rows.append((label, level, len(samples) / elapsed, loadtest.percentile(samples, 50),
+                                 loadtest.percentile(samples, 99), errors))
+            finally:
+                server.terminate()
+                server.wait(timeout=10)
+
+    print(f"\n{'path':<6} {'clients':>8} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>9} {'errors':>7}")
+    for label, level, rps, p50, p99, errors in rows:
+        print(f"{label:<6} {level:>8} {rps:>8.1f} {p50:>8.1f} {p99:>9.1f} {errors:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Benchmark: API-Latenz während eines Online-Backups einer großen Datenbank.
+
+Legt eine Wegwerf-Datenbank an (benchmarks.dataset + Füll-Tabelle bis
+--size-mb), startet uvicorn darauf und misst "list_open" (Lesen) und
+"inline_edit" (Schreiben) zuerst ohne Backup, dann während Backups mit
+verschiedenen Schrittgrößen (--pages, -1 = alles in einem Schritt).
+Gebremst wird jeweils nur durch die Sperre eines einzelnen Schritts.
+
+Braucht dieselbe Umgebung wie die App (SECRET_KEY, ALGORITHM, ...).
+
+Aufruf aus dem backend-Verzeichnis:
+    python -m benchmarks.bench_backup --size-mb 2048 --pages 256,1024,-1 --duration 30
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import threading
+
+from sqlalchemy import create_engine, text
+
+from app import backup, migrations
+from app.database import Base
+from benchmarks import dataset, loadtest
+
+SCENARIOS = ("list_open", "inline_edit")
+
+
+def pad(engine, size_mb):
+    """Füllt die Datenbank mit Zufalls-Blobs (in SQLite erzeugt) bis etwa size_mb."""
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE IF NOT EXISTS bench_padding (id INTEGER PRIMARY KEY, blob BLOB)"))
+        blobs = size_mb * 16  # 64 KB pro Zeile
+        for start in range(0, blobs, 1024):
+            conn.execute(text(
+                "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < :count) "
+                "INSERT INTO bench_padding (blob) SELECT randomblob(65536) FROM n"
+            ), {"count": min(1024, blobs - start)})
+
+
+def measure(base_url, users, concurrency, duration):
+    rec = loadtest.Recorder()
+
+    async def run():
+        return await asyncio.gather(*(
+            loadtest.run_scenario(name, base_url, users, concurrency, duration, rec, 1) for name in SCENARIOS
+        ))
+
+    asyncio.run(run())
+    return {
+        name: sorted(s for key, values in rec.samples.items() if key.startswith(name) for s in values)
+        for name in SCENARIOS
+    }, sum(rec.errors.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=2048)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--entries", type=int, default=200)
+    parser.add_argument("--pages", default="256,1024,-1")
+    parser.add_argument("--sleep", type=float, default=0.05)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=30.0)
+    args = parser.parse_args()
+
+    rows = []
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "vokabeln.db")
+        engine = create_engine(f"sqlite:///{path}")
+        Base.metadata.create_all(bind=engine)
+        migrations.upgrade(engine)
+        seeded = dataset.seed(engine, users=args.users, lists=2, columns=3, entries=args.entries)
+        print(f"Fülle Datenbank auf ~{args.size_mb} MB ...", flush=True)
+        pad(engine, args.size_mb)
+        engine.dispose()
+        print(f"Datenbank: {os.path.getsize(path) / 1024 / 1024:.0f} MB", flush=True)
+
+        port = loadtest.free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        server = loadtest.start_server(workdir, port, 1)
+        try:
+            users = asyncio.run(loadtest.login_all(base_url, args.users, seeded))
+            latencies, errors = measure(base_url, users, args.concurrency, args.duration)
+            rows.append(("ohne Backup", latencies, errors, []))
+
+            for pages in (int(p) for p in args.pages.split(",")):
+                print(f"Backup mit {pages} Seiten/Schritt ...", flush=True)
+                stop = threading.Event()
+                runs = []
+
+                def backup_loop():
+                    with tempfile.TemporaryDirectory() as target:
+                        while not stop.is_set():
+                            runs.append(backup.backup_file(path, target, "bench", pages=pages, sleep=args.sleep, keep=1))
+
+                thread = threading.Thread(target=backup_loop)
+                thread.start()
+                latencies, errors = measure(base_url, users, args.concurrency, args.duration)
+                stop.set()
+                thread.join()
+                rows.append((f"pages={pages}", latencies, errors, runs))
+        finally:
+            server.terminate()
+            server.wait(timeout=10)
+
+    print(f"\n{'Lauf':<14} {'read p50':>9} {'read p99':>9} {'write p50':>10} {'write p99':>10} {'err':>5} "
+          f"{'backups':>8} {'Ø s':>7} {'Neustarts':>10}")
+    for label, latencies, errors, runs in rows:
+        read, write = latencies["list_open"], latencies["inline_edit"]
+        seconds = sum(r.seconds for r in runs) / len(runs) if runs else 0.0
+        print(f"{label:<14} {loadtest.percentile(read, 50):>9.1f} {loadtest.percentile(read, 99):>9.1f} "
+              f"{loadtest.percentile(write, 50):>10.1f} {loadtest.percentile(write, 99):>10.1f} {errors:>5} "
+              f"{len(runs):>8} {seconds:>7.1f} {sum(r.restarts for r in runs):>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Benchmark: CPU-Kosten vs. gesparte Bytes für die API-Komprimierung.
+
+Erzeugt eine typische Antwort von GET /api/vocab/entries/list/{id}
+(N Einträge × M Spalten) und komprimiert sie mit allen gzip-Levels und
+brotli-Qualitäten (falls installiert). Auf dem Pi ausführen, um
+COMPRESSION_GZIP_LEVEL / COMPRESSION_BROTLI_QUALITY zu wählen.
+
+Aufruf aus dem backend-Verzeichnis:
+    python -m benchmarks.bench_compression --entries 2000 --columns 3
+"""
+import argparse
+import json
+import random
+import time
+import zlib
+
+from app.compression import brotli
+from benchmarks.dataset import ALPHABET
+
+
+def payload(n_entries, n_columns, seed_value=42):
+    rnd = random.Random(seed_value)
+    entries = []
+    for entry_id in range(1, n_entries + 1):
+        entries.append({
+            "id": entry_id,
+            "vocab_list_id": 1,
+            "position": entry_id - 1,
+            "field_values": [
+                {"column_id": c + 1, "value": "".join(rnd.choices(ALPHABET, k=rnd.randint(4, 14))),
+                 "id": entry_id * n_columns + c, "entry_id": entry_id}
+                for c in range(n_columns)
+            ],
+        })
+    return json.dumps(entries, separators=(",", ":")).encode()
+
+
+def measure(compress, data, rounds):
+    best = None
+    for _ in range(rounds):
+        start = time.process_time()
+        out = compress(data)
+        cpu = time.process_time() - start
+        best = cpu if best is None else min(best, cpu)
+    return len(out), best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=2000)
+    parser.add_argument("--columns", type=int, default=3)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    data = payload(args.entries, args.columns)
+    mb = len(data) / 1024 / 1024
+    print(f"Payload: {len(data) / 1024:.1f} KB\n")
+    print(f"{'codec':<12} {'KB':>8} {'ratio':>7} {'CPU ms':>8} {'ms/MB':>8} {'KB saved/ms':>12}")
+
+    candidates = [(f"gzip-{level}", lambda d, l=level: zlib.compress(d, l)) for level in range(1, 10)]
+    if brotli is not None:
+        candidates += [(f"br-{q}", lambda d, q=q: brotli.compress(d, quality=q)) for q in range(0, 12)]
+    else:
+        print("(brotli nicht installiert – nur gzip)")
+
+    for name, compress in candidates:
+        size, cpu = measure(compress, data, args.rounds)
+        cpu_ms = cpu * 1000
+        saved_kb = (len(data) - size) / 1024
+        print(f"{name:<12} {size / 1024:>8.1f} {len(data) / size:>6.1f}x {cpu_ms:>8.2f} {cpu_ms / mb:>8.2f} "
+              f"{saved_kb / cpu_ms if cpu_ms else float('inf'):>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Benchmark: EAV (entry_field_values) vs. JSON-Dokument (vocab_entries.data).
+
+Legt pro Speichermodus eine Wegwerf-SQLite-Datenbank mit synthetischen Daten an
+und misst Lesen (Liste öffnen inkl. Serialisierung), Schreiben (crud.create_vocab_entry)
+und Dateigröße.
+
+Aufruf aus dem backend-Verzeichnis:
+    python -m benchmarks.bench_entry_storage --entries 100000 --lists 50 --columns 4
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app import config, crud, schemas
+from app.database import Base
+from benchmarks import dataset
+
+
+def bench_mode(mode, args, workdir):
+    path = os.path.join(workdir, f"{mode}.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    config.ENTRY_STORAGE = mode
+
+    t0 = time.perf_counter()
+    dataset.seed(engine, users=1, lists=args.lists, columns=args.columns,
+                 entries=args.entries // args.lists, entry_storage=mode)
+    seed_s = time.perf_counter() - t0
+
+    rnd = random.Random(7)
+    read_ms = []
+    for _ in range(args.reads):
+        list_id = rnd.randint(1, args.lists)
+        db = Session()
+        t0 = time.perf_counter()
+        entries = crud.get_vocab_list_entries(db, list_id)
+        [schemas.VocabEntry.model_validate(e).model_dump() for e in entries]
+        read_ms.append((time.perf_counter() - t0) * 1000)
+        db.close()
+
+    write_ms = []
+    db = Session()
+    for i in range(args.writes):
+        list_id = rnd.randint(1, args.lists)
+        item = schemas.VocabEntryCreate(vocab_list_id=list_id, field_values=[
+            schemas.EntryFieldValueCreate(column_id=(list_id - 1) * args.columns + c + 1, value=f"wort{i}-{c}")
+            for c in range(args.columns)
+        ])
+        t0 = time.perf_counter()
+        crud.create_vocab_entry(db, item)
+        write_ms.append((time.perf_counter() - t0) * 1000)
+    db.close()
+
+    with engine.connect() as conn:
+        conn.execute(text("VACUUM"))
+    engine.dispose()
+    size_mb = os.path.getsize(path) / 1024 / 1024
+
+    return {
+        "mode": mode,
+        "seed_s": seed_s,
+        "read_p50": statistics.median(read_ms),
+        "read_p95": statistics.quantiles(read_ms, n=20)[18] if len(read_ms) > 1 else read_ms[0],
+        "write_p50": statistics.median(write_ms),
+        "write_p95": statistics.quantiles(write_ms, n=20)[18] if len(write_ms) > 1 else write_ms[0],
+        "size_mb": size_mb,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=100_000)
+    parser.add_argument("--lists", type=int, default=50)
+    parser.add_argument("--columns", type=int, default=4)
+    parser.add_argument("--reads", type=int, default=30)
+    parser.add_argument("--writes", type=int, default=200)
+    parser.add_argument("--modes", default=",".join(config.ENTRY_STORAGE_MODES))
+    args = parser.parse_args()
+
+    original_mode = config.ENTRY_STORAGE
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for mode in args.modes.split(","):
+            print(f"[{mode}] seeding {args.entries} entries ...", flush=True)
+            results.append(bench_mode(mode, args, workdir))
+    config.ENTRY_STORAGE = original_mode
+
+    print()
+    print(f"{'mode':<6} {'seed s':>8} {'read p50':>10} {'read p95':>10} {'write p50':>10} {'write p95':>10} {'size MB':>9}")
+    for r in results:
+        print(f"{r['mode']:<6} {r['seed_s']:>8.1f} {r['read_p50']:>8.1f}ms {r['read_p95']:>8.1f}ms "
+              f"{r['write_p50']:>8.2f}ms {r['write_p95']:>8.2f}ms {r['size_mb']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
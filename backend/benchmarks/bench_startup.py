@@ -0,0 +1,134 @@
+"""
+Benchmark: Kaltstart der App (Import von app.main und Lifespan-Start).
+
+Jede Runde ist ein frischer Interpreter wie bei einem Neustart auf dem Pi.
+Gemessen werden der Import von app.main, der Lifespan-Start (Schema-Prüfung
+samt erster Verbindung), danach bei offener Verbindung die Schema-Prüfung
+allein und zum Vergleich create_all() + upgrade() mit Reflection aller
+Tabellen, wie es vorher bei jedem Import lief. Die erste Runde läuft gegen
+eine leere Datenbank (Schema wird angelegt), alle weiteren gegen die dann
+aktuelle.
+
+Mit --record wird das Ergebnis (Median) samt Commit an eine JSON-Lines-Datei
+angehängt und mit dem letzten Eintrag desselben Rechners verglichen, so
+lässt sich die Startzeit über Releases verfolgen.
+
+Aufruf aus dem backend-Verzeichnis:
+    python -m benchmarks.bench_startup --rounds 10 --record benchmarks/results/startup.jsonl
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parents[1]
+
+PROBE = """
+import asyncio, json, sys, time
+start = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+
+async def lifespan():
+    async with app.main.lifespan(app.main.app):
+        return time.perf_counter()
+
+started = asyncio.run(lifespan())
+from app import database, migrations
+check = time.perf_counter()
+migrations.ensure_schema(database.engine)
+checked = time.perf_counter()
+database.Base.metadata.create_all(bind=database.engine)
+migrations.upgrade(database.engine)
+reflected = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - start) * 1000,
+    "startup_ms": (started - imported) * 1000,
+    "check_ms": (checked - check) * 1000,
+    "reflect_ms": (reflected - checked) * 1000,
+    "modules": len(sys.modules),
+    "lazy": not any(name in sys.modules for name in ("jose", "passlib")),
+}))
+"""
+
+
+def probe(database_url: str) -> dict:
+    env = {
+        **os.environ,
+        "DATABASE_URL": database_url,
+        "JOB_WORKERS": "0",
+        "BACKUP_INTERVAL_MINUTES": "0",
+        "SECRET_KEY": os.environ.get("SECRET_KEY", "bench"),
+        "ALGORITHM": os.environ.get("ALGORITHM", "HS256"),
+    }
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=BACKEND, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"], cwd=BACKEND, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unbekannt"
+
+
+def record(path: Path, result: dict):
+    previous = None
+    if path.exists():
+        for line in path.read_text().splitlines():
+            entry = json.loads(line)
+            if entry.get("host") == result["host"]:
+                previous = entry
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("a") as f:
+        f.write(json.dumps(result) + "\n")
+    if previous:
+        for key in ("import_ms", "startup_ms"):
+            change = (result[key] - previous[key]) / previous[key] * 100 if previous[key] else 0
+            print(f"{key}: {previous[key]:.1f} -> {result[key]:.1f} ms ({change:+.1f} %) seit {previous['commit']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--database-url", help="Standard: frische SQLite-Datei in einem Temp-Verzeichnis")
+    parser.add_argument("--record", type=Path, help="Ergebnis an diese JSON-Lines-Datei anhängen")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.database_url or f"sqlite:///{Path(tmp) / 'startup.db'}"
+        cold = probe(url)
+        warm = [probe(url) for _ in range(args.rounds)]
+
+    keys = ("import_ms", "startup_ms", "check_ms", "reflect_ms")
+    print(f"{'':<14} {'import ms':>10} {'startup ms':>11} {'check ms':>9} {'reflect ms':>11} {'modules':>8}")
+    median = {key: statistics.median(r[key] for r in warm) for key in keys}
+    for label, row, modules in (("leere DB", cold, cold["modules"]), ("aktuelle (p50)", median, warm[0]["modules"])):
+        print(f"{label:<14} {row['import_ms']:>10.1f} {row['startup_ms']:>11.1f} {row['check_ms']:>9.1f} "
+              f"{row['reflect_ms']:>11.1f} {modules:>8}")
+    if not all(r["lazy"] for r in warm):
+        print("Warnung: jose/passlib werden schon beim Import geladen")
+
+    if args.record:
+        record(args.record, {
+            "commit": git_commit(),
+            "host": platform.node(),
+            "python": platform.python_version(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "rounds": args.rounds,
+            **{key: round(value, 1) for key, value in median.items()},
+        })
+
+
+if __name__ == "__main__":
+    main()
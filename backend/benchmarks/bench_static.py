@@ -0,0 +1,86 @@
+"""
+Benchmark: Erstaufruf der Seite (Bytes und Latenz), z.B. über den Cloudflare-Tunnel.
+
+Lädt index.html und alle darin referenzierten Assets je Accept-Encoding
+und zählt die tatsächlich übertragenen (komprimierten) Bytes. Danach ein
+zweiter "Wiederbesuch": index.html per If-None-Match, Assets mit
+"immutable" werden gar nicht erst angefragt.
+
+Aufruf aus dem backend-Verzeichnis:
+    python -m benchmarks.bench_static --url https://vocademy.example.org --rounds 5
+"""
+import argparse
+import re
+import statistics
+import time
+from urllib.parse import urljoin
+
+import httpx
+
+ASSET_RE = re.compile(r'(?:src|href)="(/[^"]+\.(?:js|css|svg|png|ico|woff2?))"')
+
+
+def fetch(client, url, headers):
+    start = time.perf_counter()
+    with client.stream("GET", url, headers=headers) as response:
+        body = b"".join(response.iter_raw())
+    return response, body, (time.perf_counter() - start) * 1000
+
+
+def first_load(client, base, encoding):
+    headers = {"Accept-Encoding": encoding}
+    start = time.perf_counter()
+    index, body, _ = fetch(client, base + "/", headers)
+    total_bytes = len(body)
+    if index.headers.get("content-encoding") is None:
+        html = body.decode("utf-8", "replace")
+    else:
+        # Für das Parsen unkomprimiert nachladen (nicht mitgezählt)
+        html = client.get(base + "/", headers={"Accept-Encoding": "identity"}).text
+    assets = sorted(set(ASSET_RE.findall(html)))
+    cacheable = []
+    for path in assets:
+        response, body, _ = fetch(client, urljoin(base + "/", path.lstrip("/")), headers)
+        total_bytes += len(body)
+        if "immutable" in response.headers.get("cache-control", ""):
+            cacheable.append(path)
+    elapsed = (time.perf_counter() - start) * 1000
+    return total_bytes, elapsed, assets, cacheable, index.headers.get("etag")
+
+
+def revisit(client, base, encoding, assets, cacheable, etag):
+    headers = {"Accept-Encoding": encoding}
+    start = time.perf_counter()
+    _, body, _ = fetch(client, base + "/", {**headers, **({"If-None-Match": etag} if etag else {})})
+    total_bytes = len(body)
+    for path in assets:
+        if path in cacheable:
+            continue  # Browser-Cache, kein Request
+        _, body, _ = fetch(client, urljoin(base + "/", path.lstrip("/")), headers)
+        total_bytes += len(body)
+    return total_bytes, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--encodings", default="identity,gzip,br")
+    args = parser.parse_args()
+    base = args.url.rstrip("/")
+
+    print(f"{'encoding':<10} {'first KB':>9} {'first ms p50':>13} {'revisit KB':>11} {'revisit ms p50':>15} {'assets':>7} {'immutable':>10}")
+    with httpx.Client(timeout=30) as client:
+        for encoding in args.encodings.split(","):
+            first_ms, revisit_ms = [], []
+            for _ in range(args.rounds):
+                first_bytes, ms, assets, cacheable, etag = first_load(client, base, encoding)
+                first_ms.append(ms)
+                revisit_bytes, ms = revisit(client, base, encoding, assets, cacheable, etag)
+                revisit_ms.append(ms)
+            print(f"{encoding:<10} {first_bytes / 1024:>9.1f} {statistics.median(first_ms):>13.1f} "
+                  f"{revisit_bytes / 1024:>11.1f} {statistics.median(revisit_ms):>15.1f} {len(assets):>7} {len(cacheable):>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Synthetische Testdaten für Benchmarks: users × lists × columns × entries.
+
+Schreibt direkt über Core-Inserts in eine (Wegwerf-)Datenbank, ohne die API.
+Alle Benutzer heißen bench<N> und haben das Passwort PASSWORD.
+"""
+import random
+
+from app import models
+from app.auth import hash_password
+
+PASSWORD = "bench-password"
+ALPHABET = "abcdefghijklmnopqrstuvwxyzäöüß"
+BATCH = 5000
+
+
+def _word(rnd):
+    return "".join(rnd.choices(ALPHABET, k=rnd.randint(4, 14)))
+
+
+def seed(engine, users=1, lists=1, columns=2, entries=100, entry_storage="eav", seed_value=42):
+    """
+    Legt `users` Benutzer mit je `lists` Listen à `columns` Spalten und
+    `entries` Einträgen an. `entry_storage` wie config.ENTRY_STORAGE.
+    Gibt die angelegten IDs zurück: lists[user], columns[list], entries[list].
+    """
+    rnd = random.Random(seed_value)
+    password = hash_password(PASSWORD)  # einmal hashen, pbkdf2 ist teuer
+
+    list_ids, column_ids, entry_ids = {}, {}, {}
+    with engine.begin() as conn:
+        conn.execute(models.User.__table__.insert(), [
+            {"id": u, "username": f"bench{u}", "email": f"bench{u}@example.com",
+             "password": password, "role": "User", "is_active": True}
+            for u in range(1, users + 1)
+        ])
+
+        list_rows, column_rows = [], []
+        for u in range(1, users + 1):
+            for l in range(lists):
+                list_id = (u - 1) * lists + l + 1
+                list_ids.setdefault(u, []).append(list_id)
+                list_rows.append({"id": list_id, "name": f"Liste {l + 1}", "user_id": u})
+                for c in range(columns):
+                    column_id = (list_id - 1) * columns + c + 1
+                    column_ids.setdefault(list_id, []).append(column_id)
+                    column_rows.append({
+                        "id": column_id, "vocab_list_id": list_id, "name": f"Spalte {c + 1}",
+                        "column_type": "custom", "position": c, "is_primary": c == 0,
+                    })
+        conn.execute(models.VocabList.__table__.insert(), list_rows)
+        conn.execute(models.ListColumn.__table__.insert(), column_rows)
+
+        entry_rows, value_rows = [], []
+        entry_id = 0
+        for list_id, cols in column_ids.items():
+            for position in range(entries):
+                entry_id += 1
+                entry_ids.setdefault(list_id, []).append(entry_id)
+                values = {str(c): _word(rnd) for c in cols}
+                entry_rows.append({
+                    "id": entry_id, "vocab_list_id": list_id, "position": position,
+                    "data": values if entry_storage != "eav" else None,
+                })
+                if entry_storage != "json":
+                    value_rows.extend({"entry_id": entry_id, "column_id": int(c), "value": v} for c, v in values.items())
+                if len(entry_rows) >= BATCH:
+                    _flush(conn, entry_rows, value_rows)
+        _flush(conn, entry_rows, value_rows)
+
+    return {"lists": list_ids, "columns": column_ids, "entries": entry_ids}
+
+
+def _flush(conn, entry_rows, value_rows):
+    if entry_rows:
+        conn.execute(models.VocabEntry.__table__.insert(), entry_rows)
+    if value_rows:
+        conn.execute(models.EntryFieldValue.__table__.insert(), value_rows)
+    entry_rows.clear()
+    value_rows.clear()
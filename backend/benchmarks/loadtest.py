@@ -0,0 +1,272 @@
+"""
+Reproduzierbarer Lasttest für die API.
+
+Legt eine Wegwerf-Datenbank mit synthetischen Daten an (benchmarks.dataset),
+startet uvicorn darauf und fährt realistische Abläufe mit mehreren
+virtuellen Benutzern gleichzeitig. Ausgegeben werden p50/p95/p99 und
+Durchsatz pro Endpoint; Ergebnisse lassen sich als Baseline speichern
+und später vergleichen (Exit-Code 1 bei Regression).
+
+Braucht dieselbe Umgebung wie die App (SECRET_KEY, ALGORITHM, ...).
+
+Aufruf aus dem backend-Verzeichnis:
+    python -m benchmarks.loadtest --users 20 --lists 5 --entries 300 --duration 15 \\
+        --save-baseline benchmarks/baselines/local.json
+    python -m benchmarks.loadtest --users 20 --lists 5 --entries 300 --duration 15 \\
+        --compare benchmarks/baselines/local.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+from sqlalchemy import create_engine
+
+from app import migrations
+from app.database import Base
+from benchmarks import dataset
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+SCENARIOS = ("dashboard", "list_open", "inline_edit", "quiz", "login_burst")
+
+
+# ============== Messung ==============
+class Recorder:
+    def __init__(self):
+        self.samples = {}  # "scenario METHOD route" -> [ms]
+        self.errors = {}
+
+    async def request(self, client, scenario, method, url, route, **kwargs):
+        key = f"{scenario} {method} {route}"
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+            ok = response.status_code < 400
+        except httpx.HTTPError:
+            response, ok = None, False
+        self.samples.setdefault(key, []).append((time.perf_counter() - start) * 1000)
+        if not ok:
+            self.errors[key] = self.errors.get(key, 0) + 1
+        return response
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(p / 100 * len(sorted_values))  # nearest-rank
+    return sorted_values[min(len(sorted_values), max(rank, 1)) - 1]
+
+
+# ============== Szenarien ==============
+# Jede Funktion entspricht einem Ablauf im Frontend.
+async def dashboard(rec, client, user, rnd):
+    await rec.request(client, "dashboard", "GET", "/api/me/", "/api/me/", headers=user["headers"])
+    await rec.request(client, "dashboard", "GET", "/api/vocablist/", "/api/vocablist/", headers=user["headers"])
+
+
+async def list_open(rec, client, user, rnd):
+    list_id = rnd.choice(user["lists"])
+    await rec.request(client, "list_open", "GET", f"/api/vocablist/{list_id}", "/api/vocablist/{id}", headers=user["headers"])
+    await rec.request(client, "list_open", "GET", f"/api/vocab/entries/list/{list_id}", "/api/vocab/entries/list/{id}", headers=user["headers"])
+
+
+async def inline_edit(rec, client, user, rnd):
+    entry_id = rnd.choice(user["entries"])
+    list_id = user["entry_list"][entry_id]
+    field_values = [{"column_id": c, "value": f"edit-{rnd.randint(0, 1_000_000)}"} for c in user["columns"][list_id]]
+    await rec.request(client, "inline_edit", "PUT", f"/api/vocab/entries/{entry_id}", "/api/vocab/entries/{id}",
+                      headers=user["headers"], json={"field_values": field_values})
+
+
+async def quiz(rec, client, user, rnd):
+    # VocabTest.tsx: Listen laden, dann je gewählter Liste Liste + Einträge parallel
+    await rec.request(client, "quiz", "GET", "/api/vocablist/", "/api/vocablist/", headers=user["headers"])
+    chosen = rnd.sample(user["lists"], min(3, len(user["lists"])))
+    await asyncio.gather(*(
+        coro for list_id in chosen for coro in (
+            rec.request(client, "quiz", "GET", f"/api/vocablist/{list_id}", "/api/vocablist/{id}", headers=user["headers"]),
+            rec.request(client, "quiz", "GET", f"/api/vocab/entries/list/{list_id}", "/api/vocab/entries/list/{id}", headers=user["headers"]),
+        )
+    ))
+
+
+async def login_burst(rec, client, user, rnd):
+    await rec.request(client, "login_burst", "POST", "/api/login/", "/api/login/",
+                      data={"username": user["username"], "password": dataset.PASSWORD})
+
+
+# ============== Ablauf ==============
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(workdir, port, workers, extra_env=None):
+    env = dict(os.environ)
+    # Alle virtuellen Benutzer kommen von 127.0.0.1 – das Login-Limit würde login_burst nur noch 429 liefern
+    env.setdefault("RATE_LIMIT_ENABLED", "0")
+    env.update(extra_env or {})
+    env["PYTHONPATH"] = str(BACKEND_DIR) + os.pathsep + env.get("PYTHONPATH", "")
+    # Die Datenbank-URL ist relativ (./vokabeln.db) -> cwd bestimmt die Datenbank
+    cmd = [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+           "--port", str(port), "--workers", str(workers), "--log-level", "warning"]
+    proc = subprocess.Popen(cmd, cwd=workdir, env=env)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/api/health", timeout=1).status_code == 200:
+                return proc
+        except httpx.HTTPError:
+            pass
+        if proc.poll() is not None:
+            break
+        time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("uvicorn ist nicht gestartet")
+
+
+async def login_all(base_url, n_users, seeded):
+    users = []
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        for u in range(1, n_users + 1):
+            username = f"bench{u}"
+            response = await client.post("/api/login/", data={"username": username, "password": dataset.PASSWORD})
+            response.raise_for_status()
+            lists = seeded["lists"][u]
+            entry_list = {e: l for l in lists for e in seeded["entries"].get(l, [])}
+            users.append({
+                "username": username,
+                "headers": {"Authorization": f"Bearer {response.json()['access_token']}"},
+                "lists": lists,
+                "columns": {l: seeded["columns"][l] for l in lists},
+                "entries": list(entry_list),
+                "entry_list": entry_list,
+            })
+    return users
+
+
+async def run_scenario(name, base_url, users, concurrency, duration, rec, seed_value):
+    scenario = globals()[name]
+    stop_at = time.perf_counter() + duration
+
+    async def virtual_user(vu):
+        rnd = random.Random(seed_value * 1000 + vu)
+        async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+            while time.perf_counter() < stop_at:
+                await scenario(rec, client, rnd.choice(users), rnd)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(virtual_user(vu) for vu in range(concurrency)))
+    return time.perf_counter() - start
+
+
+def summarize(rec, elapsed):
+    results = {}
+    for key, samples in sorted(rec.samples.items()):
+        values = sorted(samples)
+        scenario = key.split(" ", 1)[0]
+        results[key] = {
+            "count": len(values),
+            "errors": rec.errors.get(key, 0),
+            "rps": len(values) / elapsed[scenario],
+            "p50": percentile(values, 50),
+            "p95": percentile(values, 95),
+            "p99": percentile(values, 99),
+        }
+    return results
+
+
+def print_report(results):
+    print(f"\n{'endpoint':<52} {'n':>6} {'err':>5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for key, r in results.items():
+        print(f"{key:<52} {r['count']:>6} {r['errors']:>5} {r['rps']:>8.1f} {r['p50']:>8.1f} {r['p95']:>8.1f} {r['p99']:>8.1f}")
+
+
+def compare(results, baseline, tolerance):
+    """Gibt die Endpoints zurück, deren p95 um mehr als `tolerance` schlechter ist."""
+    regressions = []
+    for key, old in baseline["results"].items():
+        new = results.get(key)
+        if new and new["p95"] > old["p95"] * (1 + tolerance):
+            regressions.append((key, old["p95"], new["p95"]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--lists", type=int, default=5, help="Listen pro Benutzer")
+    parser.add_argument("--columns", type=int, default=3, help="Spalten pro Liste")
+    parser.add_argument("--entries", type=int, default=200, help="Einträge pro Liste")
+    parser.add_argument("--entry-storage", default="eav")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=8, help="virtuelle Benutzer pro Szenario")
+    parser.add_argument("--duration", type=float, default=10.0, help="Sekunden pro Szenario")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--save-baseline", metavar="PATH")
+    parser.add_argument("--compare", metavar="PATH")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="erlaubte p95-Verschlechterung (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    scenarios = [s for s in args.scenarios.split(",") if s]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unbekannte Szenarien: {', '.join(sorted(unknown))}")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        engine = create_engine(f"sqlite:///{os.path.join(workdir, 'vokabeln.db')}")
+        Base.metadata.create_all(bind=engine)
+        migrations.upgrade(engine)
+        print(f"Seeding {args.users}×{args.lists} Listen × {args.columns} Spalten × {args.entries} Einträge ...", flush=True)
+        seeded = dataset.seed(engine, users=args.users, lists=args.lists, columns=args.columns,
+                              entries=args.entries, entry_storage=args.entry_storage, seed_value=args.seed)
+        engine.dispose()
+
+        port = free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        server = start_server(workdir, port, args.workers)
+        try:
+            users = asyncio.run(login_all(base_url, args.users, seeded))
+            rec = Recorder()
+            elapsed = {}
+            for name in scenarios:
+                print(f"Szenario {name} ({args.concurrency} VUs, {args.duration:.0f}s) ...", flush=True)
+                elapsed[name] = asyncio.run(run_scenario(name, base_url, users, args.concurrency, args.duration, rec, args.seed))
+        finally:
+            server.terminate()
+            server.wait(timeout=10)
+
+    results = summarize(rec, elapsed)
+    print_report(results)
+
+    if args.save_baseline:
+        Path(args.save_baseline).parent.mkdir(parents=True, exist_ok=True)
+        meta = {k: v for k, v in vars(args).items() if k not in ("save_baseline", "compare")}
+        Path(args.save_baseline).write_text(json.dumps({"meta": meta, "results": results}, indent=2))
+        print(f"\nBaseline gespeichert: {args.save_baseline}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\nRegressionen (p95 > +{args.tolerance:.0%}):")
+            for key, old, new in regressions:
+                print(f"  {key}: {old:.1f} ms -> {new:.1f} ms")
+            return 1
+        print("\nKeine Regressionen gegenüber der Baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
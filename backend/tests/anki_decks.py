@@ -0,0 +1,40 @@
+"""Anki-Pakete (.apkg) für die Tests von Import und Hintergrund-Jobs."""
+import io
+import json
+import sqlite3
+import zipfile
+
+BASIC, REVERSED = 1001, 1002
+
+
+def apkg(tmp_path, notes, schema18=False, member="collection.anki2"):
+    """Minimale Anki-Sammlung: notes (mid, flds), cards (did), Notiztypen/Decks als JSON oder Tabellen."""
+    path = tmp_path / f"collection-{len(list(tmp_path.iterdir()))}.sqlite"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE col (models TEXT, decks TEXT)")
+    conn.execute("CREATE TABLE notes (id INTEGER PRIMARY KEY, mid INTEGER, flds TEXT)")
+    conn.execute("CREATE TABLE cards (id INTEGER PRIMARY KEY, nid INTEGER, did INTEGER)")
+    types = {BASIC: ["Vorderseite", "Rückseite"], REVERSED: ["Front", "Back", "Extra"]}
+    if schema18:
+        conn.execute("INSERT INTO col VALUES ('', '')")
+        conn.execute("CREATE TABLE fields (ntid INTEGER, ord INTEGER, name TEXT)")
+        conn.execute("CREATE TABLE decks (id INTEGER PRIMARY KEY, name TEXT)")
+        conn.executemany("INSERT INTO fields VALUES (?, ?, ?)",
+                         [(mid, i, name) for mid, names in types.items() for i, name in enumerate(names)])
+        conn.execute("INSERT INTO decks VALUES (7, ?)", ("Englisch\x1fUnit 1",))
+    else:
+        models_json = {str(mid): {"flds": [{"name": n, "ord": i} for i, n in reversed(list(enumerate(names)))]}
+                       for mid, names in types.items()}
+        conn.execute("INSERT INTO col VALUES (?, ?)", (json.dumps(models_json), json.dumps({"7": {"name": "Englisch::Unit 1"}})))
+    for i, (mid, fields) in enumerate(notes, start=1):
+        conn.execute("INSERT INTO notes VALUES (?, ?, ?)", (i, mid, "\x1f".join(fields)))
+        conn.execute("INSERT INTO cards VALUES (?, ?, 7)", (i, i))
+    conn.commit()
+    conn.close()
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.write(path, member)
+        archive.writestr("media", "{}")
+    buffer.seek(0)
+    return buffer
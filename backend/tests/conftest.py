@@ -1,11 +1,23 @@
+import os
 import pytest
+from fastapi import FastAPI
 from fastapi.testclient import TestClient
+from app import crud, database, models, schemas
+from app.auth import create_access_token
 from app.main import app
 
+@pytest.fixture(autouse=True)
+def _reset_rate_limits():
+    """Login-Buckets nicht über Tests hinweg teilen (alle Requests kommen von "testclient")."""
+    from app import ratelimit
+    ratelimit.backend.reset()
+
+
 @pytest.fixture(scope="session")
 def client():
-    """Erzeugt einen globalen TestClient für alle Tests."""
-    return TestClient(app)
+    """Erzeugt einen globalen TestClient für alle Tests (mit Lifespan: Schema, Hintergrund-Threads)."""
+    with TestClient(app) as test_client:
+        yield test_client
 
 
 @pytest.fixture(scope="session")
@@ -30,3 +42,106 @@ def auth_headers(client):
     assert token, "Kein Token erhalten!"
 
     return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture()
+def db():
+    """
+    Eigene Datenbank pro Test (unabhängig von vokabeln.db).
+
+    Standard ist SQLite in-memory. Mit TEST_DATABASE_URL (z.B. eine leere
+    PostgreSQL-Datenbank aus deploy/postgres) laufen die Tests gegen diese;
+    die Tabellen werden dort pro Test neu angelegt.
+    """
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+    from app.database import Base
+
+    url = os.getenv("TEST_DATABASE_URL")
+    if url:
+        engine = create_engine(url)
+        Base.metadata.drop_all(bind=engine)
+    else:
+        engine = create_engine(
+            "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+        )
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+# ============== Mini-Apps und Testdaten ==============
+@pytest.fixture()
+def bearer():
+    """Authorization-Header ohne Login: bearer(user) oder bearer(user_id) für fremde IDs."""
+    def make(user, role="User"):
+        if isinstance(user, int):
+            claims = {"sub": f"user{user}", "uid": user, "role": role}
+        else:
+            claims = {"sub": user.username, "uid": user.id, "role": role}
+        return {"Authorization": f"Bearer {create_access_token(claims)}"}
+    return make
+
+
+@pytest.fixture()
+def api_client(request, bearer):
+    """
+    api_client(*routers): TestClient einer App nur mit diesen Routern unter /api.
+
+    get_db ersetzt database.get_db (Standard: die Session aus dem db-Fixture),
+    mit user schicken alle Requests dessen Token mit. Weitere Routen oder
+    Middleware über client.app vor dem ersten Request.
+    """
+    def make(*routers, get_db=None, user=None):
+        if get_db is None:
+            session = request.getfixturevalue("db")
+            get_db = lambda: session
+        test_app = FastAPI()
+        for router in routers:
+            test_app.include_router(router, prefix="/api")
+        test_app.dependency_overrides[database.get_db] = get_db
+        test_client = TestClient(test_app)
+        if user is not None:
+            test_client.headers.update(bearer(user))
+        return test_client
+    return make
+
+
+@pytest.fixture()
+def add_entry():
+    """add_entry(db, vocab_list, *values): Eintrag mit den Werten in Spaltenreihenfolge."""
+    def add(db, vocab_list, *values, **kwargs):
+        return crud.create_vocab_entry(db, schemas.VocabEntryCreate(vocab_list_id=vocab_list.id, field_values=[
+            schemas.EntryFieldValueCreate(column_id=column.id, value=value)
+            for column, value in zip(vocab_list.columns, values)
+        ]), **kwargs)
+    return add
+
+
+@pytest.fixture()
+def make_list(add_entry):
+    """
+    make_list(db, ...): Liste "Unit 1" mit den Spalten columns (primary ist
+    die Hauptspalte, None für keine) und einem Eintrag pro Zeile in rows.
+    Ohne user gehört sie einem neu angelegten "lehrer".
+    """
+    def make(db, user=None, rows=(), columns=("Deutsch", "Englisch"), primary=0, name="Unit 1", description=None):
+        if user is None:
+            user = models.User(username="lehrer", email="lehrer@example.com", password="x")
+            db.add(user)
+            db.commit()
+        vocab_list = crud.create_vocab_list(db, schemas.VocabListCreate(
+            name=name, description=description, columns=[
+                schemas.ListColumnCreate(name=column, position=i, is_primary=i == primary)
+                for i, column in enumerate(columns)
+            ]
+        ), user.id)
+        for row in rows:
+            add_entry(db, vocab_list, *row)
+        return vocab_list
+    return make
@@ -0,0 +1,109 @@
+import io
+import zipfile
+
+import pytest
+
+from anki_decks import BASIC, REVERSED, apkg
+from app import anki, config, crud, models, schemas
+from app.routes import vocablist
+
+
+@pytest.fixture()
+def user(db):
+    user = models.User(username="anna", email="anna@example.com", password="x")
+    db.add(user)
+    db.commit()
+    return user
+
+
+def _values(db, list_id):
+    names = {c.id: c.name for c in db.query(models.ListColumn).filter_by(vocab_list_id=list_id)}
+    result = []
+    for entry in sorted(crud.get_vocab_list_entries(db, list_id), key=lambda e: e.position):
+        entry = schemas.VocabEntry.model_validate(entry)
+        result.append({names[f.column_id]: f.value for f in entry.field_values})
+    return result
+
+
+def _break_long_fields(deck):
+    """Überlaufseiten langer Feldwerte zerstören: mid/Anzahl bleiben lesbar, erst SELECT flds scheitert."""
+    with zipfile.ZipFile(deck) as archive:
+        data = bytearray(archive.read("collection.anki2"))
+    page_size = int.from_bytes(data[16:18], "big")
+    broken = 0
+    for start in range(page_size, len(data), page_size):
+        if data[start + 4:start + page_size] == b"y" * (page_size - 4):
+            data[start:start + 4] = b"\xff" * 4  # Zeiger auf die nächste Überlaufseite
+            broken += 1
+    assert broken
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("collection.anki2", bytes(data))
+    buffer.seek(0)
+    return buffer
+
+
+@pytest.mark.parametrize("storage", ["eav", "dual", "json"])
+@pytest.mark.parametrize("schema18", [False, True], ids=["legacy", "schema18"])
+def test_import_maps_fields_and_notes(db, user, tmp_path, monkeypatch, storage, schema18):
+    monkeypatch.setattr(config, "ENTRY_STORAGE", storage)
+    monkeypatch.setattr(config, "ANKI_IMPORT_BATCH_SIZE", 2)
+    deck = apkg(tmp_path, [
+        (BASIC, ["<b>laufen</b>", "to run&nbsp;[sound:run.mp3]"]),
+        (BASIC, ["Haus", "house<br>building"]),
+        (REVERSED, ["Baum", "tree", "extra"]),
+    ], schema18=schema18)
+
+    result = anki.import_deck(db, deck, user.id)
+    assert (result["name"], result["notes"]) == ("Unit 1", 3)
+    assert [c.name for c in result["columns"]] == ["Vorderseite", "Rückseite"]
+    assert _values(db, result["vocab_list_id"]) == [
+        {"Vorderseite": "laufen", "Rückseite": "to run"},
+        {"Vorderseite": "Haus", "Rückseite": "house\nbuilding"},
+        {"Vorderseite": "Baum", "Rückseite": "tree"},
+    ]
+
+
+def test_route_rejects_invalid_uploads_and_cleans_up(db, user, tmp_path, monkeypatch, api_client):
+    client = api_client(vocablist.router, user=user)
+
+    response = client.post("/api/vocablist/import/anki", files={"file": ("deck.apkg", b"kein zip")})
+    assert response.status_code == 400
+
+    newer = apkg(tmp_path, [(BASIC, ["a", "b"])], member="collection.anki21b")
+    monkeypatch.setattr(anki, "zstandard", None)
+    response = client.post("/api/vocablist/import/anki", files={"file": ("deck.apkg", newer.getvalue())})
+    assert response.status_code == 400 and "älterer Versionen" in response.json()["detail"]
+
+    monkeypatch.setattr(config, "ANKI_MAX_NOTES", 1)
+    deck = apkg(tmp_path, [(BASIC, ["a", "b"]), (BASIC, ["c", "d"])])
+    response = client.post("/api/vocablist/import/anki", files={"file": ("deck.apkg", deck.getvalue())})
+    assert response.status_code == 400
+
+    corrupt = _break_long_fields(apkg(tmp_path, [(BASIC, ["a", "y" * 20000])]))
+    response = client.post("/api/vocablist/import/anki", files={"file": ("deck.apkg", corrupt.getvalue())})
+    assert response.status_code == 400 and response.json()["detail"] == "Anki-Sammlung ist beschädigt"
+    assert db.query(models.VocabList).count() == 0
+
+    monkeypatch.setattr(config, "ANKI_MAX_NOTES", 100)
+    monkeypatch.setattr(config, "ANKI_IMPORT_BATCH_SIZE", 1)
+    calls = []
+
+    def fail_second_batch(*args):
+        calls.append(1)
+        if len(calls) == 2:
+            raise RuntimeError("Platte voll")
+        return original(*args)
+
+    original = anki._insert_notes
+    monkeypatch.setattr(anki, "_insert_notes", fail_second_batch)
+    with pytest.raises(RuntimeError):
+        client.post("/api/vocablist/import/anki", files={"file": ("deck.apkg", deck.getvalue())})
+    assert db.query(models.VocabList).count() == 0
+    assert db.query(models.VocabEntry).count() == 0
+
+    monkeypatch.setattr(anki, "_insert_notes", original)
+    response = client.post("/api/vocablist/import/anki", data={"name": "Meine Karten"},
+                           files={"file": ("deck.apkg", deck.getvalue())})
+    assert response.status_code == 200
+    assert (response.json()["name"], response.json()["notes"]) == ("Meine Karten", 2)
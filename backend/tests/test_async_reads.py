@@ -0,0 +1,62 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+
+from app import database
+from app.auth import create_access_token
+from app.database import Base
+from app.routes import async_reads
+from benchmarks import dataset
+
+pytest.importorskip("aiosqlite")
+
+
+@pytest.fixture()
+def client(tmp_path, monkeypatch):
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    path = tmp_path / "async.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    dataset.seed(engine, users=2, lists=2, columns=2, entries=5)
+    engine.dispose()
+
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    sessions = async_sessionmaker(async_engine, expire_on_commit=False)
+    # Gemeinsame Ladevorgänge (singleflight) öffnen eigene Sessions
+    monkeypatch.setattr(database, "AsyncSessionLocal", sessions)
+
+    async def override():
+        async with sessions() as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(async_reads.router, prefix="/api")
+    app.dependency_overrides[database.get_async_db] = override
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def _headers(username):
+    return {"Authorization": f"Bearer {create_access_token({'sub': username})}"}
+
+
+def test_async_list_reads(client):
+    lists = client.get("/api/vocablist/", headers=_headers("bench1"))
+    assert lists.status_code == 200
+    assert [l["id"] for l in lists.json()] == [1, 2]
+    assert len(lists.json()[0]["entries"][0]["field_values"]) == 2
+
+    entries = client.get("/api/vocab/entries/list/1", headers=_headers("bench1"))
+    assert len(entries.json()) == 5
+
+    me = client.get("/api/me/", headers=_headers("bench1"))
+    assert me.json()["username"] == "bench1"
+    assert len(me.json()["lists"]) == 2
+
+
+def test_async_reads_check_ownership(client):
+    assert client.get("/api/vocablist/1", headers=_headers("bench2")).status_code == 403
+    assert client.get("/api/vocablist/99", headers=_headers("bench1")).status_code == 404
+    assert client.get("/api/vocab/entries/1", headers=_headers("bench2")).status_code == 403
@@ -0,0 +1,81 @@
+import base64
+import io
+
+import pytest
+from fastapi import HTTPException
+from PIL import Image
+
+from app import avatars, config, crud, models, schemas
+from app.routes import avatars as avatar_routes, user
+
+
+def _png(width=300, height=200, color=(200, 30, 30)):
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), color).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+@pytest.fixture()
+def client(db, tmp_path, monkeypatch, api_client):
+    monkeypatch.setattr(config, "AVATAR_DIR", str(tmp_path / "avatars"))
+    anna = models.User(username="anna", email="anna@example.com", password="x", role="User", is_active=True)
+    db.add(anna)
+    db.commit()
+    return api_client(avatar_routes.router, user.router, user=anna)
+
+
+def test_upload_stores_hash_and_serves_immutable_thumbnails(client, db):
+    data = _png()
+    response = client.post("/api/user/me/avatar", files={"file": ("a.png", data, "image/png")})
+    assert response.status_code == 200, response.text
+    body = response.json()
+    key = avatars.store().put(data)  # gleicher Inhalt -> gleicher Hash
+    assert "avatar_hash" not in body
+    assert body["avatar_url"] == f"/api/avatars/{key}-256.webp"
+    assert db.query(models.User).one().avatar_hash == key
+
+    for size in config.AVATAR_SIZES:
+        response = client.get(f"/api/avatars/{key}-{size}.webp")
+        assert response.status_code == 200
+        assert response.headers["cache-control"] == avatar_routes.IMMUTABLE
+        assert Image.open(io.BytesIO(response.content)).size == (size, size)
+    assert client.get(f"/api/avatars/{key}-100.webp").status_code == 404
+    assert client.get("/api/avatars/nothex-64.webp").status_code == 404
+
+
+def test_same_image_is_only_processed_once(client, monkeypatch):
+    data = _png(color=(1, 2, 3))
+    assert client.post("/api/user/me/avatar", files={"file": ("a.png", data)}).status_code == 200
+
+    def fail(_):
+        raise AssertionError("Thumbnails wurden neu erzeugt")
+
+    monkeypatch.setattr(avatars, "_open", fail)
+    assert client.post("/api/user/me/avatar", files={"file": ("b.png", data)}).status_code == 200
+
+
+def test_rejects_invalid_and_oversized_uploads(client, monkeypatch):
+    response = client.post("/api/user/me/avatar", files={"file": ("a.png", b"kein bild")})
+    assert response.status_code == 400
+
+    monkeypatch.setattr(config, "AVATAR_MAX_BYTES", 100)
+    response = client.post("/api/user/me/avatar", files={"file": ("a.png", _png())})
+    assert response.status_code == 413
+
+
+def test_data_url_avatars_move_to_blob_store(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "AVATAR_DIR", str(tmp_path / "avatars"))
+    anna = models.User(username="anna", email="anna@example.com", password="x", role="User", is_active=True)
+    db.add(anna)
+    db.commit()
+
+    data_url = "data:image/png;base64," + base64.b64encode(_png()).decode()
+    updated = crud.update_user(db, anna.id, schemas.UserUpdate(avatar=data_url), anna)
+    assert updated.avatar is None and len(updated.avatar_hash) == 64
+
+    updated = crud.update_user(db, anna.id, schemas.UserUpdate(avatar="color:sky"), anna)
+    assert updated.avatar == "color:sky" and updated.avatar_hash is not None
+
+    with pytest.raises(HTTPException) as exc:
+        crud.update_user(db, anna.id, schemas.UserUpdate(avatar="x" * 500), anna)
+    assert exc.value.status_code == 400
@@ -0,0 +1,89 @@
+import sqlite3
+import threading
+
+import pytest
+
+from app import backup, config, database
+
+
+def _make_db(path, rows=2000):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, value TEXT)")
+    conn.executemany("INSERT INTO t (value) VALUES (?)", [("x" * 200,)] * rows)
+    conn.commit()
+    conn.close()
+
+
+def _count(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM t").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_backup_is_verified_and_rotated(tmp_path):
+    source = tmp_path / "live.db"
+    _make_db(source)
+    target = tmp_path / "backups"
+
+    results = []
+    for second in range(3):
+        result = backup.backup_file(source, target, "main", pages=16, sleep=0, keep=2)
+        # gleiche Sekunde -> gleicher Name; für den Test eindeutig umbenennen
+        renamed = result.path.with_name(f"main-2026010{second + 1}-000000.db")
+        result.path.rename(renamed)
+        results.append(renamed)
+        backup.rotate(target, "main", 2)
+
+    assert backup.list_backups(target, "main") == results[1:]
+    assert backup.verify(results[-1]) == "ok"
+    assert _count(results[-1]) == 2000
+    assert not list(target.glob("*.part"))
+
+
+def test_backup_restarts_with_larger_steps_when_source_changes(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "BACKUP_MAX_RESTARTS", 2)
+    source = tmp_path / "live.db"
+    _make_db(source, rows=5000)
+    writer = sqlite3.connect(source, check_same_thread=False)
+    written = threading.Event()
+
+    def progress(done, total):
+        if not written.is_set():
+            writer.execute("INSERT INTO t (value) VALUES ('neu')")
+            writer.commit()
+            written.set()
+
+    result = backup.backup_file(source, tmp_path / "b", "main", pages=4, sleep=0, progress=progress)
+    writer.close()
+    assert result.restarts >= 1
+    assert _count(result.path) == 5001
+
+
+def test_verify_reports_corruption(tmp_path):
+    broken = tmp_path / "broken.db"
+    _make_db(broken)
+    data = bytearray(broken.read_bytes())
+    data[4096:8192] = b"\xff" * 4096
+    broken.write_bytes(bytes(data))
+    assert backup.verify(broken) != "ok"
+    with pytest.raises(backup.BackupError):
+        backup.restore(broken)
+
+
+def test_restore_keeps_copy_of_current_state(tmp_path, monkeypatch):
+    live = tmp_path / "vokabeln.db"
+    _make_db(live, rows=10)
+    saved = backup.backup_file(live, tmp_path / "b", "main", keep=5).path
+
+    conn = sqlite3.connect(live)
+    conn.execute("DELETE FROM t")
+    conn.commit()
+    conn.close()
+
+    monkeypatch.setattr(database, "SQLALCHEMY_DATABASE_URL", f"sqlite:///{live}")
+    assert backup.restore(saved, "main", tmp_path / "b") == live
+    assert _count(live) == 10
+    pre_restore = backup.list_backups(tmp_path / "b", "main-vor-restore")
+    assert len(pre_restore) == 1 and _count(pre_restore[0]) == 0
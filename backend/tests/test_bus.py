@@ -0,0 +1,154 @@
+import asyncio
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine, event
+
+from app import bus, config, events, migrations, revocation
+
+
+@pytest.fixture()
+def workers(tmp_path, monkeypatch):
+    """Zwei "Worker" auf derselben SQLite-Datei (eigene Bus-Instanzen, eigene Verbindungen)."""
+    monkeypatch.setattr(config, "BUS_ENABLED", True)
+    engine = create_engine(f"sqlite:///{tmp_path / 'main.db'}")
+    migrations.ensure_schema(engine)
+    pair = [bus.Bus(engine, poll_seconds=0), bus.Bus(engine, poll_seconds=0)]
+    for worker in pair:
+        worker.open()
+    yield pair
+    for worker in pair:
+        worker.close()
+    engine.dispose()
+
+
+@pytest.fixture()
+def received(monkeypatch):
+    messages = []
+    monkeypatch.setitem(bus._listeners, "test", [lambda **payload: messages.append(payload)])
+    return messages
+
+
+def test_messages_reach_other_workers_only(workers, received):
+    first, second = workers
+    statements = []
+    event.listen(first.engine, "before_cursor_execute", lambda conn, cursor, sql, *args: statements.append(sql))
+
+    # Ohne Schreibzugriffe: nur PRAGMA data_version, kein SELECT auf bus_messages
+    assert first.poll() == 0 and second.poll() == 0
+    assert statements == ["PRAGMA data_version"] * 2
+
+    first.publish("test", list_id=7)
+    assert second.poll() == 1
+    assert first.poll() == 0
+    assert received == [{"list_id": 7}]
+    assert second.poll() == 0
+
+    # Neu verbundene Worker fangen beim aktuellen Stand an
+    second.close()
+    second.open()
+    assert second.poll() == 0
+
+
+def test_messages_committed_out_of_id_order_are_delivered(workers, received, monkeypatch):
+    first, second = workers
+
+    def commit(id_, list_id):
+        # Wie auf PostgreSQL: die ID steht vor dem Commit fest, der Commit kommt später
+        with first.engine.begin() as conn:
+            conn.execute(bus.messages.insert().values(
+                id=id_, origin=first.origin, topic="test", payload={"list_id": list_id}, created_at=time.time()
+            ))
+
+    start = second.last_id
+    commit(start + 2, 2)
+    assert second.poll() == 1
+    commit(start + 1, 1)
+    assert second.poll() == 1 and second.poll() == 0
+    assert received == [{"list_id": 2}, {"list_id": 1}]
+    assert second.last_id == start + 2
+
+    # Zurückgerollte IDs bleiben nicht ewig offen
+    monkeypatch.setattr(config, "BUS_GAP_SECONDS", 0)
+    commit(start + 4, 4)
+    assert second.poll() == 1
+    assert second.last_id == start + 4
+
+
+def test_bus_disabled_publishes_nothing(workers, received, monkeypatch):
+    monkeypatch.setattr(config, "BUS_ENABLED", False)
+    first, second = workers
+    first.publish("test", list_id=7)
+    assert second.poll() == 0 and received == []
+
+
+def test_list_events_and_revocations_cross_workers(workers, monkeypatch):
+    first, second = workers
+    monkeypatch.setattr(bus, "bus", first)
+    monkeypatch.setattr(events, "hub", events.EventHub())
+    revocations = revocation.RevocationList(sync_seconds=3600)
+    monkeypatch.setattr(revocation, "revocations", revocations)
+
+    class Db:
+        def get_bind(self):
+            return first.engine
+
+    events.publish(Db(), 3, "list_updated", name="Unit 2", description=None)
+    first.publish("revocation", rows=[["main:5", 123.0]])
+
+    # Der andere Worker hat einen eigenen Hub mit einem offenen Abo
+    other_hub = events.EventHub()
+    monkeypatch.setattr(events, "hub", other_hub)
+
+    async def scenario():
+        subscription, _ = other_hub.subscribe(events.channel(Db(), 3), "1")
+        assert second.poll() == 2
+        message = await subscription.next(1)
+        other_hub.unsubscribe(subscription)
+        return message
+
+    message = asyncio.run(scenario())
+    assert json.loads(message[2]) == {"type": "list_updated", "name": "Unit 2", "description": None}
+    assert revocations.is_revoked("main:5", 100)
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="app.serve braucht fork()")
+def test_serve_starts_workers_and_stops_on_sigterm(tmp_path):
+    port = _free_port()
+    env = {
+        **os.environ, "DATABASE_URL": f"sqlite:///{tmp_path / 'app.db'}", "JOB_WORKERS": "0",
+        "BACKUP_INTERVAL_MINUTES": "0", "RATE_LIMIT_SQLITE_PATH": str(tmp_path / "ratelimit.db"),
+    }
+    process = subprocess.Popen(
+        [sys.executable, "-m", "app.serve", "--port", str(port), "--workers", "2", "--log-level", "warning"],
+        cwd=Path(__file__).resolve().parents[1], env=env
+    )
+    try:
+        deadline = time.time() + 20
+        while True:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/api/health", timeout=1) as response:
+                    assert response.status == 200
+                    break
+            except OSError:
+                assert process.poll() is None and time.time() < deadline
+                time.sleep(0.1)
+        process.send_signal(signal.SIGTERM)
+        assert process.wait(timeout=15) == 0
+    finally:
+        if process.poll() is None:
+            process.kill()
@@ -0,0 +1,86 @@
+import pytest
+from sqlalchemy import event
+
+from app import config, crud, models, schemas
+from app.routes import vocablist
+
+
+@pytest.fixture()
+def make_source(db, make_list):
+    """Liste von "lehrer" mit entries Einträgen, dazu "schueler"."""
+    def make(entries=3):
+        users = [models.User(username=name, email=f"{name}@example.com", password="x") for name in ("lehrer", "schueler")]
+        db.add_all(users)
+        db.commit()
+        rows = [(f"wort {i}", f"word {i}") for i in range(entries)]
+        return make_list(db, users[0], rows=rows, description="Klasse 7"), users
+    return make
+
+
+def _rows(db, list_id):
+    """Einträge als [(position, {spaltenname: wert})], unabhängig von IDs und Speicherform."""
+    names = {c.id: c.name for c in db.query(models.ListColumn).filter_by(vocab_list_id=list_id)}
+    rows = []
+    for entry in crud.get_vocab_list_entries(db, list_id):
+        entry = schemas.VocabEntry.model_validate(entry)
+        rows.append((entry.position, {names[f.column_id]: f.value for f in entry.field_values}))
+    return sorted(rows, key=lambda row: row[0])
+
+
+@pytest.mark.parametrize("storage", ["eav", "dual", "json"])
+def test_clone_copies_columns_and_remaps_values(db, monkeypatch, storage, make_source):
+    monkeypatch.setattr(config, "ENTRY_STORAGE", storage)
+    source, (teacher, student) = make_source()
+    # Eine weitere Liste davor/dazwischen, damit alte und neue IDs auseinanderlaufen
+    crud.create_vocab_list(db, schemas.VocabListCreate(name="Andere", columns=[schemas.ListColumnCreate(name="X")]), teacher.id)
+
+    clone = crud.clone_vocab_list(db, source.id, student.id)
+    assert (clone.name, clone.description, clone.user_id) == ("Unit 1", "Klasse 7", student.id)
+    assert [(c.name, c.position, c.is_primary) for c in clone.columns] == [("Deutsch", 0, True), ("Englisch", 1, False)]
+    assert {c.id for c in clone.columns}.isdisjoint({c.id for c in source.columns})
+    assert _rows(db, clone.id) == _rows(db, source.id) != []
+    if storage != "json":
+        clone_columns = {c.id for c in clone.columns}
+        values = db.query(models.EntryFieldValue).join(models.VocabEntry).filter(models.VocabEntry.vocab_list_id == clone.id)
+        assert {v.column_id for v in values} == clone_columns
+
+
+def test_clone_statement_count_does_not_grow_with_entries(db, make_source):
+    source, (_, student) = make_source(entries=50)
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute", lambda conn, cursor, sql, *args: statements.append(sql))
+    crud.clone_vocab_list(db, source.id, student.id)
+    assert sum(sql.lstrip().upper().startswith("INSERT") for sql in statements) == 4  # Liste, Spalten, Einträge, Werte
+
+
+def test_shared_list_is_read_only_and_clonable(make_source, api_client, bearer):
+    source, (teacher, student) = make_source()
+    client = api_client(vocablist.router)
+
+    assert client.post(f"/api/vocablist/{source.id}/share", headers=bearer(student)).status_code == 403
+    code = client.post(f"/api/vocablist/{source.id}/share", headers=bearer(teacher)).json()["share_code"]
+    assert client.post(f"/api/vocablist/{source.id}/share", headers=bearer(teacher)).json()["share_code"] == code
+
+    shared = client.get(f"/api/shared/{code}", headers=bearer(student))
+    assert shared.status_code == 200 and shared.json()["id"] == source.id
+    assert len(client.get(f"/api/shared/{code}/entries", headers=bearer(student)).json()) == 3
+    assert client.put(f"/api/vocablist/{source.id}", json={"name": "x"}, headers=bearer(student)).status_code == 403
+
+    response = client.post(f"/api/shared/{code}/clone", json={"name": "Meine Unit 1"}, headers=bearer(student))
+    assert response.status_code == 200
+    assert (response.json()["name"], response.json()["user_id"]) == ("Meine Unit 1", student.id)
+    assert response.json()["share_code"] is None
+
+    client.delete(f"/api/vocablist/{source.id}/share", headers=bearer(teacher))
+    assert client.get(f"/api/shared/{code}", headers=bearer(student)).status_code == 404
+
+
+def test_shared_list_statement_count_does_not_grow_with_entries(db, monkeypatch, make_source):
+    monkeypatch.setattr(config, "ENTRY_STORAGE", "eav")
+    source, _ = make_source(entries=20)
+    code = crud.share_vocab_list(db, source.id).share_code
+    db.expire_all()
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute", lambda conn, cursor, sql, *args: statements.append(sql))
+    schemas.VocabList.model_validate(crud.get_shared_vocab_list(db, code))
+    assert len(statements) == 4  # Liste, Spalten, Einträge, Feldwerte
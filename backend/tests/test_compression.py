@@ -0,0 +1,53 @@
+import gzip
+
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.compression import CompressionMiddleware
+
+app = FastAPI()
+app.add_middleware(CompressionMiddleware)
+
+
+@app.get("/api/big")
+def big():
+    return [{"column_id": i, "value": "Haus", "entry_id": i} for i in range(500)]
+
+
+@app.get("/api/small")
+def small():
+    return {"status": "ok"}
+
+
+@app.get("/api/stream")
+def stream():
+    def rows():
+        for i in range(100):
+            yield f'{{"column_id": {i}, "value": "Baum"}}\n' * 20
+    return StreamingResponse(rows(), media_type="text/plain")
+
+
+client = TestClient(app)
+
+
+def test_large_json_is_gzipped():
+    response = client.get("/api/big", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert int(response.headers["content-length"]) < 5000
+    assert len(response.json()) == 500
+
+
+def test_small_response_and_identity_stay_plain():
+    small_response = client.get("/api/small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small_response.headers
+    identity = client.get("/api/big", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in identity.headers
+
+
+def test_streaming_response_is_compressed_incrementally():
+    with client.stream("GET", "/api/stream", headers={"Accept-Encoding": "gzip"}) as response:
+        raw = b"".join(response.iter_raw())
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert gzip.decompress(raw).count(b"Baum") == 2000
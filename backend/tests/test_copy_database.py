@@ -0,0 +1,74 @@
+import os
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+
+from app import database, migrations, models
+from app.database import Base
+from benchmarks import dataset
+
+
+@pytest.fixture()
+def source(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'source.db'}")
+    Base.metadata.create_all(bind=engine)
+    dataset.seed(engine, users=2, lists=2, columns=2, entries=7, entry_storage="dual")
+    with engine.begin() as conn:
+        # SQLite prüft keine Fremdschlüssel: Feldwert zu einem gelöschten Eintrag
+        conn.execute(models.EntryFieldValue.__table__.insert(), [{"entry_id": 9999, "column_id": 1, "value": "weg"}])
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture()
+def target(tmp_path):
+    url = os.getenv("TEST_DATABASE_URL") or f"sqlite:///{tmp_path / 'target.db'}"
+    engine = create_engine(url)
+    Base.metadata.drop_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+def _count(engine, model):
+    with engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(model)).scalar()
+
+
+def test_copy_database_copies_all_rows_and_skips_orphans(source, target):
+    result = migrations.copy_database(source, target, batch_size=5)
+
+    assert result["users"] == (2, 0)
+    assert result["vocab_entries"] == (28, 0)
+    assert result["entry_field_values"] == (56, 1)
+    for model in (models.User, models.VocabList, models.ListColumn, models.VocabEntry, models.EntryFieldValue):
+        assert _count(target, model) == _count(source, model) - (model is models.EntryFieldValue)
+
+    with Session(target) as db:
+        entry = db.get(models.VocabEntry, 1)
+        assert entry.data == {str(f.column_id): f.value for f in entry.field_values}
+        user = db.get(models.User, 2)
+        assert user.username == "bench2" and user.is_active is True
+
+        # Neue Zeilen bekommen freie IDs (Sequenzen auf PostgreSQL nachgezogen)
+        db.add(models.User(username="neu", email="neu@example.com", password="x"))
+        db.commit()
+        assert db.scalars(select(models.User.id).filter_by(username="neu")).one() == 3
+
+
+def test_copy_database_refuses_non_empty_target(source, target):
+    migrations.copy_database(source, target)
+    with pytest.raises(ValueError, match="nicht leer"):
+        migrations.copy_database(source, target)
+
+
+def test_engine_options_per_dialect():
+    sqlite = database.engine_options("sqlite:///./vokabeln.db")
+    assert sqlite["connect_args"] == {"check_same_thread": False}
+    assert "pool_pre_ping" not in sqlite
+
+    postgres = database.engine_options("postgresql+psycopg2://u:p@localhost/vocademy")
+    assert "connect_args" not in postgres
+    assert postgres["pool_pre_ping"] is True
+    assert postgres["pool_size"] >= 1
+    assert database.async_database_url("postgresql+psycopg2://u:p@h/db") == "postgresql+asyncpg://u:p@h/db"
@@ -0,0 +1,122 @@
+from collections import defaultdict
+
+import pytest
+from sqlalchemy import event, select
+from sqlalchemy.orm import sessionmaker
+
+from app import config, crud, distractors, jobs, models, schemas
+from app.routes import quiz as quiz_routes
+
+WORDS = [
+    ("Haus", "house"), ("Maus", "mouse"), ("Laus", "louse"), ("Baum", "tree"), ("Raum", "room"),
+    ("Traum", "dream"), ("Haustür", "front door"), ("Katze", "cat"), ("Tatze", "paw"), ("Glatze", "bald head"),
+    ("Satz", "sentence"), ("Schatz", "treasure"), ("Platz", "square"), ("Hose", "trousers"),
+]
+
+
+@pytest.fixture(autouse=True)
+def few_candidates(monkeypatch):
+    # Wenige Kandidaten, damit Verdrängen und Auffüllen auch vorkommen
+    monkeypatch.setattr(config, "DISTRACTOR_CANDIDATES", 3)
+
+
+@pytest.fixture()
+def vocab_list(db, make_list):
+    return make_list(db)
+
+
+@pytest.fixture()
+def client(api_client):
+    return api_client(quiz_routes.router)
+
+
+@pytest.fixture()
+def add_words(db, add_entry):
+    return lambda vocab_list, words: [add_entry(db, vocab_list, *pair).id for pair in words]
+
+
+def _snapshot(db):
+    """Scores der Kandidaten je (Spalte, Eintrag) – bei Gleichstand kann die Wahl abweichen, die Scores nicht."""
+    table = models.DistractorCandidate.__table__
+    result = defaultdict(list)
+    for column_id, entry_id, value in db.execute(select(table.c.column_id, table.c.entry_id, table.c.score)):
+        result[(column_id, entry_id)].append(round(value, 9))
+    return {key: sorted(scores) for key, scores in result.items()}
+
+
+def test_incremental_updates_match_full_rebuild(db, vocab_list, add_words):
+    german, english = vocab_list.columns
+    ids = add_words(vocab_list, WORDS)
+    crud.update_vocab_entry(db, ids[0], schemas.VocabEntryUpdate(field_values=[
+        schemas.EntryFieldValueCreate(column_id=german.id, value="Hase"),
+    ]))
+    field = db.scalars(select(models.EntryFieldValue).where(
+        models.EntryFieldValue.entry_id == ids[7], models.EntryFieldValue.column_id == english.id
+    )).one()
+    crud.update_field_value(db, field.id, "kitten")
+    crud.delete_vocab_entry(db, ids[1])
+    crud.delete_vocab_entry(db, ids[10])
+
+    incremental = _snapshot(db)
+    assert all(len(scores) <= 3 for scores in incremental.values())
+    # Geleerte englische Spalte von "Hase" und gelöschte Einträge tauchen nirgends mehr auf
+    assert (english.id, ids[0]) not in incremental and (german.id, ids[1]) not in incremental
+    distractors.rebuild_columns(db, vocab_list.id, [german.id, english.id])
+    assert incremental == _snapshot(db)
+
+    crud.delete_column(db, english.id)
+    assert all(column_id == german.id for column_id, _ in _snapshot(db))
+    crud.delete_vocab_list(db, vocab_list.id)
+    assert _snapshot(db) == {}
+
+
+def test_quiz_uses_similar_values_with_bounded_queries(db, vocab_list, client, add_words, bearer):
+    german, english = vocab_list.columns
+    add_words(vocab_list, WORDS)
+    url, headers = f"/api/vocablist/{vocab_list.id}/quiz", bearer(vocab_list.owner)
+    params = {"source_column_id": english.id, "target_column_id": german.id}
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute", lambda conn, cursor, sql, *args: statements.append(sql))
+
+    counts = []
+    for count in (2, len(WORDS)):
+        statements.clear()
+        response = client.get(url, headers=headers, params={**params, "count": count})
+        assert response.status_code == 200
+        counts.append(len(statements))
+    assert counts[0] == counts[1]
+
+    quiz = response.json()
+    assert quiz["precomputed"] is True and len(quiz["questions"]) == len(WORDS)
+    for question in quiz["questions"]:
+        assert len(set(question["options"])) == 4 and question["answer"] in question["options"]
+    haus = next(q for q in quiz["questions"] if q["prompt"] == "house")
+    assert {"Haus", "Maus", "Laus"} <= set(haus["options"])
+
+    assert client.get(url, headers=headers, params={**params, "target_column_id": 9999}).status_code == 400
+    assert client.get(url, headers=bearer(999), params=params).status_code == 403
+
+
+def test_large_unprepared_list_rebuilds_in_background(db, vocab_list, client, monkeypatch, add_words, bearer):
+    monkeypatch.setattr(config, "DISTRACTOR_INLINE_LIMIT", 5)
+    queue = jobs.JobQueue(sessionmaker(bind=db.get_bind()), workers=0)
+    monkeypatch.setattr(jobs, "queue", queue)
+    add_words(vocab_list, WORDS)
+    clone = crud.clone_vocab_list(db, vocab_list.id, vocab_list.user_id)
+    german, english = clone.columns
+
+    def get_quiz():
+        return client.get(f"/api/vocablist/{clone.id}/quiz", headers=bearer(clone.user_id),
+                          params={"source_column_id": german.id, "count": 5}).json()
+
+    quiz = get_quiz()
+    assert quiz["precomputed"] is False
+    # Bis der Job gelaufen ist: zufällige Ablenker aus der Spalte
+    assert all(len(set(q["options"])) == 4 for q in quiz["questions"])
+    get_quiz()
+    assert [job.kind for job in queue.list_jobs(clone.user_id)] == ["rebuild_distractors"]
+
+    assert queue.run_next().status == "succeeded"
+    db.expire_all()
+    assert get_quiz()["precomputed"] is True
+    assert {column_id for column_id, _ in _snapshot(db)} >= {german.id, english.id}
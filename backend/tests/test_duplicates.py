@@ -0,0 +1,74 @@
+import pytest
+from fastapi import HTTPException
+
+from app import config, crud, migrations, models, schemas
+from app.normalize import normalize_term
+from app.routes import vocab
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("Straße", "strasse"),
+    ("  STRASSE! ", "strasse"),
+    ("Café", "cafe"),
+    ("to run (fast)", "to run fast"),
+    ("e-mail", "e mail"),
+    ("don’t", "don t"),
+    ("", ""),
+    (None, ""),
+])
+def test_normalize_term(value, expected):
+    assert normalize_term(value) == expected
+
+
+@pytest.fixture()
+def vocab_list(db, make_list):
+    # Hauptspalte ist die zweite: der Begriff folgt is_primary, nicht der Position
+    return make_list(db, columns=("Englisch", "Deutsch"), primary=1)
+
+
+@pytest.mark.parametrize("storage", ["eav", "dual", "json"])
+def test_term_follows_primary_column(db, monkeypatch, storage, vocab_list, add_entry):
+    monkeypatch.setattr(config, "ENTRY_STORAGE", storage)
+    entry = add_entry(db, vocab_list, "street", "Straße")
+    assert entry.normalized_term == "strasse"
+
+    with pytest.raises(HTTPException) as error:
+        add_entry(db, vocab_list, "x", "STRASSE!", reject_duplicates=True)
+    assert error.value.status_code == 409
+    duplicate = add_entry(db, vocab_list, "x", "strasse")
+    assert crud.find_duplicate_entries(db, vocab_list.id) == [
+        {"normalized_term": "strasse", "entry_ids": [entry.id, duplicate.id]}
+    ]
+
+    english_col, german_col = [c.id for c in vocab_list.columns]
+    crud.update_vocab_entry(db, duplicate.id, schemas.VocabEntryUpdate(field_values=[
+        schemas.EntryFieldValueCreate(column_id=german_col, value="Weg"),
+    ]))
+    assert db.get(models.VocabEntry, duplicate.id).normalized_term == "weg"
+    assert crud.find_duplicate_entries(db, vocab_list.id) == []
+
+    # Hauptspalte weg -> erste Spalte wird zum Begriff
+    crud.delete_column(db, german_col)
+    assert [e.id for e in crud.find_entries_by_term(db, vocab_list.id, "Street")] == [entry.id]
+
+
+def test_backfill_and_routes(db, vocab_list, add_entry, api_client):
+    first, second = add_entry(db, vocab_list, "x", "Haus"), add_entry(db, vocab_list, "x", "haus ")
+    db.query(models.VocabEntry).update({"normalized_term": None})
+    db.commit()
+    assert migrations.backfill_entry_terms(db) == 1
+    assert migrations.backfill_entry_terms(db) == 0
+
+    client = api_client(vocab.router, user=vocab_list.owner)
+
+    response = client.get(f"/api/vocab/entries/list/{vocab_list.id}/duplicates")
+    assert response.json() == [{"normalized_term": "haus", "entry_ids": [first.id, second.id]}]
+    response = client.get(f"/api/vocab/entries/list/{vocab_list.id}/lookup", params={"term": "HAUS"})
+    assert [e["id"] for e in response.json()] == [first.id, second.id]
+
+    english_col, german_col = [c.id for c in vocab_list.columns]
+    response = client.post("/api/vocab/entries", params={"reject_duplicates": True}, json={
+        "vocab_list_id": vocab_list.id,
+        "field_values": [{"column_id": german_col, "value": "Haus"}],
+    })
+    assert response.status_code == 409
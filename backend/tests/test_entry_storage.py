@@ -0,0 +1,47 @@
+import pytest
+
+from app import config, crud, migrations, models, schemas
+
+
+@pytest.fixture()
+def vocab_list(db, make_list):
+    return make_list(db, name="Liste", primary=None)
+
+
+def test_dual_mode_keeps_document_in_sync(db, monkeypatch, vocab_list, add_entry):
+    monkeypatch.setattr(config, "ENTRY_STORAGE", "dual")
+    cols = [c.id for c in vocab_list.columns]
+
+    entry = add_entry(db, vocab_list, "laufen", "run")
+    assert entry.data == {str(cols[0]): "laufen", str(cols[1]): "run"}
+    assert len(entry.field_values) == 2
+
+    crud.update_field_value(db, entry.field_values[1].id, "to run")
+    assert entry.data[str(cols[1])] == "to run"
+
+    crud.delete_column(db, cols[1])
+    db.refresh(entry)
+    assert entry.data == {str(cols[0]): "laufen"}
+
+
+def test_json_mode_serializes_from_document(db, monkeypatch, vocab_list, add_entry):
+    monkeypatch.setattr(config, "ENTRY_STORAGE", "json")
+    cols = [c.id for c in vocab_list.columns]
+    add_entry(db, vocab_list, "Haus", "house")
+
+    assert db.query(models.EntryFieldValue).count() == 0
+    entries = crud.get_vocab_list_entries(db, vocab_list.id)
+    out = schemas.VocabEntry.model_validate(entries[0])
+    assert {(f.column_id, f.value) for f in out.field_values} == {(cols[0], "Haus"), (cols[1], "house")}
+
+
+def test_backfill_fills_missing_documents(db, vocab_list, add_entry):
+    cols = [c.id for c in vocab_list.columns]
+    for word in ("eins", "zwei", "drei"):
+        add_entry(db, vocab_list, word, word.upper())
+    assert db.query(models.VocabEntry).filter(models.VocabEntry.data.isnot(None)).count() == 0
+
+    assert migrations.backfill_entry_data(db, batch_size=2) == 3
+    docs = [e.data for e in db.query(models.VocabEntry).order_by(models.VocabEntry.id)]
+    assert docs[1] == {str(cols[0]): "zwei", str(cols[1]): "ZWEI"}
+    assert migrations.backfill_entry_data(db) == 0
@@ -0,0 +1,139 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from app import config, crud, events, schemas
+from app.routes import events as event_routes
+
+
+@pytest.fixture()
+def hub(monkeypatch):
+    hub = events.EventHub()
+    monkeypatch.setattr(events, "hub", hub)
+    return hub
+
+
+@pytest.fixture()
+def vocab_list(db, make_list):
+    return make_list(db)
+
+
+def _values(columns, *values):
+    return [schemas.EntryFieldValueCreate(column_id=c.id, value=v) for c, v in zip(columns, values)]
+
+
+def _drain(subscription):
+    messages = []
+    while not subscription.queue.empty():
+        messages.append(json.loads(subscription.queue.get_nowait()[2]))
+    return messages
+
+
+def test_crud_changes_reach_subscribers(db, hub, vocab_list):
+    german, english = vocab_list.columns
+
+    async def scenario():
+        subscription, missed = hub.subscribe(events.channel(db, vocab_list.id), "1")
+        assert missed == []
+        # crud läuft wie in den sync-Routen im Threadpool
+        entry = await asyncio.to_thread(crud.create_vocab_entry, db, schemas.VocabEntryCreate(
+            vocab_list_id=vocab_list.id, field_values=_values(vocab_list.columns, "Haus", "house")))
+        await asyncio.to_thread(crud.update_vocab_entry, db, entry.id,
+                                schemas.VocabEntryUpdate(field_values=_values(vocab_list.columns, "Haus", "home")))
+        await asyncio.to_thread(crud.delete_column, db, english.id)
+        await asyncio.to_thread(crud.delete_vocab_entry, db, entry.id)
+        await asyncio.sleep(0)
+        received = _drain(subscription)
+        hub.unsubscribe(subscription)
+        return entry.id, received
+
+    entry_id, received = asyncio.run(scenario())
+    assert received == [
+        {"type": "entry_created", "entry": {"id": entry_id, "position": 0,
+                                            "values": {str(german.id): "Haus", str(english.id): "house"}}},
+        {"type": "entry_updated", "entry": {"id": entry_id, "position": 0,
+                                            "values": {str(german.id): "Haus", str(english.id): "home"}}},
+        {"type": "column_deleted", "column_id": english.id},
+        {"type": "entry_deleted", "entry_id": entry_id},
+    ]
+    assert hub.subscriber_count(events.channel(db, vocab_list.id)) == 0
+
+
+def test_slow_subscriber_gets_single_resync(hub, monkeypatch):
+    monkeypatch.setattr(config, "EVENTS_QUEUE_SIZE", 3)
+
+    async def scenario():
+        slow, _ = hub.subscribe(("db", 1), "1")
+        for n in range(10):
+            hub.publish(("db", 1), "entry_deleted", entry_id=n)
+        await asyncio.sleep(0)
+        first = [(await slow.next(0.1))[1] for _ in range(slow.queue.qsize())]
+        hub.publish(("db", 1), "entry_deleted", entry_id=99)
+        await asyncio.sleep(0)
+        after = await slow.next(0.1)
+        hub.unsubscribe(slow)
+        return first, after
+
+    first, after = asyncio.run(scenario())
+    assert first == ["resync"]
+    assert json.loads(after[2]) == {"type": "entry_deleted", "entry_id": 99}
+
+
+def test_reconnect_replays_missed_events_or_resyncs(hub, monkeypatch):
+    monkeypatch.setattr(config, "EVENTS_HISTORY", 3)
+    monkeypatch.setattr(config, "EVENTS_HISTORY_LISTS", 1)
+    for n in range(5):
+        hub.publish(("db", 1), "entry_deleted", entry_id=n)
+
+    async def reconnect(key, last_event_id):
+        subscription, missed = hub.subscribe(key, "1", last_event_id)
+        hub.unsubscribe(subscription)
+        return [message[2] for message in missed]
+
+    # Die letzten 3 Events sind noch da
+    assert len(asyncio.run(reconnect(("db", 1), f"{hub.epoch}.3"))) == 2
+    assert asyncio.run(reconnect(("db", 1), f"{hub.epoch}.5")) == []
+    assert asyncio.run(reconnect(("db", 1), f"{hub.epoch}.1")) == [events.RESYNC[2]]
+    assert asyncio.run(reconnect(("db", 1), "neustart.5")) == [events.RESYNC[2]]
+    # Historie der Liste verdrängt: nur wer danach verbunden war, braucht kein resync
+    hub.publish(("db", 2), "entry_deleted", entry_id=7)
+    assert asyncio.run(reconnect(("db", 1), f"{hub.epoch}.4")) == [events.RESYNC[2]]
+    assert asyncio.run(reconnect(("db", 1), f"{hub.epoch}.6")) == []
+
+
+def test_stream_ends_once_token_is_revoked(hub, monkeypatch):
+    monkeypatch.setattr(config, "EVENTS_PING_SECONDS", 0.01)
+    revoked = []
+
+    async def scenario():
+        subscription, _ = hub.subscribe(("db", 1), "1")
+        body = events.stream(subscription, [], time.time() + 5, hub, authorized=lambda: not revoked)
+        chunks = [await body.__anext__(), await body.__anext__()]
+        revoked.append(True)
+        chunks += [chunk async for chunk in body]
+        return chunks
+
+    assert asyncio.run(scenario()) == [f"retry: {events.RETRY_MS}\n\n", ": ping\n\n"]
+    assert hub.subscriber_count(("db", 1)) == 0
+
+
+def test_event_stream_route(db, hub, vocab_list, monkeypatch, api_client, bearer):
+    monkeypatch.setattr(config, "EVENTS_MAX_STREAM_SECONDS", 0.2)
+    client = api_client(event_routes.router)
+
+    def headers(uid, **extra):
+        return {**bearer(uid), **extra}
+
+    assert client.get("/api/vocablist/9999/events", headers=headers(vocab_list.user_id)).status_code == 404
+    assert client.get(f"/api/vocablist/{vocab_list.id}/events", headers=headers(999)).status_code == 403
+
+    crud.update_vocab_list(db, vocab_list.id, schemas.VocabListUpdate(name="Unit 2"))
+    response = client.get(f"/api/vocablist/{vocab_list.id}/events",
+                          headers=headers(vocab_list.user_id, **{"Last-Event-ID": f"{hub.epoch}.0"}))
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.text.startswith("retry: ")
+    data = [json.loads(line[6:]) for line in response.text.splitlines() if line.startswith("data: ")]
+    assert data == [{"type": "list_updated", "name": "Unit 2", "description": None}]
+    assert hub.subscriber_count(events.channel(db, vocab_list.id)) == 0
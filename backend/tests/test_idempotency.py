@@ -0,0 +1,86 @@
+import time
+
+import pytest
+from fastapi import HTTPException
+from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy.orm import sessionmaker
+
+from app import config, models
+from app.idempotency import IdempotencyMiddleware, IdempotencyStore
+from app.routes import vocablist
+
+BODY = {"name": "Unit 1", "columns": [{"name": "Deutsch", "position": 0, "is_primary": True}]}
+
+
+@pytest.fixture()
+def client(db, api_client):
+    user = models.User(username="lehrer", email="lehrer@example.com", password="x")
+    db.add(user)
+    db.commit()
+    client = api_client(vocablist.router, user=user)
+
+    @client.app.post("/api/kaputt")
+    def broken():
+        raise HTTPException(status_code=503, detail="Später")
+
+    client.app.add_middleware(IdempotencyMiddleware, store=IdempotencyStore(sessionmaker(bind=db.get_bind())))
+    return client
+
+
+def test_retry_with_same_key_is_replayed(client, db):
+    first = client.post("/api/vocablist/", json=BODY, headers={"Idempotency-Key": "a1"})
+    second = client.post("/api/vocablist/", json=BODY, headers={"Idempotency-Key": "a1"})
+    assert first.status_code == second.status_code == 200
+    assert second.json() == first.json()
+    assert second.headers["idempotent-replayed"] == "true"
+    assert "idempotent-replayed" not in first.headers
+    assert db.query(models.VocabList).count() == 1
+
+    # Anderer Request mit demselben Key
+    response = client.post("/api/vocablist/", json={**BODY, "name": "Unit 2"}, headers={"Idempotency-Key": "a1"})
+    assert response.status_code == 422
+    assert db.query(models.VocabList).count() == 1
+
+
+def test_without_key_or_token_requests_run_normally(client, db):
+    client.post("/api/vocablist/", json=BODY)
+    client.post("/api/vocablist/", json=BODY)
+    assert db.query(models.VocabList).count() == 2
+    response = client.post("/api/vocablist/", json=BODY, headers={"Idempotency-Key": "b1", "Authorization": ""})
+    assert response.status_code == 401
+    assert db.query(models.IdempotencyKey).count() == 0
+    assert client.post("/api/vocablist/", json=BODY, headers={"Idempotency-Key": "x" * 300}).status_code == 400
+
+
+def test_server_errors_are_not_stored_and_expired_keys_pruned(client, db, monkeypatch):
+    assert client.post("/api/kaputt", headers={"Idempotency-Key": "c1"}).status_code == 503
+    assert client.post("/api/kaputt", headers={"Idempotency-Key": "c1"}).status_code == 503
+    assert db.query(models.IdempotencyKey).count() == 0
+
+    # Erste Ausführung läuft noch -> 409
+    client.post("/api/vocablist/", json=BODY, headers={"Idempotency-Key": "d1"})
+    row = db.query(models.IdempotencyKey).one()
+    row.status_code = None
+    db.commit()
+    assert client.post("/api/vocablist/", json=BODY, headers={"Idempotency-Key": "d1"}).status_code == 409
+
+    # Abgelaufen: nächster Request räumt auf
+    db.query(models.IdempotencyKey).update({"expires_at": time.time() - 1})
+    db.commit()
+    monkeypatch.setattr(config, "IDEMPOTENCY_PRUNE_SECONDS", 0)
+    client.post("/api/vocablist/", json=BODY, headers={"Idempotency-Key": "e1"})
+    db.expire_all()
+    assert [row.key for row in db.query(models.IdempotencyKey)] == ["e1"]
+
+
+def test_replay_gets_cors_headers_for_its_own_origin(client, db):
+    # Reihenfolge wie in main.py: CORS außerhalb der Idempotency-Middleware
+    origins = ["https://a.example", "https://b.example"]
+    client.app.add_middleware(CORSMiddleware, allow_origins=origins, allow_credentials=True,
+                              allow_methods=["*"], allow_headers=["*"])
+    for origin in origins:
+        response = client.post("/api/vocablist/", json=BODY, headers={"Idempotency-Key": "f1", "Origin": origin})
+        assert response.headers["access-control-allow-origin"] == origin
+    assert response.headers["idempotent-replayed"] == "true"
+    stored = db.query(models.IdempotencyKey).one().headers
+    assert not any(name.startswith("access-control-") for name, _ in stored)
@@ -0,0 +1,142 @@
+import time
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from anki_decks import BASIC, apkg
+from app import config, jobs, models
+from app.routes import jobs as job_routes, vocablist
+
+
+@pytest.fixture()
+def queue(db, tmp_path, monkeypatch):
+    """Warteschlange auf der Test-DB, ohne Threads: Jobs laufen per run_next()."""
+    monkeypatch.setattr(config, "JOB_THROTTLE_SECONDS", 0)
+    monkeypatch.setattr(config, "JOB_BATCH_SIZE", 2)
+    monkeypatch.setattr(config, "JOB_DIR", str(tmp_path / "jobs"))
+    queue = jobs.JobQueue(sessionmaker(bind=db.get_bind()), workers=0)
+    monkeypatch.setattr(jobs, "queue", queue)
+    return queue
+
+
+@pytest.fixture()
+def users(db):
+    users = [models.User(username=name, email=f"{name}@example.com", password="x") for name in ("anna", "ben")]
+    db.add_all(users)
+    db.commit()
+    return users
+
+
+@pytest.fixture()
+def client(api_client):
+    return api_client(vocablist.router, job_routes.router)
+
+
+@pytest.fixture()
+def steps():
+    """Handler "test": jeder Lauf führt den nächsten Schritt aus der Liste aus."""
+    steps = []
+    jobs.handler("test")(lambda ctx: steps.pop(0)(ctx))
+    yield steps
+    jobs._handlers.pop("test")
+
+
+def test_delete_list_in_background(db, queue, users, client, bearer, make_list):
+    vocab_list = make_list(db, users[0], rows=[(f"wort {i}",) for i in range(5)], columns=["Wort"], name="Groß")
+    list_id = vocab_list.id
+
+    response = client.delete(f"/api/vocablist/{list_id}", params={"background": True}, headers=bearer(users[0]))
+    assert response.status_code == 202
+    job_id = response.json()["id"]
+    assert response.headers["location"] == f"/api/jobs/{job_id}"
+    assert client.get(f"/api/jobs/{job_id}", headers=bearer(users[1])).status_code == 403
+    # Löschen lässt sich nur abbrechen, solange es wartet – hier läuft es schon
+    jobs.queue.claim()
+    assert client.post(f"/api/jobs/{job_id}/cancel", headers=bearer(users[0])).status_code == 409
+    db.query(models.Job).update({"status": "queued", "attempts": 0})
+    db.commit()
+
+    job = queue.run_next()
+    assert (job.status, job.progress, job.total) == ("succeeded", 5, 5)
+    assert job.result == {"vocab_list_id": list_id, "deleted": True, "entries": 5}
+    db.expire_all()
+    assert db.query(models.VocabList).count() == 0
+    assert db.query(models.VocabEntry).count() == 0 and db.query(models.EntryFieldValue).count() == 0
+    assert [j["id"] for j in client.get("/api/jobs/", headers=bearer(users[0])).json()] == [job_id]
+
+
+def test_anki_import_in_background(db, queue, users, client, bearer, tmp_path):
+    deck = apkg(tmp_path, [(BASIC, ["Haus", "house"]), (BASIC, ["Baum", "tree"])])
+    response = client.post("/api/vocablist/import/anki", params={"background": True},
+                           files={"file": ("deck.apkg", deck.getvalue())}, headers=bearer(users[0]))
+    assert response.status_code == 202
+    upload = jobs.upload_path(db.get(models.Job, response.json()["id"]).params["upload"])
+    assert upload.exists()
+
+    job = queue.run_next()
+    assert job.status == "succeeded" and job.result["notes"] == 2
+    assert db.get(models.VocabList, job.result["vocab_list_id"]).user_id == users[0].id
+    assert not upload.exists()
+
+
+def test_cancel_and_retry(db, queue, users, steps):
+    def cancel_midway(ctx):
+        queue.cancel(ctx.id)
+        ctx.progress(1, 2)
+        return {"done": False}
+
+    queued = queue.enqueue("test", {}, users[0].id)
+    assert queue.cancel(queued.id).status == "cancelled"
+    assert queue.run_next() is None
+
+    job = queue.enqueue("test", {}, users[0].id)
+    steps.append(cancel_midway)
+    assert (queue.run_next().status, queue.get(job.id).progress) == ("cancelled", 1)
+
+    assert queue.retry(job.id)
+    assert not queue.retry(job.id)  # wartet schon wieder
+    steps.append(lambda ctx: {"done": True})
+    assert queue.run_next().result == {"done": True}
+
+
+def test_transient_errors_are_retried(db, queue, users, steps, monkeypatch):
+    monkeypatch.setattr(config, "JOB_RETRY_DELAY_SECONDS", 0)
+    monkeypatch.setattr(config, "JOB_MAX_ATTEMPTS", 2)
+
+    def locked(ctx):
+        raise OperationalError("UPDATE", {}, Exception("database is locked"))
+
+    job = queue.enqueue("test", {}, users[0].id)
+    steps.extend([locked, locked])
+    first = queue.run_next()
+    assert (first.status, first.error) == ("queued", "database is locked")
+    second = queue.run_next()
+    assert (second.status, second.attempts) == ("failed", 2)
+
+    assert queue.retry(job.id)
+    steps.append(lambda ctx: 1 / 0)
+    assert queue.run_next().error == "Interner Fehler (ZeroDivisionError)"
+
+
+def test_stale_jobs_limits_and_pruning(db, queue, users, steps, monkeypatch):
+    monkeypatch.setattr(config, "JOB_MAX_ACTIVE_PER_USER", 2)
+    first = queue.enqueue("test", {}, users[0].id)
+    queue.enqueue("test", {}, users[0].id)
+    with pytest.raises(HTTPException) as error:
+        queue.enqueue("test", {}, users[0].id)
+    assert error.value.status_code == 429
+    queue.enqueue("test", {}, users[1].id)
+
+    # Worker stirbt mitten im Job: nach JOB_STALE_SECONDS wieder eingereiht
+    assert queue.claim().id == first.id
+    db.query(models.Job).filter_by(id=first.id).update({"heartbeat_at": time.time() - config.JOB_STALE_SECONDS - 1})
+    db.commit()
+    assert queue.recover_stale() == 1
+    db.expire_all()
+    assert db.get(models.Job, first.id).status == "queued"
+
+    db.query(models.Job).update({"status": "succeeded", "finished_at": time.time() - config.JOB_KEEP_DAYS * 86400 - 1})
+    db.commit()
+    assert queue.prune() == 3
@@ -0,0 +1,21 @@
+from benchmarks.loadtest import compare, percentile
+
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 99) == 99
+    assert percentile([], 95) == 0.0
+
+
+def test_compare_reports_only_regressions():
+    baseline = {"results": {
+        "quiz GET /api/vocablist/": {"p95": 100.0},
+        "dashboard GET /api/me/": {"p95": 100.0},
+    }}
+    results = {
+        "quiz GET /api/vocablist/": {"p95": 130.0},
+        "dashboard GET /api/me/": {"p95": 110.0},
+    }
+    assert compare(results, baseline, 0.25) == [("quiz GET /api/vocablist/", 100.0, 130.0)]
@@ -0,0 +1,24 @@
+from app.metrics import Registry, LATENCY_BUCKETS
+
+
+def test_registry_renders_prometheus_text():
+    registry = Registry()
+    registry.describe("demo_seconds", "histogram", "Demo")
+    registry.observe("demo_seconds", 0.02, LATENCY_BUCKETS, (("route", "/api/x"),))
+    registry.inc("demo_total", (("status", "200"),))
+
+    text = registry.render()
+    assert "# TYPE demo_seconds histogram" in text
+    assert 'demo_seconds_bucket{route="/api/x",le="0.01"} 0' in text
+    assert 'demo_seconds_bucket{route="/api/x",le="0.025"} 1' in text
+    assert 'demo_seconds_bucket{route="/api/x",le="+Inf"} 1' in text
+    assert 'demo_total{status="200"} 1' in text
+
+
+def test_metrics_endpoint_records_routes(client):
+    assert client.get("/api/health").status_code == 200
+    response = client.get("/api/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'http_requests_total{method="GET",route="/api/health",status="200"}' in response.text
+    assert "threadpool_tokens_total" in response.text
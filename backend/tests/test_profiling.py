@@ -0,0 +1,74 @@
+import os
+import threading
+import time
+
+from app import config, profiling
+
+
+def _busy(stop):
+    while not stop.is_set():
+        sum(i * i for i in range(1000))
+
+
+def test_sampler_collects_busy_thread():
+    stop = threading.Event()
+    worker = threading.Thread(target=_busy, args=(stop,))
+    worker.start()
+    sampler = profiling.Sampler(0.001)
+    sampler.start()
+    time.sleep(0.1)
+    sampler.stop()
+    stop.set()
+    worker.join()
+
+    assert sampler.samples > 0
+    assert "_busy (test_profiling.py" in sampler.folded()
+
+
+def test_store_and_load_profile(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "PROFILE_DIR", str(tmp_path))
+    monkeypatch.setattr(config, "PROFILE_KEEP", 1)
+    profiling.store_profile("a" * 32, "GET /old", "x;y 1\n")
+    time.sleep(0.01)
+    profiling.store_profile("b" * 32, "GET /new", "x;z 2\n")
+
+    assert [p["id"] for p in profiling.list_profiles()] == ["b" * 32]
+    assert profiling.load_profile("b" * 32).endswith("x;z 2\n")
+    assert profiling.load_profile("../etc/passwd") is None
+
+
+def test_profile_header_ignored_without_admin(client):
+    response = client.get("/api/health", headers={"X-Profile": "return"})
+    assert response.json() == {"status": "ok"}
+    assert "x-profile-id" not in response.headers
+
+
+def _slow_endpoint():
+    deadline = time.time() + 0.2
+    while time.time() < deadline:
+        sum(i * i for i in range(1000))
+    return {"status": "ok"}
+
+
+def test_request_profile_only_samples_its_own_threads(tmp_path, monkeypatch, api_client, bearer):
+    monkeypatch.setattr(config, "PROFILE_DIR", str(tmp_path))
+    monkeypatch.setattr(config, "PROFILER_REQUEST_INTERVAL", 0.001)
+    client = api_client()
+    client.app.get("/slow")(_slow_endpoint)
+    client.app.add_middleware(profiling.ProfilingMiddleware)
+    stop = threading.Event()
+    worker = threading.Thread(target=_busy, args=(stop,))
+    worker.start()
+    try:
+        response = client.get("/slow", headers={"X-Profile": "return", **bearer(1, role="Admin")})
+    finally:
+        stop.set()
+        worker.join()
+
+    assert response.status_code == 200 and "x-profile-id" not in response.headers
+    assert "_slow_endpoint (test_profiling.py" in response.text
+    assert "_busy (test_profiling.py" not in response.text
+    # "return" legt nichts in PROFILE_DIR ab, "store" schon
+    assert os.listdir(tmp_path) == []
+    response = client.get("/slow", headers={"X-Profile": "store", **bearer(1, role="Admin")})
+    assert profiling.load_profile(response.headers["x-profile-id"]) is not None
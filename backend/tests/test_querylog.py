@@ -0,0 +1,43 @@
+import logging
+
+import pytest
+
+from app import config, crud, models, querylog, schemas
+
+
+def _seed(db, n_entries):
+    user = models.User(username="q", email="q@example.com", password="x")
+    db.add(user)
+    db.commit()
+    vocab_list = crud.create_vocab_list(db, schemas.VocabListCreate(
+        name="Liste", columns=[schemas.ListColumnCreate(name="Wort")]
+    ), user.id)
+    for i in range(n_entries):
+        crud.create_vocab_entry(db, schemas.VocabEntryCreate(
+            vocab_list_id=vocab_list.id,
+            field_values=[schemas.EntryFieldValueCreate(column_id=vocab_list.columns[0].id, value=f"w{i}")]
+        ))
+    list_id = vocab_list.id
+    db.expunge_all()
+    return list_id
+
+
+def test_budget_flags_lazy_loading(db):
+    list_id = _seed(db, 6)
+    engine = db.get_bind()
+
+    with pytest.raises(querylog.QueryBudgetExceeded):
+        with querylog.budget(3, engine=engine) as log:
+            schemas.VocabList.model_validate(crud.get_vocab_list(db, list_id))
+    # field_values wird pro Eintrag einzeln nachgeladen
+    assert log.repeated(5)
+
+
+def test_slow_query_logs_plan(db, monkeypatch, caplog):
+    _seed(db, 1)
+    monkeypatch.setattr(config, "SQL_SLOW_QUERY_MS", 0)
+    querylog.install(db.get_bind())
+
+    with caplog.at_level(logging.WARNING, logger="vocademy.sql"):
+        db.query(models.VocabEntry).filter(models.VocabEntry.vocab_list_id == 1).all()
+    assert any("Langsames SQL" in r.message and "vocab_entries" in r.message for r in caplog.records)
@@ -0,0 +1,70 @@
+import pytest
+
+from app import config, models, ratelimit
+from app.metrics import registry
+from app.routes import user
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.mark.parametrize("make", [
+    lambda clock, tmp_path: ratelimit.MemoryBackend(clock=clock),
+    lambda clock, tmp_path: ratelimit.SqliteBackend(str(tmp_path / "rl.db"), clock=clock),
+], ids=["memory", "sqlite"])
+def test_token_bucket_burst_and_refill(make, tmp_path):
+    clock = FakeClock()
+    backend = make(clock, tmp_path)
+    capacity, rate = ratelimit.parse_rate("3/30")  # 3 am Stück, dann 1 Token alle 10 s
+
+    assert [backend.take("k", capacity, rate) for _ in range(3)] == [0, 0, 0]
+    assert backend.take("k", capacity, rate) == pytest.approx(10)
+    assert backend.take("other", capacity, rate) == 0
+
+    clock.now += 10
+    assert backend.take("k", capacity, rate) == 0
+    assert backend.take("k", capacity, rate) > 0
+
+    clock.now += 1000  # nie mehr als capacity ansparen
+    assert [backend.take("k", capacity, rate) for _ in range(4)][-1] > 0
+
+
+def test_memory_backend_prunes_full_buckets():
+    clock = FakeClock()
+    backend = ratelimit.MemoryBackend(max_keys=2, clock=clock)
+    backend.take("a", 5, 1)
+    backend.take("b", 5, 1)
+    clock.now += 10
+    backend.take("c", 5, 1)
+    assert set(backend._buckets) == {"c"}
+
+
+def test_login_is_rejected_before_password_hashing(db, monkeypatch, api_client):
+    monkeypatch.setattr(config, "LOGIN_RATE_PER_IP", "100/60")
+    monkeypatch.setattr(config, "LOGIN_RATE_PER_USERNAME", "2/60")
+    calls = []
+    monkeypatch.setattr(user, "verify_password", lambda plain, hashed: calls.append(plain) or False)
+
+    client = api_client(user.router)
+
+    key = ("rate_limit_rejected_total", (("rule", "login_username"),))
+    before = registry.counters.get(key, 0)
+    form = {"username": "Anna", "password": "falsch"}
+    db.add(models.User(username="Anna", email="a@example.com", password="x", is_active=True))
+    db.commit()
+
+    assert client.post("/api/login/", data=form).status_code == 401
+    assert client.post("/api/login/", data={**form, "username": "anna "}).status_code == 401
+    response = client.post("/api/login/", data=form)
+    assert response.status_code == 429
+    assert 0 < int(response.headers["retry-after"]) <= 30
+    assert len(calls) == 1  # nur der erste Versuch hat überhaupt gehasht ("anna " existiert nicht)
+    assert registry.counters[key] == before + 1
+
+    # Andere Benutzer sind vom Username-Bucket nicht betroffen
+    assert client.post("/api/login/", data={"username": "bob", "password": "x"}).status_code == 401
@@ -0,0 +1,204 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, database, models, schemas, singleflight
+from app.metrics import registry
+from app.routes import vocab, vocablist
+
+READERS = 5
+
+
+def _coalesced(name):
+    return registry.counters.get(("singleflight_coalesced_total", (("read", name),)), 0)
+
+
+def _wait_for(condition):
+    deadline = time.time() + 5
+    while not condition():
+        assert time.time() < deadline
+        time.sleep(0.01)
+
+
+def test_concurrent_calls_share_one_load():
+    flight = singleflight.SingleFlight("test")
+    release, calls = threading.Event(), []
+    before = _coalesced("test")
+
+    def load():
+        calls.append(1)
+        release.wait(5)
+        return b"[]"
+
+    with ThreadPoolExecutor(READERS) as pool:
+        futures = [pool.submit(flight.do, "key", load) for _ in range(READERS)]
+        _wait_for(lambda: _coalesced("test") == before + READERS - 1)
+        release.set()
+        assert [future.result() for future in futures] == [b"[]"] * READERS
+    assert len(calls) == 1 and flight.in_flight() == 0
+
+    # Kein Cache: danach wird neu geladen
+    assert flight.do("key", load) == b"[]" and len(calls) == 2
+
+
+def test_failed_load_is_retried_by_followers():
+    flight = singleflight.SingleFlight("test")
+    release = threading.Event()
+    before = _coalesced("test")
+
+    def fail():
+        release.wait(5)
+        raise ValueError("kaputt")
+
+    # Den Fehler bekommt nur der Leader, die Follower laden selbst
+    with ThreadPoolExecutor(READERS) as pool:
+        leader = pool.submit(flight.do, "key", fail)
+        _wait_for(lambda: flight.in_flight() == 1)
+        followers = [pool.submit(flight.do, "key", lambda: b"[]") for _ in range(READERS - 1)]
+        _wait_for(lambda: _coalesced("test") == before + READERS - 1)
+        release.set()
+        with pytest.raises(ValueError):
+            leader.result()
+        assert [future.result() for future in followers] == [b"[]"] * (READERS - 1)
+
+    async def scenario():
+        started = asyncio.Event()
+
+        async def fail_async():
+            started.set()
+            await asyncio.sleep(0.01)
+            raise ValueError("kaputt")
+
+        async def load_async():
+            return b"[]"
+
+        leader = asyncio.ensure_future(flight.do_async("key", fail_async))
+        await started.wait()
+        follower = await flight.do_async("key", load_async)
+        with pytest.raises(ValueError):
+            await leader
+        return follower
+
+    assert asyncio.run(scenario()) == b"[]"
+
+
+@pytest.fixture()
+def sessions(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}", connect_args={"check_same_thread": False})
+    database.Base.metadata.create_all(bind=engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture()
+def vocab_list(sessions, make_list):
+    with sessions() as db:
+        vocab_list = make_list(db, rows=[("Haus",), ("Baum",)], columns=["Deutsch"])
+        return vocab_list.id, vocab_list.user_id, vocab_list.columns[0].id
+
+
+@pytest.fixture()
+def client(sessions, api_client):
+    # Eigene Session pro Request, wie database.get_db
+    def get_db():
+        with sessions() as db:
+            yield db
+
+    return api_client(vocablist.router, vocab.router, get_db=get_db)
+
+
+def test_concurrent_list_reads_load_once(sessions, vocab_list, client, monkeypatch, bearer):
+    list_id, user_id, column_id = vocab_list
+    release, loads = threading.Event(), []
+    load_list = crud.get_vocab_list
+    before = _coalesced("vocablist")
+
+    def slow_load(db, vocablist_id):
+        loads.append(vocablist_id)
+        release.wait(5)
+        return load_list(db, vocablist_id)
+
+    monkeypatch.setattr(crud, "get_vocab_list", slow_load)
+    url = f"/api/vocablist/{list_id}"
+    with ThreadPoolExecutor(READERS + 1) as pool:
+        futures = [pool.submit(client.get, url, headers=bearer(user_id)) for _ in range(READERS)]
+        _wait_for(lambda: _coalesced("vocablist") == before + READERS - 1)
+        # Berechtigung prüft jeder Request selbst, auch während die Liste lädt
+        assert client.get(url, headers=bearer(999)).status_code == 403
+
+        # Nach einem Schreibzugriff gehört der nächste Request zu einem neuen Ladevorgang
+        with sessions() as db:
+            crud.create_vocab_entry(db, schemas.VocabEntryCreate(vocab_list_id=list_id, field_values=[
+                schemas.EntryFieldValueCreate(column_id=column_id, value="Maus"),
+            ]))
+        fresh = pool.submit(client.get, url, headers=bearer(user_id))
+        _wait_for(lambda: len(loads) == 2)
+        release.set()
+        bodies = [future.result().json() for future in futures]
+        assert "Maus" in {e["field_values"][0]["value"] for e in fresh.result().json()["entries"]}
+    assert loads == [list_id, list_id]
+    assert all(body == bodies[0] for body in bodies)
+
+    # Gleiches JSON wie mit response_model
+    with sessions() as db:
+        expected = schemas.VocabList.model_validate(load_list(db, list_id)).model_dump(mode="json")
+    assert bodies[0] == expected
+
+    entries = client.get(f"/api/vocab/entries/list/{list_id}", headers=bearer(user_id))
+    assert sorted(e["field_values"][0]["value"] for e in entries.json()) == ["Baum", "Haus", "Maus"]
+    assert client.get("/api/vocab/entries/list/999", headers=bearer(user_id)).status_code == 404
+
+
+
+@pytest.mark.parametrize("path, loader", [
+    ("/api/vocablist/{}", "get_vocab_list"),
+    ("/api/vocab/entries/list/{}", "get_vocab_list_entries"),
+])
+def test_list_deleted_after_owner_check_is_404(sessions, vocab_list, client, monkeypatch, bearer, path, loader):
+    list_id, user_id, _ = vocab_list
+    load = getattr(crud, loader)
+
+    def deleted_first(db, list_id):
+        # Ein anderer Request löscht die Liste zwischen Berechtigungscheck und Laden
+        with sessions() as other:
+            other.delete(other.get(models.VocabList, list_id))
+            other.commit()
+        return load(db, list_id)
+
+    monkeypatch.setattr(crud, loader, deleted_first)
+    assert client.get(path.format(list_id), headers=bearer(user_id)).status_code == 404
+
+
+@pytest.mark.parametrize("path, shared_path, loader, read", [
+    ("/api/vocablist/{}", "/api/shared/{}", "get_vocab_list", "vocablist"),
+    ("/api/vocab/entries/list/{}", "/api/shared/{}/entries", "get_vocab_list_entries", "entries"),
+])
+def test_shared_reads_join_owner_reads(sessions, vocab_list, client, monkeypatch, bearer, path, shared_path, loader, read):
+    list_id, user_id, _ = vocab_list
+    with sessions() as db:
+        code = crud.share_vocab_list(db, list_id).share_code
+    release, loads = threading.Event(), []
+    load = getattr(crud, loader)
+    before = _coalesced(read)
+
+    def slow_load(db, list_id):
+        loads.append(list_id)
+        release.wait(5)
+        return load(db, list_id)
+
+    monkeypatch.setattr(crud, loader, slow_load)
+    with ThreadPoolExecutor(2) as pool:
+        owner = pool.submit(client.get, path.format(list_id), headers=bearer(user_id))
+        _wait_for(lambda: loads)
+        shared = pool.submit(client.get, shared_path.format(code), headers=bearer(999))
+        _wait_for(lambda: _coalesced(read) == before + 1)
+        release.set()
+        assert shared.result().status_code == owner.result().status_code == 200
+        assert shared.result().json() == owner.result().json()
+    assert loads == [list_id]
+    assert client.get(shared_path.format("falsch"), headers=bearer(999)).status_code == 404
@@ -0,0 +1,54 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from sqlalchemy import create_engine, event, inspect, text
+
+from app import migrations
+
+
+def _statements(engine):
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, sql, *args: statements.append(sql))
+    return statements
+
+
+def test_schema_is_only_migrated_when_fingerprint_changes(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    assert migrations.ensure_schema(engine) is True
+    assert "vocab_entries" in inspect(engine).get_table_names()
+
+    # Aktuelles Schema: ein SELECT, keine Reflection
+    statements = _statements(engine)
+    assert migrations.ensure_schema(engine) is False
+    assert len(statements) == 1 and "schema_version" in statements[0]
+
+    # Ältere Datenbank ohne schema_version und ohne nachgezogene Spalte
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE schema_version"))
+        conn.execute(text("ALTER TABLE users DROP COLUMN list_count"))
+    assert migrations.ensure_schema(engine) is True
+    assert "list_count" in {c["name"] for c in inspect(engine).get_columns("users")}
+
+    # Modell geändert
+    monkeypatch.setattr(migrations, "schema_fingerprint", lambda: "neu")
+    assert migrations.ensure_schema(engine) is True
+    assert migrations.stored_fingerprint(engine) == "neu"
+    engine.dispose()
+
+
+def test_importing_app_touches_no_database_and_loads_no_crypto(tmp_path):
+    database = tmp_path / "app.db"
+    probe = (
+        "import json, sys, app.main; "
+        "print(json.dumps(sorted(m for m in ('jose', 'passlib') if m in sys.modules)))"
+    )
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{database}", "JOB_WORKERS": "0", "BACKUP_INTERVAL_MINUTES": "0"}
+    output = subprocess.run(
+        [sys.executable, "-c", probe], cwd=Path(__file__).resolve().parents[1], env=env,
+        capture_output=True, text=True, check=True
+    ).stdout
+    assert json.loads(output.strip().splitlines()[-1]) == []
+    assert not database.exists()
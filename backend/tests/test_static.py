@@ -0,0 +1,49 @@
+import gzip
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app import static
+
+
+def _app(tmp_path):
+    assets = tmp_path / "assets"
+    assets.mkdir()
+    (assets / "index-Abcd1234.js").write_text("console.log('x');" * 100)
+    (assets / "index-Abcd1234.js.gz").write_bytes(gzip.compress(b"console.log('x');" * 100))
+    (tmp_path / "index.html").write_text("<html>app</html>")
+
+    app = FastAPI()
+    spa = static.SpaIndex(tmp_path / "index.html")
+    app.mount("/assets", static.PrecompressedStaticFiles(directory=str(assets)))
+
+    @app.get("/{path:path}")
+    def index(path: str, request: Request):
+        return spa.response(request)
+
+    return TestClient(app)
+
+
+def test_accepted_encodings_ignores_q0():
+    assert static.accepted_encodings("gzip, br;q=0, deflate;q=0.5") == {"gzip", "deflate"}
+
+
+def test_assets_serve_gzip_variant_with_immutable_cache(tmp_path):
+    client = _app(tmp_path)
+    response = client.get("/assets/index-Abcd1234.js", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "immutable" in response.headers["cache-control"]
+    assert response.text == "console.log('x');" * 100
+
+    plain = client.get("/assets/index-Abcd1234.js", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+
+
+def test_index_etag_revalidation(tmp_path):
+    client = _app(tmp_path)
+    first = client.get("/some/route")
+    assert first.text == "<html>app</html>"
+    assert first.headers["cache-control"] == "no-cache"
+
+    second = client.get("/other", headers={"If-None-Match": first.headers["etag"]})
+    assert second.status_code == 304
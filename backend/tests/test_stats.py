@@ -0,0 +1,91 @@
+import pytest
+from sqlalchemy import event
+
+from anki_decks import BASIC, apkg
+from app import anki, config, crud, models, schemas, stats
+from app.routes import stats as stats_routes
+
+
+@pytest.fixture()
+def user(db):
+    user = models.User(username="lehrer", email="lehrer@example.com", password="x")
+    db.add(user)
+    db.commit()
+    return user
+
+
+@pytest.mark.parametrize("storage", ["eav", "dual", "json"])
+def test_counters_follow_crud(db, user, monkeypatch, storage, make_list, add_entry):
+    monkeypatch.setattr(config, "ENTRY_STORAGE", storage)
+    vocab_list = make_list(db, user)
+    list_id, (german, english) = vocab_list.id, [c.id for c in vocab_list.columns]
+    entries = [add_entry(db, vocab_list, *row) for row in [("Haus", "house"), ("Baum", ""), ("Weg", " ")]]
+    assert stats.user_stats(db, user.id) == {"lists": 1, "entries": 3}
+    assert [c["filled"] for c in stats.list_stats(db, list_id)["columns"]] == [3, 1]
+
+    crud.update_vocab_entry(db, entries[1].id, schemas.VocabEntryUpdate(field_values=[
+        schemas.EntryFieldValueCreate(column_id=german, value="Baum"),
+        schemas.EntryFieldValueCreate(column_id=english, value="tree"),
+    ]))
+    if storage != "json":
+        field = db.query(models.EntryFieldValue).filter_by(entry_id=entries[0].id, column_id=english).one()
+        crud.update_field_value(db, field.id, "")
+    crud.delete_vocab_entry(db, entries[2].id)
+    result = stats.list_stats(db, list_id)
+    assert result["entries"] == 2
+    assert [c["filled"] for c in result["columns"]] == [2, 1 if storage != "json" else 2]
+
+    clone = crud.clone_vocab_list(db, list_id, user.id)
+    assert stats.user_stats(db, user.id) == {"lists": 2, "entries": 4}
+    crud.delete_vocab_list(db, list_id)
+    assert stats.user_stats(db, user.id) == {"lists": 1, "entries": 2}
+    assert stats.list_stats(db, clone.id)["entries"] == 2
+    assert stats.reconcile(db) == 0
+
+
+def test_anki_import_and_background_delete_keep_counters(db, user, tmp_path, monkeypatch):
+    from app import jobs
+    from sqlalchemy.orm import sessionmaker
+
+    monkeypatch.setattr(config, "ANKI_IMPORT_BATCH_SIZE", 2)
+    monkeypatch.setattr(config, "JOB_THROTTLE_SECONDS", 0)
+    monkeypatch.setattr(config, "JOB_BATCH_SIZE", 2)
+    result = anki.import_deck(db, apkg(tmp_path, [(BASIC, ["a", "b"]), (BASIC, ["c", ""]), (BASIC, ["e", "f"])]), user.id)
+    list_stats = stats.list_stats(db, result["vocab_list_id"])
+    assert (list_stats["entries"], [c["filled"] for c in list_stats["columns"]]) == (3, [3, 2])
+    assert stats.user_stats(db, user.id) == {"lists": 1, "entries": 3}
+
+    queue = jobs.JobQueue(sessionmaker(bind=db.get_bind()), workers=0)
+    queue.enqueue("delete_vocab_list", {"vocab_list_id": result["vocab_list_id"]}, user.id)
+    assert queue.run_next().status == "succeeded"
+    db.expire_all()
+    assert stats.user_stats(db, user.id) == {"lists": 0, "entries": 0}
+    assert stats.reconcile(db) == 0
+
+
+def test_unknown_counters_and_drift_are_repaired(db, user, make_list, api_client):
+    list_id = make_list(db, user, rows=[("Haus", "house"), ("Baum", "")]).id
+    # Frisch migrierte Spalten sind NULL
+    db.query(models.User).update({"list_count": None, "entry_count": None})
+    db.query(models.VocabList).update({"entry_count": None})
+    db.query(models.ListColumn).update({"filled_count": None})
+    db.commit()
+
+    client = api_client(stats_routes.router, user=user)
+
+    assert client.get("/api/stats/me").json() == {"lists": 1, "entries": 2}
+    response = client.get(f"/api/vocablist/{list_id}/stats").json()
+    assert (response["entries"], response["filled_ratio"]) == (2, 0.75)
+
+    # Danach nur noch Zähler lesen: Anzahl Statements unabhängig von den Einträgen
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute", lambda conn, cursor, sql, *args: statements.append(sql))
+    client.get(f"/api/vocablist/{list_id}/stats")
+    assert not any("vocab_entries" in sql or "entry_field_values" in sql for sql in statements)
+
+    db.query(models.User).update({"entry_count": 99})
+    db.query(models.ListColumn).update({"filled_count": 0})
+    db.commit()
+    assert stats.reconcile(db) == 3
+    assert stats.reconcile(db) == 0
+    assert stats.user_overview(db) == [{"id": user.id, "username": "lehrer", "lists": 1, "entries": 2}]
@@ -0,0 +1,128 @@
+import pytest
+from jose import jwt
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import auth, config, database, models, tenancy
+from app.database import Base
+from app.routes import user, vocab, vocablist
+
+
+@pytest.fixture()
+def sharded(tmp_path, monkeypatch, api_client):
+    """Haupt-DB und Shards in tmp_path, TENANT_SHARDING aktiv."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'main.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    monkeypatch.setattr(database, "engine", engine)
+    monkeypatch.setattr(database, "SessionLocal", sessionmaker(autocommit=False, autoflush=False, bind=engine))
+    monkeypatch.setattr(config, "TENANT_SHARDING", True)
+    monkeypatch.setattr(config, "TENANT_DATABASE_URL", f"sqlite:///{tmp_path}/tenants/{{shard}}.db")
+    registry = tenancy.ShardRegistry(idle_seconds=300, max_engines=8)
+    monkeypatch.setattr(tenancy, "registry", registry)
+
+    # Echte Sessions über database.get_db: Haupt-DB oder Shard des Mandanten
+    yield api_client(user.router, vocab.router, vocablist.router, get_db=database.get_db)
+    registry.dispose()
+    engine.dispose()
+
+
+def _register_and_login(client, username, tenant=None):
+    body = {"username": username, "email": f"{username}@example.com", "password": "geheim1"}
+    if tenant:
+        body["tenant"] = tenant
+    response = client.post("/api/register/", json=body)
+    assert response.status_code == 200, response.text
+    response = client.post("/api/login/", data={"username": username, "password": "geheim1"})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def _create_list(client, headers, name):
+    response = client.post("/api/vocablist/", headers=headers, json={
+        "name": name, "columns": [{"name": "Deutsch", "position": 0}, {"name": "Englisch", "position": 1}],
+    })
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_tenants_are_isolated_in_their_own_shards(sharded, tmp_path):
+    tenancy.create_tenant("nord")
+    tenancy.create_tenant("sued")
+    nord = _register_and_login(sharded, "anna", "nord")
+    sued = _register_and_login(sharded, "ben", "sued")
+
+    claims = jwt.decode(nord["Authorization"].split()[1], auth.SECRET_KEY, algorithms=[auth.ALGORITHM])
+    assert claims["tenant"] == "nord"
+
+    assert _create_list(sharded, nord, "Nord-Liste")["id"] == 1
+    assert _create_list(sharded, sued, "Süd-Liste")["id"] == 1
+    assert [l["name"] for l in sharded.get("/api/vocablist/", headers=nord).json()] == ["Nord-Liste"]
+    assert [l["name"] for l in sharded.get("/api/vocablist/", headers=sued).json()] == ["Süd-Liste"]
+    assert sharded.get("/api/me/", headers=sued).json()["tenant"] == "sued"
+
+    assert (tmp_path / "tenants" / "nord.db").exists()
+    with database.SessionLocal() as directory:
+        assert directory.query(models.User).count() == 0
+        assert tenancy.tenant_of_user(directory, "anna") == "nord"
+
+    # Benutzernamen bleiben über alle Shards eindeutig
+    body = {"username": "anna", "email": "x@example.com", "password": "geheim1", "tenant": "sued"}
+    assert sharded.post("/api/register/", json=body).status_code == 400
+    body["tenant"] = "gibtsnicht"
+    body["username"] = "neu"
+    assert sharded.post("/api/register/", json=body).status_code == 404
+
+
+def test_move_tenant_from_main_db_into_own_shard(sharded):
+    # Bestandsnutzer der Haupt-DB, daneben ein Nutzer ohne Mandant
+    other = _register_and_login(sharded, "ohne")
+    _create_list(sharded, other, "Bleibt")
+    headers = _register_and_login(sharded, "carla")
+    vocab_list = _create_list(sharded, headers, "Verben")
+    columns = [c["id"] for c in vocab_list["columns"]]
+    response = sharded.post("/api/vocab/entries", headers=headers, json={
+        "vocab_list_id": vocab_list["id"],
+        "field_values": [{"column_id": columns[0], "value": "laufen"}, {"column_id": columns[1], "value": "run"}],
+    })
+    assert response.status_code == 200, response.text
+
+    tenancy.create_tenant("west", shard=tenancy.MAIN_SHARD)
+    assert tenancy.add_members("west", ["carla"]) == 1
+    counts = tenancy.move_tenant("west", "west", batch_size=1)
+    assert counts == {"users": 1, "vocab_lists": 1, "list_columns": 2, "vocab_entries": 1, "entry_field_values": 2}
+
+    response = sharded.post("/api/login/", data={"username": "carla", "password": "geheim1"})
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    lists = sharded.get("/api/vocablist/", headers=headers).json()
+    assert [l["name"] for l in lists] == ["Verben"]
+    entries = sharded.get(f"/api/vocab/entries/list/{lists[0]['id']}", headers=headers).json()
+    assert sorted(f["value"] for f in entries[0]["field_values"]) == ["laufen", "run"]
+    assert {f["column_id"] for f in entries[0]["field_values"]} == {c["id"] for c in lists[0]["columns"]}
+
+    with database.SessionLocal() as directory:
+        assert [u.username for u in directory.query(models.User)] == ["ohne"]
+        assert directory.query(models.VocabList).count() == 1
+        assert directory.get(models.Tenant, "west").shard == "west"
+    assert [l["name"] for l in sharded.get("/api/vocablist/", headers=other).json()] == ["Bleibt"]
+
+
+def test_registry_evicts_idle_and_least_recently_used_engines(sharded):
+    registry = tenancy.ShardRegistry(idle_seconds=300, max_engines=2)
+    for shard in ("a", "b", "c"):
+        registry.engine(shard)
+    assert registry.open_shards() == ["b", "c"]
+
+    registry.idle_seconds = 0
+    with registry.session("b") as db:
+        db.connection()  # ausgecheckte Verbindung schützt vor dem Schließen
+        registry.evict_idle()
+        assert registry.open_shards() == ["b"]
+    registry.evict_idle()
+    assert registry.open_shards() == []
+    registry.dispose()
+
+
+def test_invalid_shard_names_are_rejected():
+    for name in ("../etc", "Nord", "", "a" * 64):
+        with pytest.raises(ValueError):
+            tenancy.validate_name(name)
@@ -0,0 +1,139 @@
+import threading
+import time
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app import auth, config, crud, database, models, revocation, schemas
+from app.routes import user, vocablist
+
+
+@pytest.fixture()
+def main_db(tmp_path, monkeypatch):
+    """Datei-DB als Haupt-DB: Refresh-Tokens und Sperrliste laufen über database.SessionLocal."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'main.db'}", connect_args={"check_same_thread": False})
+    database.Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    monkeypatch.setattr(database, "SessionLocal", session_factory)
+    revocations = revocation.RevocationList(sync_seconds=0.05)
+    monkeypatch.setattr(revocation, "revocations", revocations)
+    yield engine
+    revocations.stop()
+    engine.dispose()
+
+
+@pytest.fixture()
+def client(main_db, api_client):
+    def get_db():
+        db = database.SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    with database.SessionLocal() as db:
+        for name, role in [("admin", "Admin"), ("anna", "User")]:
+            created = crud.create_user(db, schemas.UserCreate(username=name, email=f"{name}@example.com", password="geheim"))
+            created.role = role
+        db.commit()
+
+    return api_client(user.router, vocablist.router, get_db=get_db)
+
+
+def _login(client, username):
+    response = client.post("/api/login/", data={"username": username, "password": "geheim"})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def _bearer(pair):
+    return {"Authorization": f"Bearer {pair['access_token']}"}
+
+
+def test_token_check_needs_no_database(client, main_db):
+    pair = _login(client, "anna")
+    statements = []
+    event.listen(
+        main_db, "before_cursor_execute",
+        lambda *args: statements.append(args[2]) if threading.current_thread() is threading.main_thread() else None
+    )
+    token_user = auth.get_token_user(pair["access_token"])
+    assert (token_user.username, token_user.role) == ("anna", "User")
+    assert statements == []
+    assert client.get("/api/vocablist/", headers=_bearer(pair)).status_code == 200
+
+
+def test_refresh_rotates_and_detects_reuse(client, monkeypatch):
+    pair = _login(client, "anna")
+    response = client.post("/api/refresh/", json={"refresh_token": pair["refresh_token"]})
+    assert response.status_code == 200
+    second = response.json()
+    assert second["refresh_token"] != pair["refresh_token"]
+
+    # Zweiter Tab mit dem alten Token kurz danach: abgelehnt, aber keine Sperre
+    assert client.post("/api/refresh/", json={"refresh_token": pair["refresh_token"]}).status_code == 401
+    response = client.post("/api/refresh/", json={"refresh_token": second["refresh_token"]})
+    assert response.status_code == 200
+    third = response.json()
+
+    # Später noch einmal vorgelegt: gestohlen -> alle Sitzungen beenden
+    monkeypatch.setattr(config, "REFRESH_REUSE_GRACE_SECONDS", -1)
+    assert client.post("/api/refresh/", json={"refresh_token": pair["refresh_token"]}).status_code == 401
+    assert client.post("/api/refresh/", json={"refresh_token": third["refresh_token"]}).status_code == 401
+    assert client.get("/api/vocablist/", headers=_bearer(third)).status_code == 401
+
+
+def test_deactivation_takes_effect_immediately(client):
+    admin, anna = _login(client, "admin"), _login(client, "anna")
+    anna_id = auth.get_token_user(anna["access_token"]).id
+
+    assert client.put(f"/api/user/{anna_id}/deactivate", headers=_bearer(admin)).status_code == 200
+    with pytest.raises(HTTPException) as exc:
+        auth.get_token_user(anna["access_token"])
+    assert exc.value.status_code == 401
+    assert client.post("/api/refresh/", json={"refresh_token": anna["refresh_token"]}).status_code == 401
+    assert client.post("/api/login/", data={"username": "anna", "password": "geheim"}).status_code == 403
+
+
+def test_role_change_needs_only_a_refresh(client):
+    admin, anna = _login(client, "admin"), _login(client, "anna")
+    anna_id = auth.get_token_user(anna["access_token"]).id
+
+    response = client.put(f"/api/user/{anna_id}", json={"role": "Admin"}, headers=_bearer(admin))
+    assert response.status_code == 200
+    assert client.get("/api/vocablist/", headers=_bearer(anna)).status_code == 401
+
+    response = client.post("/api/refresh/", json={"refresh_token": anna["refresh_token"]})
+    assert response.status_code == 200
+    assert auth.admin_required(response.json()["access_token"]).username == "anna"
+
+
+def test_password_change_ends_other_sessions(client):
+    phone, laptop = _login(client, "anna"), _login(client, "anna")
+    response = client.put(
+        "/api/user/me/password/", json={"current_password": "geheim", "new_password": "neu"}, headers=_bearer(laptop)
+    )
+    assert response.status_code == 200
+    assert client.get("/api/vocablist/", headers=_bearer(response.json())).status_code == 200
+    assert client.get("/api/vocablist/", headers=_bearer(phone)).status_code == 401
+    assert client.post("/api/refresh/", json={"refresh_token": phone["refresh_token"]}).status_code == 401
+
+
+def test_revocations_reach_other_processes_and_expire(main_db):
+    writer = revocation.RevocationList(max_age=60, sync_seconds=3600)
+    reader = revocation.RevocationList(max_age=60, sync_seconds=3600)
+    try:
+        now = time.time()
+        writer.revoke([":1"], now)
+        writer.revoke([":2"], now - 120)  # älter als jedes Access-Token
+        reader.sync()
+        assert reader.is_revoked(":1", now - 1)
+        assert not reader.is_revoked(":1", now + 1)
+        assert not reader.is_revoked(":2", 0)
+        with database.SessionLocal() as db:
+            assert [row.subject for row in db.query(models.TokenRevocation)] == [":1"]
+    finally:
+        writer.stop()
+        reader.stop()
@@ -0,0 +1 @@
+CREATE DATABASE vocademy_test OWNER vocademy;
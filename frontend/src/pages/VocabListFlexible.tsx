@@ -2,6 +2,7 @@ import { useEffect, useState } from "react";
 import { useParams } from "react-router-dom";
 import api from "../services/api";
 import { updateEntry, deleteEntry } from "../services/vocab";
+import { fieldValues, subscribeToList, type ListEvent } from "../services/events";
 import Navbar from "../components/Navbar";
 
 interface Column {
@@ -26,10 +27,54 @@ export default function VocabListFlexible() {
   const [editValues, setEditValues] = useState<Record<number, string>>({});
 
   useEffect(() => {
-    api.get(`/vocablist/${id}`).then((res) => {
-      setColumns(res.data.columns || []);
-      setEntries(res.data.entries || []);
-    });
+    const load = () =>
+      api.get(`/vocablist/${id}`).then((res) => {
+        setColumns(res.data.columns || []);
+        setEntries(res.data.entries || []);
+      });
+    load();
+
+    // Änderungen von anderen Geräten live übernehmen (eigene kommen ebenfalls zurück, daher per ID ersetzen)
+    const apply = (event: ListEvent) => {
+      switch (event.type) {
+        case "entry_created":
+        case "entry_updated": {
+          const entry = { id: event.entry.id, field_values: fieldValues(event.entry) };
+          setEntries((prev) =>
+            prev.some((e) => e.id === entry.id) ? prev.map((e) => (e.id === entry.id ? entry : e)) : [...prev, entry]
+          );
+          break;
+        }
+        case "entry_deleted":
+          setEntries((prev) => prev.filter((e) => e.id !== event.entry_id));
+          break;
+        case "field_updated":
+          setEntries((prev) =>
+            prev.map((e) =>
+              e.id !== event.entry_id
+                ? e
+                : {
+                    ...e,
+                    field_values: [
+                      ...e.field_values.filter((f) => f.column_id !== event.column_id),
+                      { column_id: event.column_id, value: event.value },
+                    ],
+                  }
+            )
+          );
+          break;
+        case "column_added":
+          setColumns((prev) => [...prev.filter((c) => c.id !== event.column.id), event.column]);
+          break;
+        case "column_deleted":
+          setColumns((prev) => prev.filter((c) => c.id !== event.column_id));
+          break;
+        case "resync":
+          load();
+          break;
+      }
+    };
+    return subscribeToList(Number(id), apply);
   }, [id]);
 
   const handleAddEntry = async () => {
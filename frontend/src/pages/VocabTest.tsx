@@ -1,6 +1,6 @@
 ﻿import { useEffect, useState } from "react";
 import Navbar from "../components/Navbar";
-import { getVocabLists, getVocabList, getEntriesByList } from "../services/vocab";
+import { getVocabLists, getVocabList, getEntriesByList, getQuiz } from "../services/vocab";
 
 // Toleranter Antwortvergleich: normalisiert Zeichen, Leerzeichen, Interpunktion
 function normalizeAnswer(input: string): string {
@@ -60,6 +60,22 @@ interface ListItem { id: number; name: string }
 interface Column { id: number; name: string; is_primary?: boolean }
 interface EntryField { column_id: number; value: string }
 interface Entry { id: number; field_values: EntryField[] }
+interface QuizQuestion { prompt: string; answer: string; target_column_id: number; options: string[] }
+interface Question {
+  q: string;
+  a: string;
+  listName: string;
+  sourceName: string;
+  targetName: string;
+  options?: string[];  // nur Multiple Choice
+}
+type Mode = "input" | "choice";
+
+// Multiple Choice: nur die angeklickte Antwort zählt (Ablenker sind absichtlich ähnlich)
+function checkAnswer(question: Question, userInput: string): boolean {
+  if (question.options) return userInput.trim() === question.a.trim();
+  return isAnswerCorrect(userInput, question.a);
+}
 
 export default function VocabTest() {
   const [lists, setLists] = useState<ListItem[]>([]);
@@ -67,13 +83,8 @@ export default function VocabTest() {
   const [columnsByList, setColumnsByList] = useState<Record<number, Column[]>>({});
   const [sourceByList, setSourceByList] = useState<Record<number, string>>({});
 
-  const [questions, setQuestions] = useState<{
-    q: string;
-    a: string;
-    listName: string;
-    sourceName: string;
-    targetName: string;
-  }[]>([]);
+  const [mode, setMode] = useState<Mode>("input");
+  const [questions, setQuestions] = useState<Question[]>([]);
   const [current, setCurrent] = useState(0);
   const [answer, setAnswer] = useState("");
   const [score, setScore] = useState(0);
@@ -129,20 +140,11 @@ export default function VocabTest() {
     if (!selected.length) { setError("Bitte mindestens eine Liste wählen!"); return; }
     setLoading(true);
     try {
-      const all: {
-        q: string;
-        a: string;
-        listName: string;
-        sourceName: string;
-        targetName: string;
-      }[] = [];
+      const all: Question[] = [];
 
       // Liste für Liste abfragen (keine globale Durchmischung der Listen)
       for (const listId of selected) {
-        const [listRes, entriesRes] = await Promise.all([
-          getVocabList(listId),
-          getEntriesByList(listId),
-        ]);
+        const listRes = await getVocabList(listId);
         const listName: string = listRes.data.name;
         const columns = listRes.data.columns as Column[];
         const nameToId = new Map(columns.map((c) => [c.name, c.id] as const));
@@ -160,6 +162,24 @@ export default function VocabTest() {
         // Zielkandidaten: alle anderen Spalten in dieser Liste (außer Quelle)
         const targets = columns.filter((c) => c.id !== srcId);
 
+        if (mode === "choice") {
+          // Fragen samt ähnlichen falschen Antworten kommen fertig vom Server
+          const quizRes = await getQuiz(listId, srcId);
+          const targetNames = new Map(targets.map((c) => [c.id, c.name] as const));
+          for (const item of quizRes.data.questions as QuizQuestion[]) {
+            all.push({
+              q: item.prompt,
+              a: item.answer,
+              listName,
+              sourceName: srcColName!,
+              targetName: targetNames.get(item.target_column_id) || "",
+              options: item.options,
+            });
+          }
+          continue;
+        }
+        const entriesRes = await getEntriesByList(listId);
+
         // Reihenfolge innerhalb der Liste: wir können Einträge mischen, bleiben aber in der Liste
         const entries = (entriesRes.data as Entry[]).slice();
         for (let i = entries.length - 1; i > 0; i--) {
@@ -211,14 +231,13 @@ export default function VocabTest() {
     }
   };
 
-  const submit = () => {
+  const submit = (given: string = answer) => {
     if (!questions[current]) return;
-    const correct = questions[current].a;
-    const ok = isAnswerCorrect(answer, correct);
+    const ok = checkAnswer(questions[current], given);
     if (ok) setScore((s) => s + 1);
     setUserAnswers((prev) => {
       const next = prev.slice();
-      next[current] = answer;
+      next[current] = given;
       return next;
     });
     setAnswer("");
@@ -256,7 +275,7 @@ export default function VocabTest() {
               <tbody>
                 {questions.map((qq, i) => {
                   const ua = (userAnswers[i] || "").trim();
-                  const ok = isAnswerCorrect(ua, qq.a);
+                  const ok = checkAnswer(qq, ua);
                   return (
                     <tr key={i} className="border-t">
                       <td className="px-3 py-2">{i + 1}</td>
@@ -276,7 +295,7 @@ export default function VocabTest() {
           <div className="md:hidden space-y-3">
             {questions.map((qq, i) => {
               const ua = (userAnswers[i] || "").trim();
-              const ok = isAnswerCorrect(ua, qq.a);
+              const ok = checkAnswer(qq, ua);
               return (
                 <div key={i} className="bg-white rounded-lg shadow p-4">
                   <div className="flex items-center justify-between text-sm text-gray-600">
@@ -352,6 +371,21 @@ export default function VocabTest() {
             <p className="text-xs text-gray-500">Ziel ist automatisch „alle anderen Sprachen“ der jeweils ausgewählten Liste.</p>
           </div>
 
+          <div>
+            <h2 className="font-semibold mb-2">Abfrage</h2>
+            <div className="flex gap-2">
+              {([["input", "Eingabe"], ["choice", "Multiple Choice"]] as const).map(([value, label]) => (
+                <button
+                  key={value}
+                  onClick={() => setMode(value)}
+                  className={`px-3 py-2 rounded border ${mode === value ? "bg-emerald-600 text-white border-emerald-600" : "bg-white hover:bg-gray-50"}`}
+                >
+                  {label}
+                </button>
+              ))}
+            </div>
+          </div>
+
           <div>
             <button onClick={start} className="bg-emerald-600 text-white px-4 py-2 rounded hover:bg-emerald-700">Test starten</button>
           </div>
@@ -371,15 +405,27 @@ export default function VocabTest() {
           </div>
           <div className="text-sm text-gray-700">Quelle: <span className="font-medium">{q.sourceName}</span> → Ziel: <span className="font-medium">{q.targetName}</span></div>
           <div className="text-2xl font-semibold text-center">{q.q}</div>
-          <input
-            type="text"
-            value={answer}
-            onChange={(e) => setAnswer(e.target.value)}
-            onKeyDown={(e) => e.key === "Enter" && submit()}
-            className="border rounded w-full px-3 py-2"
-            placeholder="Antwort eingeben..."
-          />
-          <button onClick={submit} className="bg-emerald-600 text-white px-4 py-2 rounded hover:bg-emerald-700 w-full">Bestätigen</button>
+          {q.options ? (
+            <div className="grid grid-cols-1 gap-2">
+              {q.options.map((option, i) => (
+                <button key={i} onClick={() => submit(option)} className="border rounded px-3 py-2 text-left hover:bg-emerald-50">
+                  {option}
+                </button>
+              ))}
+            </div>
+          ) : (
+            <>
+              <input
+                type="text"
+                value={answer}
+                onChange={(e) => setAnswer(e.target.value)}
+                onKeyDown={(e) => e.key === "Enter" && submit()}
+                className="border rounded w-full px-3 py-2"
+                placeholder="Antwort eingeben..."
+              />
+              <button onClick={() => submit()} className="bg-emerald-600 text-white px-4 py-2 rounded hover:bg-emerald-700 w-full">Bestätigen</button>
+            </>
+          )}
         </div>
       </div>
     </div>
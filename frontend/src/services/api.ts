@@ -4,13 +4,71 @@ const api = axios.create({
   baseURL: import.meta.env.VITE_API_URL || "/api",
 });
 
+const MUTATING = ["post", "put", "patch", "delete"];
+
 api.interceptors.request.use((config) => {
   const token = localStorage.getItem("token");
   if (token) {
     config.headers.Authorization = `Bearer ${token}`;
   }
+  // Ein Key pro Vorgang: Wiederholungen (gleiche config) schicken denselben, der Server führt sie nur einmal aus
+  if (MUTATING.includes((config.method || "get").toLowerCase()) && !config.headers["Idempotency-Key"]) {
+    config.headers["Idempotency-Key"] = crypto.randomUUID();
+  }
   return config;
 });
 
+export function storeTokens(data: { access_token?: string; refresh_token?: string }) {
+  if (data?.access_token) localStorage.setItem("token", data.access_token);
+  if (data?.refresh_token) localStorage.setItem("refresh_token", data.refresh_token);
+}
+
+// Access-Tokens leben nur kurz: bei 401 einmal per Refresh-Token erneuern und den Request wiederholen.
+// Gleichzeitige 401er teilen sich einen Refresh, denn jedes Refresh-Token gilt nur einmal.
+let refreshing: Promise<string | null> | null = null;
+
+async function refreshAccessToken(): Promise<string | null> {
+  const refreshToken = localStorage.getItem("refresh_token");
+  if (!refreshToken) return null;
+  try {
+    const res = await axios.post(`${api.defaults.baseURL}/refresh/`, { refresh_token: refreshToken });
+    storeTokens(res.data);
+    return res.data.access_token;
+  } catch {
+    // Ein anderer Tab war schneller und hat schon neue Tokens gespeichert
+    if (localStorage.getItem("refresh_token") !== refreshToken) return localStorage.getItem("token");
+    return null;
+  }
+}
+
+/** Neues Access-Token (oder null); für Verbindungen außerhalb von axios, z.B. den Live-Stream. */
+export function refreshOnce(): Promise<string | null> {
+  refreshing = refreshing ?? refreshAccessToken().finally(() => { refreshing = null; });
+  return refreshing;
+}
+
+const NETWORK_RETRIES = 2;
+
+api.interceptors.response.use(undefined, async (error: any) => {
+  const original = error.config;
+  const url: string = original?.url || "";
+  // Antwort unterwegs verloren (Tunnel/Mobilfunk) oder Erstausführung läuft noch (409):
+  // mit demselben Idempotency-Key wiederholen, der Server spielt ggf. die gespeicherte Antwort ab
+  const lost = !error.response || (error.response.status === 409 && original?.headers?.["Idempotency-Key"]);
+  if (original && lost && original.headers?.["Idempotency-Key"] && (original._attempts ?? 0) < NETWORK_RETRIES) {
+    original._attempts = (original._attempts ?? 0) + 1;
+    await new Promise((resolve) => setTimeout(resolve, 500 * 2 ** original._attempts));
+    return api(original);
+  }
+  if (error.response?.status !== 401 || !original || original._retried || url.includes("/login/") || url.includes("/refresh/")) {
+    return Promise.reject(error);
+  }
+  const token = await refreshOnce();
+  if (!token) return Promise.reject(error);
+  original._retried = true;
+  original.headers.Authorization = `Bearer ${token}`;
+  return api(original);
+});
+
 export default api;
 
@@ -1,4 +1,4 @@
-import api from "./api";
+import api, { storeTokens } from "./api";
 
 // Login
 export async function login(username: string, password: string) {
@@ -10,8 +10,7 @@ export async function login(username: string, password: string) {
     headers: { "Content-Type": "application/x-www-form-urlencoded" },
   });
 
-  const token = res.data.access_token;
-  if (token) localStorage.setItem("token", token);
+  storeTokens(res.data);
 
   return res.data;
 }
@@ -31,5 +30,8 @@ export async function getCurrentUser() {
 }
 
 export function logout() {
+  const refreshToken = localStorage.getItem("refresh_token");
+  if (refreshToken) api.post("/logout/", { refresh_token: refreshToken }).catch(() => {});
   localStorage.removeItem("token");
+  localStorage.removeItem("refresh_token");
 }
@@ -0,0 +1,93 @@
+import api, { refreshOnce } from "./api";
+
+export interface EntryPayload {
+  id: number;
+  position: number;
+  values: Record<string, string>;
+}
+
+export type ListEvent =
+  | { type: "entry_created" | "entry_updated"; entry: EntryPayload }
+  | { type: "entry_deleted"; entry_id: number }
+  | { type: "field_updated"; entry_id: number; column_id: number; value: string }
+  | { type: "column_added"; column: { id: number; name: string; position: number; is_primary: boolean } }
+  | { type: "column_deleted"; column_id: number }
+  | { type: "list_updated"; name: string; description: string | null }
+  | { type: "list_deleted" }
+  | { type: "resync" };
+
+/** Feldwerte eines Events im Format der Listen-API (field_values). */
+export function fieldValues(entry: EntryPayload) {
+  return Object.entries(entry.values).map(([column_id, value]) => ({ entry_id: entry.id, column_id: Number(column_id), value }));
+}
+
+/**
+ * Live-Änderungen einer Liste (Server-Sent Events). Gelesen per fetch statt
+ * EventSource, damit das Token im Authorization-Header bleibt. Nach einem
+ * Abbruch (Tunnel, Stream-Ende mit dem Token) wird mit Last-Event-ID neu
+ * verbunden; "resync" heißt: Liste neu laden. Gibt eine Funktion zum Beenden zurück.
+ */
+export function subscribeToList(listId: number, onEvent: (event: ListEvent) => void): () => void {
+  const controller = new AbortController();
+  let lastEventId: string | null = null;
+  let retryMs = 3000;
+  let stopped = false;
+
+  const handle = (block: string) => {
+    let data = "";
+    for (const line of block.split("\n")) {
+      if (line.startsWith("id: ")) lastEventId = line.slice(4);
+      else if (line.startsWith("retry: ")) retryMs = Number(line.slice(7)) || retryMs;
+      else if (line.startsWith("data: ")) data += line.slice(6);
+    }
+    if (!data) return;
+    const event = JSON.parse(data) as ListEvent;
+    if (event.type === "list_deleted") stopped = true;
+    onEvent(event);
+  };
+
+  const connect = async (): Promise<void> => {
+    const headers: Record<string, string> = { Accept: "text/event-stream" };
+    const token = localStorage.getItem("token");
+    if (token) headers.Authorization = `Bearer ${token}`;
+    if (lastEventId) headers["Last-Event-ID"] = lastEventId;
+    const res = await fetch(`${api.defaults.baseURL}/vocablist/${listId}/events`, { headers, signal: controller.signal });
+    if (res.status === 401 && (await refreshOnce())) return;  // mit neuem Token sofort neu verbinden
+    if (!res.ok || !res.body) {
+      if ([401, 403, 404].includes(res.status)) stopped = true;
+      return;
+    }
+    const reader = res.body.pipeThrough(new TextDecoderStream()).getReader();
+    let buffer = "";
+    for (;;) {
+      const { value, done } = await reader.read();
+      if (done) return;
+      buffer += value;
+      let end;
+      while ((end = buffer.indexOf("\n\n")) >= 0) {
+        handle(buffer.slice(0, end));
+        buffer = buffer.slice(end + 2);
+      }
+    }
+  };
+
+  (async () => {
+    while (!stopped && !controller.signal.aborted) {
+      const started = Date.now();
+      try {
+        await connect();
+      } catch {
+        if (controller.signal.aborted) return;
+      }
+      // Nach sofortigem Abbruch warten, nach einem normal beendeten Stream gleich neu verbinden
+      if (!stopped && Date.now() - started < retryMs) {
+        await new Promise((resolve) => setTimeout(resolve, retryMs));
+      }
+    }
+  })();
+
+  return () => {
+    stopped = true;
+    controller.abort();
+  };
+}
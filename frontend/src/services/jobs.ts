@@ -0,0 +1,47 @@
+import api from "./api";
+
+export type JobStatus = "queued" | "running" | "succeeded" | "failed" | "cancelled";
+
+export interface Job {
+  id: number;
+  kind: string;
+  status: JobStatus;
+  progress: number;
+  total: number | null;
+  result: Record<string, any> | null;
+  error: string | null;
+  attempts: number;
+  created_at: number;
+  started_at: number | null;
+  finished_at: number | null;
+}
+
+export async function getJobs() {
+  return api.get<Job[]>("/jobs/");
+}
+
+export async function getJob(id: number) {
+  return api.get<Job>(`/jobs/${id}`);
+}
+
+export async function cancelJob(id: number) {
+  return api.post<Job>(`/jobs/${id}/cancel`);
+}
+
+export async function retryJob(id: number) {
+  return api.post<Job>(`/jobs/${id}/retry`);
+}
+
+// Fragt den Job ab, bis er beendet ist; onProgress z.B. für einen Fortschrittsbalken
+export async function waitForJob(
+  id: number,
+  onProgress?: (job: Job) => void,
+  intervalMs = 1000
+): Promise<Job> {
+  for (;;) {
+    const { data: job } = await getJob(id);
+    onProgress?.(job);
+    if (job.status !== "queued" && job.status !== "running") return job;
+    await new Promise((resolve) => setTimeout(resolve, intervalMs));
+  }
+}
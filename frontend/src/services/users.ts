@@ -1,4 +1,4 @@
-import api from "./api";
+import api, { storeTokens } from "./api";
 
 export async function getUsers() {
   return api.get("/user/");
@@ -22,5 +22,18 @@ export async function changePassword(userId: number, current_password: string, n
 }
 
 export async function changePasswordMe(current_password: string, new_password: string) {
-  return api.put(`/user/me/password/`, { current_password, new_password });
+  const res = await api.put(`/user/me/password/`, { current_password, new_password });
+  // Der Server beendet alle anderen Sitzungen und schickt für diese ein neues Token-Paar
+  storeTokens(res.data);
+  return res;
+}
+
+// Zähler fürs Dashboard (Listen/Einträge), ohne Listen zu laden
+export async function getMyStats() {
+  return api.get("/stats/me");
+}
+
+// Admin: Listen/Einträge pro Benutzer
+export async function getUserOverview() {
+  return api.get("/admin/stats/users");
 }
@@ -27,19 +27,32 @@ export async function createVocabList(
 
 export async function createEntry(
   vocabListId: number,
-  valuesByColumnId: Record<number, string>
+  valuesByColumnId: Record<number, string>,
+  rejectDuplicates = false
 ) {
   const field_values = Object.entries(valuesByColumnId).map(([column_id, value]) => ({
     column_id: Number(column_id),
     value,
   }));
-  return api.post("/vocab/entries", { vocab_list_id: vocabListId, field_values });
+  return api.post(
+    "/vocab/entries",
+    { vocab_list_id: vocabListId, field_values },
+    { params: rejectDuplicates ? { reject_duplicates: true } : undefined }
+  );
 }
 
 export async function getEntriesByList(listId: number) {
   return api.get(`/vocab/entries/list/${listId}`);
 }
 
+export async function getDuplicateEntries(listId: number) {
+  return api.get(`/vocab/entries/list/${listId}/duplicates`);
+}
+
+export async function lookupEntries(listId: number, term: string) {
+  return api.get(`/vocab/entries/list/${listId}/lookup`, { params: { term } });
+}
+
 export async function updateVocabList(
   id: number,
   data: { name?: string; description?: string }
@@ -47,8 +60,60 @@ export async function updateVocabList(
   return api.put(`/vocablist/${id}`, data);
 }
 
-export async function deleteVocabList(id: number) {
-  return api.delete(`/vocablist/${id}`);
+// background: 202 mit einem Job (siehe services/jobs.ts), sinnvoll für große Listen
+export async function deleteVocabList(id: number, background = false) {
+  return api.delete(`/vocablist/${id}`, { params: background ? { background: true } : undefined });
+}
+
+// Einträge und Füllstand pro Spalte
+export async function getVocabListStats(id: number) {
+  return api.get(`/vocablist/${id}/stats`);
+}
+
+// Multiple Choice: Fragen mit vorberechneten Ablenkern (ohne Zielspalten: alle anderen Spalten)
+export async function getQuiz(
+  listId: number,
+  sourceColumnId: number,
+  targetColumnIds: number[] = [],
+  count = 50,
+  choices = 4
+) {
+  const params = new URLSearchParams({ source_column_id: String(sourceColumnId), count: String(count), choices: String(choices) });
+  targetColumnIds.forEach((id) => params.append("target_column_id", String(id)));
+  return api.get(`/vocablist/${listId}/quiz`, { params });
+}
+
+export async function cloneVocabList(id: number, name?: string) {
+  return api.post(`/vocablist/${id}/clone`, name ? { name } : undefined);
+}
+
+export async function shareVocabList(id: number) {
+  return api.post(`/vocablist/${id}/share`);
+}
+
+export async function unshareVocabList(id: number) {
+  return api.delete(`/vocablist/${id}/share`);
+}
+
+export async function getSharedVocabList(shareCode: string) {
+  return api.get(`/shared/${shareCode}`);
+}
+
+export async function getSharedEntries(shareCode: string) {
+  return api.get(`/shared/${shareCode}/entries`);
+}
+
+export async function cloneSharedVocabList(shareCode: string, name?: string) {
+  return api.post(`/shared/${shareCode}/clone`, name ? { name } : undefined);
+}
+
+export async function importAnkiDeck(file: File, name?: string, background = false) {
+  const form = new FormData();
+  form.append("file", file);
+  if (name) form.append("name", name);
+  return api.post("/vocablist/import/anki", form, {
+    params: background ? { background: true } : undefined,
+  });
 }
 
 export async function updateEntry(